@@ -11,13 +11,21 @@ import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
-from google import genai
 
-from src.services.ai_generator import AIGenerator
+from src.services.ai_generator import AIGenerator, serialize_json
+from src.services.asset_bundler import AssetBundler
+from src.services.cancellation import CancellationToken, PhaseTimeouts
+from src.services.chart_filters import MaskCache
 from src.services.chat_handler import ChatHandler
+from src.services.compact_encoding import PayloadEncoding
 from src.services.data_processor import DataProcessor
-from src.services.genai_adapter import GenAIModelAdapter
+from src.services.genai_adapter import GenAIModelAdapter, create_genai_client
+from src.services.intent_classifier import IntentClassifier
 from src.services.mock_generator import MockAIGenerator
+from src.services.model_cassette import ModelCassette
+from src.services.query_engine import detect_date_column
+from src.services.rollup_cube import CubeBuild
+from src.services.time_partitions import TimePartitions
 from src.styles import MAJIN_ORACLE_CSS
 
 load_dotenv()
@@ -33,18 +41,38 @@ AVAILABLE_MODELS = [
     "gemini-2.0-flash-exp",  # 旧世代実験版
 ]
 
+# フェーズ別タイムアウト（秒）: 期限超過時は待機を打ち切りワーカーを解放する
+GENERATION_TIMEOUTS = PhaseTimeouts(
+    blueprint=90,
+    code=180,
+    repair=90,
+    aggregation=120,
+    assembly=30,
+)
+
+# 埋め込みデータ: 表は列形式。KPI や表のセルに表示する値が変わらないよう丸めない
+PAYLOAD_ENCODING = PayloadEncoding(columnar=True, significant_digits=None)
+
+# チャットの意図分類: 確信度 0.8 以上はローカルで判定し、モデル呼び出しを1回省く
+INTENT_CLASSIFIER = IntentClassifier(threshold=0.8)
+
 SESSION_DEFAULTS = {
     "csv_data": None,
     "df_full": None,
     "dashboard_html": None,
     "aggregated_data": None,
     "blueprint": None,
+    "downsampled": [],
     "chat_history": [],
     "generation_status": "idle",
     "current_step": 0,
     "total_steps": 4,
     "last_generation_error": None,
     "demo_mode": False,
+    "cancel_token": None,
+    "mask_cache": None,
+    "rollup_cube": None,
+    "time_partitions": None,
 }
 
 PROGRESS_STEPS = [
@@ -75,7 +103,10 @@ def init_session_state() -> None:
 
 
 def reset_session_state() -> None:
-    """セッション状態のリセット"""
+    """セッション状態のリセット（進行中の生成はキャンセルする）"""
+    token = st.session_state.get("cancel_token")
+    if token is not None:
+        token.cancel("セッションがリセットされました")
     for key in list(st.session_state.keys()):
         del st.session_state[key]
 
@@ -164,12 +195,43 @@ def render_sidebar() -> str:
 # =============================================================================
 
 
+@st.cache_resource
+def load_offline_assets(directory: str) -> AssetBundler | None:
+    """OFFLINE_ASSETS_DIR のアセットを読み込む（読み込んだ内容はプロセス内で使い回す）"""
+    try:
+        return AssetBundler(directory)
+    except ValueError as e:
+        st.warning(f"オフライン用アセットを使えません（CDN を参照します）: {e}")
+        return None
+
+
+@st.cache_resource
+def load_model_cassette() -> ModelCassette | None:
+    """GEMINI_CASSETTE のカセットを読み込む（再実行ごとに記録ファイルを読み直さない）"""
+    return ModelCassette.from_env()
+
+
 def generate_dashboard(df: pd.DataFrame, model) -> bool:
     """ダッシュボードをワンショットで生成"""
     if st.session_state.get("demo_mode", False):
         generator = MockAIGenerator()
     else:
-        generator = AIGenerator(model=model)
+        assets_dir = os.getenv("OFFLINE_ASSETS_DIR")
+        generator = AIGenerator(
+            model=model,
+            timeouts=GENERATION_TIMEOUTS,
+            encoding=PAYLOAD_ENCODING,
+            optimize_output=True,
+            assets=load_offline_assets(assets_dir) if assets_dir else None,
+            time_partitions=st.session_state.get("time_partitions"),
+        )
+
+    # 前回の生成が残っていればキャンセルし、新しいトークンで開始する
+    previous_token = st.session_state.get("cancel_token")
+    if previous_token is not None:
+        previous_token.cancel("新しい生成が開始されました")
+    cancel_token = CancellationToken()
+    st.session_state.cancel_token = cancel_token
 
     def progress_callback(step: int, message: str) -> None:
         st.session_state.current_step = step
@@ -177,11 +239,14 @@ def generate_dashboard(df: pd.DataFrame, model) -> bool:
 
     try:
         st.session_state.generation_status = "generating"
-        result = generator.generate_oneshot(df, progress_callback=progress_callback)
+        result = generator.generate_oneshot(
+            df, progress_callback=progress_callback, cancel_token=cancel_token
+        )
 
         st.session_state.dashboard_html = result.html
         st.session_state.aggregated_data = result.data
         st.session_state.blueprint = result.blueprint
+        st.session_state.downsampled = result.downsampled
         st.session_state.generation_status = "complete"
 
         _add_initial_chat_message(df)
@@ -236,6 +301,7 @@ def render_upload_view(model) -> None:
                 # ダミーデータフレームを作成
                 dummy_df = pd.DataFrame({"dummy": [1, 2, 3]})
                 st.session_state.df_full = dummy_df
+                st.session_state.csv_data = None
 
                 if generate_dashboard(dummy_df, model):
                     st.rerun()
@@ -250,10 +316,26 @@ def render_upload_view(model) -> None:
     try:
         uploaded_file.seek(0)
         csv_bytes = uploaded_file.read()
-        df = processor.load_csv(csv_bytes)
 
-        st.session_state.df_full = df
-        st.session_state.csv_data = csv_bytes
+        # 同じファイルの再実行では読み込んだ DataFrame を使い回す
+        # （パーティションは作った DataFrame オブジェクトにだけ使われる）
+        if (
+            st.session_state.df_full is None
+            or st.session_state.rollup_cube is None
+            or st.session_state.csv_data != csv_bytes
+        ):
+            df = processor.load_csv(csv_bytes)
+            # グラフ・ローカル集計用のロールアップキューブはバックグラウンドで事前集計する
+            # （構築中のチャットは生データで集計する）
+            st.session_state.rollup_cube = CubeBuild(df)
+            # 日付の範囲の絞り込み用に、日付カラムで並べたパーティションを作る
+            date_column = detect_date_column(df)
+            st.session_state.time_partitions = (
+                TimePartitions.build(df, date_column) if date_column is not None else None
+            )
+            st.session_state.df_full = df
+            st.session_state.csv_data = csv_bytes
+        df = st.session_state.df_full
 
         st.success(f"読み込み完了: {len(df)}行 x {len(df.columns)}列")
 
@@ -311,6 +393,19 @@ def _render_dashboard_panel() -> None:
             mime="text/html",
             width="stretch",
         )
+        if st.session_state.aggregated_data is not None:
+            st.download_button(
+                label="集計データ(JSON)をダウンロード",
+                data=serialize_json(st.session_state.aggregated_data),
+                file_name="aggregated_data.json",
+                mime="application/json",
+                width="stretch",
+            )
+        for series in st.session_state.downsampled:
+            st.caption(
+                f"{series.path}: {series.original_points:,} 点 → {series.points:,} 点に間引いて"
+                "表示しています（JSON には全件を含みます）"
+            )
 
     if st.button("新しいデータで始める"):
         reset_session_state()
@@ -327,38 +422,56 @@ def _render_chat_panel(model) -> None:
             if message.get("chart_html"):
                 components.html(message["chart_html"], height=300)
 
-    _render_chat_suggestions(model)
+    suggestion = _render_chat_suggestions()
 
-    if prompt := st.chat_input("質問や分析リクエストを入力..."):
-        _handle_chat_input(prompt, model)
+    if user_message := st.chat_input("質問や分析リクエストを入力...") or suggestion:
+        _handle_chat_input(user_message, model)
         st.rerun()
 
 
-def _render_chat_suggestions(model) -> None:
-    """チャットサジェストを描画"""
+def _render_chat_suggestions() -> str | None:
+    """チャットサジェストを描画し、押されたサジェストを返す"""
     if len(st.session_state.chat_history) > 2:
-        return
+        return None
 
     st.markdown("こんな質問ができます:")
     cols = st.columns(3)
+    selected = None
     for i, suggestion in enumerate(CHAT_SUGGESTIONS):
         with cols[i]:
             if st.button(suggestion, key=f"sug_{i}"):
-                _handle_chat_input(suggestion, model)
-                st.rerun()
+                selected = suggestion
+    return selected
 
 
 def _handle_chat_input(user_message: str, model) -> None:
-    """チャット入力を処理"""
+    """チャット入力を処理（応答はトークンが届くたびに描画する）"""
     st.session_state.chat_history.append({"role": "user", "content": user_message})
-
-    handler = ChatHandler(model=model)
+    with st.chat_message("user"):
+        st.markdown(user_message)
+
+    # 絞り込みのマスク・カラムの転置インデックスは会話をまたいで再利用する
+    if st.session_state.mask_cache is None:
+        st.session_state.mask_cache = MaskCache(index_columns=True)
+    cube_build = st.session_state.rollup_cube
+    handler = ChatHandler(
+        model=model,
+        intent_classifier=INTENT_CLASSIFIER,
+        combined=True,
+        local_queries=True,
+        mask_cache=st.session_state.mask_cache,
+        rollup_cube=cube_build.cube if cube_build is not None else None,
+        time_partitions=st.session_state.time_partitions,
+    )
     context = {
         "df": st.session_state.df_full,
         "summary": st.session_state.aggregated_data,
     }
 
-    response = handler.handle_message(user_message, context)
+    with st.chat_message("assistant"):
+        stream = handler.stream_message(user_message, context)
+        st.write_stream(stream)
+    response = stream.response
 
     assistant_message = {"role": "assistant", "content": response.content}
 
@@ -390,8 +503,13 @@ def main() -> None:
 
     model_name = render_sidebar()
     api_key = os.getenv("GOOGLE_API_KEY")
-    client = genai.Client(api_key=api_key)
-    model = GenAIModelAdapter(client, model_name=model_name)
+    # GEMINI_BASE_URL を設定するとローカル代替サーバー等に接続する
+    # GEMINI_CASSETTE を設定するとモデル呼び出しを記録・再生する
+    cassette = load_model_cassette()
+    client = None
+    if cassette is None or not cassette.replaying:
+        client = create_genai_client(api_key, base_url=os.getenv("GEMINI_BASE_URL"))
+    model = GenAIModelAdapter(client, model_name=model_name, cassette=cassette)
 
     if is_dashboard_complete():
         render_dashboard_view(model)
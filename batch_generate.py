@@ -0,0 +1,87 @@
+"""
+CSV 一括ダッシュボード生成 CLI
+
+使い方:
+    python batch_generate.py data/stores/ --output out/ --workers 8 --max-model-calls 4
+    python batch_generate.py "data/**/*.csv" --output out/ --no-resume
+
+各 CSV について <name>.html と <name>.json を出力し、
+batch_state.jsonl（再開用）と batch_summary.json（処理時間サマリー）を書き出す。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from src.services.batch_generator import (
+    DEFAULT_MODEL_NAME,
+    BatchConfig,
+    BatchFileResult,
+    run_batch,
+)
+from src.services.cancellation import PhaseTimeouts
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CSVからダッシュボードを一括生成します")
+    parser.add_argument("inputs", nargs="+", help="CSVファイル・ディレクトリ・グロブパターン")
+    parser.add_argument("-o", "--output", required=True, type=Path, help="出力ディレクトリ")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="使用するモデル名")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=4, help="ワーカープロセス数（0 で逐次実行）"
+    )
+    parser.add_argument(
+        "--max-model-calls", type=int, default=4, help="全ワーカー合計のモデル同時呼び出し数"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="各フェーズのタイムアウト（秒）"
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true", help="完了済みファイルもすべて再生成する"
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+
+    timeouts = None
+    if args.timeout is not None:
+        timeouts = PhaseTimeouts(
+            blueprint=args.timeout,
+            code=args.timeout,
+            repair=args.timeout,
+            aggregation=args.timeout,
+            assembly=args.timeout,
+        )
+    config = BatchConfig(
+        inputs=args.inputs,
+        output_dir=args.output,
+        model_name=args.model,
+        workers=args.workers,
+        max_model_calls=args.max_model_calls,
+        resume=not args.no_resume,
+        timeouts=timeouts,
+    )
+
+    def on_result(result: BatchFileResult) -> None:
+        total = result.timings.get("total")
+        elapsed = f" ({total:.1f}s)" if total is not None else ""
+        print(f"[{result.status}] {result.source}{elapsed}", flush=True)
+
+    try:
+        report = run_batch(config, on_result=on_result)
+    except ValueError as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 2
+
+    print()
+    print(report.format_table())
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
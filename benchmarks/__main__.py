@@ -0,0 +1,81 @@
+"""
+ベンチマーク CLI
+
+使い方:
+    python -m benchmarks                       # 計測してベースラインと比較
+    python -m benchmarks --filter load_csv     # ケース名で絞り込み
+    python -m benchmarks --update-baselines    # 計測結果でベースラインを更新
+
+ベースラインより threshold（%）以上遅くなったケースがあると終了コード 1 を返す。
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.suite import DEFAULT_SIZES, build_cases
+from src.utils.benchmark import (
+    compare,
+    format_report,
+    load_baselines,
+    run_case,
+    save_baselines,
+)
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="計測する行数"
+    )
+    parser.add_argument("--filter", default="", help="ケース名に含まれる文字列で絞り込む")
+    parser.add_argument("--rounds", type=int, default=7, help="計測ラウンド数")
+    parser.add_argument("--threshold", type=float, default=25.0, help="回帰とみなす変化率（%%）")
+    parser.add_argument("--baselines", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", type=Path, help="結果を JSON で書き出す")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    cases = [case for case in build_cases(args.sizes) if args.filter in case.name]
+    if not cases:
+        print("該当するベンチマークがありません", file=sys.stderr)
+        return 2
+
+    results = []
+    for case in cases:
+        results.append(run_case(case, rounds=args.rounds))
+        print(f"  {case.name}", file=sys.stderr)
+
+    comparisons = compare(results, load_baselines(args.baselines), args.threshold)
+    print(format_report(results, comparisons))
+
+    if args.json:
+        payload = {
+            "results": [
+                {
+                    **result.to_dict(),
+                    "status": comparison.status,
+                    "change_pct": comparison.change_pct,
+                }
+                for result, comparison in zip(results, comparisons)
+            ],
+        }
+        args.json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.update_baselines:
+        save_baselines(args.baselines, results)
+        print(f"ベースラインを更新しました: {args.baselines}")
+        return 0
+
+    regressions = [c for c in comparisons if c.status == "regression"]
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
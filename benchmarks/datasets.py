@@ -0,0 +1,41 @@
+"""
+ベンチマーク用データセット
+
+責務:
+- 再現可能な大規模 DataFrame / CSV の生成
+"""
+
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+REGIONS = ["東京", "大阪", "名古屋", "福岡", "札幌", "仙台", "広島", "神戸"]
+PRODUCTS = [f"商品{i}" for i in range(1, 51)]  # 50商品
+CATEGORIES = ["食品", "衣料", "電化製品", "日用品", "書籍"]
+
+
+def generate_large_dataframe(rows: int, seed: int = 42) -> pd.DataFrame:
+    """大規模テストデータを生成"""
+    rng = np.random.RandomState(seed)
+
+    return pd.DataFrame(
+        {
+            "日付": pd.date_range("2020-01-01", periods=rows, freq="h"),
+            "地域": rng.choice(REGIONS, rows),
+            "商品名": rng.choice(PRODUCTS, rows),
+            "カテゴリ": rng.choice(CATEGORIES, rows),
+            "売上": rng.randint(100, 100000, rows),
+            "数量": rng.randint(1, 100, rows),
+            "利益": rng.randint(-10000, 50000, rows),
+            "顧客ID": rng.randint(1, 10000, rows),
+        }
+    )
+
+
+def generate_large_csv_bytes(rows: int, seed: int = 42) -> bytes:
+    """大規模CSVデータをバイト列で生成"""
+    df = generate_large_dataframe(rows, seed=seed)
+    buffer = StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,131 @@
+"""
+HTML 注入ベンチマーク
+
+責務:
+- 数 MB〜100 MB のテンプレートとデータでの inject_json の計測
+- 注入パスごと（プレースホルダー / dashboardData 宣言 / </body> 挿入）の処理速度（MB/s）
+- サイズに対するスケーリング指数の推定（線形であることの確認）
+
+テンプレートとデータは半分ずつの大きさにする（--sizes-mb は合計サイズ）。
+数十 MB を超えると出力文字列1回分のコピー自体がキャッシュ・ページ確保の影響で
+超線形になるため、同じサイズの単純な join（コピー下限）も計測し、
+指数はコピー下限との差で判定する。
+
+使い方:
+    python -m benchmarks.injection                      # 1 / 10 / 100 MB
+    python -m benchmarks.injection --sizes-mb 10 --rounds 5
+"""
+
+import argparse
+import gc
+import json
+import sys
+from unittest.mock import Mock
+
+from src.services.ai_generator import AIGenerator
+from src.services.mock_generator import MOCK_DASHBOARD_HTML
+from src.utils.benchmark import fit_scaling_exponent, measure
+
+DEFAULT_SIZES_MB = (1, 10, 100)
+DEFAULT_TOLERANCE = 0.15
+
+# 注入パスごとのテンプレート（MOCK_DASHBOARD_HTML のデータ宣言を差し替える）
+INJECTION_PATHS = {
+    "placeholder": MOCK_DASHBOARD_HTML,
+    "declaration": MOCK_DASHBOARD_HTML.replace("{{JSON_DATA}}", "{}"),
+    "body": MOCK_DASHBOARD_HTML.replace("const dashboardData = {{JSON_DATA}};", ""),
+}
+
+_FILLER_CARD = '<div class="card"><h3>売上推移</h3><p class="micro-insight">前年比 +12%</p></div>\n'
+
+
+def build_inputs(template: str, megabytes: float) -> tuple[str, str]:
+    """
+    合計 megabytes MB のテンプレートと JSON を作る
+
+    テンプレートは </body> の前にカード要素を繰り返して大きくする。
+    """
+    half = int(megabytes * 1024 * 1024 / 2)
+    filler = _FILLER_CARD * max(half // len(_FILLER_CARD.encode()), 1)
+    large_template = template.replace("</body>", filler + "</body>")
+
+    row = {"日付": "2024-01-01", "地域": "東京", "売上": 12345.678, "数量": 3}
+    row_bytes = len(json.dumps(row, ensure_ascii=False).encode()) + 2
+    json_data = json.dumps(
+        {"table": [row] * max(half // row_bytes, 1)}, ensure_ascii=False, check_circular=False
+    )
+    return large_template, json_data
+
+
+def _median_seconds(func, rounds: int) -> float:
+    return measure(func, rounds=rounds, warmup=1, min_round_seconds=0).median
+
+
+def run_injection(
+    sizes_mb: list[float], rounds: int = 3, paths: list[str] | None = None
+) -> dict[str, list[tuple[int, float]]]:
+    """
+    注入パス・サイズごとに inject_json を計測し、パス別の (入力バイト数, 中央値秒) を返す
+
+    "copy" には同じ入力を1回 join するだけの時間（コピー下限）を入れる。
+    """
+    generator = AIGenerator(model=Mock())
+    measurements: dict[str, list[tuple[int, float]]] = {}
+    for megabytes in sizes_mb:
+        for path in paths or list(INJECTION_PATHS):
+            template, json_data = build_inputs(INJECTION_PATHS[path], megabytes)
+            size = len(template.encode()) + len(json_data.encode())
+            seconds = _median_seconds(
+                lambda template=template, json_data=json_data: generator.inject_json(
+                    template, json_data
+                ),
+                rounds,
+            )
+            measurements.setdefault(path, []).append((size, seconds))
+            print(
+                f"  {path:<12} {size / 1e6:>8.1f} MB  {seconds * 1e3:>9.2f} ms  "
+                f"{size / 1e6 / seconds:>8.0f} MB/s",
+                file=sys.stderr,
+            )
+        copy_seconds = _median_seconds(
+            lambda template=template, json_data=json_data: "".join([template, json_data]),
+            rounds,
+        )
+        measurements.setdefault("copy", []).append((size, copy_seconds))
+        del template, json_data
+        gc.collect()
+    return measurements
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.injection", description=__doc__)
+    parser.add_argument(
+        "--sizes-mb", type=float, nargs="+", default=list(DEFAULT_SIZES_MB), help="合計サイズ（MB）"
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    measurements = run_injection(args.sizes_mb, rounds=args.rounds)
+    if len(args.sizes_mb) < 2:
+        return 0
+
+    copy = fit_scaling_exponent(*zip(*measurements.pop("copy")), name="copy")
+    passed = True
+    print(f"{'path':<12} {'exponent':>9} {'copy':>7} {'r2':>6}  status")
+    for path, points in measurements.items():
+        fit = fit_scaling_exponent(*zip(*points), name=path)
+        ok = fit.exponent - copy.exponent <= args.tolerance
+        passed &= ok
+        status = "ok" if ok else "SUPERLINEAR"
+        print(
+            f"{path:<12} {fit.exponent:>9.2f} {copy.exponent:>7.2f} {fit.r_squared:>6.2f}  {status}"
+        )
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
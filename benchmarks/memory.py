@@ -0,0 +1,119 @@
+"""
+generate_oneshot の段階別メモリベンチマーク
+
+責務:
+- load / profile / prompt / exec / downsample / json_coercion / html_assembly の各段階の
+  Python ヒープピークと RSS 増分の計測
+- 行数ごとのピーク段階の報告
+
+モデル呼び出しは含めず、モックモードと同じ HTML テンプレートと、行数に比例して
+出力が大きくなる集計コード（benchmarks.suite.ASSEMBLY_CODE）を使う。
+html_assembly は generate_oneshot と同じ assemble_html（除外・エンコード・シリアライズ・
+注入）を計測する。json_coercion は JSON 互換への変換だけを切り出した参考値で、
+assemble_html の中でも同じ変換を行う。
+
+使い方:
+    python -m benchmarks.memory                           # 10k / 1M / 10M 行
+    python -m benchmarks.memory --sizes 10000 1000000 --json memory.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+from benchmarks.datasets import generate_large_csv_bytes
+from benchmarks.suite import ASSEMBLY_CODE
+from src.services.ai_generator import AIGenerator, _coerce_json_value
+from src.services.data_processor import DataProcessor
+from src.services.downsampling import downsample_payload
+from src.services.mock_generator import MOCK_BLUEPRINT, MOCK_DASHBOARD_HTML
+from src.utils.memory_profile import MemoryProfiler, MemoryReport
+
+DEFAULT_MEMORY_SIZES = (10_000, 1_000_000, 10_000_000)
+
+PIPELINE_STAGES = (
+    "load",
+    "profile",
+    "prompt",
+    "exec",
+    "downsample",
+    "json_coercion",
+    "html_assembly",
+)
+
+
+def pipeline_generator() -> AIGenerator:
+    """
+    計測に使う AIGenerator
+
+    モックテンプレートは ASSEMBLY_CODE の集計結果のキーを参照しないため、除外・圧縮を
+    無効にして集計結果の全件を組み立てる（benchmarks.suite と同じ設定）。
+    """
+    return AIGenerator(model=Mock(), prune_payload=False, compress_threshold=None)
+
+
+def profile_pipeline(rows: int, sample_rss: bool = True) -> MemoryReport:
+    """
+    1つの行数で generate_oneshot 相当のパイプラインを段階別に計測する
+
+    入力 CSV バイト列の生成は計測に含めない（アップロード済みの状態から開始）。
+    """
+    csv_bytes = generate_large_csv_bytes(rows)
+    gc.collect()
+
+    processor = DataProcessor()
+    generator = pipeline_generator()
+
+    with MemoryProfiler(f"{rows:,} rows", sample_rss=sample_rss) as profiler:
+        with profiler.stage("load"):
+            df = processor.load_csv(csv_bytes)
+        with profiler.stage("profile"):
+            processor.generate_summary(df)
+            processor.calculate_statistics(df)
+        with profiler.stage("prompt"):
+            generator.build_blueprint_prompt(df)
+            generator.build_code_prompt(MOCK_BLUEPRINT, df)
+        with profiler.stage("exec"):
+            data = generator.execute_aggregation(ASSEMBLY_CODE, df)
+        with profiler.stage("downsample"):
+            embedded, _ = downsample_payload(data, generator.downsample)
+        with profiler.stage("json_coercion"):
+            safe_data = _coerce_json_value(embedded)
+        del safe_data
+        with profiler.stage("html_assembly"):
+            generator.assemble_html(MOCK_DASHBOARD_HTML, embedded)
+
+    del df, data, embedded, csv_bytes
+    gc.collect()
+    return profiler.report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.memory", description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_MEMORY_SIZES), help="計測する行数"
+    )
+    parser.add_argument("--json", type=Path, help="結果を JSON で書き出す")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    reports = []
+    for rows in args.sizes:
+        report = profile_pipeline(rows)
+        reports.append(report)
+        print(report.format_table())
+        print(f"peak stage: {report.peak_stage.stage}\n")
+
+    if args.json:
+        payload = [report.to_dict() for report in reports]
+        args.json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+スケーラビリティ曲線ベンチマーク
+
+責務:
+- 1k 行から 10M 行以上まで対数等間隔に行数を変えたスイートの計測
+- サービスメソッドごとの経験的なスケーリング指数の推定
+- 線形（以下）であるべきメソッドが超線形になっていないかの判定
+
+固定サイズのテストでは見逃す偶発的な二乗オーダーの処理を検出する。
+小さいサイズでは固定オーバーヘッドが支配的で指数が低く出るため、
+判定には fit_min_rows 以上のサイズだけを使う。
+
+使い方:
+    python -m benchmarks.scaling                               # 1k〜10M 行
+    python -m benchmarks.scaling --max-rows 30000000 --points-per-decade 3
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.suite import build_cases
+from src.utils.benchmark import ScalingFit, fit_scaling_exponent, log_spaced_sizes, run_case
+
+# メソッドごとに許容するスケーリング指数の上限（すべて行数に対して線形以下であるべき）
+EXPECTED_MAX_EXPONENT = {
+    "load_csv": 1.0,
+    "generate_summary": 1.0,
+    "calculate_statistics": 1.0,
+    "execute_aggregation": 1.0,
+    "coerce_json_value": 1.0,
+    "assemble_html": 1.0,
+    "assemble_html_compressed": 1.0,
+    "generate_chart_data": 1.0,
+    "_get_data_info": 1.0,
+}
+
+DEFAULT_TOLERANCE = 0.15
+
+
+@dataclass
+class ScalingCheck:
+    """1メソッドの判定結果"""
+
+    fit: ScalingFit
+    overall: ScalingFit
+    limit: float
+
+    @property
+    def passed(self) -> bool:
+        return self.fit.exponent <= self.limit
+
+
+def method_name(case_name: str) -> str:
+    """ケース名からメソッド名を取り出す（"load_csv[1000]" → "load_csv"）"""
+    return case_name.split("[", 1)[0]
+
+
+def run_sweep(
+    sizes: list[int], rounds: int = 3, name_filter: str = ""
+) -> dict[str, list[tuple[int, float]]]:
+    """
+    行数ごとにスイートを計測し、メソッド別の (行数, 中央値秒) を返す
+
+    サイズごとにケースを作り直し、大きなデータを同時に保持しない。
+    """
+    measurements: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    for rows in sizes:
+        for case in build_cases([rows]):
+            if name_filter not in case.name:
+                continue
+            result = run_case(case, rounds=rounds, calibration_rounds=0)
+            measurements[method_name(case.name)].append((rows, result.median))
+            print(f"  {case.name}: {result.median:.4f}s", file=sys.stderr)
+    return dict(measurements)
+
+
+def analyse(
+    measurements: dict[str, list[tuple[int, float]]],
+    fit_min_rows: int = 100_000,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[ScalingCheck]:
+    """
+    メソッドごとにスケーリング指数を推定し、上限と比較する
+
+    判定用の当てはめは fit_min_rows 以上のサイズで行う（2点未満なら上位2点を使う）。
+    """
+    checks = []
+    for name, points in measurements.items():
+        points = sorted(points)
+        tail = [point for point in points if point[0] >= fit_min_rows]
+        if len(tail) < 2:
+            tail = points[-2:]
+        overall = fit_scaling_exponent(*zip(*points), name=name)
+        fit = fit_scaling_exponent(*zip(*tail), name=name)
+        limit = EXPECTED_MAX_EXPONENT.get(name, 1.0) + tolerance
+        checks.append(ScalingCheck(fit=fit, overall=overall, limit=limit))
+    return checks
+
+
+def format_checks(checks: list[ScalingCheck]) -> str:
+    lines = [
+        f"{'method':<24} {'exponent':>9} {'overall':>9} {'r2':>6} {'limit':>7}  status",
+        "-" * 68,
+    ]
+    for check in checks:
+        status = "ok" if check.passed else "SUPERLINEAR"
+        lines.append(
+            f"{check.fit.name:<24} {check.fit.exponent:>9.2f} {check.overall.exponent:>9.2f} "
+            f"{check.fit.r_squared:>6.2f} {check.limit:>7.2f}  {status}"
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling", description=__doc__)
+    parser.add_argument("--min-rows", type=int, default=1_000)
+    parser.add_argument("--max-rows", type=int, default=10_000_000)
+    parser.add_argument("--points-per-decade", type=int, default=2)
+    parser.add_argument(
+        "--fit-min-rows", type=int, default=100_000, help="判定用の当てはめに使う最小行数"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--filter", default="", help="ケース名に含まれる文字列で絞り込む")
+    parser.add_argument("--json", type=Path, help="計測値と指数を JSON で書き出す")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = log_spaced_sizes(args.min_rows, args.max_rows, args.points_per_decade)
+    measurements = run_sweep(sizes, rounds=args.rounds, name_filter=args.filter)
+    if not measurements:
+        print("該当するベンチマークがありません", file=sys.stderr)
+        return 2
+
+    checks = analyse(measurements, fit_min_rows=args.fit_min_rows, tolerance=args.tolerance)
+    print(format_checks(checks))
+
+    if args.json:
+        payload = {
+            "sizes": sizes,
+            "methods": {
+                check.fit.name: {
+                    "points": measurements[check.fit.name],
+                    "exponent": check.fit.exponent,
+                    "overall_exponent": check.overall.exponent,
+                    "r_squared": check.fit.r_squared,
+                    "limit": check.limit,
+                    "passed": check.passed,
+                }
+                for check in checks
+            },
+        }
+        args.json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    return 0 if all(check.passed for check in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
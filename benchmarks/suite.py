@@ -0,0 +1,274 @@
+"""
+サービス層ベンチマークスイート
+
+責務:
+- 計測ケース（load_csv / generate_summary / calculate_statistics /
+  execute_aggregation / coerce_json_value / assemble_html / assemble_html_compressed /
+  generate_chart_data / generate_chart_data_top_n /
+  generate_chart_data_by_date / generate_chart_data_filtered /
+  generate_chart_data_indexed / build_rollup_cube / generate_chart_data_cube /
+  build_time_partitions / generate_chart_data_date_range / _get_data_info）の定義
+
+ケース名は "<対象>[<行数>]" 形式で、baselines.json のキーになる。
+"""
+
+from collections.abc import Iterable
+from functools import lru_cache
+from unittest.mock import Mock
+
+import pandas as pd
+
+from benchmarks.datasets import generate_large_csv_bytes, generate_large_dataframe
+from src.services.ai_generator import AIGenerator, _coerce_json_value
+from src.services.chart_filters import MaskCache
+from src.services.chat_handler import ChatHandler
+from src.services.data_processor import DataProcessor
+from src.services.mock_generator import MOCK_DASHBOARD_HTML
+from src.services.rollup_cube import RollupCube
+from src.services.time_partitions import TimePartitions
+from src.utils.benchmark import BenchmarkCase
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+AGGREGATION_CODE = """
+def aggregate_all_data(df):
+    import pandas as pd
+
+    # KPI計算
+    kpi = {
+        "total_sales": int(df['売上'].sum()),
+        "total_profit": int(df['利益'].sum()),
+        "avg_sales": float(df['売上'].mean()),
+        "transaction_count": len(df)
+    }
+
+    # グラフデータ
+    charts = {
+        "region_sales": df.groupby('地域')['売上'].sum().to_dict(),
+        "category_sales": df.groupby('カテゴリ')['売上'].sum().to_dict(),
+        "daily_sales": df.groupby(df['日付'].dt.date)['売上'].sum().head(30).to_dict()
+    }
+
+    return {"kpi": kpi, "charts": charts}
+"""
+
+# 行数に比例して大きくなる集計結果（組み立て時の JSON 化コストを計測する）
+ASSEMBLY_CODE = """
+def aggregate_all_data(df):
+    import pandas as pd
+
+    dates = pd.to_datetime(df['日付']).dt.date
+    daily = df.groupby(dates).agg(売上=('売上', 'sum'), 利益=('利益', 'sum'))
+    return {
+        "kpi": {"row_count": len(df), "total_sales": df['売上'].sum()},
+        "charts": {
+            "daily": {
+                "labels": [str(d) for d in daily.index],
+                "sales": daily['売上'].tolist(),
+                "profit": daily['利益'],
+            },
+            "region": df.groupby('地域')['売上'].sum(),
+        },
+        "table": df.head(len(df) // 10)[['地域', '商品名', '売上', '数量']].to_dict('records'),
+    }
+"""
+
+CHART_SPEC = {"type": "bar", "x": "地域", "y": "売上", "aggregation": "sum"}
+
+# グループ数の多いカラムを上位 N 件と「その他」にまとめる複数系列のグラフ
+TOP_N_CHART_SPEC = {
+    "type": "bar",
+    "x": "顧客ID",
+    "y": ["売上", "利益"],
+    "aggregation": ["sum", "mean"],
+    "top_n": 10,
+}
+
+# 1時間ごとの日付を x にしたグラフ（期間に丸めて点数を抑える）
+DATE_CHART_SPEC = {"type": "line", "x": "日付", "y": "売上", "aggregation": "sum"}
+
+# 絞り込み付きのグラフ（2回目以降はキャッシュしたマスクを使う）
+FILTERED_CHART_SPEC = {
+    "type": "bar",
+    "x": "商品名",
+    "y": "売上",
+    "filters": {"地域": "東京", "カテゴリ": ["食品", "日用品"], "数量": {"min": 10}},
+}
+
+# 選択率の低い絞り込み（転置インデックスから該当する行だけを集める）
+INDEXED_CHART_SPEC = {
+    "type": "bar",
+    "x": "カテゴリ",
+    "y": "売上",
+    "filters": {"地域": "東京", "商品名": "商品1"},
+}
+
+# ロールアップキューブから答えるグラフ（日付を期間に丸め、次元の等値で絞り込む）
+CUBE_CHART_SPEC = {
+    "type": "line",
+    "x": "日付",
+    "y": ["売上", "利益"],
+    "aggregation": ["sum", "mean"],
+    "filters": {"地域": "東京"},
+}
+
+# 日付の範囲で絞り込むグラフ（日付順のパーティションから該当する行だけを取り出す）
+DATE_RANGE_CHART_SPEC = {
+    "type": "bar",
+    "x": "地域",
+    "y": "売上",
+    "filters": {"日付": {"start": "2020-01-10", "end": "2020-01-20"}},
+}
+
+
+# スイートはサイズ順にケースを並べるため、直近1サイズ分だけ保持すれば足りる
+# （大きいサイズのデータを全サイズ分抱え込まない）
+@lru_cache(maxsize=1)
+def _dataframe(rows: int) -> pd.DataFrame:
+    return generate_large_dataframe(rows)
+
+
+@lru_cache(maxsize=1)
+def _csv_bytes(rows: int) -> bytes:
+    return generate_large_csv_bytes(rows)
+
+
+def _cube_data(rows: int) -> tuple[pd.DataFrame, RollupCube]:
+    df = _dataframe(rows)
+    return df, RollupCube.build(df)
+
+
+def _partitioned_data(rows: int) -> tuple[pd.DataFrame, TimePartitions]:
+    df = _dataframe(rows)
+    return df, TimePartitions.build(df, "日付")
+
+
+def _assembly_data(rows: int) -> dict:
+    generator = AIGenerator(model=Mock())
+    return generator.execute_aggregation(ASSEMBLY_CODE, _dataframe(rows))
+
+
+def _coercion_data(rows: int) -> dict:
+    """行数ぶんの値を持つ Series / リストを含む集計結果（欠損あり）"""
+    df = _dataframe(rows)
+    sales = df["売上"].astype(float)
+    sales.iloc[::20] = float("nan")
+    return {
+        "dates": df["日付"],
+        "sales": sales,
+        "quantity": df["数量"],
+        "region": df["地域"],
+        "profit": df["利益"].tolist(),
+    }
+
+
+def build_cases(sizes: Iterable[int] = DEFAULT_SIZES) -> list[BenchmarkCase]:
+    """
+    行数ごとの計測ケースを作る
+
+    データ生成は setup に置き、計測時間に含めない。
+    """
+    processor = DataProcessor()
+    # モックテンプレートは集計結果のキーを参照しないため、除外せず全件の組み立てを計測する
+    generator = AIGenerator(model=Mock(), prune_payload=False, compress_threshold=None)
+    compressing = AIGenerator(model=Mock(), prune_payload=False, compress_threshold=0)
+    handler = ChatHandler(model=Mock())
+    caching = ChatHandler(model=Mock(), mask_cache=MaskCache())
+    indexing = ChatHandler(model=Mock(), mask_cache=MaskCache(index_columns=True))
+
+    cases = []
+    for rows in sizes:
+        cases.extend(
+            [
+                BenchmarkCase(
+                    f"load_csv[{rows}]",
+                    processor.load_csv,
+                    setup=lambda rows=rows: _csv_bytes(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_summary[{rows}]",
+                    processor.generate_summary,
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"calculate_statistics[{rows}]",
+                    processor.calculate_statistics,
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"execute_aggregation[{rows}]",
+                    lambda df: generator.execute_aggregation(AGGREGATION_CODE, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"coerce_json_value[{rows}]",
+                    _coerce_json_value,
+                    setup=lambda rows=rows: _coercion_data(rows),
+                ),
+                BenchmarkCase(
+                    f"assemble_html[{rows}]",
+                    lambda data: generator.assemble_html(MOCK_DASHBOARD_HTML, data),
+                    setup=lambda rows=rows: _assembly_data(rows),
+                ),
+                BenchmarkCase(
+                    f"assemble_html_compressed[{rows}]",
+                    lambda data: compressing.assemble_html(MOCK_DASHBOARD_HTML, data),
+                    setup=lambda rows=rows: _assembly_data(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data[{rows}]",
+                    lambda df: handler.generate_chart_data(CHART_SPEC, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_top_n[{rows}]",
+                    lambda df: handler.generate_chart_data(TOP_N_CHART_SPEC, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_by_date[{rows}]",
+                    lambda df: handler.generate_chart_data(DATE_CHART_SPEC, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_filtered[{rows}]",
+                    lambda df: caching.generate_chart_data(FILTERED_CHART_SPEC, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_indexed[{rows}]",
+                    lambda df: indexing.generate_chart_data(INDEXED_CHART_SPEC, df),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"build_rollup_cube[{rows}]",
+                    RollupCube.build,
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_cube[{rows}]",
+                    lambda data: ChatHandler(model=Mock(), rollup_cube=data[1]).generate_chart_data(
+                        CUBE_CHART_SPEC, data[0]
+                    ),
+                    setup=lambda rows=rows: _cube_data(rows),
+                ),
+                BenchmarkCase(
+                    f"build_time_partitions[{rows}]",
+                    lambda df: TimePartitions.build(df, "日付"),
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+                BenchmarkCase(
+                    f"generate_chart_data_date_range[{rows}]",
+                    lambda data: ChatHandler(
+                        model=Mock(), time_partitions=data[1]
+                    ).generate_chart_data(DATE_RANGE_CHART_SPEC, data[0]),
+                    setup=lambda rows=rows: _partitioned_data(rows),
+                ),
+                BenchmarkCase(
+                    f"_get_data_info[{rows}]",
+                    handler._get_data_info,
+                    setup=lambda rows=rows: _dataframe(rows),
+                ),
+            ]
+        )
+    return cases
@@ -123,6 +123,7 @@ PHASE2_PROMPT_TEMPLATE = """
     - **【重要】型安全性とエラー防止:**
         - **`.cat` アクセサの使用は禁止**します。カテゴリ変数は必ず文字列型として扱い、`.unique()` や `.value_counts()` を使用してください。
         - **`.dt` アクセサ**を使用する場合、事前に対象カラムを `pd.to_datetime()` で確実に日時型に変換してください。
+    - **期間の絞り込み:** 日付の範囲で行を絞り込む場合は、比較演算子ではなく組み込みの `filter_date_range(df, "日付カラム", "2024-01-01", "2024-03-31")` を使用してください（開始・終了は省略可、終了日はその日の終わりまで含みます）。
 
 2.  **[HTML] ダッシュボード (Majin Executive Theme):**
     - Python側から渡される `const dashboardData = {{JSON_DATA}};` を受け取り、Chart.jsで描画してください。
@@ -10,16 +10,44 @@ AIGenerator - AI を使ったダッシュボード生成
 
 import ast
 import json
+import logging
 import re
 import traceback
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import partial
 from io import StringIO
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 from prompts import PHASE1_PROMPT_TEMPLATE, PHASE2_PROMPT_TEMPLATE
+from src.services.asset_bundler import AssetBundler
+from src.services.cancellation import (
+    CancellationToken,
+    GenerationCancelledError,
+    PhaseTimeoutError,
+    PhaseTimeouts,
+    run_with_deadline,
+)
+from src.services.chart_filters import filter_date_range
+from src.services.compact_encoding import (
+    DECODER_FUNCTION,
+    PayloadEncoding,
+    encode_payload,
+    insert_decoder,
+)
+from src.services.downsampling import DownsampleConfig, DownsampledSeries, downsample_payload
+from src.services.html_optimizer import optimize_template
+from src.services.payload_compression import COMPRESSED_DATA_EXPRESSION, embed_compressed
+from src.services.payload_pruning import prune_unreferenced
+from src.services.time_partitions import TimePartitions
+
+logger = logging.getLogger(__name__)
+
+# 埋め込む JSON がこのサイズ（バイト）を超えたら gzip + base64 で圧縮する
+COMPRESS_THRESHOLD_BYTES = 256 * 1024
 
 CHART_SAFETY_NET_SCRIPT = """
 <script src="https://unpkg.com/lucide@latest"></script>
@@ -80,6 +108,54 @@ DIRECT_VIEW_SCRIPT = """
 </script>
 """
 
+# inject_json が </body> の直前に挿入するスクリプト
+INJECTED_SCRIPTS = CHART_SAFETY_NET_SCRIPT + DIRECT_VIEW_SCRIPT
+
+
+# inject_json が探すトークン（先頭の固定文字列 → トークン全体のパターン）
+_INJECTION_TOKENS = {
+    "{{": re.compile(r"\{\{\s*JSON_DATA\s*\}\}"),
+    "const": re.compile(r"const\s+dashboardData\s*="),
+    "</body>": re.compile(r"</body>"),
+}
+
+_WHITESPACE_RE = re.compile(r"\s*")
+
+
+def _scan_injection_tokens(html: str) -> tuple[list[re.Match], re.Match | None, int]:
+    """
+    テンプレートを1回走査してプレースホルダー・最初の宣言・最後の </body> を探す
+
+    各トークンの先頭の固定文字列を str.find で前方へ探し、見つかった位置でだけ
+    正規表現を照合する（正規表現の選択を全文字で試すより桁違いに速い）。
+    各固定文字列の検索位置は前にしか進まないため、走査は入力長に対して線形。
+
+    Returns:
+        tuple: (プレースホルダーのマッチ, 最初の dashboardData 宣言のマッチ, </body> の位置)
+    """
+    placeholders: list[re.Match] = []
+    declaration: re.Match | None = None
+    body_close = -1
+    upcoming = {anchor: html.find(anchor) for anchor in _INJECTION_TOKENS}
+    while True:
+        candidates = [(pos, anchor) for anchor, pos in upcoming.items() if pos >= 0]
+        if not candidates:
+            return placeholders, declaration, body_close
+        position, anchor = min(candidates)
+        match = _INJECTION_TOKENS[anchor].match(html, position)
+        resume = position + 1
+        if match is not None:
+            resume = match.end()
+            if anchor == "{{":
+                placeholders.append(match)
+            elif anchor == "</body>":
+                body_close = position
+            elif declaration is None:
+                declaration = match
+        for other, pos in upcoming.items():
+            if 0 <= pos < resume:
+                upcoming[other] = html.find(other, resume)
+
 
 def _safe_tolist(obj: Any) -> list[Any]:
     if hasattr(obj, "tolist"):
@@ -209,22 +285,72 @@ def _format_runtime_error(error: Exception) -> str:
     return f"{error.__class__.__name__}: {error}"
 
 
-def _coerce_json_value(value: Any) -> Any:
-    if isinstance(value, dict):
-        return {str(key): _coerce_json_value(val) for key, val in value.items()}
-    if isinstance(value, (list, tuple, set)):
-        return [_coerce_json_value(item) for item in value]
+# 秒未満の端数を持つ datetime64 単位と、1秒あたりのカウント
+_DATETIME_UNITS_PER_SECOND = {"s": 1, "ms": 10**3, "us": 10**6, "ns": 10**9}
+
+
+def _isoformat_datetime64(values: np.ndarray) -> list[Any] | None:
+    """
+    tz なし datetime64 配列を Timestamp.isoformat() と同じ文字列リストに一括変換する
+
+    端数が0なら秒まで、マイクロ秒で割り切れれば6桁、それ以外は9桁の小数を付ける。
+    NaT は None。対応外の単位・年（1〜9999 年以外）の場合は None を返す。
+    """
+    unit = np.datetime_data(values.dtype)[0]
+    per_second = _DATETIME_UNITS_PER_SECOND.get(unit)
+    if per_second is None:
+        return None
+
+    nat = np.isnat(values)
+    ticks = values.view(np.int64)
+    seconds = np.where(nat, 0, ticks // per_second)
+    fraction_ns = (ticks - seconds * per_second) * (10**9 // per_second)
+    as_seconds = seconds.astype("datetime64[s]")
+    years = as_seconds.astype("datetime64[Y]").astype(np.int64) + 1970
+    if years.size and (years.min() < 1 or years.max() > 9999):
+        return None
+
+    result: list[Any] = np.datetime_as_string(as_seconds, unit="s").tolist()
+    for index in np.flatnonzero(fraction_ns).tolist():
+        fraction = int(fraction_ns[index])
+        if fraction % 1000 == 0:
+            result[index] += f".{fraction // 1000:06d}"
+        else:
+            result[index] += f".{fraction:09d}"
+    for index in np.flatnonzero(nat).tolist():
+        result[index] = None
+    return result
+
+
+def _coerce_array_values(value: pd.Series | pd.Index) -> list[Any]:
+    """Series / Index を dtype ごとに一括で JSON 互換のリストへ変換する"""
+    dtype = value.dtype
+    if isinstance(dtype, np.dtype):
+        kind = dtype.kind
+        if kind in "iub":
+            # 整数・真偽値は欠損を持たない
+            return value.tolist()
+        if kind == "f":
+            array = value.to_numpy()
+            items = array.tolist()
+            for index in np.flatnonzero(np.isnan(array)).tolist():
+                items[index] = None
+            return items
+        if kind == "M":
+            isoformatted = _isoformat_datetime64(value.to_numpy())
+            if isoformatted is not None:
+                return isoformatted
+    return [_coerce_json_value(item) for item in value.tolist()]
+
+
+def _coerce_scalar(value: Any) -> Any:
     if isinstance(value, (bytes, bytearray)):
         return value.decode("utf-8", errors="replace")
-    if value is None:
-        return None
     try:
         if pd.isna(value):
             return None
     except Exception:
         pass
-    if isinstance(value, (pd.Series, pd.Index)):
-        return [_coerce_json_value(item) for item in value.tolist()]
     if isinstance(value, pd.Timestamp):
         return value.isoformat()
     if isinstance(value, pd.Timedelta):
@@ -242,6 +368,44 @@ def _coerce_json_value(value: Any) -> Any:
     return value
 
 
+def _coerce_json_value(value: Any) -> Any:
+    """
+    集計結果を json.dumps できる値に変換する
+
+    型で分岐し、Series / Index は dtype ごとに一括変換する（NaN→None、
+    datetime→ISO 文字列、tolist()）。要素ごとの pd.isna 呼び出しを避けるだけで、
+    出力は要素単位で変換していたときと同一。ndarray は従来どおり、要素数1なら
+    item()、それ以外は tolist() をそのまま返す。
+    """
+    value_type = type(value)
+    if value_type is str or value_type is int or value_type is bool or value is None:
+        return value
+    if value_type is float:
+        return None if value != value else value
+    if isinstance(value, dict):
+        return {str(key): _coerce_json_value(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_coerce_json_value(item) for item in value]
+    if isinstance(value, (pd.Series, pd.Index)):
+        return _coerce_array_values(value)
+    if isinstance(value, np.ndarray) and value.size != 1:
+        return value.tolist()
+    return _coerce_scalar(value)
+
+
+def serialize_json(data: Any) -> str:
+    """
+    集計結果を JSON 文字列にする（pandas / numpy の値は JSON 互換に変換）
+
+    Args:
+        data: 集計結果
+
+    Returns:
+        str: JSON 文字列
+    """
+    return json.dumps(_coerce_json_value(data), ensure_ascii=False)
+
+
 @dataclass
 class GenerationResult:
     """ダッシュボード生成結果"""
@@ -249,45 +413,110 @@ class GenerationResult:
     html: str
     data: dict[str, Any]
     blueprint: str
+    downsampled: list[DownsampledSeries] = field(default_factory=list)
 
 
 class AIGenerator:
     """AIを使ったダッシュボード生成を行うクラス"""
 
-    def __init__(self, model):
+    def __init__(
+        self,
+        model,
+        timeouts: PhaseTimeouts | None = None,
+        downsample: DownsampleConfig | None = None,
+        prune_payload: bool = True,
+        compress_threshold: int | None = COMPRESS_THRESHOLD_BYTES,
+        encoding: PayloadEncoding | None = None,
+        optimize_output: bool = False,
+        assets: AssetBundler | None = None,
+        time_partitions: TimePartitions | None = None,
+    ):
         """
         Args:
             model: Gemini モデルインスタンス
+            timeouts: フェーズ別タイムアウト（None の場合は期限なし）
+            downsample: HTML 埋め込み前の系列間引き設定（None の場合は既定値）
+            prune_payload: テンプレートが参照しないキーを埋め込みデータから除くか
+            compress_threshold: 埋め込みデータを圧縮する JSON サイズ（バイト、None で圧縮しない）
+            encoding: 埋め込みデータの列形式化・有効桁数の設定（None の場合はそのまま埋め込む）
+            optimize_output: 外部リソースの重複除去・注入スクリプトの結合・縮小を行うか
+            assets: 外部アセットをインライン化するバンドラー（None の場合は CDN を参照する）
+            time_partitions: 集計対象の日付カラムのパーティション（集計コードの
+                filter_date_range が全行を走査せずに日付の範囲で絞り込む。集計コードが
+                並べ替えたデータなど、パーティションを作ったデータ以外はマスクで絞り込む）
         """
         self.model = model
+        self.timeouts = timeouts or PhaseTimeouts()
+        self.downsample = downsample or DownsampleConfig()
+        self.prune_payload = prune_payload
+        self.compress_threshold = compress_threshold
+        self.encoding = encoding
+        self.optimize_output = optimize_output
+        self.assets = assets
+        self.time_partitions = time_partitions
+
+    def _generate(
+        self,
+        generate_content: Callable[[str], Any],
+        prompt: str,
+        phase: str,
+        cancel_token: CancellationToken | None = None,
+    ) -> Any:
+        timeout = self.timeouts.for_phase(phase)
+        if timeout is not None and getattr(self.model, "supports_timeout", False) is True:
+            # 期限を超えた呼び出しが裏で待ち続けないよう、HTTP リクエストにも期限を付ける
+            generate_content = partial(generate_content, timeout=timeout)
+        return run_with_deadline(
+            generate_content,
+            prompt,
+            phase=phase,
+            timeout=timeout,
+            token=cancel_token,
+        )
 
-    def generate_blueprint(self, df: pd.DataFrame) -> str:
+    def generate_blueprint(
+        self, df: pd.DataFrame, cancel_token: CancellationToken | None = None
+    ) -> str:
         """
         データフレームからBlueprintを生成する
 
         Args:
             df: 対象のDataFrame
+            cancel_token: キャンセルトークン
 
         Returns:
             str: Blueprint（グラフ構成案）のMarkdown
         """
-        # データサマリーを作成
+        prompt = self.build_blueprint_prompt(df)
+        response = self._generate(self.model.generate_content, prompt, "blueprint", cancel_token)
+        return response.text
+
+    def build_blueprint_prompt(self, df: pd.DataFrame) -> str:
+        """Phase1 のプロンプト（カラム一覧と先頭5行のサンプル）を組み立てる"""
         columns_str = ", ".join(df.columns.tolist())
         buffer = StringIO()
         df.head(5).to_csv(buffer, index=False)
         sample_data = buffer.getvalue()
+        return PHASE1_PROMPT_TEMPLATE.format(columns=columns_str, sample_data=sample_data)
 
-        prompt = PHASE1_PROMPT_TEMPLATE.format(columns=columns_str, sample_data=sample_data)
-        response = self.model.generate_content(prompt)
-        return response.text
+    def build_code_prompt(self, blueprint: str, df: pd.DataFrame) -> str:
+        """Phase2 のプロンプト（Blueprint とカラム一覧）を組み立てる"""
+        # カラムリストを文字列化 (Ground Truth)
+        columns_str = ", ".join(df.columns.tolist())
+        return PHASE2_PROMPT_TEMPLATE.replace("{{BLUEPRINT}}", blueprint).replace(
+            "{{COLUMNS}}", columns_str
+        )
 
-    def generate_code(self, blueprint: str, df: pd.DataFrame) -> tuple[str, str]:
+    def generate_code(
+        self, blueprint: str, df: pd.DataFrame, cancel_token: CancellationToken | None = None
+    ) -> tuple[str, str]:
         """
         Blueprintからコードを生成する
 
         Args:
             blueprint: 承認されたBlueprint
             df: データフレーム（カラム名参照用）
+            cancel_token: キャンセルトークン
 
         Returns:
             Tuple[str, str]: (Python集計コード, HTMLダッシュボード)
@@ -295,13 +524,8 @@ class AIGenerator:
         Raises:
             ValueError: コードブロックが見つからない場合
         """
-        # カラムリストを文字列化 (Ground Truth)
-        columns_str = ", ".join(df.columns.tolist())
-
-        prompt = PHASE2_PROMPT_TEMPLATE.replace("{{BLUEPRINT}}", blueprint).replace(
-            "{{COLUMNS}}", columns_str
-        )
-        response = self.model.generate_content(prompt)
+        prompt = self.build_code_prompt(blueprint, df)
+        response = self._generate(self.model.generate_content, prompt, "code", cancel_token)
         content = response.text
 
         # Pythonコードを抽出（柔軟なパターン）
@@ -326,7 +550,12 @@ class AIGenerator:
 
         return py_code, html_code
 
-    def _repair_python_code(self, py_code: str, error: SyntaxError) -> str | None:
+    def _repair_python_code(
+        self,
+        py_code: str,
+        error: SyntaxError,
+        cancel_token: CancellationToken | None = None,
+    ) -> str | None:
         generate_content = getattr(self.model, "generate_content", None)
         if not callable(generate_content):
             return None
@@ -344,7 +573,7 @@ class AIGenerator:
             "Python code:\n"
             f"{py_code}\n"
         )
-        response = generate_content(prompt)
+        response = self._generate(generate_content, prompt, "repair", cancel_token)
         content = getattr(response, "text", None)
         if not isinstance(content, str):
             return None
@@ -354,7 +583,13 @@ class AIGenerator:
         extracted = _extract_python_code(content)
         return extracted or content
 
-    def _repair_runtime_error(self, py_code: str, error: Exception, df: pd.DataFrame) -> str | None:
+    def _repair_runtime_error(
+        self,
+        py_code: str,
+        error: Exception,
+        df: pd.DataFrame,
+        cancel_token: CancellationToken | None = None,
+    ) -> str | None:
         generate_content = getattr(self.model, "generate_content", None)
         if not callable(generate_content):
             return None
@@ -372,7 +607,7 @@ class AIGenerator:
             "Python code:\n"
             f"{py_code}\n"
         )
-        response = generate_content(prompt)
+        response = self._generate(generate_content, prompt, "repair", cancel_token)
         content = getattr(response, "text", None)
         if not isinstance(content, str):
             return None
@@ -389,13 +624,20 @@ class AIGenerator:
             "_safe_tolist": _safe_tolist,
             "_safe_mul": _safe_mul,
             "_safe_fillna": _safe_fillna,
+            "filter_date_range": partial(filter_date_range, partitions=self.time_partitions),
         }
 
-    def _exec_code_safe(self, code: str, original_code: str, scope: dict[str, Any]) -> None:
+    def _exec_code_safe(
+        self,
+        code: str,
+        original_code: str,
+        scope: dict[str, Any],
+        cancel_token: CancellationToken | None = None,
+    ) -> None:
         try:
             exec(code, scope, scope)
         except SyntaxError as e:
-            repaired = self._repair_python_code(original_code, e)
+            repaired = self._repair_python_code(original_code, e, cancel_token)
             if not repaired:
                 msg = _format_syntax_error(e, code)
                 raise ValueError(f"生成された集計コードに構文エラーがあります: {msg}") from e
@@ -407,33 +649,55 @@ class AIGenerator:
                 msg = _format_syntax_error(re, repaired_code)
                 raise ValueError(f"修正後の集計コードに構文エラーがあります: {msg}") from re
 
-    def execute_aggregation(self, py_code: str, df: pd.DataFrame) -> dict[str, Any]:
+    def _run_aggregate(
+        self,
+        scope: dict[str, Any],
+        df: pd.DataFrame,
+        cancel_token: CancellationToken | None = None,
+    ) -> dict[str, Any]:
+        return run_with_deadline(
+            scope["aggregate_all_data"],
+            df,
+            phase="aggregation",
+            timeout=self.timeouts.aggregation,
+            token=cancel_token,
+        )
+
+    def execute_aggregation(
+        self, py_code: str, df: pd.DataFrame, cancel_token: CancellationToken | None = None
+    ) -> dict[str, Any]:
         """
         Python集計コードを実行する
 
         Args:
             py_code: 集計コード
             df: 対象のDataFrame
+            cancel_token: キャンセルトークン
 
         Returns:
             dict: 集計結果
 
         Raises:
             ValueError: aggregate_all_data関数が定義されていない場合
+            GenerationCancelledError: キャンセルされた場合
+            PhaseTimeoutError: 集計・修復が期限を超過した場合
             Exception: 実行時エラー
         """
         normalized_code = _rewrite_generated_calls(py_code)
         scope = self._create_scope(df)
 
-        self._exec_code_safe(normalized_code, py_code, scope)
+        self._exec_code_safe(normalized_code, py_code, scope, cancel_token)
 
         if "aggregate_all_data" not in scope:
             raise ValueError("aggregate_all_data 関数が定義されていません")
 
         try:
-            return scope["aggregate_all_data"](df)
+            return self._run_aggregate(scope, df, cancel_token)
+        except (GenerationCancelledError, PhaseTimeoutError):
+            # キャンセル・期限超過は修復対象外
+            raise
         except Exception as error:
-            repaired = self._repair_runtime_error(py_code, error, df)
+            repaired = self._repair_runtime_error(py_code, error, df, cancel_token)
             if not repaired:
                 raise ValueError(
                     f"集計コードの実行に失敗しました: {_format_runtime_error(error)}"
@@ -442,13 +706,15 @@ class AIGenerator:
             # Repaired code execution
             normalized_repaired = _rewrite_generated_calls(repaired)
             scope = self._create_scope(df)
-            self._exec_code_safe(normalized_repaired, repaired, scope)
+            self._exec_code_safe(normalized_repaired, repaired, scope, cancel_token)
 
             if "aggregate_all_data" not in scope:
                 raise ValueError("修正後のaggregate_all_data 関数が定義されていません") from error
 
             try:
-                return scope["aggregate_all_data"](df)
+                return self._run_aggregate(scope, df, cancel_token)
+            except (GenerationCancelledError, PhaseTimeoutError):
+                raise
             except Exception as repaired_error:
                 raise ValueError(
                     "修正後の集計コードの実行に失敗しました: "
@@ -459,6 +725,17 @@ class AIGenerator:
         """
         HTMLテンプレートにデータを注入する
 
+        prune_payload が有効な場合、テンプレートの JavaScript が参照しないキーは
+        埋め込む前に除く（除いたパスと削減バイト数は INFO ログに出す）。
+        JSON が compress_threshold を超える場合は gzip + base64 で埋め込み、
+        ブラウザの DecompressionStream で展開してから dashboardData を定義する。
+        encoding が指定されている場合は表を列形式で書き出し、デコーダースクリプトで
+        元のレコード形式に戻してから dashboardData を定義する。
+        optimize_output が有効な場合は、注入前のテンプレートと注入するスクリプトの
+        重複読み込みを除いて縮小する（埋め込む JSON には手を入れない）。
+        assets が指定されている場合は、CDN のスクリプト・スタイルシートを
+        ローカルのアセットからインライン化する（オフライン表示）。
+
         Args:
             html_template: HTMLテンプレート
             data: 注入するデータ
@@ -466,70 +743,114 @@ class AIGenerator:
         Returns:
             str: 完成したHTML
         """
+        scripts = INJECTED_SCRIPTS
+        if self.optimize_output:
+            original_size = len(html_template) + len(scripts)
+            html_template, scripts = optimize_template(html_template, scripts)
+            logger.info(
+                "HTML を最適化しました: %d → %d 文字",
+                original_size,
+                len(html_template) + len(scripts),
+            )
+        if self.assets is not None:
+            html_template, scripts = self.assets.bundle_template(html_template, scripts)
+
+        if self.prune_payload:
+            data, dropped = prune_unreferenced(html_template, data)
+            if dropped and logger.isEnabledFor(logging.INFO):
+                saved = sum(len(serialize_json(value).encode()) for value in dropped.values())
+                logger.info(
+                    "テンプレートが参照しないキーを除外しました: %d bytes 削減 (%s)",
+                    saved,
+                    ", ".join(dropped),
+                )
+
         # JSONデータを注入
-        safe_data = _coerce_json_value(data)
-        json_data = json.dumps(safe_data, ensure_ascii=False)
+        tables = 0
+        if self.encoding is not None:
+            encoded, tables = encode_payload(_coerce_json_value(data), self.encoding)
+            json_data = json.dumps(encoded, ensure_ascii=False)
+        else:
+            json_data = serialize_json(data)
+
+        threshold = self.compress_threshold
+        compressed = threshold is not None and len(json_data.encode("utf-8")) > threshold
+        expression = COMPRESSED_DATA_EXPRESSION if compressed else json_data
+        if tables:
+            expression = f"{DECODER_FUNCTION}({expression})"
+
+        html = self.inject_json(html_template, expression, scripts)
+        if tables:
+            html = insert_decoder(html)
+        if compressed:
+            html = embed_compressed(html, json_data)
+        return html
 
-        # 1. プレースホルダーの置換（空白許容）
-        # {{JSON_DATA}}, {{ JSON_DATA }}, {JSON_DATA} 等に対応
-        pattern = r"\{\{\s*JSON_DATA\s*\}\}"
+    def inject_json(
+        self, html_template: str, json_data: str, scripts: str = INJECTED_SCRIPTS
+    ) -> str:
+        """
+        シリアライズ済みの JSON をHTMLテンプレートに注入する
 
-        if re.search(pattern, html_template):
-            html = re.sub(pattern, lambda _: json_data, html_template)
-        else:
-            # 2. フォールバック: プレースホルダーがない場合
-            # const dashboardData = ... ; を探して置換
-            # DOTALLを使って複数行に対応
-            var_pattern = r"(const\s+dashboardData\s*=\s*)(.*?)(\s*;)"
-
-            # 既存の dashboardData があるか確認（複数行対応）
-            match = re.search(var_pattern, html_template, re.DOTALL)
-
-            if match:
-                # JSONデータが安全に置換されるようにエスケープ処理などは json.dumps で済んでいる
-                # 後方参照を使って variable 定義を書き換え
-                html = re.sub(
-                    var_pattern, f"\\1{json_data}\\3", html_template, count=1, flags=re.DOTALL
-                )
-            else:
-                # 3. 最終手段: scriptタグを強制挿入
-                # 既存の dashboardData が中途半端に存在して重複エラーになるのを防ぐため、念のため単純な置換も試みる
-                if "const dashboardData =" in html_template:
-                    # Regexで拾えなかったが文字列としては存在する場合、コメントアウトするなどして無効化したいが、
-                    # ここでは単純に追記モード（リスクあり）ではなく、警告をログに残すべきだが、
-                    # 実用上は injection_script を body 末尾に追加することで overwrite はできない（const再宣言エラーになる）。
-                    # なので、var_pattern を緩和して再トライ
-                    loose_pattern = r"const\s+dashboardData\s*="
-                    html = re.sub(
-                        loose_pattern,
-                        f"// replaced\nconst dashboardData = {json_data}; //",
-                        html_template,
-                        count=1,
-                    )
-                else:
-                    # bodyの閉じタグの直前に挿入
-                    injection_script = f"<script>const dashboardData = {json_data};</script>"
-                    if "</body>" in html_template:
-                        html = html_template.replace("</body>", f"{injection_script}</body>")
-                    else:
-                        html = html_template + injection_script
-
-        # Helper for safer injection
-        def inject_script(target_html, script):
-            if "</body>" in target_html:
-                return target_html.replace("</body>", f"{script}</body>")
-            return target_html + script
-
-        # Chart.js Safety Net: 常にカラー関数とデフォルト設定を注入
-        html = inject_script(html, CHART_SAFETY_NET_SCRIPT)
-
-        # Direct View用スクリプトを追加
-        html = inject_script(html, DIRECT_VIEW_SCRIPT)
+        テンプレートを1回だけ走査してプレースホルダー・dashboardData の宣言・
+        </body> の位置を集め、出力は1回の join で組み立てる（文字列全体のコピーは
+        出力時の1回だけで、テンプレートと JSON のサイズに対して線形）。
 
-        return html
+        注入の優先順位:
+        1. {{JSON_DATA}}（空白許容）をすべて JSON で置換
+        2. 最初の const dashboardData = ...; の右辺を置換
+        3. ; のない const dashboardData = を置換して文を閉じる
+        4. </body> の直前（なければ末尾）に宣言スクリプトを挿入
+        最後に scripts（既定は Safety Net と Direct View）を </body> の直前に挿入する。
+
+        Args:
+            html_template: HTMLテンプレート
+            json_data: JSON 文字列
+            scripts: </body> の直前に挿入するスクリプト
+
+        Returns:
+            str: 完成したHTML
+        """
+        placeholders, declaration, body_close = _scan_injection_tokens(html_template)
+
+        # (開始, 終了, 置換文字列) の編集リスト
+        edits: list[tuple[int, int, str]] = []
+        if placeholders:
+            edits = [(match.start(), match.end(), json_data) for match in placeholders]
+        elif declaration is not None:
+            value_start = _WHITESPACE_RE.match(html_template, declaration.end()).end()
+            semicolon = html_template.find(";", value_start)
+            if semicolon >= 0:
+                # const dashboardData = <値>; の <値> を置換（; の直前の空白は残す）
+                value_end = semicolon
+                while value_end > value_start and html_template[value_end - 1].isspace():
+                    value_end -= 1
+                edits = [(value_start, value_end, json_data)]
+            elif "const dashboardData =" in html_template:
+                # ; で閉じられていない宣言は置換して文を閉じる（残りはコメントアウト）
+                replacement = f"// replaced\nconst dashboardData = {json_data}; //"
+                edits = [(declaration.start(), declaration.end(), replacement)]
+
+        if not edits:
+            scripts = f"<script>const dashboardData = {json_data};</script>" + scripts
+        if body_close < 0 or any(start <= body_close < end for start, end, _ in edits):
+            body_close = len(html_template)
+        edits.append((body_close, body_close, scripts))
+        edits.sort(key=lambda edit: edit[0])
+
+        pieces: list[str] = []
+        cursor = 0
+        for start, end, replacement in edits:
+            pieces += [html_template[cursor:start], replacement]
+            cursor = end
+        pieces.append(html_template[cursor:])
+        return "".join(pieces)
 
     def generate_oneshot(
-        self, df: pd.DataFrame, progress_callback: Callable[[int, str], None] | None = None
+        self,
+        df: pd.DataFrame,
+        progress_callback: Callable[[int, str], None] | None = None,
+        cancel_token: CancellationToken | None = None,
     ) -> GenerationResult:
         """
         ワンショットでダッシュボードを生成する
@@ -537,29 +858,48 @@ class AIGenerator:
         Args:
             df: 対象のDataFrame
             progress_callback: 進捗通知コールバック (step, message)
+            cancel_token: キャンセルトークン（各フェーズの開始前と実行中に監視）
 
         Returns:
             GenerationResult: 生成結果
+
+        Raises:
+            GenerationCancelledError: キャンセルされた場合
+            PhaseTimeoutError: いずれかのフェーズが期限を超過した場合
         """
 
         def notify(step: int, message: str):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
             if progress_callback:
                 progress_callback(step, message)
 
         # Step 1: Blueprint生成
         notify(1, "データ構造を分析中...")
-        blueprint = self.generate_blueprint(df)
+        blueprint = self.generate_blueprint(df, cancel_token)
 
         # Step 2: コード生成
         notify(2, "ダッシュボードを設計中...")
-        py_code, html_template = self.generate_code(blueprint, df)
+        py_code, html_template = self.generate_code(blueprint, df, cancel_token)
 
         # Step 3: 集計実行
         notify(3, "データを集計中...")
-        aggregated_data = self.execute_aggregation(py_code, df)
+        aggregated_data = self.execute_aggregation(py_code, df, cancel_token)
+
+        # 長い系列は埋め込み用に間引く（元データは result.data に残す）
+        embedded_data, downsampled = downsample_payload(aggregated_data, self.downsample)
 
         # Step 4: HTML組み立て
         notify(4, "ダッシュボードを構築中...")
-        final_html = self.assemble_html(html_template, aggregated_data)
+        final_html = run_with_deadline(
+            self.assemble_html,
+            html_template,
+            embedded_data,
+            phase="assembly",
+            timeout=self.timeouts.assembly,
+            token=cancel_token,
+        )
 
-        return GenerationResult(html=final_html, data=aggregated_data, blueprint=blueprint)
+        return GenerationResult(
+            html=final_html, data=aggregated_data, blueprint=blueprint, downsampled=downsampled
+        )
@@ -0,0 +1,486 @@
+"""
+AssetBundler - 外部アセットのインライン化（オフライン表示モード）
+
+責務:
+- CDN の URL からローカルに用意したアセットディレクトリ（manifest.json）への解決
+- <script src> / <link rel="stylesheet"> / CSS の @import のインライン化（1文書につき1回）
+- コンテンツのハッシュによるアセットのフィンガープリント
+- CSS 内のフォント等の url() の data URI 化
+- Tailwind CDN の、使われているクラスだけに絞った静的 CSS への置き換え
+- アセットディレクトリの作成（python -m src.services.asset_bundler）
+
+manifest.json は {"assets": {"CDN の URL": "ディレクトリ内のファイル名", ...}} の形式。
+manifest にない URL は CDN の参照のまま残す。Tailwind CDN の URL は、.js のファイル
+（ブラウザ内でクラスを生成する CDN スクリプト）ならそのままインライン化し、.css の
+ファイル（全クラスを事前ビルドした CSS）なら文書に現れるクラスのルールだけに絞って
+<style> に置き換える。
+
+使い方:
+    python -m src.services.asset_bundler assets/vendor   # 既定のアセットを取得
+    python -m src.services.asset_bundler assets/vendor --tailwind-css tailwind.full.css
+    python -m src.services.asset_bundler assets/vendor --tailwind-css https://example.com/tw.css
+    OFFLINE_ASSETS_DIR=assets/vendor streamlit run app_v2.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import mimetypes
+import re
+import urllib.parse
+import urllib.request
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+TAILWIND_CDN_URL = "https://cdn.tailwindcss.com"
+
+# 既定で取得するアセット（テンプレートが参照する URL → 取得元、None は同じ URL）
+DEFAULT_ASSET_SOURCES: dict[str, str | None] = {
+    "https://cdn.jsdelivr.net/npm/chart.js": (
+        "https://cdn.jsdelivr.net/npm/chart.js@4/dist/chart.umd.min.js"
+    ),
+    "https://unpkg.com/lucide@latest": "https://unpkg.com/lucide@latest/dist/umd/lucide.min.js",
+    TAILWIND_CDN_URL: None,
+    "https://fonts.googleapis.com/css2?family=Cormorant+Garamond:wght@600;700"
+    "&family=DM+Sans:wght@400;500;700&family=JetBrains+Mono:wght@400;500&display=swap": None,
+    "https://fonts.googleapis.com/css2?family=Cormorant+Garamond:wght@400;600;700"
+    "&family=DM+Sans:wght@400;500;700&family=JetBrains+Mono:wght@400;500&display=swap": None,
+}
+
+# Google Fonts は User-Agent で返すフォント形式を変えるため、woff2 を返すブラウザを名乗る
+_GOOGLE_FONTS_CSS_URL = "https://fonts.googleapis.com/css"
+_FETCH_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0 Safari/537.36"
+)
+
+_SCRIPT_SRC_RE = re.compile(r"<script\b(?P<attrs>[^>]*)>\s*</script\s*>", re.IGNORECASE)
+_LINK_RE = re.compile(r"<link\b(?P<attrs>[^>]*)>", re.IGNORECASE)
+_STYLE_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.IGNORECASE | re.DOTALL)
+_IMPORT_RE = re.compile(
+    r"""@import\s+(?:url\(\s*)?(["']?)(?P<url>[^"')\s;]+)\1\s*\)?\s*;""", re.IGNORECASE
+)
+_CSS_URL_RE = re.compile(r"""url\(\s*(["']?)(?P<url>[^"')]+)\1\s*\)""")
+_ATTR_RE = re.compile(r"""\b([\w-]+)(?:\s*=\s*(["']?)([^"'\s>]*)\2)?""")
+_CLASS_CANDIDATE_RE = re.compile(r"""[^<>"'`\s=]+""")
+_SELECTOR_CLASS_RE = re.compile(r"\.((?:\\[0-9a-fA-F]{1,6}\s?|\\.|[\w-])+)")
+_CSS_ESCAPE_RE = re.compile(r"\\(?:([0-9a-fA-F]{1,6})\s?|(.))")
+_CSS_BRACE_RE = re.compile(r"[{}'\"]")
+_FONT_TYPES = {".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf"}
+
+# 中身のルールを選別する @ ルール（それ以外の @ ルールはそのまま残す）
+_GROUPING_AT_RULES = ("@media", "@supports")
+
+# Tailwind CDN を外した後も tailwind.config = {...} の代入が失敗しないようにする
+_TAILWIND_STUB_SCRIPT = "<script>window.tailwind=window.tailwind||{};</script>"
+
+
+@dataclass(frozen=True)
+class BundledAsset:
+    """
+    インライン化するアセット
+
+    Attributes:
+        url: テンプレートが参照する URL
+        file: アセットディレクトリ内のファイル名
+        content: インライン化する内容（CSS 内の url() は data URI に置換済み）
+        fingerprint: 内容の SHA-256 の先頭12桁
+    """
+
+    url: str
+    file: str
+    content: str
+    fingerprint: str
+
+
+def fingerprint(content: bytes) -> str:
+    """
+    アセットのフィンガープリント（SHA-256 の先頭12桁）を返す
+
+    Args:
+        content: アセットの内容
+
+    Returns:
+        str: フィンガープリント
+    """
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def _attributes(attrs: str) -> dict[str, str]:
+    return {m.group(1).lower(): m.group(3) or "" for m in _ATTR_RE.finditer(attrs)}
+
+
+def _escape_inline(content: str, tag: str) -> str:
+    """インライン化した内容が </script> / </style> で要素を閉じないようにする"""
+    return re.sub(rf"</({tag})", r"<\\/\1", content, flags=re.IGNORECASE)
+
+
+@dataclass
+class _CssRule:
+    selectors: list[tuple[str, frozenset[str]]]
+    body: str
+
+
+@dataclass
+class _CssBlock:
+    prelude: str
+    children: list
+
+
+def _matching_brace(css: str, start: int) -> int:
+    """start の { に対応する } の位置"""
+    depth = 0
+    position = start
+    while True:
+        match = _CSS_BRACE_RE.search(css, position)
+        if match is None:
+            return len(css)
+        char = match.group(0)
+        position = match.end()
+        if char in "'\"":
+            end = css.find(char, position)
+            position = len(css) if end < 0 else end + 1
+        elif char == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.start()
+
+
+def _unescape_css(match: re.Match) -> str:
+    return chr(int(match.group(1), 16)) if match.group(1) else match.group(2)
+
+
+def _selector_classes(selector: str) -> frozenset[str]:
+    return frozenset(
+        _CSS_ESCAPE_RE.sub(_unescape_css, name) for name in _SELECTOR_CLASS_RE.findall(selector)
+    )
+
+
+def parse_css(css: str) -> list:
+    """
+    CSS をルール単位に分解する（クラスによる選別用）
+
+    Args:
+        css: コメントを除いた CSS
+
+    Returns:
+        list: _CssRule / _CssBlock / 文字列（そのまま残す文）のリスト
+    """
+    nodes: list = []
+    i = 0
+    while i < len(css):
+        brace = css.find("{", i)
+        semicolon = css.find(";", i)
+        if brace < 0:
+            if css[i:].strip():
+                nodes.append(css[i:].strip())
+            break
+        prelude = css[i:brace].strip()
+        if prelude.startswith("@") and 0 <= semicolon < brace:
+            nodes.append(css[i : semicolon + 1].strip())  # @charset / @import
+            i = semicolon + 1
+            continue
+        end = _matching_brace(css, brace)
+        if prelude.lower().startswith(_GROUPING_AT_RULES):
+            nodes.append(_CssBlock(prelude, parse_css(css[brace + 1 : end])))
+        elif prelude.startswith("@"):
+            nodes.append(css[i : end + 1].strip())  # @font-face / @keyframes など
+        else:
+            selectors = [
+                (selector.strip(), _selector_classes(selector)) for selector in prelude.split(",")
+            ]
+            nodes.append(_CssRule(selectors, css[brace + 1 : end]))
+        i = end + 1
+    return nodes
+
+
+def purge_css(nodes: list, used_classes: set[str]) -> str:
+    """
+    使われていないクラスを含むセレクタを除いた CSS を組み立てる
+
+    クラスを含まないセレクタ（要素・擬似要素などの基本スタイル）は残す。
+
+    Args:
+        nodes: parse_css の結果
+        used_classes: 文書に現れるクラス名の候補
+
+    Returns:
+        str: 選別後の CSS
+    """
+    pieces: list[str] = []
+    for node in nodes:
+        if isinstance(node, str):
+            pieces.append(node)
+        elif isinstance(node, _CssBlock):
+            inner = purge_css(node.children, used_classes)
+            if inner:
+                pieces.append(f"{node.prelude}{{{inner}}}")
+        else:
+            kept = [selector for selector, classes in node.selectors if classes <= used_classes]
+            if kept:
+                pieces.append(f"{','.join(kept)}{{{node.body}}}")
+    return "".join(pieces)
+
+
+class AssetBundler:
+    """ローカルのアセットディレクトリから外部アセットをインライン化するクラス"""
+
+    def __init__(self, directory: str | Path, purge_tailwind: bool = True):
+        """
+        Args:
+            directory: manifest.json とアセットを置いたディレクトリ
+            purge_tailwind: 事前ビルドの Tailwind CSS を使われているクラスのルールに絞るか
+
+        Raises:
+            ValueError: manifest.json がない、または形式が不正な場合
+        """
+        self.directory = Path(directory)
+        self.purge_tailwind = purge_tailwind
+        manifest_path = self.directory / MANIFEST_NAME
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            self.manifest: dict[str, str] = dict(manifest["assets"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"アセットの manifest を読み込めません: {manifest_path}") from e
+        self._assets: dict[str, BundledAsset | None] = {}
+        self._tailwind: tuple[list, str] | None = None
+
+    def _read(self, url: str) -> bytes | None:
+        file = self.manifest.get(url)
+        if file is None:
+            return None
+        try:
+            return (self.directory / file).read_bytes()
+        except OSError:
+            logger.warning("アセットを読み込めません（CDN を参照します）: %s", file)
+            return None
+
+    def _data_uri(self, match: re.Match) -> str:
+        url = match.group("url")
+        content = self._read(url)
+        if content is None:
+            return match.group(0)
+        file = self.manifest[url]
+        mime = (
+            _FONT_TYPES.get(Path(file).suffix)
+            or mimetypes.guess_type(file)[0]
+            or "application/octet-stream"
+        )
+        return f"url(data:{mime};base64,{base64.b64encode(content).decode('ascii')})"
+
+    def resolve(self, url: str) -> BundledAsset | None:
+        """
+        URL をアセットディレクトリのファイルに解決する（結果はインスタンス内にキャッシュ）
+
+        Args:
+            url: テンプレートが参照する URL
+
+        Returns:
+            BundledAsset | None: manifest にない・読み込めない場合は None
+        """
+        if url not in self._assets:
+            content = self._read(url)
+            asset = None
+            if content is not None:
+                file = self.manifest[url]
+                text = content.decode("utf-8")
+                if file.endswith(".css"):
+                    text = _CSS_URL_RE.sub(self._data_uri, text)
+                asset = BundledAsset(url, file, text, fingerprint(content))
+            self._assets[url] = asset
+        return self._assets[url]
+
+    def _tailwind_css(self) -> tuple[list, str]:
+        if self._tailwind is None:
+            asset = self.resolve(TAILWIND_CDN_URL)
+            css = re.sub(r"/\*.*?\*/", "", asset.content, flags=re.DOTALL)
+            self._tailwind = (parse_css(css), asset.fingerprint)
+        return self._tailwind
+
+    def _asset_tag(self, tag: str, asset: BundledAsset, inlined: set[str]) -> str:
+        if asset.fingerprint in inlined:
+            return ""
+        inlined.add(asset.fingerprint)
+        return (
+            f'<{tag} data-asset="{asset.file}" data-fingerprint="{asset.fingerprint}">'
+            f"{_escape_inline(asset.content, tag)}</{tag}>"
+        )
+
+    def bundle(self, html: str, inlined: set[str] | None = None) -> str:
+        """
+        HTML が参照する外部アセットをインライン化する
+
+        同期的に読み込まれる <script src> と <link rel="stylesheet">、<style> 内の
+        @import が対象。同じ内容のアセットは最初の1回だけインライン化する。
+
+        Args:
+            html: HTML（テンプレートまたは断片）
+            inlined: インライン化済みのフィンガープリント（複数の断片で共有し、更新される）
+
+        Returns:
+            str: インライン化した HTML
+        """
+        inlined = set() if inlined is None else inlined
+
+        def replace_script(match: re.Match) -> str:
+            attrs = _attributes(match.group("attrs"))
+            url = attrs.get("src")
+            if not url or "async" in attrs or "defer" in attrs or attrs.get("type") == "module":
+                return match.group(0)
+            asset = self.resolve(url)
+            if asset is None:
+                return match.group(0)
+            if url == TAILWIND_CDN_URL and asset.file.endswith(".css"):
+                return self._tailwind_tag(asset, html, inlined)
+            return self._asset_tag("script", asset, inlined)
+
+        def replace_link(match: re.Match) -> str:
+            attrs = _attributes(match.group("attrs"))
+            if attrs.get("rel", "").lower() != "stylesheet":
+                return match.group(0)
+            asset = self.resolve(attrs.get("href", ""))
+            return match.group(0) if asset is None else self._asset_tag("style", asset, inlined)
+
+        def replace_import(match: re.Match) -> str:
+            asset = self.resolve(match.group("url"))
+            if asset is None:
+                return match.group(0)
+            if asset.fingerprint in inlined:
+                return ""
+            inlined.add(asset.fingerprint)
+            return _escape_inline(asset.content, "style")
+
+        def replace_style(match: re.Match) -> str:
+            open_tag, css, close_tag = match.groups()
+            return open_tag + _IMPORT_RE.sub(replace_import, css) + close_tag
+
+        html = _SCRIPT_SRC_RE.sub(replace_script, html)
+        html = _LINK_RE.sub(replace_link, html)
+        return _STYLE_RE.sub(replace_style, html)
+
+    def _tailwind_tag(self, asset: BundledAsset, html: str, inlined: set[str]) -> str:
+        """Tailwind CDN を文書に現れるクラスのルールだけの <style> に置き換える"""
+        if asset.fingerprint in inlined:
+            return _TAILWIND_STUB_SCRIPT
+        inlined.add(asset.fingerprint)
+        css = asset.content
+        if self.purge_tailwind:
+            nodes, _ = self._tailwind_css()
+            css = purge_css(nodes, set(_CLASS_CANDIDATE_RE.findall(html)))
+        return (
+            f'<style data-asset="{asset.file}" data-fingerprint="{asset.fingerprint}">'
+            f"{_escape_inline(css, 'style')}</style>{_TAILWIND_STUB_SCRIPT}"
+        )
+
+    def bundle_template(self, html_template: str, injected_scripts: str) -> tuple[str, str]:
+        """
+        注入前のテンプレートと注入するスクリプトのアセットをインライン化する
+
+        両方で参照するアセットはテンプレート側だけにインライン化する。
+
+        Args:
+            html_template: データ注入前の HTML テンプレート
+            injected_scripts: テンプレートの末尾に注入するスクリプト
+
+        Returns:
+            tuple: (インライン化したテンプレート, インライン化した注入スクリプト)
+        """
+        inlined: set[str] = set()
+        template = self.bundle(html_template, inlined)
+        return template, self.bundle(injected_scripts, inlined)
+
+
+def _fetch(url: str) -> bytes:
+    """URL の内容を取得する（スキームのない取得元はローカルのファイルパスとして読む）"""
+    if not urllib.parse.urlsplit(url).scheme:
+        return Path(url).read_bytes()
+    request = urllib.request.Request(url, headers={"User-Agent": _FETCH_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def _file_name(url: str, content: bytes, suffix: str) -> str:
+    """URL の末尾の名前にフィンガープリントを付けたファイル名"""
+    path = urllib.parse.urlsplit(url).path.rstrip("/")
+    stem = Path(path).stem if Path(path).suffix == suffix else Path(path).name
+    stem = re.sub(r"[^\w.@-]+", "-", stem) or "asset"
+    return f"{stem}.{fingerprint(content)}{suffix}"
+
+
+def vendor_assets(
+    directory: str | Path,
+    sources: dict[str, str | None] | None = None,
+    fetch: Callable[[str], bytes] = _fetch,
+) -> dict[str, str]:
+    """
+    アセットを取得してディレクトリに保存し、manifest.json を書き出す
+
+    CSS が url() で参照するフォントなども取得して manifest に加える。
+
+    Args:
+        directory: 保存先ディレクトリ
+        sources: テンプレートが参照する URL → 取得元の URL またはローカルのファイルパス
+            （None は同じ URL から取得）
+        fetch: 取得元の内容を返す関数
+
+    Returns:
+        dict: 書き出した manifest の assets
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    assets: dict[str, str] = {}
+
+    def save(url: str, content: bytes, suffix: str) -> None:
+        name = _file_name(url, content, suffix)
+        (directory / name).write_bytes(content)
+        assets[url] = name
+
+    for url, source in (sources or DEFAULT_ASSET_SOURCES).items():
+        content = fetch(source or url)
+        is_css = (source or url).endswith(".css") or url.startswith(_GOOGLE_FONTS_CSS_URL)
+        if is_css:
+            for match in _CSS_URL_RE.finditer(content.decode("utf-8")):
+                nested = match.group("url")
+                if nested.startswith(("http://", "https://")) and nested not in assets:
+                    save(nested, fetch(nested), Path(nested.split("?", 1)[0]).suffix)
+        save(url, content, ".css" if is_css else ".js")
+
+    manifest = {"assets": assets}
+    (directory / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    return assets
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="オフライン表示用のアセットを取得する")
+    parser.add_argument("directory", help="保存先ディレクトリ（OFFLINE_ASSETS_DIR に指定する）")
+    parser.add_argument(
+        "--tailwind-css",
+        help=(
+            "全クラスを事前ビルドした Tailwind の CSS（URL またはローカルのパス）。"
+            "指定すると使われているクラスだけに絞る"
+        ),
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    sources = dict(DEFAULT_ASSET_SOURCES)
+    if args.tailwind_css:
+        sources[TAILWIND_CDN_URL] = args.tailwind_css
+    assets = vendor_assets(args.directory, sources)
+    print(f"{len(assets)} 件のアセットを {args.directory} に保存しました")
+
+
+if __name__ == "__main__":
+    main()
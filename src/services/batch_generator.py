@@ -0,0 +1,396 @@
+"""
+BatchGenerator - CSV 一括ダッシュボード生成（ヘッドレス）
+
+責務:
+- 入力ディレクトリ / グロブからの CSV 収集
+- プロセスプールによる並列生成（DataProcessor → AIGenerator）
+- 全ワーカー共通のモデル同時呼び出し数制限
+- 再開（レジューム）用の状態ファイル管理
+- ファイルごとの処理時間サマリーの出力
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from src.services.ai_generator import AIGenerator, _coerce_json_value
+from src.services.cancellation import PhaseTimeouts
+from src.services.data_processor import DataProcessor
+
+DEFAULT_MODEL_NAME = "gemini-2.5-flash"
+STATE_FILE_NAME = "batch_state.jsonl"
+SUMMARY_FILE_NAME = "batch_summary.json"
+
+# generate_oneshot の progress_callback のステップ番号とフェーズ名の対応
+STEP_PHASES = {1: "blueprint", 2: "code", 3: "aggregation", 4: "assembly"}
+
+
+@dataclass
+class BatchJob:
+    """1ファイル分の生成ジョブ"""
+
+    source: str
+    output_stem: str
+    output_dir: str
+    fingerprint: str
+
+
+@dataclass
+class BatchFileResult:
+    """1ファイル分の生成結果"""
+
+    source: str
+    status: str  # "ok", "error", "skipped"
+    html_path: str | None = None
+    json_path: str | None = None
+    fingerprint: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass
+class BatchConfig:
+    """一括生成の設定"""
+
+    inputs: list[str]
+    output_dir: Path
+    model_name: str = DEFAULT_MODEL_NAME
+    workers: int = 4
+    max_model_calls: int = 4
+    resume: bool = True
+    timeouts: PhaseTimeouts | None = None
+
+
+@dataclass
+class BatchReport:
+    """一括生成のサマリー"""
+
+    results: list[BatchFileResult]
+    wall_time: float
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for result in self.results if result.status == "ok")
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.results if result.status == "error")
+
+    @property
+    def skipped(self) -> int:
+        return sum(1 for result in self.results if result.status == "skipped")
+
+    def to_dict(self) -> dict[str, Any]:
+        totals = [r.timings["total"] for r in self.results if r.status == "ok"]
+        return {
+            "wall_time": round(self.wall_time, 3),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "median_total": round(statistics.median(totals), 3) if totals else None,
+            "max_total": round(max(totals), 3) if totals else None,
+            "files": [asdict(result) for result in self.results],
+        }
+
+    def format_table(self) -> str:
+        """ファイルごとの処理時間を表形式の文字列で返す"""
+        phases = ["load", *STEP_PHASES.values(), "total"]
+        header = f"{'status':<8} " + " ".join(f"{p:>11}" for p in phases) + "  source"
+        lines = [header, "-" * len(header)]
+        for result in self.results:
+            cells = []
+            for phase in phases:
+                value = result.timings.get(phase)
+                cells.append(f"{value:>10.2f}s" if value is not None else f"{'-':>11}")
+            lines.append(f"{result.status:<8} " + " ".join(cells) + f"  {result.source}")
+        lines.append(
+            f"ok={self.succeeded} error={self.failed} skipped={self.skipped} "
+            f"wall={self.wall_time:.2f}s"
+        )
+        return "\n".join(lines)
+
+
+class ThrottledModel:
+    """
+    モデル呼び出しをセマフォで制限するラッパー
+
+    プロセスプールの全ワーカーで同じセマフォを共有することで、
+    バッチ全体でのモデル同時呼び出し数を上限以下に抑える。
+    """
+
+    def __init__(self, model: Any, semaphore: Any):
+        self._model = model
+        self._semaphore = semaphore
+
+    @property
+    def supports_timeout(self) -> bool:
+        """包んだモデルが generate_content の timeout を受け付けるか"""
+        return getattr(self._model, "supports_timeout", False) is True
+
+    def generate_content(self, prompt: str, **kwargs: Any) -> Any:
+        # timeout を渡すと、期限切れで放棄された呼び出しもその時点でセマフォを返す
+        with self._semaphore:
+            return self._model.generate_content(prompt, **kwargs)
+
+
+def create_genai_model(model_name: str) -> Any:
+    """
+    環境変数から Gemini モデルを生成する
+
+    GOOGLE_API_KEY と任意の GEMINI_BASE_URL で接続し、GEMINI_CASSETTE が
+    設定されていればモデル呼び出しを記録・再生する。
+    """
+    from src.services.genai_adapter import GenAIModelAdapter, create_genai_client
+    from src.services.model_cassette import ModelCassette
+
+    cassette = ModelCassette.from_env()
+    client = None
+    if cassette is None or not cassette.replaying:
+        client = create_genai_client(
+            os.getenv("GOOGLE_API_KEY"), base_url=os.getenv("GEMINI_BASE_URL")
+        )
+    return GenAIModelAdapter(client, model_name=model_name, cassette=cassette)
+
+
+def discover_csv_files(inputs: Iterable[str]) -> list[Path]:
+    """
+    ディレクトリ・グロブ・ファイルパスから CSV ファイルを収集する
+
+    Args:
+        inputs: ディレクトリ（直下の *.csv）、グロブパターン、ファイルパス
+
+    Returns:
+        list[Path]: 重複を除いてソートされた CSV ファイル
+    """
+    found: set[Path] = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found.update(p for p in path.glob("*.csv") if p.is_file())
+        elif path.is_file():
+            found.add(path)
+        else:
+            found.update(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file())
+    return sorted(p.resolve() for p in found)
+
+
+def file_fingerprint(path: Path) -> str:
+    """再開判定用のフィンガープリント（サイズと更新時刻）"""
+    stat = path.stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def plan_jobs(files: list[Path], output_dir: Path) -> list[BatchJob]:
+    """
+    出力ファイル名を決定してジョブを作成する
+
+    同名の CSV が複数ディレクトリにある場合は連番サフィックスで区別する。
+    入力の並びが同じであれば名前は再実行間で安定する。
+    """
+    jobs = []
+    used: dict[str, int] = {}
+    for path in files:
+        stem = path.stem
+        count = used.get(stem, 0) + 1
+        used[stem] = count
+        output_stem = stem if count == 1 else f"{stem}-{count}"
+        jobs.append(
+            BatchJob(
+                source=str(path),
+                output_stem=output_stem,
+                output_dir=str(output_dir),
+                fingerprint=file_fingerprint(path),
+            )
+        )
+    return jobs
+
+
+def load_completed(output_dir: Path) -> dict[str, str]:
+    """状態ファイルから完了済み (source -> fingerprint) を読み込む"""
+    state_path = output_dir / STATE_FILE_NAME
+    completed: dict[str, str] = {}
+    if not state_path.exists():
+        return completed
+    with state_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 書き込み途中で中断された行は無視する
+                continue
+            if entry.get("status") == "ok":
+                completed[entry["source"]] = entry.get("fingerprint", "")
+    return completed
+
+
+def _is_done(job: BatchJob, completed: dict[str, str]) -> bool:
+    if completed.get(job.source) != job.fingerprint:
+        return False
+    output_dir = Path(job.output_dir)
+    return (output_dir / f"{job.output_stem}.html").exists() and (
+        output_dir / f"{job.output_stem}.json"
+    ).exists()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+_WORKER_STATE: dict[str, Any] = {}
+
+
+def _init_worker(
+    model_factory: Callable[[str], Any],
+    model_name: str,
+    semaphore: Any,
+    timeouts: PhaseTimeouts | None,
+) -> None:
+    model = ThrottledModel(model_factory(model_name), semaphore)
+    _WORKER_STATE["generator"] = AIGenerator(model=model, timeouts=timeouts)
+    _WORKER_STATE["processor"] = DataProcessor()
+
+
+def _generate_one(job: BatchJob) -> BatchFileResult:
+    generator: AIGenerator = _WORKER_STATE["generator"]
+    processor: DataProcessor = _WORKER_STATE["processor"]
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    try:
+        df = processor.load_csv(Path(job.source).read_bytes())
+        timings["load"] = time.perf_counter() - started
+
+        marks: list[tuple[int, float]] = []
+
+        def progress_callback(step: int, message: str) -> None:
+            marks.append((step, time.perf_counter()))
+
+        result = generator.generate_oneshot(df, progress_callback=progress_callback)
+        marks.append((0, time.perf_counter()))
+        for (step, begin), (_, end) in zip(marks, marks[1:]):
+            timings[STEP_PHASES.get(step, str(step))] = end - begin
+
+        output_dir = Path(job.output_dir)
+        html_path = output_dir / f"{job.output_stem}.html"
+        json_path = output_dir / f"{job.output_stem}.json"
+        _write_atomic(html_path, result.html)
+        _write_atomic(
+            json_path,
+            json.dumps(_coerce_json_value(result.data), ensure_ascii=False, indent=2),
+        )
+        timings["total"] = time.perf_counter() - started
+        return BatchFileResult(
+            source=job.source,
+            status="ok",
+            html_path=str(html_path),
+            json_path=str(json_path),
+            fingerprint=job.fingerprint,
+            timings={k: round(v, 4) for k, v in timings.items()},
+        )
+    except Exception as error:
+        timings["total"] = time.perf_counter() - started
+        return BatchFileResult(
+            source=job.source,
+            status="error",
+            fingerprint=job.fingerprint,
+            timings={k: round(v, 4) for k, v in timings.items()},
+            error=f"{error.__class__.__name__}: {error}\n{traceback.format_exc()}",
+        )
+
+
+def _record(output_dir: Path, result: BatchFileResult) -> None:
+    entry = {"source": result.source, "status": result.status, "fingerprint": result.fingerprint}
+    with (output_dir / STATE_FILE_NAME).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def run_batch(
+    config: BatchConfig,
+    model_factory: Callable[[str], Any] = create_genai_model,
+    on_result: Callable[[BatchFileResult], None] | None = None,
+) -> BatchReport:
+    """
+    CSV ファイル群からダッシュボードを一括生成する
+
+    Args:
+        config: 一括生成の設定
+        model_factory: モデル名からモデルを生成する関数（ワーカープロセスで呼ばれるため
+            pickle 可能なモジュールレベル関数であること）
+        on_result: 1ファイル完了ごとに呼ばれるコールバック
+
+    Returns:
+        BatchReport: 生成結果のサマリー（output_dir にも JSON で保存される）
+
+    Raises:
+        ValueError: 入力に CSV ファイルが見つからない場合
+    """
+    started = time.perf_counter()
+    output_dir = Path(config.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    files = discover_csv_files(config.inputs)
+    if not files:
+        raise ValueError("CSVファイルが見つかりません")
+
+    jobs = plan_jobs(files, output_dir)
+    completed = load_completed(output_dir) if config.resume else {}
+
+    results: list[BatchFileResult] = []
+    pending: list[BatchJob] = []
+    for job in jobs:
+        if _is_done(job, completed):
+            skipped = BatchFileResult(
+                source=job.source, status="skipped", fingerprint=job.fingerprint
+            )
+            results.append(skipped)
+            if on_result:
+                on_result(skipped)
+        else:
+            pending.append(job)
+
+    def collect(result: BatchFileResult) -> None:
+        _record(output_dir, result)
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    max_calls = max(1, config.max_model_calls)
+    if config.workers <= 0:
+        # プロセスを使わず逐次実行（デバッグ用）
+        _init_worker(
+            model_factory, config.model_name, threading.BoundedSemaphore(max_calls), config.timeouts
+        )
+        for job in pending:
+            collect(_generate_one(job))
+    elif pending:
+        ctx = multiprocessing.get_context()
+        semaphore = ctx.BoundedSemaphore(max_calls)
+        with ProcessPoolExecutor(
+            max_workers=min(config.workers, len(pending)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(model_factory, config.model_name, semaphore, config.timeouts),
+        ) as executor:
+            futures = [executor.submit(_generate_one, job) for job in pending]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    order = {job.source: index for index, job in enumerate(jobs)}
+    results.sort(key=lambda result: order[result.source])
+    report = BatchReport(results=results, wall_time=time.perf_counter() - started)
+    _write_atomic(
+        output_dir / SUMMARY_FILE_NAME,
+        json.dumps(report.to_dict(), ensure_ascii=False, indent=2),
+    )
+    return report
@@ -0,0 +1,188 @@
+"""
+Cancellation - 生成処理の協調的キャンセルとフェーズ別タイムアウト
+
+責務:
+- キャンセルトークンの提供
+- フェーズごとの期限（タイムアウト）設定
+- モデル呼び出し・集計処理の待機を、キャンセル／期限超過時に即座に打ち切る
+"""
+
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+class GenerationCancelledError(Exception):
+    """生成処理がキャンセルされた"""
+
+    def __init__(self, phase: str | None = None, reason: str | None = None):
+        self.phase = phase
+        self.reason = reason
+        message = "生成処理がキャンセルされました"
+        if phase:
+            message = f"{message} (phase: {phase})"
+        if reason:
+            message = f"{message}: {reason}"
+        super().__init__(message)
+
+
+class PhaseTimeoutError(TimeoutError):
+    """フェーズの実行が期限を超過した"""
+
+    def __init__(self, phase: str, timeout: float):
+        self.phase = phase
+        self.timeout = timeout
+        super().__init__(f"{phase} フェーズが {timeout:g} 秒以内に完了しませんでした")
+
+
+class CancellationToken:
+    """
+    協調的キャンセルのためのトークン
+
+    cancel() はどのスレッドからでも呼び出せる。待機中の run_with_deadline は
+    直ちに起床して GenerationCancelledError を送出する。
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters: list[threading.Event] = []
+        self.reason: str | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        """キャンセル済みかどうか"""
+        return self._event.is_set()
+
+    def cancel(self, reason: str | None = None) -> None:
+        """
+        キャンセルを要求する
+
+        Args:
+            reason: キャンセル理由（エラーメッセージに含まれる）
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            waiter.set()
+
+    def raise_if_cancelled(self, phase: str | None = None) -> None:
+        """
+        キャンセル済みであれば例外を送出する
+
+        Raises:
+            GenerationCancelledError: キャンセル済みの場合
+        """
+        if self._event.is_set():
+            raise GenerationCancelledError(phase, self.reason)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """キャンセルされるまで待機する（キャンセルされた場合 True）"""
+        return self._event.wait(timeout)
+
+    def _add_waiter(self, waiter: threading.Event) -> None:
+        with self._lock:
+            self._waiters.append(waiter)
+            if self._event.is_set():
+                waiter.set()
+
+    def _remove_waiter(self, waiter: threading.Event) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+
+@dataclass
+class PhaseTimeouts:
+    """
+    フェーズ別のタイムアウト（秒）
+
+    None のフェーズは期限なし。repair は構文・実行時エラー修復の
+    モデル呼び出し 1 回ごとに適用される。
+    """
+
+    blueprint: float | None = None
+    code: float | None = None
+    repair: float | None = None
+    aggregation: float | None = None
+    assembly: float | None = None
+
+    def for_phase(self, phase: str) -> float | None:
+        """フェーズ名に対応するタイムアウトを返す（未知のフェーズは None）"""
+        return getattr(self, phase, None)
+
+
+def run_with_deadline(
+    func: Callable[..., Any],
+    *args: Any,
+    phase: str,
+    timeout: float | None = None,
+    token: CancellationToken | None = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    期限とキャンセルを監視しながら func を実行する
+
+    期限もトークンも指定されない場合は呼び出し元スレッドでそのまま実行する。
+    それ以外はデーモンスレッドで実行し、完了・キャンセル・期限超過のいずれかで
+    呼び出し元を解放する。Python ではスレッドを強制終了できないため、
+    打ち切られた処理はバックグラウンドで完了まで走り、その結果は破棄される。
+
+    モデル呼び出しは HTTP リクエストにも同じ期限を付けて終わらせる
+    （AIGenerator が supports_timeout のモデルに timeout を渡す）。exec で実行した集計コード
+    （aggregation フェーズ）は中断する手段がなく、期限を超えても CPU とメモリを
+    使いながら完了まで走り続ける。
+
+    Args:
+        func: 実行する関数
+        phase: フェーズ名（エラーメッセージ用）
+        timeout: 期限（秒）。None の場合は期限なし
+        token: キャンセルトークン
+
+    Returns:
+        Any: func の戻り値
+
+    Raises:
+        GenerationCancelledError: キャンセルされた場合
+        PhaseTimeoutError: 期限を超過した場合
+        Exception: func が送出した例外
+    """
+    if token is not None:
+        token.raise_if_cancelled(phase)
+    if timeout is None and token is None:
+        return func(*args, **kwargs)
+
+    wakeup = threading.Event()
+    outcome: dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            outcome["value"] = func(*args, **kwargs)
+        except BaseException as error:
+            outcome["error"] = error
+        finally:
+            outcome["done"] = True
+            wakeup.set()
+
+    if token is not None:
+        token._add_waiter(wakeup)
+    try:
+        worker = threading.Thread(target=target, name=f"majin-{phase}", daemon=True)
+        worker.start()
+        wakeup.wait(timeout)
+    finally:
+        if token is not None:
+            token._remove_waiter(wakeup)
+
+    if not outcome.get("done"):
+        if token is not None and token.cancelled:
+            raise GenerationCancelledError(phase, token.reason)
+        raise PhaseTimeoutError(phase, timeout or 0.0)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
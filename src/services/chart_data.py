@@ -0,0 +1,350 @@
+"""
+ChartData - チャットで追加するグラフのデータ集計
+
+責務:
+- グラフ仕様（x・y・集計方法）の解釈
+- 複数の系列（y カラム・集計方法）の集計（キーの factorize は1回だけ）
+- 上位 N 件への絞り込みと残りのグループの「その他」へのまとめ
+- 並び順（集計値の降順・昇順・ラベル順・出現順）の適用
+- 日付の x の期間（日・週・月・四半期・年）への丸め（表示点数に収まる粒度を自動で選ぶ）
+- filters による行の絞り込み（chart_filters を参照。日付の範囲は time_partitions も参照）
+- ロールアップキューブで答えられるグラフのキューブからの集計（rollup_cube を参照）
+
+グラフ仕様の例:
+    {"x": "顧客ID", "y": ["売上", "利益"], "aggregation": "sum", "top_n": 10, "sort": "desc"}
+    {"x": "日付", "y": "売上", "time_bucket": "auto", "max_points": 60}
+    {"x": "商品名", "y": "売上", "filters": {"地域": "東京"}}
+"""
+
+from typing import Any
+
+import pandas as pd
+
+from src.services.chart_filters import FilterCondition, MaskCache, filter_frame, parse_filters
+from src.services.query_engine import AGGREGATIONS, TIME_BUCKETS, is_date_column
+from src.services.rollup_cube import RollupCube
+from src.services.time_partitions import TimePartitions
+
+# 上位 N 件に入らなかったグループをまとめる系列のラベル
+OTHER_LABEL = "その他"
+
+SORT_ORDERS = ("desc", "asc", "label", "none")
+
+# 「その他」をグループごとの集計値から求められる集計方法
+_COMBINE_REMAINDER = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+# 日付の x を丸める点数の目安（time_bucket が "auto" の場合）
+DEFAULT_MAX_POINTS = 60
+
+# 期間の粒度 → 1期間のおおよその日数（細かい順）
+_BUCKET_DAYS = {"day": 1.0, "week": 7.0, "month": 30.44, "quarter": 91.31, "year": 365.25}
+
+
+def chart_measures(spec: dict[str, Any]) -> list[tuple[str, str]]:
+    """
+    グラフ仕様から (y カラム, 集計方法) の系列を取り出す
+
+    y と aggregation はそれぞれ文字列でもリストでもよい。両方がリストで長さが
+    同じ場合は対応する要素を組にし、それ以外はすべての組み合わせにする。
+    未対応の集計方法は sum として扱う。
+
+    Args:
+        spec: グラフ仕様
+
+    Returns:
+        list: (y カラム, 集計方法) のリスト
+    """
+    ys = spec.get("y")
+    aggregations = spec.get("aggregation") or "sum"
+    ys = ys if isinstance(ys, list) else [ys]
+    aggregations = aggregations if isinstance(aggregations, list) else [aggregations]
+    if len(ys) == len(aggregations):
+        pairs = list(zip(ys, aggregations, strict=True))
+    else:
+        pairs = [(y, aggregation) for y in ys for aggregation in aggregations]
+    return [(y, aggregation if aggregation in AGGREGATIONS else "sum") for y, aggregation in pairs]
+
+
+def choose_time_bucket(start: pd.Timestamp, end: pd.Timestamp, max_points: int) -> str:
+    """
+    期間の長さから点数が max_points に収まる最も細かい粒度を選ぶ
+
+    Args:
+        start: 最初の日時
+        end: 最後の日時
+        max_points: 点数の目安
+
+    Returns:
+        str: TIME_BUCKETS のキー（年でも収まらない場合は "year"）
+    """
+    days = (end - start) / pd.Timedelta(days=1)
+    for bucket, bucket_days in _BUCKET_DAYS.items():
+        if days / bucket_days + 1 <= max_points:
+            return bucket
+    return "year"
+
+
+def _time_keys(spec: dict[str, Any], df: pd.DataFrame, x_col: str) -> tuple[pd.Series, str | None]:
+    """
+    x が日付の場合は期間（Period）に丸めたグループキーと粒度を返す
+
+    time_bucket が "none" の場合や x が日付でない場合は x の値をそのまま返す。
+    """
+    keys = df[x_col]
+    bucket = spec.get("time_bucket") or "auto"
+    if bucket == "none" or not is_date_column(df, x_col):
+        return keys, None
+    if not pd.api.types.is_datetime64_any_dtype(keys):
+        keys = pd.to_datetime(keys, errors="coerce")
+    if bucket not in TIME_BUCKETS:
+        start, end = keys.min(), keys.max()
+        if pd.isna(start):
+            return keys, None
+        bucket = choose_time_bucket(start, end, _max_points(spec))
+    return keys.dt.to_period(TIME_BUCKETS[bucket][0]), bucket
+
+
+def _max_points(spec: dict[str, Any]) -> int:
+    max_points = spec.get("max_points")
+    if not isinstance(max_points, int) or max_points < 1:
+        return DEFAULT_MAX_POINTS
+    return max_points
+
+
+def _top_n(spec: dict[str, Any]) -> int | None:
+    # True や "5"・5.0・0 以下はグループを絞らない（全件をそのまま表示する）
+    top_n = spec.get("top_n")
+    if not isinstance(top_n, int) or isinstance(top_n, bool) or top_n < 1:
+        return None
+    return top_n
+
+
+def _from_cube(
+    spec: dict[str, Any],
+    df: pd.DataFrame,
+    x_col: str,
+    named: dict[str, tuple[str, str]],
+    conditions: list[FilterCondition],
+    cube: RollupCube,
+) -> tuple[dict[str, pd.Series] | None, str | None]:
+    """
+    キューブから系列ごとの集計値と日付の粒度を求める
+
+    出現順（sort="none"）、丸めない日付、キューブにない次元・集計方法・条件の場合は
+    (None, None) を返す（生データで集計する）。
+    """
+    if spec.get("sort") == "none" or not cube.matches(df):
+        return None, None
+    grain = None
+    if x_col == cube.date_column:
+        grain = spec.get("time_bucket") or "auto"
+        if grain == "none":
+            return None, None
+        if grain not in TIME_BUCKETS:
+            span = cube.date_span(conditions)
+            if span is None or pd.isna(span[0]):
+                return None, None
+            grain = choose_time_bucket(*span, _max_points(spec))
+    elif is_date_column(df, x_col):
+        return None, None
+    answer = cube.aggregate(x_col, grain, list(named.values()), conditions)
+    if answer is None:
+        return None, None
+    return dict(zip(named, answer.values, strict=True)), grain
+
+
+def _order(spec: dict[str, Any], top_n: int | None, time_bucket: str | None) -> str:
+    order = spec.get("sort") or ("desc" if top_n and time_bucket is None else "label")
+    return order if order in SORT_ORDERS else "label"
+
+
+def _period_labels(periods: pd.PeriodIndex, bucket: str) -> list[str]:
+    """期間のラベル（週は開始日、それ以外は "2024-01" や "2024Q1" の形式）"""
+    if bucket == "week":
+        return periods.start_time.strftime("%Y-%m-%d").tolist()
+    return periods.astype(str).tolist()
+
+
+def _series_label(y: str, aggregation: str, measures: list[tuple[str, str]]) -> str:
+    if len({measure_y for measure_y, _ in measures}) == len(measures):
+        return str(y)
+    return f"{y}（{AGGREGATIONS[aggregation]}）"
+
+
+def _json_values(series: pd.Series) -> list[Any]:
+    """欠損を None にした Python の値のリスト"""
+    if not series.hasnans:
+        return series.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _json_label(label: Any) -> Any:
+    """JSON にできるラベル・値（numpy のスカラーは Python の値、それ以外は文字列）"""
+    if hasattr(label, "item"):
+        return label.item()
+    if isinstance(label, str | bool | int | float) or label is None:
+        return label
+    return str(label)
+
+
+def build_chart_data(
+    spec: dict[str, Any],
+    df: pd.DataFrame,
+    mask_cache: MaskCache | None = None,
+    cube: RollupCube | None = None,
+    partitions: TimePartitions | None = None,
+) -> dict[str, Any]:
+    """
+    グラフ仕様に基づいてデータを集計する
+
+    すべての系列を1つの groupby(observed=True) から集計する（グループキーの
+    factorize は1回だけ）。名前付き集計の agg(**kwargs) や DataFrame の組み立ては
+    呼び出しごとの固定費が大きいため、系列ごとに SeriesGroupBy.agg を呼び、
+    並び順は先頭の系列で決めて残りの系列はそのラベル順に取り出す。
+    top_n を指定すると、先頭の系列の集計値で上位（sort が "asc" の場合は下位）
+    N 件に絞り、残りは「その他」にまとめる（other=False で省略）。
+
+    x が日付（datetime 型、または日付として解釈できる名前の文字列カラム）の場合は、
+    to_period で期間に丸めてから集計し、期間順に並べる。粒度は time_bucket
+    （day / week / month / quarter / year）で指定でき、省略時や "auto" の場合は
+    max_points（既定は DEFAULT_MAX_POINTS）に収まる最も細かい粒度を選ぶ。
+    "none" を指定すると丸めない。
+
+    filters を指定すると、条件をすべて満たす行だけを集計する。条件ごとのマスクは
+    mask_cache に保持し、同じデータへの次のグラフで再利用する。partitions を渡すと、
+    日付の範囲の条件は日付順のパーティションを二分探索して該当する行だけを取り出す。
+
+    cube を渡すと、x がキューブの次元（または日付カラム）で、集計方法が
+    sum / mean / count / min / max、filters が次元の等値・「いずれか」だけのグラフは
+    キューブの集計表から集計する（行数ではなくグループ数に比例する）。
+
+    Args:
+        spec: グラフ仕様（x, y, aggregation, top_n, sort, other, time_bucket, max_points,
+            filters）
+        df: データフレーム
+        mask_cache: 絞り込みのマスクのキャッシュ（None の場合は毎回計算する）
+        cube: ロールアップキューブ（df から作ったもの。答えられるグラフはキューブの
+            集計表から集計し、答えられない場合は df を集計する）
+        partitions: df の日付カラムのパーティション（日付の範囲の filters に使う）
+
+    Returns:
+        dict: labels, values（先頭の系列）, series（系列ごとの label・y・aggregation・values）,
+            group_count（絞り込み前のグループ数）、日付を丸めた場合は time_bucket。
+            カラムが存在しない場合や filters が不正な場合は labels と values が空のリスト
+    """
+    x_col = spec.get("x")
+    measures = chart_measures(spec)
+    if x_col not in df.columns or any(y not in df.columns for y, _ in measures):
+        return {"labels": [], "values": []}
+    try:
+        conditions = parse_filters(spec.get("filters"))
+    except ValueError:
+        return {"labels": [], "values": []}
+    if any(condition.column not in df.columns for condition in conditions):
+        return {"labels": [], "values": []}
+
+    top_n = _top_n(spec)
+    named = {f"m{i}": (y, aggregation) for i, (y, aggregation) in enumerate(measures)}
+    if top_n:
+        # 平均の「その他」はグループごとの合計と件数から求める
+        for i, (y, aggregation) in enumerate(measures):
+            if aggregation == "mean":
+                named[f"m{i}_sum"] = (y, "sum")
+                named[f"m{i}_count"] = (y, "count")
+
+    grouped, time_bucket = (
+        (None, None) if cube is None else _from_cube(spec, df, x_col, named, conditions, cube)
+    )
+    keys = None
+    if grouped is not None:
+        order = _order(spec, top_n, time_bucket)
+    else:
+        if conditions:
+            columns = list(dict.fromkeys([x_col, *(y for y, _ in measures)]))
+            try:
+                df = filter_frame(df, conditions, mask_cache, columns, partitions)
+            except ValueError:
+                return {"labels": [], "values": []}
+        keys, time_bucket = _time_keys(spec, df, x_col)
+        order = _order(spec, top_n, time_bucket)
+        # ラベル順はグループ化の時点で並べる（集計後の sort_index を省く）
+        groupby = df.groupby(
+            x_col if time_bucket is None else keys, sort=order == "label", observed=True
+        )
+        grouped = {name: groupby[y].agg(aggregation) for name, (y, aggregation) in named.items()}
+    primary = grouped["m0"]
+    group_count = len(primary)
+
+    remainder = None
+    trimmed = bool(top_n) and group_count > top_n
+    if trimmed:
+        if order == "asc":
+            top_index = primary.nsmallest(top_n).index
+        else:
+            top_index = primary.nlargest(top_n).index
+        rest = {name: values.drop(top_index) for name, values in grouped.items()}
+        primary = primary.loc[top_index]
+        if spec.get("other", True):
+            remainder = _remainder(rest, measures, df, keys, top_index)
+
+    if order == "desc":
+        primary = primary.sort_values(ascending=False, kind="stable")
+    elif order == "asc":
+        primary = primary.sort_values(kind="stable")
+    elif order == "label" and trimmed:
+        primary = primary.sort_index()
+
+    if time_bucket is None:
+        labels = [_json_label(label) for label in primary.index.tolist()]
+    else:
+        labels = _period_labels(primary.index, time_bucket)
+    series = []
+    for i, (y, aggregation) in enumerate(measures):
+        values = _json_values(primary if i == 0 else grouped[f"m{i}"].loc[primary.index])
+        if remainder is not None:
+            values.append(remainder[i])
+        series.append(
+            {
+                "label": _series_label(y, aggregation, measures),
+                "y": y,
+                "aggregation": aggregation,
+                "values": values,
+            }
+        )
+    if remainder is not None:
+        labels.append(OTHER_LABEL)
+
+    data = {
+        "labels": labels,
+        "values": series[0]["values"],
+        "series": series,
+        "group_count": group_count,
+    }
+    if time_bucket is not None:
+        data["time_bucket"] = time_bucket
+    return data
+
+
+def _remainder(
+    rest: dict[str, pd.Series],
+    measures: list[tuple[str, str]],
+    df: pd.DataFrame,
+    keys: pd.Series,
+    top_index: pd.Index,
+) -> list[Any]:
+    """上位 N 件以外のグループを1つにまとめた系列ごとの値"""
+    values: list[Any] = []
+    rest_rows = None
+    for i, (y, aggregation) in enumerate(measures):
+        if aggregation in _COMBINE_REMAINDER:
+            value = rest[f"m{i}"].agg(_COMBINE_REMAINDER[aggregation])
+        elif aggregation == "mean":
+            count = rest[f"m{i}_count"].sum()
+            value = rest[f"m{i}_sum"].sum() / count if count else None
+        else:
+            # 中央値はグループの集計値から求められないため、残りの行で計算する
+            if rest_rows is None:
+                rest_rows = df[~keys.isin(top_index)]
+            value = rest_rows[y].agg(aggregation)
+        values.append(None if value is None or pd.isna(value) else _json_label(value))
+    return values
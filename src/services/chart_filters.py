@@ -0,0 +1,365 @@
+"""
+ChartFilters - グラフ仕様の絞り込み条件
+
+責務:
+- グラフ仕様の filters（等値・いずれか・範囲・日付の範囲）の解釈
+- 条件ごとのブールマスクの計算と、データフレームごとのマスクのキャッシュ
+- マスクを組み合わせた行の絞り込み
+- 等値・「いずれか」の条件の転置インデックス（ColumnIndex）による行の取り出し（任意）
+- 日付の範囲の条件の日付順のパーティション（TimePartitions）による行の取り出し（任意）
+
+filters の例:
+    {
+        "地域": "東京",                                   # 等値
+        "商品名": ["商品A", "商品B"],                      # いずれか
+        "売上": {"min": 1000, "max": 50000},               # 範囲（両端を含む）
+        "日付": {"start": "2024-01-01", "end": "2024-03-31"},  # 日付の範囲
+    }
+
+同じ会話の中で絞り込みを変えながらグラフを追加しても、一度計算した
+(カラム, 条件) のマスクは MaskCache から再利用するため、全行を走査し直さない。
+MaskCache(index_columns=True) の場合は、等値・「いずれか」の条件はカラムごとの
+転置インデックス（初めて使うときに作る）から該当する行の位置を取り出し、
+その行だけを集めて残りの条件を評価する。日付の範囲の条件は、読み込み時に作った
+TimePartitions を渡すと、パーティションを二分探索して該当する行の位置を取り出す。
+"""
+
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.services.column_index import ColumnIndex, indexable
+from src.services.time_partitions import TimePartitions, date_bounds
+
+# キャッシュするデータフレームの数（古いものから捨てる）
+MAX_CACHED_FRAMES = 4
+
+# データフレームごとにキャッシュするマスクの数（古いものから捨てる）
+MAX_MASKS_PER_FRAME = 64
+
+_RANGE_KEYS = frozenset({"min", "max"})
+_DATE_RANGE_KEYS = frozenset({"start", "end"})
+
+
+@dataclass(frozen=True)
+class FilterCondition:
+    """
+    1つのカラムの絞り込み条件（マスクのキャッシュのキーになる）
+
+    Attributes:
+        column: カラム名
+        kind: "eq"（等値）/ "in"（いずれか）/ "range"（範囲）/ "date_range"（日付の範囲）
+        values: eq は (値,)、in は値のタプル、range と date_range は (下限, 上限)
+            （範囲の省略した側は None）
+    """
+
+    column: str
+    kind: str
+    values: tuple[Any, ...]
+
+
+def parse_filters(filters: dict[str, Any] | None) -> list[FilterCondition]:
+    """
+    グラフ仕様の filters を条件のリストにする
+
+    値がリストの場合は「いずれか」、min / max を持つ辞書は範囲、start / end を持つ
+    辞書は日付の範囲、それ以外は等値として扱う。
+
+    Args:
+        filters: カラム → 条件 の辞書（None や空の場合は絞り込まない）
+
+    Returns:
+        list: FilterCondition のリスト
+
+    Raises:
+        ValueError: filters が辞書でない場合、または条件の形式が不正な場合
+    """
+    if not filters:
+        return []
+    if not isinstance(filters, dict):
+        raise ValueError(f"filters は辞書で指定してください: {filters!r}")
+
+    conditions = []
+    for column, condition in filters.items():
+        if isinstance(condition, list | tuple):
+            if not condition:
+                raise ValueError(f"{column} の候補が空です")
+            conditions.append(FilterCondition(column, "in", tuple(condition)))
+        elif isinstance(condition, dict):
+            keys = frozenset(condition)
+            if keys and keys <= _RANGE_KEYS:
+                kind, bounds = "range", (condition.get("min"), condition.get("max"))
+            elif keys and keys <= _DATE_RANGE_KEYS:
+                kind, bounds = "date_range", (condition.get("start"), condition.get("end"))
+            else:
+                raise ValueError(f"{column} の範囲の指定が不正です: {condition!r}")
+            if all(bound is None for bound in bounds):
+                raise ValueError(f"{column} の範囲の上限・下限がありません")
+            conditions.append(FilterCondition(column, kind, bounds))
+        else:
+            conditions.append(FilterCondition(column, "eq", (condition,)))
+    return conditions
+
+
+def compute_mask(df: pd.DataFrame, condition: FilterCondition) -> np.ndarray:
+    """
+    条件に合う行のブールマスクを計算する
+
+    日付の範囲は日付として解釈できない値を除く。時刻のない end はその日の終わりまでを含む。
+
+    Args:
+        df: データフレーム
+        condition: 絞り込み条件
+
+    Returns:
+        np.ndarray: 行ごとのブール値
+
+    Raises:
+        ValueError: 範囲の上限・下限を比較できない場合
+    """
+    series = df[condition.column]
+    if condition.kind == "eq":
+        return (series == condition.values[0]).to_numpy(dtype=bool, na_value=False)
+    if condition.kind == "in":
+        return series.isin(condition.values).to_numpy(dtype=bool, na_value=False)
+
+    low, high = condition.values
+    upper_inclusive = True
+    if condition.kind == "date_range":
+        if not pd.api.types.is_datetime64_any_dtype(series):
+            series = pd.to_datetime(series, errors="coerce")
+        try:
+            low, high, upper_inclusive = date_bounds(low, high, series.dt.tz)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{condition.column} の日付を解釈できません: {e}") from e
+
+    mask = np.ones(len(series), dtype=bool)
+    try:
+        if low is not None:
+            mask &= (series >= low).to_numpy(dtype=bool, na_value=False)
+        if high is not None:
+            below = series <= high if upper_inclusive else series < high
+            mask &= below.to_numpy(dtype=bool, na_value=False)
+    except TypeError as e:
+        raise ValueError(f"{condition.column} の範囲を比較できません: {e}") from e
+    return mask
+
+
+def frame_fingerprint(df: pd.DataFrame) -> tuple[Any, ...]:
+    """
+    マスクのキャッシュのキーにするデータフレームの指紋
+
+    オブジェクトの識別子・行数・カラムから作る（値は走査しない）。
+    同じオブジェクトの値をその場で書き換えた場合は検知しないため、
+    データを変更したら MaskCache.clear() を呼ぶ。
+    """
+    return (id(df), len(df), tuple(df.columns))
+
+
+@dataclass
+class _FrameEntry:
+    """MaskCache が1つのデータフレームについて保持するもの"""
+
+    ref: weakref.ref
+    masks: OrderedDict = field(default_factory=OrderedDict)
+    indexes: dict[str, ColumnIndex | None] = field(default_factory=dict)
+
+
+class MaskCache:
+    """
+    データフレームの指紋ごとに条件のブールマスクを保持するキャッシュ
+
+    データフレームが破棄されると、同じ識別子の別のデータフレームにマスクを
+    使い回さないよう、そのデータフレームのマスクとインデックスを捨てる。
+    """
+
+    def __init__(
+        self,
+        max_frames: int = MAX_CACHED_FRAMES,
+        max_masks: int = MAX_MASKS_PER_FRAME,
+        index_columns: bool = False,
+    ):
+        """
+        Args:
+            max_frames: キャッシュするデータフレームの数
+            max_masks: データフレームごとにキャッシュするマスクの数
+            index_columns: True の場合、等値・「いずれか」の条件はカラムの転置インデックス
+                から行の位置を取り出す（インデックスはカラムを初めて使うときに作る）
+
+        Raises:
+            ValueError: max_frames または max_masks が1未満の場合
+        """
+        if max_frames < 1 or max_masks < 1:
+            raise ValueError("max_frames と max_masks は1以上にしてください")
+        self.max_frames = max_frames
+        self.max_masks = max_masks
+        self.index_columns = index_columns
+        self.hits = 0
+        self.misses = 0
+        self.index_builds = 0
+        self._frames: OrderedDict[tuple[Any, ...], _FrameEntry] = OrderedDict()
+
+    def mask(self, df: pd.DataFrame, condition: FilterCondition) -> np.ndarray:
+        """
+        条件のマスクを返す（キャッシュになければ計算して保持する）
+
+        Args:
+            df: データフレーム
+            condition: 絞り込み条件
+
+        Returns:
+            np.ndarray: 行ごとのブール値（書き換えないこと）
+        """
+        masks = self._entry(df).masks
+        mask = masks.get(condition)
+        if mask is not None:
+            masks.move_to_end(condition)
+            self.hits += 1
+            return mask
+
+        self.misses += 1
+        mask = compute_mask(df, condition)
+        mask.flags.writeable = False
+        masks[condition] = mask
+        if len(masks) > self.max_masks:
+            masks.popitem(last=False)
+        return mask
+
+    def rows(self, df: pd.DataFrame, condition: FilterCondition) -> np.ndarray | None:
+        """
+        転置インデックスから条件に合う行の位置を返す
+
+        Args:
+            df: データフレーム
+            condition: 絞り込み条件
+
+        Returns:
+            np.ndarray | None: 行の位置（昇順）。index_columns が False の場合、
+                等値・「いずれか」以外の条件の場合、インデックスを作れないカラムの場合は None
+        """
+        if not self.index_columns or condition.kind not in ("eq", "in"):
+            return None
+        indexes = self._entry(df).indexes
+        if condition.column not in indexes:
+            series = df[condition.column]
+            indexes[condition.column] = (
+                ColumnIndex.from_series(series) if indexable(series) else None
+            )
+            self.index_builds += 1
+        index = indexes[condition.column]
+        if index is None:
+            return None
+        if condition.kind == "eq":
+            return index.positions(condition.values[0])
+        return index.positions_in(condition.values)
+
+    def clear(self) -> None:
+        """すべてのマスクとインデックスを捨てる"""
+        self._frames.clear()
+
+    def __len__(self) -> int:
+        return sum(len(entry.masks) for entry in self._frames.values())
+
+    def _entry(self, df: pd.DataFrame) -> _FrameEntry:
+        key = frame_fingerprint(df)
+        entry = self._frames.get(key)
+        if entry is not None and entry.ref() is df:
+            self._frames.move_to_end(key)
+            return entry
+
+        frames = self._frames
+        entry = _FrameEntry(weakref.ref(df, lambda _: frames.pop(key, None)))
+        self._frames[key] = entry
+        if len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+        return entry
+
+
+def filter_frame(
+    df: pd.DataFrame,
+    conditions: list[FilterCondition],
+    cache: MaskCache | None = None,
+    columns: list[str] | None = None,
+    partitions: TimePartitions | None = None,
+) -> pd.DataFrame:
+    """
+    条件をすべて満たす行に絞り込む
+
+    Args:
+        df: データフレーム
+        conditions: 絞り込み条件（空の場合は絞り込まない）
+        cache: マスクのキャッシュ（None の場合は毎回計算する）
+        columns: 残すカラム（None の場合はすべて）
+        partitions: df の日付カラムのパーティション（日付の範囲の条件に使う）
+
+    Returns:
+        pd.DataFrame: 絞り込んだデータフレーム
+
+    Raises:
+        ValueError: 範囲の上限・下限を比較できない場合
+    """
+    if not conditions:
+        return df if columns is None else df[columns]
+
+    positions = None
+    rest = []
+    for condition in conditions:
+        rows = cache.rows(df, condition) if cache is not None else None
+        if rows is None and partitions is not None and condition.kind == "date_range":
+            rows = partitions.rows(df, condition.column, *condition.values)
+        if rows is None:
+            rest.append(condition)
+        elif positions is None:
+            positions = rows
+        else:
+            positions = np.intersect1d(positions, rows, assume_unique=True)
+
+    if positions is not None:
+        # インデックス・パーティションで絞った行だけを集め、残りの条件はその行だけで評価する
+        if columns is not None:
+            df = df[list(dict.fromkeys([*columns, *(condition.column for condition in rest)]))]
+        frame = df.take(positions)
+        if rest:
+            frame = frame[np.logical_and.reduce([compute_mask(frame, c) for c in rest])]
+        return frame if columns is None else frame[columns]
+
+    masks = [
+        cache.mask(df, condition) if cache is not None else compute_mask(df, condition)
+        for condition in rest
+    ]
+    mask = masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+    if columns is None:
+        return df[mask]
+    return df.loc[mask, columns]
+
+
+def filter_date_range(
+    df: pd.DataFrame,
+    column: str,
+    start: Any = None,
+    end: Any = None,
+    partitions: TimePartitions | None = None,
+) -> pd.DataFrame:
+    """
+    日付の範囲で行を絞り込む（生成した集計コードから使う）
+
+    Args:
+        df: データフレーム
+        column: 日付カラム
+        start: 開始日時（None の場合は下限なし）
+        end: 終了日時（None の場合は上限なし。時刻のない場合はその日の終わりまで）
+        partitions: df の日付カラムのパーティション（None の場合や、パーティションを
+            作ったデータと別のオブジェクトの場合は全行を比較する）
+
+    Returns:
+        pd.DataFrame: 絞り込んだデータフレーム
+
+    Raises:
+        ValueError: 開始・終了を日時として解釈できない場合
+    """
+    condition = FilterCondition(column, "date_range", (start, end))
+    return filter_frame(df, [condition], partitions=partitions)
@@ -2,20 +2,81 @@
 ChatHandler - AIチャットによる対話型分析
 
 責務:
-- ユーザーメッセージの意図分類
+- ユーザーメッセージの意図分類（明らかなものはローカルで分類し、モデル呼び出しを省く）
+- 意図分類と応答生成を1回のモデル呼び出しで行う統合モード
+- 定量的な質問のローカル集計（QueryEngine）による回答
+- ロールアップキューブがあれば、グラフ・ローカル集計をキューブから集計
+- 応答テキストのストリーミング（届いたトークンから順に表示できるようにする）
 - 質問応答
 - 追加グラフ生成リクエスト処理
 - コンテキスト管理
 """
 
 import json
+import logging
 import re
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
 from enum import Enum
+from itertools import cycle
 from typing import Any
 
 import pandas as pd
 
+from src.services.chart_data import build_chart_data
+from src.services.chart_filters import MaskCache
+from src.services.intent_classifier import IntentClassifier
+from src.services.query_engine import QuerySpec, execute_query, parse_query
+from src.services.rollup_cube import RollupCube
+from src.services.time_partitions import TimePartitions
+
+logger = logging.getLogger(__name__)
+
+# 統合モードで意図ごとに返す ChatResponse の type
+RESPONSE_TYPES = {
+    "question": "text",
+    "add_chart": "chart",
+    "analyze": "insight",
+    "summarize": "text",
+    "general": "text",
+}
+
+# モデルにグラフ仕様を作らせる場合の JSON の形式（build_chart_data が解釈する）
+CHART_SPEC_FORMAT = (
+    '{"type": "bar|line|pie", "title": "グラフタイトル", "x": "X軸カラム", '
+    '"y": "Y軸カラム（複数の場合はリスト）", "aggregation": "sum|mean|median|min|max|count", '
+    '"top_n": 10, '
+    '"time_bucket": "X軸が日付の場合の粒度 day|week|month|quarter|year（省略時は自動）", '
+    '"filters": {"カラムA": "等しい値（絞り込む場合だけ、省略可）", "カラムB": ["値1", "値2"], '
+    '"カラムC": {"min": 下限, "max": 上限}, '
+    '"日付カラム": {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}}}'
+)
+
+# 追加グラフの系列の色（RGB）
+CHART_COLORS = ("54, 162, 235", "255, 99, 132", "75, 192, 192", "255, 159, 64", "153, 102, 255")
+
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_HIGH_SURROGATE_RE = re.compile(r"\\u[dD][89abAB]")
+
+# モデルに集計クエリを作らせる場合の JSON の形式（QuerySpec と同じキー）
+QUERY_SPEC_FORMAT = (
+    '{"measure": "数値カラム（件数の場合は null）", '
+    '"aggregation": "sum|mean|median|max|min|count", '
+    '"group_by": "グループ化するカラムまたは null", '
+    '"time_bucket": "day|week|month|quarter|year または null（group_by が日付の場合）", '
+    '"filters": {"カラム": "値"}, "top_k": "上位何件か（整数）または null", '
+    '"ascending": false}'
+)
+
+
+def _load_json(text: str) -> Any:
+    """コードブロックで囲まれていてもよい JSON を読み込む（不正な場合は None）"""
+    fence = _JSON_FENCE_RE.search(text)
+    try:
+        return json.loads(fence.group(1) if fence else text)
+    except json.JSONDecodeError:
+        return None
+
 
 class Intent(Enum):
     """ユーザーの意図"""
@@ -38,26 +99,165 @@ class ChatResponse:
     data: dict[str, Any] | None = None
 
 
+class ChatStream:
+    """
+    ストリーミング応答
+
+    反復するとモデルが生成したテキストを届いた順に返し、反復し終えると response に
+    ChatResponse が入る。最終的な応答の content が届いたテキストの続きでない場合
+    （ローカル集計の回答や、統合モードの応答を解釈できなかった場合）は、最後に
+    その content を返す。
+    """
+
+    def __init__(self, chunks: Iterable[str], finalize: Callable[[str], ChatResponse]):
+        """
+        Args:
+            chunks: 表示するテキストの断片
+            finalize: 届いたテキスト全体から ChatResponse を作る関数
+        """
+        self._chunks = chunks
+        self._finalize = finalize
+        self.response: ChatResponse | None = None
+
+    @classmethod
+    def of(cls, response: ChatResponse) -> "ChatStream":
+        """生成済みの応答をそのまま返すストリーム"""
+        return cls((), lambda _: response)
+
+    def __iter__(self) -> Iterator[str]:
+        streamed = []
+        for chunk in self._chunks:
+            if chunk:
+                streamed.append(chunk)
+                yield chunk
+        text = "".join(streamed)
+        self.response = self._finalize(text)
+        content = self.response.content
+        if content.startswith(text):
+            if content[len(text) :]:
+                yield content[len(text) :]
+        else:
+            yield f"\n\n{content}"
+
+
+class _JsonStringField:
+    """
+    生成途中の JSON から1つの文字列フィールドの値を少しずつ取り出す
+
+    feed() に届いた断片を渡すと、そのフィールドの値のうち新しくデコードできた
+    部分を返す。受け取った断片全体は raw に溜める。
+    """
+
+    _ESCAPES = {
+        "n": "\n",
+        "t": "\t",
+        "r": "\r",
+        "b": "\b",
+        "f": "\f",
+        '"': '"',
+        "\\": "\\",
+        "/": "/",
+    }
+
+    def __init__(self, name: str):
+        self._start_re = re.compile(rf'"{re.escape(name)}"\s*:\s*"')
+        self.raw = ""
+        self._position: int | None = None
+        self._closed = False
+
+    def feed(self, chunk: str) -> str:
+        self.raw += chunk
+        if self._position is None:
+            match = self._start_re.search(self.raw)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        raw = self.raw
+        position = self._position
+        decoded = []
+        while position < len(raw) and not self._closed:
+            char = raw[position]
+            if char == '"':
+                self._closed = True
+            elif char != "\\":
+                decoded.append(char)
+                position += 1
+            elif position + 1 >= len(raw):
+                break
+            elif raw[position + 1] != "u":
+                decoded.append(self._ESCAPES.get(raw[position + 1], raw[position + 1]))
+                position += 2
+            else:
+                # サロゲートペアは2つ目の \uXXXX まで揃ってからデコードする
+                width = 12 if _HIGH_SURROGATE_RE.match(raw, position) else 6
+                if position + width > len(raw):
+                    break
+                try:
+                    decoded.append(json.loads(f'"{raw[position : position + width]}"'))
+                except json.JSONDecodeError:
+                    decoded.append(raw[position : position + width])
+                position += width
+        self._position = position
+        return "".join(decoded)
+
+
 class ChatHandler:
     """AIチャットを処理するクラス"""
 
-    def __init__(self, model):
+    def __init__(
+        self,
+        model,
+        intent_classifier: IntentClassifier | None = None,
+        combined: bool = False,
+        local_queries: bool = False,
+        mask_cache: MaskCache | None = None,
+        rollup_cube: RollupCube | None = None,
+        time_partitions: TimePartitions | None = None,
+    ):
         """
         Args:
             model: Gemini モデルインスタンス
+            intent_classifier: ローカルの意図分類器（None の場合は常にモデルで分類する）
+            combined: True の場合、ローカルで分類できないメッセージは
+                意図と応答を1回のモデル呼び出しでまとめて生成する
+            local_queries: True の場合、定量的な質問は集計クエリにしてローカルで計算する
+                （質問文から組み立てられない場合はモデルにクエリ仕様だけを作らせる）
+            mask_cache: グラフ・ローカル集計の絞り込みのマスクのキャッシュ（会話をまたいで
+                保持すると、同じデータへの絞り込みを全行の走査なしで再利用する）
+            rollup_cube: アップロード時に事前集計したキューブ（答えられるグラフ・ローカル
+                集計はキューブから集計し、答えられない場合や別のデータの場合は生データを集計する）
+            time_partitions: 読み込み時に作った日付カラムのパーティション（グラフの日付の範囲の
+                絞り込みで全行を走査しない）
         """
         self.model = model
+        self.intent_classifier = intent_classifier
+        self.combined = combined
+        self.local_queries = local_queries
+        self.mask_cache = mask_cache
+        self.rollup_cube = rollup_cube
+        self.time_partitions = time_partitions
 
     def classify_intent(self, message: str) -> Intent:
         """
         ユーザーメッセージの意図を分類する
 
+        intent_classifier の確信度がしきい値以上の場合は、モデルを呼ばずにその意図を返す。
+
         Args:
             message: ユーザーメッセージ
 
         Returns:
             Intent: 分類された意図
         """
+        if self.intent_classifier is not None:
+            local_intent = self.intent_classifier.classify(message)
+            if local_intent is not None:
+                return Intent(local_intent)
+        return self._classify_with_model(message)
+
+    def _classify_with_model(self, message: str) -> Intent:
+        """モデルで意図を分類"""
         prompt = f"""
 ユーザーのメッセージを以下のカテゴリに分類してください。
 
@@ -84,6 +284,11 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
         """
         ユーザーメッセージを処理して応答を生成する
 
+        combined が True でローカルの意図分類が確信を持てない場合は、意図と応答を
+        1回のモデル呼び出しで生成する。その応答を解釈できない場合は、意図分類と
+        応答生成を個別に行う。local_queries が True で質問文から集計クエリを
+        組み立てられる場合は、モデルを呼ばずにローカルで集計して答える。
+
         Args:
             message: ユーザーメッセージ
             context: コンテキスト情報（df, summaryなど）
@@ -91,25 +296,228 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
         Returns:
             ChatResponse: 応答
         """
-        intent = self.classify_intent(message)
-
-        if intent == Intent.QUESTION:
-            return self._handle_question(message, context)
-        elif intent == Intent.ADD_CHART:
-            return self._handle_add_chart(message, context)
-        elif intent == Intent.ANALYZE:
-            return self._handle_analyze(message, context)
-        elif intent == Intent.SUMMARIZE:
-            return self._handle_summarize(message, context)
-        else:
-            return self._handle_general(message, context)
+        local_answer = self._answer_locally(message, context)
+        if local_answer is not None:
+            return local_answer
+
+        local_intent = self._local_intent(message)
+        if local_intent is None and self.combined:
+            response = self._handle_combined(message, context)
+            if response is not None:
+                return response
+
+        intent = local_intent or self._classify_with_model(message)
+        return self._dispatch(intent, message, context)
+
+    def stream_message(self, message: str, context: dict[str, Any]) -> ChatStream:
+        """
+        ユーザーメッセージへの応答をストリーミングで生成する
+
+        handle_message と同じ経路で応答を作り、応答本文を生成するモデル呼び出しだけを
+        generate_content_stream で受け取る（モデルが対応していなければ一括で受け取る）。
+        統合モードでは、生成途中の JSON から content の値を取り出して返す。
+
+        Args:
+            message: ユーザーメッセージ
+            context: コンテキスト情報（df, summaryなど）
 
-    def _handle_question(self, message: str, context: dict[str, Any]) -> ChatResponse:
-        """質問に対する応答を生成"""
+        Returns:
+            ChatStream: 反復すると応答テキストを届いた順に返すストリーム
+        """
+        local_answer = self._answer_locally(message, context)
+        if local_answer is not None:
+            return ChatStream.of(local_answer)
+
+        local_intent = self._local_intent(message)
+        if local_intent is None and self.combined:
+            return self._stream_combined(message, context)
+
+        intent = local_intent or self._classify_with_model(message)
+        answered = self._answer_with_model_query(intent, message, context)
+        if answered is not None:
+            return ChatStream.of(answered)
+        chunks = self._stream_text(self._build_prompt(intent, message, context))
+        return ChatStream(chunks, lambda text: self._response_for(intent, text))
+
+    def _answer_locally(self, message: str, context: dict[str, Any]) -> ChatResponse | None:
+        """質問文から組み立てた集計クエリで答える（local_queries が無効・対象外なら None）"""
+        df = context.get("df")
+        if not self.local_queries or df is None:
+            return None
+        spec = parse_query(message, df)
+        return self._answer_query(spec, df) if spec is not None else None
+
+    def _local_intent(self, message: str) -> Intent | None:
+        """ローカルの意図分類（分類器がない・確信度が足りない場合は None）"""
+        if self.intent_classifier is None:
+            return None
+        local_intent = self.intent_classifier.classify(message)
+        return Intent(local_intent) if local_intent is not None else None
+
+    def _stream_text(self, prompt: str) -> Iterator[str]:
+        """モデルの応答テキストを断片ごとに返す"""
+        stream = getattr(self.model, "generate_content_stream", None)
+        if stream is None:
+            yield self.model.generate_content(prompt).text
+            return
+        for chunk in stream(prompt):
+            yield chunk.text or ""
+
+    def _stream_combined(self, message: str, context: dict[str, Any]) -> ChatStream:
+        """統合モードの応答をストリーミングする（解釈できない場合は個別の呼び出しで答える）"""
+        field = _JsonStringField("content")
+        chunks = (
+            field.feed(chunk)
+            for chunk in self._stream_text(self._combined_prompt(message, context))
+        )
+
+        def finalize(_: str) -> ChatResponse:
+            parsed = self._parse_combined(field.raw, context.get("df"))
+            if parsed is not None:
+                return parsed
+            logger.warning("統合モードの応答を解釈できません（意図分類と応答を個別に行います）")
+            return self._dispatch(self._classify_with_model(message), message, context)
+
+        return ChatStream(chunks, finalize)
+
+    def _dispatch(self, intent: Intent, message: str, context: dict[str, Any]) -> ChatResponse:
+        """意図に応じたプロンプトで応答を生成"""
+        answered = self._answer_with_model_query(intent, message, context)
+        if answered is not None:
+            return answered
+        response = self.model.generate_content(self._build_prompt(intent, message, context))
+        return self._response_for(intent, response.text)
+
+    def _build_prompt(self, intent: Intent, message: str, context: dict[str, Any]) -> str:
+        """意図に応じたプロンプトを作る"""
+        builders = {
+            Intent.QUESTION: self._question_prompt,
+            Intent.ADD_CHART: self._add_chart_prompt,
+            Intent.ANALYZE: self._analyze_prompt,
+            Intent.SUMMARIZE: self._summarize_prompt,
+        }
+        return builders.get(intent, self._general_prompt)(message, context)
+
+    def _answer_with_model_query(
+        self, intent: Intent, message: str, context: dict[str, Any]
+    ) -> ChatResponse | None:
+        """質問をモデルが作った集計クエリでローカルに答える（対象外・不正な場合は None）"""
+        df = context.get("df")
+        if intent != Intent.QUESTION or not self.local_queries or df is None:
+            return None
+        spec = self._query_from_model(message, df)
+        return self._answer_query(spec, df) if spec is not None else None
+
+    def _handle_combined(self, message: str, context: dict[str, Any]) -> ChatResponse | None:
+        """
+        意図の分類と応答の生成を1回のモデル呼び出しで行う
+
+        Args:
+            message: ユーザーメッセージ
+            context: コンテキスト情報（df, summaryなど）
+
+        Returns:
+            ChatResponse | None: 応答（モデルの出力を解釈できない場合は None）
+        """
+        response = self.model.generate_content(self._combined_prompt(message, context))
+        parsed = self._parse_combined(response.text, context.get("df"))
+        if parsed is None:
+            logger.warning("統合モードの応答を解釈できません（意図分類と応答を個別に行います）")
+        return parsed
+
+    def _combined_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """統合モードのプロンプト"""
         df = context.get("df")
         data_info = self._get_data_info(df) if df is not None else ""
+        columns = df.columns.tolist() if df is not None else []
+        query_hint = ""
+        if self.local_queries and df is not None:
+            query_hint = (
+                "\n  集計で答えられる質問は、content の代わりに query に集計クエリを指定する"
+                f"\n  query の形式: {QUERY_SPEC_FORMAT}"
+            )
+
+        return f"""
+あなたはデータ分析アシスタントです。ユーザーのメッセージをカテゴリに分類したうえで、そのカテゴリに応じた回答を作成してください。
+
+カテゴリと回答内容:
+- question: データに関する質問 → 3-5文程度の簡潔な回答（具体的な数値があれば含める）{query_hint}
+- add_chart: グラフ追加リクエスト → 一言の説明と chart_spec
+- analyze: 分析リクエスト → 箇条書きの分析結果
+- summarize: まとめリクエスト → 要点の簡潔なまとめ
+- general: その他 → フレンドリーな応答（データ分析について質問があれば案内する）
+
+## データ情報
+{data_info}
+
+## 利用可能なカラム
+{columns}
 
+## ユーザーメッセージ
+{message}
+
+JSON形式のみで回答してください（chart_spec は add_chart の場合だけ指定し、それ以外は null）:
+{{"intent": "カテゴリ名", "content": "回答", "chart_spec": {CHART_SPEC_FORMAT}}}
+"""
+
+    def _parse_combined(self, text: str, df: pd.DataFrame | None = None) -> ChatResponse | None:
+        """統合モードの応答 JSON を ChatResponse に変換（解釈できない場合は None）"""
+        result = _load_json(text)
+        if not isinstance(result, dict):
+            return None
+        if result.get("intent") == "question" and self.local_queries and df is not None:
+            spec = self._query_spec(result.get("query"), df)
+            if spec is not None:
+                return self._answer_query(spec, df)
+        if not isinstance(result.get("content"), str):
+            return None
+
+        intent = result.get("intent")
+        response_type = RESPONSE_TYPES.get(intent, "text") if isinstance(intent, str) else "text"
+        chart_spec = result.get("chart_spec")
+        if response_type != "chart" or not isinstance(chart_spec, dict):
+            chart_spec = None
+        return ChatResponse(type=response_type, content=result["content"], chart_spec=chart_spec)
+
+    def _query_from_model(self, message: str, df: pd.DataFrame) -> QuerySpec | None:
+        """モデルに集計クエリの仕様だけを作らせる（集計で答えられない場合は None）"""
+        columns = {str(column): str(dtype) for column, dtype in df.dtypes.items()}
         prompt = f"""
+以下のデータへの質問を集計クエリに変換してください。
+
+## カラムと型
+{json.dumps(columns, ensure_ascii=False)}
+
+## 質問
+{message}
+
+JSON形式のみで回答してください（集計で答えられない質問の場合は null）:
+{QUERY_SPEC_FORMAT}
+"""
+        response = self.model.generate_content(prompt)
+        return self._query_spec(_load_json(response.text), df)
+
+    @staticmethod
+    def _query_spec(data: Any, df: pd.DataFrame) -> QuerySpec | None:
+        """モデルが返したクエリ仕様を検証（不正な場合は None）"""
+        if not isinstance(data, dict):
+            return None
+        try:
+            return QuerySpec.from_dict(data, df)
+        except (TypeError, ValueError):
+            return None
+
+    def _answer_query(self, spec: QuerySpec, df: pd.DataFrame) -> ChatResponse:
+        """集計クエリをローカルで実行して応答にする"""
+        result = execute_query(spec, df, self.mask_cache, self.rollup_cube)
+        return ChatResponse(type="text", content=result.to_text(), data=result.to_dict())
+
+    def _question_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """質問に答えるプロンプト"""
+        df = context.get("df")
+        data_info = self._get_data_info(df) if df is not None else ""
+
+        return f"""
 以下のデータに関する質問に答えてください。
 
 ## データ情報
@@ -120,15 +528,13 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 
 簡潔に回答してください（3-5文程度）。具体的な数値があれば含めてください。
 """
-        response = self.model.generate_content(prompt)
-        return ChatResponse(type="text", content=response.text)
 
-    def _handle_add_chart(self, message: str, context: dict[str, Any]) -> ChatResponse:
-        """グラフ追加リクエストを処理"""
+    def _add_chart_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """グラフ追加リクエストのプロンプト"""
         df = context.get("df")
         columns = df.columns.tolist() if df is not None else []
 
-        prompt = f"""
+        return f"""
 以下のリクエストに基づいてグラフ仕様を生成してください。
 
 ## 利用可能なカラム
@@ -141,11 +547,15 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 グラフを作成しました。
 
 ```chart_spec
-{{"type": "bar|line|pie", "title": "グラフタイトル", "x": "X軸カラム", "y": "Y軸カラム"}}
+{CHART_SPEC_FORMAT}
 ```
 """
-        response = self.model.generate_content(prompt)
-        content = response.text
+
+    @staticmethod
+    def _response_for(intent: Intent, content: str) -> ChatResponse:
+        """モデルの応答テキストを意図に応じた ChatResponse にする"""
+        if intent != Intent.ADD_CHART:
+            return ChatResponse(type=RESPONSE_TYPES[intent.value], content=content)
 
         # chart_specを抽出
         chart_spec = None
@@ -158,12 +568,12 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 
         return ChatResponse(type="chart", content=content, chart_spec=chart_spec)
 
-    def _handle_analyze(self, message: str, context: dict[str, Any]) -> ChatResponse:
-        """分析リクエストを処理"""
+    def _analyze_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """分析リクエストのプロンプト"""
         df = context.get("df")
         data_info = self._get_data_info(df) if df is not None else ""
 
-        prompt = f"""
+        return f"""
 以下のデータを分析してインサイトを提供してください。
 
 ## データ情報
@@ -174,15 +584,13 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 
 分析結果を箇条書きで提供してください。
 """
-        response = self.model.generate_content(prompt)
-        return ChatResponse(type="insight", content=response.text)
 
-    def _handle_summarize(self, message: str, context: dict[str, Any]) -> ChatResponse:
-        """まとめリクエストを処理"""
+    def _summarize_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """まとめリクエストのプロンプト"""
         df = context.get("df")
         data_info = self._get_data_info(df) if df is not None else ""
 
-        prompt = f"""
+        return f"""
 以下のデータをまとめてください。
 
 ## データ情報
@@ -193,20 +601,16 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 
 要点を簡潔にまとめてください。
 """
-        response = self.model.generate_content(prompt)
-        return ChatResponse(type="text", content=response.text)
 
-    def _handle_general(self, message: str, context: dict[str, Any]) -> ChatResponse:
-        """一般的な会話を処理"""
-        prompt = f"""
+    def _general_prompt(self, message: str, context: dict[str, Any]) -> str:
+        """一般的な会話のプロンプト"""
+        return f"""
 あなたはデータ分析アシスタントです。以下のメッセージに応答してください。
 
 メッセージ: {message}
 
 フレンドリーに応答してください。データ分析について質問があれば案内してください。
 """
-        response = self.model.generate_content(prompt)
-        return ChatResponse(type="text", content=response.text)
 
     def _get_data_info(self, df: pd.DataFrame) -> str:
         """データ情報を文字列で取得"""
@@ -264,7 +668,7 @@ JSON形式で回答してください: {{"intent": "カテゴリ名", "entities"
 リクエスト: {request}
 
 JSON形式のみで回答してください:
-{{"type": "bar|line|pie", "title": "タイトル", "x": "Xカラム", "y": "Yカラム", "aggregation": "sum|mean|count"}}
+{CHART_SPEC_FORMAT}
 """
         response = self.model.generate_content(prompt)
         try:
@@ -282,6 +686,11 @@ JSON形式のみで回答してください:
         """
         グラフ仕様に基づいてデータを集計する
 
+        複数の y・集計方法、top_n と「その他」、sort、日付の x の期間への丸め、
+        filters による絞り込みに対応する（build_chart_data を参照）。rollup_cube があれば
+        答えられるグラフはキューブから集計し、time_partitions があれば日付の範囲の絞り込みは
+        パーティションから行を取り出す。
+
         Args:
             spec: グラフ仕様
             df: データフレーム
@@ -289,23 +698,7 @@ JSON形式のみで回答してください:
         Returns:
             dict: 集計されたグラフデータ
         """
-        x_col = spec.get("x")
-        y_col = spec.get("y")
-        aggregation = spec.get("aggregation", "sum")
-
-        if x_col not in df.columns or y_col not in df.columns:
-            return {"labels": [], "values": []}
-
-        if aggregation == "sum":
-            grouped = df.groupby(x_col)[y_col].sum()
-        elif aggregation == "mean":
-            grouped = df.groupby(x_col)[y_col].mean()
-        elif aggregation == "count":
-            grouped = df.groupby(x_col)[y_col].count()
-        else:
-            grouped = df.groupby(x_col)[y_col].sum()
-
-        return {"labels": list(grouped.index), "values": list(grouped.values)}
+        return build_chart_data(spec, df, self.mask_cache, self.rollup_cube, self.time_partitions)
 
     def generate_chart_html(self, spec: dict[str, Any], data: dict[str, Any]) -> str:
         """
@@ -320,8 +713,21 @@ JSON形式のみで回答してください:
         """
         chart_type = spec.get("type", "bar")
         title = spec.get("title", "Chart")
-        labels = json.dumps(data.get("labels", []))
-        values = json.dumps(data.get("values", []))
+        labels = json.dumps(data.get("labels", []), ensure_ascii=False)
+        series = data.get("series") or [{"label": title, "values": data.get("values", [])}]
+        datasets = json.dumps(
+            [
+                {
+                    "label": title if len(series) == 1 else item["label"],
+                    "data": item["values"],
+                    "backgroundColor": f"rgba({color}, 0.5)",
+                    "borderColor": f"rgba({color}, 1)",
+                    "borderWidth": 1,
+                }
+                for item, color in zip(series, cycle(CHART_COLORS), strict=False)
+            ],
+            ensure_ascii=False,
+        )
 
         return f"""
 <div style="width: 100%; max-width: 600px;">
@@ -331,13 +737,7 @@ JSON形式のみで回答してください:
             type: '{chart_type}',
             data: {{
                 labels: {labels},
-                datasets: [{{
-                    label: '{title}',
-                    data: {values},
-                    backgroundColor: 'rgba(54, 162, 235, 0.5)',
-                    borderColor: 'rgba(54, 162, 235, 1)',
-                    borderWidth: 1
-                }}]
+                datasets: {datasets}
             }},
             options: {{
                 responsive: true,
@@ -0,0 +1,124 @@
+"""
+ColumnIndex - カテゴリカラムの転置インデックス
+
+責務:
+- カラムの値 → その値を持つ行の位置（昇順の配列）の対応づけ
+- 等値・「いずれか」の条件に合う行の位置の取り出し（全行を走査しない）
+
+インデックスは値ごとに行の位置を並べた1本の配列と、値ごとの開始位置からなる。
+カテゴリ型のカラムはカテゴリのコードを、それ以外は factorize したコードを使う。
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# 安定ソートが基数ソートになる（O(n) で並べられる）コードの上限
+_RADIX_SORT_CODES = np.iinfo(np.int16).max
+
+
+def indexable(series: pd.Series) -> bool:
+    """
+    インデックスを作れるカラムかどうか
+
+    カテゴリ型・文字列・真偽値・整数のカラムを対象にする（浮動小数点や日時は
+    等値での絞り込みに向かないため対象外）。
+
+    Args:
+        series: カラム
+
+    Returns:
+        bool: インデックスを作れる場合 True
+    """
+    dtype = series.dtype
+    return (
+        isinstance(dtype, pd.CategoricalDtype)
+        or pd.api.types.is_string_dtype(dtype)
+        or pd.api.types.is_bool_dtype(dtype)
+        or pd.api.types.is_integer_dtype(dtype)
+    )
+
+
+class ColumnIndex:
+    """
+    1つのカラムの転置インデックス
+
+    欠損値の行はどの値にも含めない（等値の比較が False になるのと同じ）。
+    """
+
+    def __init__(self, codes: np.ndarray, values: list[Any]):
+        """
+        Args:
+            codes: 行ごとの値のコード（欠損は -1）
+            values: コード → 値
+        """
+        self.values = values
+        self._lookup = {value: code for code, value in enumerate(values)}
+        if len(values) <= _RADIX_SORT_CODES:
+            codes = codes.astype(np.int16, copy=False)
+        order = np.argsort(codes, kind="stable")
+        position_dtype = np.int32 if len(codes) <= np.iinfo(np.int32).max else np.int64
+        self._order = order.astype(position_dtype, copy=False)
+        counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        missing = len(codes) - int(counts.sum())
+        self._offsets = np.concatenate(([0], np.cumsum(counts))) + missing
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "ColumnIndex":
+        """
+        カラムからインデックスを作る
+
+        Args:
+            series: カラム
+
+        Returns:
+            ColumnIndex: インデックス
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return cls(series.cat.codes.to_numpy(), series.cat.categories.tolist())
+        codes, uniques = pd.factorize(series)
+        return cls(codes, uniques.tolist())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def positions(self, value: Any) -> np.ndarray:
+        """
+        値を持つ行の位置（昇順）
+
+        Args:
+            value: 値
+
+        Returns:
+            np.ndarray: 行の位置（該当がない場合は空の配列）
+        """
+        code = self._code(value)
+        if code is None:
+            return self._order[:0]
+        return self._order[self._offsets[code] : self._offsets[code + 1]]
+
+    def positions_in(self, values: tuple[Any, ...]) -> np.ndarray:
+        """
+        いずれかの値を持つ行の位置（昇順）
+
+        Args:
+            values: 値の候補
+
+        Returns:
+            np.ndarray: 行の位置（該当がない場合は空の配列）
+        """
+        codes = {self._code(value) for value in values} - {None}
+        parts = [self._order[self._offsets[code] : self._offsets[code + 1]] for code in codes]
+        if not parts:
+            return self._order[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+    def _code(self, value: Any) -> int | None:
+        try:
+            return self._lookup.get(value)
+        except TypeError:
+            # リストなどハッシュできない値はどの行とも等しくない
+            return None
@@ -0,0 +1,171 @@
+"""
+CompactEncoding - 埋め込みデータのコンパクトな表現
+
+責務:
+- レコード形式の表（同じキーを持つ dict のリスト）の列形式への変換
+- 浮動小数点数の有効桁数での丸め
+- ブラウザ側で元の形に戻すデコーダースクリプトの提供
+
+列形式の表は {"__columnar__": {"列名": [値, ...], ...}} で表す。
+デコーダーは dashboardData の定義時に元のレコード形式へ戻すため、
+テンプレートのスクリプトからは変換前と同じ形に見える。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+COLUMNAR_KEY = "__columnar__"
+DECODER_FUNCTION = "__decodeDashboardData"
+
+# 列形式にする表の最小行数（1行では列名の繰り返しが減らない）
+MIN_COLUMNAR_ROWS = 2
+
+# データ宣言を含むスクリプトが見つからない場合の挿入位置
+_HEAD_RE = re.compile(r"<head\b[^>]*>", re.IGNORECASE)
+_DOCTYPE_RE = re.compile(r"\s*<!doctype\b[^>]*>", re.IGNORECASE)
+
+PAYLOAD_DECODER_SCRIPT = """
+<script>
+// === Columnar Payload Decoder (Injected by AIGenerator) ===
+function __decodeDashboardData(value) {
+    if (Array.isArray(value)) return value.map(__decodeDashboardData);
+    if (value === null || typeof value !== 'object') return value;
+    var keys = Object.keys(value);
+    if (keys.length === 1 && keys[0] === '__columnar__') {
+        var columns = value.__columnar__;
+        var names = Object.keys(columns);
+        var length = columns[names[0]].length;
+        var rows = new Array(length);
+        for (var i = 0; i < length; i++) {
+            var row = {};
+            for (var k = 0; k < names.length; k++) {
+                row[names[k]] = __decodeDashboardData(columns[names[k]][i]);
+            }
+            rows[i] = row;
+        }
+        return rows;
+    }
+    for (var j = 0; j < keys.length; j++) value[keys[j]] = __decodeDashboardData(value[keys[j]]);
+    return value;
+}
+</script>
+"""
+
+
+@dataclass
+class PayloadEncoding:
+    """
+    埋め込みデータのエンコード設定
+
+    Attributes:
+        columnar: レコード形式の表を列形式で書き出すか
+        significant_digits: 浮動小数点数を丸める有効桁数（None で丸めない）
+    """
+
+    columnar: bool = True
+    significant_digits: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.significant_digits is not None and not 1 <= self.significant_digits <= 17:
+            raise ValueError("significant_digits は 1〜17 で指定してください")
+
+
+def _is_records(values: list) -> bool:
+    if len(values) < MIN_COLUMNAR_ROWS or type(values[0]) is not dict or not values[0]:
+        return False
+    keys = values[0].keys()
+    return all(type(row) is dict and row.keys() == keys for row in values)
+
+
+class _Encoder:
+    def __init__(self, config: PayloadEncoding):
+        self.config = config
+        self.float_format = (
+            f".{config.significant_digits}g" if config.significant_digits is not None else None
+        )
+        self.tables = 0
+
+    def encode(self, value: Any) -> Any:
+        if type(value) is dict:
+            return {key: self.encode(item) for key, item in value.items()}
+        if type(value) is list:
+            if self.config.columnar and _is_records(value):
+                self.tables += 1
+                columns = {key: [row[key] for row in value] for key in value[0]}
+                return {COLUMNAR_KEY: {key: self.encode_list(col) for key, col in columns.items()}}
+            return self.encode_list(value)
+        if type(value) is float and self.float_format is not None:
+            return float(format(value, self.float_format))
+        return value
+
+    def encode_list(self, values: list) -> list:
+        # スカラーだけのリストは要素ごとの再帰を避ける
+        if any(type(item) in (dict, list) for item in values):
+            return [self.encode(item) for item in values]
+        if self.float_format is None:
+            return values
+        float_format = self.float_format
+        return [
+            float(format(item, float_format)) if type(item) is float else item for item in values
+        ]
+
+
+def encode_payload(data: Any, config: PayloadEncoding) -> tuple[Any, int]:
+    """
+    JSON 互換に変換済みの集計結果をコンパクトな表現にする
+
+    Args:
+        data: JSON 互換の集計結果（_coerce_json_value 適用後）
+        config: エンコード設定
+
+    Returns:
+        tuple: (エンコード後の値, 列形式にした表の数)
+    """
+    encoder = _Encoder(config)
+    return encoder.encode(data), encoder.tables
+
+
+def decode_payload(data: Any) -> Any:
+    """
+    列形式の表をレコード形式に戻す（PAYLOAD_DECODER_SCRIPT と同じ処理）
+
+    Args:
+        data: encode_payload の出力
+
+    Returns:
+        Any: レコード形式に戻した値
+    """
+    if isinstance(data, list):
+        return [decode_payload(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if list(data) == [COLUMNAR_KEY]:
+        columns = data[COLUMNAR_KEY]
+        names = list(columns)
+        return [
+            {name: decode_payload(columns[name][i]) for name in names}
+            for i in range(len(columns[names[0]]))
+        ]
+    return {key: decode_payload(item) for key, item in data.items()}
+
+
+def insert_decoder(html: str) -> str:
+    """
+    デコーダー呼び出し（データ宣言）を含むスクリプトの直前にデコーダースクリプトを挿入する
+
+    そのようなスクリプトがない場合は <head> の先頭に挿入する（<head> もない場合は
+    文書型宣言の後。文書型宣言の前に入れると互換モードになるため）。
+
+    Args:
+        html: 右辺を __decodeDashboardData(...) にしたデータ宣言を注入済みの HTML
+
+    Returns:
+        str: デコーダー入りの HTML
+    """
+    position = html.find(f"{DECODER_FUNCTION}(")
+    script_start = html.rfind("<script", 0, position) if position >= 0 else -1
+    if script_start < 0:
+        anchor = _HEAD_RE.search(html) or _DOCTYPE_RE.match(html)
+        script_start = anchor.end() if anchor else 0
+    return html[:script_start] + PAYLOAD_DECODER_SCRIPT + html[script_start:]
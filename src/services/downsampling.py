@@ -0,0 +1,280 @@
+"""
+Downsampling - 埋め込み前のグラフ系列の間引き
+
+責務:
+- LTTB（Largest-Triangle-Three-Buckets）/ min-max バケットによる系列の間引き
+- 集計結果から長い数値系列を検出し、点数上限まで間引いたコピーの作成
+- Chart.js 形式（labels + datasets[].data）の同じ長さの配列をまとめて間引く
+
+元の集計結果は変更しない（ダウンロード用に全件を残す）。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+@dataclass
+class DownsampleConfig:
+    """
+    間引き設定
+
+    Attributes:
+        max_points: 1系列あたりの点数上限（None で間引きしない）
+        method: "lttb" または "minmax"
+    """
+
+    max_points: int | None = 2000
+    method: str = "lttb"
+
+    def __post_init__(self) -> None:
+        if self.method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"未対応の間引き方式です: {self.method}")
+        if self.max_points is not None and self.max_points < 3:
+            raise ValueError("max_points は 3 以上で指定してください")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_points is not None
+
+
+@dataclass
+class DownsampledSeries:
+    """間引いた系列の記録（path は "charts.daily" のようなキーの連結）"""
+
+    path: str
+    original_points: int
+    points: int
+
+
+def lttb_indices(y: np.ndarray, threshold: int, x: np.ndarray | None = None) -> np.ndarray:
+    """
+    LTTB で残す点のインデックスを返す
+
+    先頭と末尾は必ず残し、各バケットで前の選択点・次バケットの平均点と
+    作る三角形の面積が最大の点を選ぶ。NaN の点はバケット内がすべて NaN の
+    場合だけ選ばれる。
+
+    Args:
+        y: 値（1次元）
+        threshold: 残す点数
+        x: 横軸の値（None の場合は等間隔）
+
+    Returns:
+        np.ndarray: 昇順のインデックス
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(math.floor(i * every)) + 1
+        end = min(int(math.floor((i + 1) * every)) + 1, n - 1)
+        next_start = end
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        if next_start >= n - 1:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = x[next_start:next_end].mean()
+            window = y[next_start:next_end]
+            valid = window[~np.isnan(window)]
+            avg_y = valid.mean() if len(valid) else np.nan
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs((x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    min-max バケットで残す点のインデックスを返す
+
+    threshold // 2 個のバケットそれぞれから最小値と最大値の点を残す
+    （先頭と末尾も含む）。スパイクを確実に残したい系列向け。
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max((threshold - 2) // 2, 1)
+    bounds = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    filled = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+    picked = [0, n - 1]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end <= start:
+            continue
+        segment = filled[start:end]
+        picked.append(start + int(np.argmin(segment)))
+        picked.append(start + int(np.argmax(segment)))
+    return np.unique(np.asarray(picked, dtype=np.int64))
+
+
+def _is_numeric_sequence(value: Any) -> bool:
+    if isinstance(value, pd.Series):
+        return pd.api.types.is_numeric_dtype(value.dtype) and not pd.api.types.is_bool_dtype(
+            value.dtype
+        )
+    if isinstance(value, np.ndarray):
+        return value.ndim == 1 and value.dtype.kind in "iuf"
+    if isinstance(value, (list, tuple)):
+        return all(
+            item is None
+            or (
+                isinstance(item, (int, float, np.integer, np.floating))
+                and not isinstance(item, bool)
+            )
+            for item in value
+        )
+    return False
+
+
+def _is_sequence(value: Any) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray, pd.Series, pd.Index)) and (
+        not isinstance(value, np.ndarray) or value.ndim == 1
+    )
+
+
+def _is_label_sequence(value: Any) -> bool:
+    """数値系列に対応するラベルになりうる配列（スカラーだけ。表のレコードは含まない）"""
+    if not _is_sequence(value):
+        return False
+    if isinstance(value, (np.ndarray, pd.Series, pd.Index)) and value.dtype != object:
+        return True
+    return not any(isinstance(item, (dict, list, tuple, np.ndarray, pd.Series)) for item in value)
+
+
+def _as_float_array(value: Any) -> np.ndarray:
+    if isinstance(value, pd.Series):
+        return value.to_numpy(dtype=np.float64, na_value=np.nan)
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float64)
+    return np.array([np.nan if item is None else item for item in value], dtype=np.float64)
+
+
+def _x_values(series: pd.Series) -> np.ndarray | None:
+    index = series.index
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    if pd.api.types.is_numeric_dtype(index.dtype) and not isinstance(index, pd.RangeIndex):
+        return index.to_numpy(dtype=np.float64)
+    return None
+
+
+def _select(value: Any, indices: np.ndarray) -> Any:
+    if isinstance(value, pd.Series):
+        return value.iloc[indices]
+    if isinstance(value, (np.ndarray, pd.Index)):
+        return value[indices]
+    return [value[i] for i in indices.tolist()]
+
+
+def _pick_indices(series: list[Any], config: DownsampleConfig, x: Any = None) -> np.ndarray:
+    """
+    同じ長さの数値系列群に共通のインデックスを選ぶ
+
+    系列が複数ある場合は点数上限を系列数で分け、各系列の選択を合わせる。
+    """
+    budget = max(config.max_points // len(series), 3)
+    chosen = []
+    for values in series:
+        y = _as_float_array(values)
+        if config.method == "minmax":
+            chosen.append(minmax_indices(y, budget))
+        else:
+            chosen.append(lttb_indices(y, budget, x))
+    return np.unique(np.concatenate(chosen))
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _downsample_dict(
+    value: dict, path: str, config: DownsampleConfig, report: list[DownsampledSeries]
+) -> dict:
+    datasets = value.get("datasets")
+    dataset_arrays = (
+        [d["data"] for d in datasets if isinstance(d, dict) and _is_sequence(d.get("data"))]
+        if isinstance(datasets, list)
+        else []
+    )
+    direct = [v for v in value.values() if _is_sequence(v) and _is_numeric_sequence(v)]
+    numeric = [v for v in direct + dataset_arrays if _is_numeric_sequence(v)]
+    length = max((len(v) for v in numeric), default=0)
+
+    result = dict(value)
+    if length > config.max_points:
+        group = [v for v in numeric if len(v) == length]
+        indices = _pick_indices(group, config)
+        for key, item in value.items():
+            if _is_label_sequence(item) and len(item) == length:
+                result[key] = _select(item, indices)
+        if dataset_arrays:
+            result["datasets"] = [
+                {
+                    k: _select(v, indices) if _is_label_sequence(v) and len(v) == length else v
+                    for k, v in dataset.items()
+                }
+                if isinstance(dataset, dict)
+                else dataset
+                for dataset in datasets
+            ]
+        report.append(DownsampledSeries(path or "$", length, len(indices)))
+
+    for key, item in result.items():
+        if key == "datasets" and dataset_arrays and length > config.max_points:
+            continue
+        if isinstance(item, (dict, list, tuple, np.ndarray, pd.Series)):
+            result[key] = _walk(item, _join(path, key), config, report)
+    return result
+
+
+def _walk(value: Any, path: str, config: DownsampleConfig, report: list[DownsampledSeries]) -> Any:
+    if isinstance(value, dict):
+        return _downsample_dict(value, path, config, report)
+    if _is_sequence(value) and len(value) > config.max_points and _is_numeric_sequence(value):
+        x = _x_values(value) if isinstance(value, pd.Series) else None
+        indices = _pick_indices([value], config, x)
+        report.append(DownsampledSeries(path or "$", len(value), len(indices)))
+        return _select(value, indices)
+    if isinstance(value, list):
+        return [_walk(item, _join(path, i), config, report) for i, item in enumerate(value)]
+    return value
+
+
+def downsample_payload(data: Any, config: DownsampleConfig) -> tuple[Any, list[DownsampledSeries]]:
+    """
+    集計結果の長い数値系列を間引いたコピーを返す
+
+    dict 内で同じ長さの数値系列とラベルの配列（labels と datasets[].data など）は
+    同じ点を残す。同じ長さでも表のレコード（dict のリスト）や入れ子の配列は間引かない。
+
+    Args:
+        data: 集計結果
+        config: 間引き設定
+
+    Returns:
+        tuple: (間引き後の集計結果, 間引いた系列の記録)
+    """
+    if not config.enabled:
+        return data, []
+    report: list[DownsampledSeries] = []
+    return _walk(data, "", config, report), report
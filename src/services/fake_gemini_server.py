@@ -0,0 +1,477 @@
+"""
+FakeGeminiServer - Gemini API のローカル代替サーバー（負荷試験・ベンチマーク用）
+
+責務:
+- models.generateContent / streamGenerateContent エンドポイントの模倣
+- MockAIGenerator のアセットから組み立てた定型応答の返却
+- レイテンシ分布・トークン生成速度の再現
+- エラー応答・途中打ち切り（MAX_TOKENS）の注入
+
+実際の genai.Client を base_url でこのサーバーに向けることで、
+GenAIModelAdapter を含む本番と同じコード経路をネットワークなしで計測できる。
+
+使い方:
+    python -m src.services.fake_gemini_server --port 8765 --latency-ms 800 \\
+        --latency-dist lognormal --tokens-per-second 200 --error-rate 0.05
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GOOGLE_API_KEY=fake streamlit run app_v2.py
+"""
+
+import argparse
+import json
+import math
+import pprint
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from src.services.mock_generator import MOCK_BLUEPRINT, MOCK_DASHBOARD_DATA, MOCK_DASHBOARD_HTML
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+ERROR_STATUSES = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+# 1トークンあたりの文字数の概算（英数字と日本語が混在する応答を想定）
+CHARS_PER_TOKEN = 3
+
+# 質問・分析などテキスト応答の定型文
+FAKE_TEXT = "これはローカル代替サーバーからの応答です。データの傾向は安定しています。"
+
+_PATH_PATTERN = re.compile(r"^/[^/]+/models/(?P<model>[^:/]+):(?P<method>\w+)")
+
+
+@dataclass
+class FakeServerConfig:
+    """
+    代替サーバーの挙動設定
+
+    latency_ms は最初のトークンまでの時間（分布の中央値）。
+    tokens_per_second を指定すると応答長に比例した生成時間が加算される。
+    """
+
+    latency_ms: float = 0.0
+    latency_dist: str = "fixed"
+    latency_jitter_ms: float = 0.0
+    tokens_per_second: float | None = None
+    error_rate: float = 0.0
+    error_statuses: tuple[int, ...] = (503,)
+    truncation_rate: float = 0.0
+    truncation_ratio: float = 0.5
+    stream_chunk_tokens: int = 32
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未対応のレイテンシ分布です: {self.latency_dist}")
+        for name in ("error_rate", "truncation_rate", "truncation_ratio"):
+            value = getattr(self, name)
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} は 0〜1 の範囲で指定してください: {value}")
+
+
+@dataclass
+class FakeServerStats:
+    """代替サーバーの処理統計"""
+
+    requests: int = 0
+    errors: int = 0
+    truncated: int = 0
+    by_kind: dict[str, int] = field(default_factory=dict)
+
+
+def estimate_tokens(text: str) -> int:
+    """文字数からトークン数を概算する"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def classify_prompt(prompt: str) -> str:
+    """
+    プロンプトの種類を判定する
+
+    Returns:
+        str: "repair", "code", "blueprint", "combined", "intent", "chart_spec", "text" のいずれか
+    """
+    if prompt.startswith("The following Python code"):
+        return "repair"
+    if "aggregate_all_data" in prompt and "{{JSON_DATA}}" in prompt:
+        return "code"
+    if "グラフ構成案" in prompt:
+        return "blueprint"
+    if "カテゴリに応じた回答" in prompt:
+        return "combined"
+    if "カテゴリに分類" in prompt:
+        return "intent"
+    if "グラフ仕様" in prompt:
+        return "chart_spec"
+    return "text"
+
+
+def _guess_intent(message: str) -> str:
+    if re.search(r"グラフ|可視化|見せて|チャート", message):
+        return "add_chart"
+    if re.search(r"まとめ|要約|レポート", message):
+        return "summarize"
+    if re.search(r"分析|比較|相関|傾向|トレンド", message):
+        return "analyze"
+    if re.search(r"[?？]|教えて|どこ|いくら|何", message):
+        return "question"
+    return "general"
+
+
+def _mock_python_code() -> str:
+    data_literal = pprint.pformat(MOCK_DASHBOARD_DATA, width=100, sort_dicts=False)
+    return (
+        "def aggregate_all_data(df):\n"
+        f"    result = {data_literal}\n"
+        '    result["kpi"]["row_count"] = int(len(df))\n'
+        "    return result\n"
+    )
+
+
+def _extract_columns(prompt: str) -> list[str]:
+    match = re.search(r"利用可能なカラム[:：]?\s*\n?(\[.*?\])", prompt, re.DOTALL)
+    if not match:
+        return []
+    return re.findall(r"'([^']*)'", match.group(1))
+
+
+def _fake_chart_spec(prompt: str) -> dict[str, str]:
+    columns = _extract_columns(prompt) or ["x", "y"]
+    return {
+        "type": "bar",
+        "title": "Fake Chart",
+        "x": columns[0],
+        "y": columns[1] if len(columns) > 1 else columns[0],
+    }
+
+
+class CannedResponder:
+    """
+    MockAIGenerator のアセットから定型応答を組み立てる
+
+    Blueprint には MOCK_BLUEPRINT、コード生成には MOCK_DASHBOARD_DATA を返す
+    aggregate_all_data と MOCK_DASHBOARD_HTML を返す。
+    """
+
+    def __call__(self, prompt: str) -> tuple[str, str]:
+        kind = classify_prompt(prompt)
+        if kind == "repair":
+            return kind, f"```python\n{_mock_python_code()}```"
+        if kind == "code":
+            return kind, (
+                "### 1. Python Aggregation Logic\n"
+                f"```python\n{_mock_python_code()}```\n\n"
+                "### 2. HTML Dashboard (Majin Executive Theme)\n"
+                f"```html\n{MOCK_DASHBOARD_HTML.strip()}\n```\n"
+            )
+        if kind == "blueprint":
+            return kind, MOCK_BLUEPRINT
+        if kind == "intent":
+            match = re.search(r"ユーザーメッセージ: (.*)", prompt)
+            message = match.group(1) if match else ""
+            payload = {"intent": _guess_intent(message), "entities": []}
+            return kind, json.dumps(payload, ensure_ascii=False)
+        if kind == "combined":
+            match = re.search(r"## ユーザーメッセージ\n(.*)", prompt)
+            intent = _guess_intent(match.group(1) if match else "")
+            payload = {"intent": intent, "content": FAKE_TEXT, "chart_spec": None}
+            if intent == "add_chart":
+                payload["content"] = "グラフを作成しました。"
+                payload["chart_spec"] = _fake_chart_spec(prompt)
+            return kind, json.dumps(payload, ensure_ascii=False)
+        if kind == "chart_spec":
+            spec = _fake_chart_spec(prompt)
+            return kind, (
+                "グラフを作成しました。\n\n"
+                f"```chart_spec\n{json.dumps(spec, ensure_ascii=False)}\n```"
+            )
+        return kind, FAKE_TEXT
+
+
+def _prompt_from_request(body: dict[str, Any]) -> str:
+    texts = []
+    for content in body.get("contents", []) or []:
+        for part in content.get("parts", []) or []:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                texts.append(part["text"])
+    return "".join(texts)
+
+
+def _response_payload(text: str, prompt: str, finish_reason: str) -> dict[str, Any]:
+    return {
+        "candidates": [
+            {
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": finish_reason,
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": estimate_tokens(prompt),
+            "candidatesTokenCount": estimate_tokens(text),
+            "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(text),
+        },
+        "modelVersion": "fake-gemini",
+    }
+
+
+class FakeGeminiServer:
+    """
+    Gemini API のローカル代替 HTTP サーバー
+
+    Example:
+        with FakeGeminiServer(FakeServerConfig(latency_ms=50)) as server:
+            client = server.create_client()
+            model = GenAIModelAdapter(client, model_name="gemini-2.5-flash")
+    """
+
+    def __init__(
+        self,
+        config: FakeServerConfig | None = None,
+        responder: Callable[[str], tuple[str, str]] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.config = config or FakeServerConfig()
+        self.responder = responder or CannedResponder()
+        self.stats = FakeServerStats()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        """バックグラウンドスレッドでサーバーを起動する"""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-gemini", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """呼び出し元スレッドでサーバーを実行する（CLI 用）"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """サーバーを停止する"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def create_client(self, api_key: str = "fake-key") -> Any:
+        """このサーバーに接続する genai.Client を生成する"""
+        from src.services.genai_adapter import create_genai_client
+
+        return create_genai_client(api_key=api_key, base_url=self.base_url)
+
+    def sample_latency(self) -> float:
+        """設定された分布から最初のトークンまでの遅延（秒）をサンプリングする"""
+        config = self.config
+        mean = config.latency_ms
+        jitter = config.latency_jitter_ms
+        with self._lock:
+            if config.latency_dist == "uniform":
+                value = self._rng.uniform(mean - jitter, mean + jitter)
+            elif config.latency_dist == "normal":
+                value = self._rng.gauss(mean, jitter)
+            elif config.latency_dist == "lognormal" and mean > 0:
+                sigma = jitter / mean if jitter else 0.5
+                value = mean * math.exp(self._rng.gauss(0.0, sigma))
+            else:
+                value = mean
+        return max(0.0, value) / 1000.0
+
+    def generation_time(self, text: str) -> float:
+        """tokens_per_second に基づく生成時間（秒）"""
+        if not self.config.tokens_per_second:
+            return 0.0
+        return estimate_tokens(text) / self.config.tokens_per_second
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _pick_error_status(self) -> int:
+        with self._lock:
+            return self._rng.choice(self.config.error_statuses)
+
+    def _count(self, kind: str, error: bool = False, truncated: bool = False) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.by_kind[kind] = self.stats.by_kind.get(kind, 0) + 1
+            if error:
+                self.stats.errors += 1
+            if truncated:
+                self.stats.truncated += 1
+
+    def _truncate(self, text: str) -> str:
+        return text[: int(len(text) * self.config.truncation_ratio)]
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+            def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                match = _PATH_PATTERN.match(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not match or match.group("method") not in (
+                    "generateContent",
+                    "streamGenerateContent",
+                ):
+                    self._send_json(
+                        404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}}
+                    )
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(
+                        400,
+                        {
+                            "error": {
+                                "code": 400,
+                                "message": "Invalid JSON payload",
+                                "status": "INVALID_ARGUMENT",
+                            }
+                        },
+                    )
+                    return
+                prompt = _prompt_from_request(body)
+                kind, text = server.responder(prompt)
+                latency = server.sample_latency()
+
+                if server._roll(server.config.error_rate):
+                    server._count(kind, error=True)
+                    time.sleep(latency)
+                    status = server._pick_error_status()
+                    self._send_json(
+                        status,
+                        {
+                            "error": {
+                                "code": status,
+                                "message": "Injected failure from fake Gemini server",
+                                "status": ERROR_STATUSES.get(status, "UNKNOWN"),
+                            }
+                        },
+                    )
+                    return
+
+                truncated = server._roll(server.config.truncation_rate)
+                if truncated:
+                    text = server._truncate(text)
+                finish_reason = "MAX_TOKENS" if truncated else "STOP"
+                server._count(kind, truncated=truncated)
+
+                if match.group("method") == "streamGenerateContent":
+                    self._stream(prompt, text, finish_reason, latency)
+                    return
+                time.sleep(latency + server.generation_time(text))
+                self._send_json(200, _response_payload(text, prompt, finish_reason))
+
+            def _stream(self, prompt: str, text: str, finish_reason: str, latency: float) -> None:
+                chunk_chars = max(1, server.config.stream_chunk_tokens * CHARS_PER_TOKEN)
+                chunks = [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+                chunks = chunks or [""]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(latency)
+                for index, chunk in enumerate(chunks):
+                    if index:
+                        time.sleep(server.generation_time(chunk))
+                    last = index == len(chunks) - 1
+                    payload = _response_payload(chunk, prompt, finish_reason if last else "")
+                    if not last:
+                        del payload["candidates"][0]["finishReason"]
+                    event = f"data: {json.dumps(payload, ensure_ascii=False)}\r\n\r\n"
+                    data = event.encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Gemini API のローカル代替サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="最初のトークンまでの遅延")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--error-status", type=int, action="append", help="注入するHTTPステータス（複数指定可）"
+    )
+    parser.add_argument("--truncation-rate", type=float, default=0.0)
+    parser.add_argument("--truncation-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    config = FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_status or (503,)),
+        truncation_rate=args.truncation_rate,
+        truncation_ratio=args.truncation_ratio,
+        seed=args.seed,
+    )
+    server = FakeGeminiServer(config, host=args.host, port=args.port)
+    print(f"Fake Gemini server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
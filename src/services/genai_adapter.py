@@ -1,6 +1,11 @@
+import math
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass
 from typing import Any
 
+from src.services.model_cassette import ModelCassette
+
 
 @dataclass
 class GenAIResponse:
@@ -20,16 +25,89 @@ def _extract_text(response: Any) -> str:
 
 
 class GenAIModelAdapter:
-    def __init__(self, client: Any, model_name: str) -> None:
+    """
+    genai.Client を AIGenerator / ChatHandler の model インターフェースに合わせる
+
+    cassette を渡すと、記録モードでは全呼び出しを記録し、再生モードでは
+    client を呼ばずに記録済みの応答を返す（再生時の raw は None）。
+    generate_content は timeout（秒）を受け付ける（supports_timeout）。
+    """
+
+    supports_timeout = True
+
+    def __init__(self, client: Any, model_name: str, cassette: ModelCassette | None = None) -> None:
         self._client = client
         self._model_name = model_name
+        self._cassette = cassette
 
-    def generate_content(self, prompt: str) -> GenAIResponse:
+    def generate_content(self, prompt: str, timeout: float | None = None) -> GenAIResponse:
+        """
+        応答を一括で返す
+
+        timeout（秒）を渡すと HTTP リクエストのタイムアウトにする。期限で呼び出し元を
+        解放した後も、待機中のリクエスト（とそのスレッド）がその時点で終わる。
+        """
+        if self._cassette is not None and self._cassette.replaying:
+            entry = self._cassette.replay(self._model_name, prompt)
+            return GenAIResponse(text=entry.text, raw=None)
+
+        options: dict[str, Any] = {}
+        if timeout is not None:
+            from google.genai import types
+
+            # HttpOptions.timeout はミリ秒
+            http_options = types.HttpOptions(timeout=max(1, math.ceil(timeout * 1000)))
+            options["config"] = types.GenerateContentConfig(http_options=http_options)
+        start = time.perf_counter()
         response = self._client.models.generate_content(
             model=self._model_name,
             contents=prompt,
+            **options,
         )
         text = getattr(response, "text", None)
         if text is None:
             text = _extract_text(response)
+        if self._cassette is not None:
+            latency_ms = (time.perf_counter() - start) * 1000.0
+            self._cassette.record(self._model_name, prompt, text, latency_ms)
         return GenAIResponse(text=text, raw=response)
+
+    def generate_content_stream(self, prompt: str) -> Iterator[GenAIResponse]:
+        """
+        応答を生成された断片ごとに返す
+
+        カセットには断片をつなげた全文を1件として記録し、再生時は全文を1つの断片で返す。
+        """
+        if self._cassette is not None and self._cassette.replaying:
+            entry = self._cassette.replay(self._model_name, prompt)
+            yield GenAIResponse(text=entry.text, raw=None)
+            return
+
+        start = time.perf_counter()
+        texts = []
+        for chunk in self._client.models.generate_content_stream(
+            model=self._model_name,
+            contents=prompt,
+        ):
+            text = getattr(chunk, "text", None)
+            if text is None:
+                text = _extract_text(chunk)
+            texts.append(text)
+            yield GenAIResponse(text=text, raw=chunk)
+        if self._cassette is not None:
+            latency_ms = (time.perf_counter() - start) * 1000.0
+            self._cassette.record(self._model_name, prompt, "".join(texts), latency_ms)
+
+
+def create_genai_client(api_key: str | None, base_url: str | None = None) -> Any:
+    """
+    genai.Client を生成する
+
+    base_url を指定すると、そのエンドポイント（ローカル代替サーバー等）へ接続する。
+    """
+    from google import genai
+    from google.genai import types
+
+    if base_url:
+        return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=base_url))
+    return genai.Client(api_key=api_key)
@@ -0,0 +1,457 @@
+"""
+HtmlOptimizer - 出力 HTML の重複除去と縮小
+
+責務:
+- 同じ URL の外部スクリプト・スタイルシート読み込みの重複除去
+- 連続するインラインスクリプトの1ブロックへの結合
+- CSS / JavaScript / HTML の空白・コメントの除去
+
+データの JSON を含まないテンプレート側に適用する（assemble_html は注入前の
+テンプレートと注入するスクリプトを縮小し、JSON には手を入れない）。
+JavaScript の縮小は文字列・テンプレートリテラル・正規表現リテラルをそのまま残し、
+自動セミコロン挿入に関わる改行は保持する保守的なもの。
+"""
+
+import re
+
+# 重複を除く外部リソースのタグ（src / href 属性の URL で判定）
+_RESOURCE_TAG_RE = re.compile(
+    r"<script\b(?P<script>[^>]*)>\s*</script\s*>|<link\b(?P<link>[^>]*)>", re.IGNORECASE
+)
+_ATTR_RE = re.compile(r"""\b(src|href|rel|type|async|defer)\b(?:\s*=\s*(["']?)([^"'\s>]*)\2)?""")
+_JAVASCRIPT_TYPES = {"", "text/javascript", "application/javascript"}
+
+# HTML の字句（コメント / 中身を別扱いする要素 / タグ / テキスト）
+_HTML_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(?P<raw>script|style|pre|textarea)\b(?P<attrs>[^>]*)>(?P<body>.*?)</(?P=raw)\s*>"
+    r"|<[^>]+>"
+    r"|[^<]+",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG_NAME_RE = re.compile(r"</?([a-zA-Z][\w-]*)")
+_INLINE_SCRIPT_RE = re.compile(r"<script(?P<attrs>[^>]*)>(?P<body>.*?)</script\s*>", re.DOTALL)
+
+# 前後の空白だけのテキストを落としてもレイアウトが変わらない要素
+_BLOCK_TAGS = {
+    "html", "head", "body", "title", "meta", "link", "script", "style", "noscript",
+    "div", "section", "article", "aside", "header", "footer", "main", "nav",
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "form", "canvas", "br", "hr",
+}  # fmt: skip
+
+_IDENTIFIER_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\")
+# JavaScript の行終端子（ブロックコメントに含まれる場合は改行として扱う）
+_LINE_TERMINATORS = frozenset("\n\r\u2028\u2029")
+# この文字の直後の / は正規表現リテラルの開始
+_REGEX_PRECEDERS = frozenset("(,=:[!&|?{};+-*%<>~^")
+# この語の直後の ( ... ) は文の見出しで、閉じ括弧の直後の / は正規表現リテラルの開始
+_HEADER_KEYWORDS = {"if", "while", "for", "with"}
+_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}  # fmt: skip
+# 前後がこの文字なら改行を落としても自動セミコロン挿入の結果が変わらない
+# （++ / -- と正規表現のフラグに関わる + - / は含めない）
+_NEWLINE_SAFE_BEFORE = frozenset("{([,;:=?&|*%<>!~^")
+_NEWLINE_SAFE_AFTER = frozenset("})],;.")
+
+
+def _attributes(attrs: str) -> dict[str, str]:
+    return {match.group(1).lower(): match.group(3) or "" for match in _ATTR_RE.finditer(attrs)}
+
+
+def _resource_url(match: re.Match) -> tuple[str | None, bool]:
+    """タグの URL と、後続の同じ URL を省いてよい（同期的に読み込まれる）か"""
+    if match.group("script") is not None:
+        attrs = _attributes(match.group("script"))
+        blocking = (
+            attrs.get("type", "").lower() in _JAVASCRIPT_TYPES
+            and "async" not in attrs
+            and "defer" not in attrs
+        )
+        return attrs.get("src") or None, blocking
+    attrs = _attributes(match.group("link"))
+    if attrs.get("rel", "").lower() != "stylesheet":
+        return None, False
+    return attrs.get("href") or None, True
+
+
+def dedupe_resources(html: str, loaded: set[str] | None = None) -> tuple[str, list[str]]:
+    """
+    同じ URL を読み込む <script src> / <link rel="stylesheet"> の2つ目以降を除く
+
+    最初の読み込みが async / defer / module の場合は、後続のタグが実行順序を
+    保証している可能性があるため残す。
+
+    Args:
+        html: HTML（断片でもよい）
+        loaded: 既に同期的に読み込まれている URL（html より前にある文書部分の分）
+
+    Returns:
+        tuple: (重複を除いた HTML, 除いた URL のリスト)
+    """
+    seen: dict[str, bool] = dict.fromkeys(loaded or (), True)
+    removed: list[str] = []
+
+    def replace(match: re.Match) -> str:
+        url, blocking = _resource_url(match)
+        if url is None:
+            return match.group(0)
+        if seen.get(url):
+            removed.append(url)
+            return ""
+        seen.setdefault(url, blocking)
+        return match.group(0)
+
+    return _RESOURCE_TAG_RE.sub(replace, html), removed
+
+
+def loaded_resources(html: str) -> set[str]:
+    """
+    HTML が同期的に読み込む外部スクリプト・スタイルシートの URL を返す
+
+    Args:
+        html: HTML
+
+    Returns:
+        set: URL の集合
+    """
+    urls: set[str] = set()
+    for match in _RESOURCE_TAG_RE.finditer(html):
+        url, blocking = _resource_url(match)
+        if url is not None and blocking:
+            urls.add(url)
+    return urls
+
+
+def merge_inline_scripts(html: str) -> str:
+    """
+    空白だけを挟んで連続する属性なしのインラインスクリプトを1つの <script> にまとめる
+
+    まとめると先のスクリプトの例外で後のスクリプトが実行されなくなるため、
+    例外を内部で処理している注入スクリプトなど、内容が分かっている断片に使う。
+
+    Args:
+        html: HTML 断片
+
+    Returns:
+        str: まとめた HTML
+    """
+    pieces: list[str] = []
+    bodies: list[str] = []
+    cursor = 0
+    for match in _INLINE_SCRIPT_RE.finditer(html):
+        gap = html[cursor : match.start()]
+        if match.group("attrs").strip():
+            continue
+        if bodies and gap.strip():
+            pieces.append(f"<script>{';'.join(bodies)}</script>")
+            bodies = []
+        if not bodies:
+            pieces.append(gap)
+        bodies.append(match.group("body"))
+        cursor = match.end()
+    if bodies:
+        pieces.append(f"<script>{';'.join(bodies)}</script>")
+    pieces.append(html[cursor:])
+    return "".join(pieces)
+
+
+def _skip_quoted(js: str, i: int) -> int:
+    """i の引用符で始まる文字列リテラルの終わりの次の位置"""
+    quote = js[i]
+    i += 1
+    while i < len(js):
+        char = js[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote or char == "\n":
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_template(js: str, i: int) -> int:
+    """i のバッククォートで始まるテンプレートリテラルの終わりの次の位置"""
+    i += 1
+    while i < len(js):
+        char = js[i]
+        if char == "\\":
+            i += 2
+        elif char == "`":
+            return i + 1
+        elif js.startswith("${", i):
+            i = _skip_braces(js, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _skip_braces(js: str, i: int) -> int:
+    """${ の中身を対応する } の次まで読み飛ばす"""
+    depth = 1
+    while i < len(js):
+        char = js[i]
+        if char in "'\"":
+            i = _skip_quoted(js, i)
+        elif char == "`":
+            i = _skip_template(js, i)
+        elif char == "{":
+            depth += 1
+            i += 1
+        elif char == "}":
+            depth -= 1
+            i += 1
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    return i
+
+
+def _skip_regex(js: str, i: int) -> int:
+    """i の / で始まる正規表現リテラルの終わりの次の位置（行内で閉じなければ -1）"""
+    i += 1
+    in_class = False
+    while i < len(js):
+        char = js[i]
+        if char == "\n":
+            return -1
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(js) and _is_identifier_char(js[i]):
+                i += 1  # フラグ
+            return i
+        i += 1
+    return -1
+
+
+def _is_identifier_char(char: str) -> bool:
+    """識別子に含まれうる文字（売上 などの ASCII 以外の文字も識別子とみなす）"""
+    return char in _IDENTIFIER_CHARS or not char.isascii()
+
+
+def _word_before(js: str, i: int) -> str:
+    """i の直前（空白を除く）にある識別子"""
+    end = i
+    while end > 0 and js[end - 1].isspace():
+        end -= 1
+    start = end
+    while start > 0 and _is_identifier_char(js[start - 1]):
+        start -= 1
+    return js[start:end]
+
+
+def minify_js(js: str) -> str:
+    """
+    JavaScript のコメントと不要な空白を除く
+
+    文字列・テンプレートリテラル・正規表現リテラルはそのまま残す。
+    改行は自動セミコロン挿入に影響しない位置のものだけを除く。
+    トークンに一意に分けられない場合（閉じない正規表現リテラル・ブロックコメント、
+    対応しない括弧）は縮小せずにそのまま返す。
+
+    Args:
+        js: JavaScript のソース
+
+    Returns:
+        str: 縮小した JavaScript（分けられない場合は js そのもの）
+    """
+    out: list[str] = []
+    last = ""  # 直前に出力した空白以外の文字
+    pending = ""  # 出力を保留している空白（"", " ", "\n"）
+    headers: list[bool] = []  # 開いている ( ごとに、if などの見出しの括弧かどうか
+    after_header = False  # 直前の ) が見出しの括弧を閉じたか
+    i = 0
+    length = len(js)
+
+    def flush(next_char: str) -> None:
+        nonlocal pending
+        if not pending or not last:
+            pending = ""
+            return
+        if (
+            pending == "\n"
+            and last not in _NEWLINE_SAFE_BEFORE
+            and next_char not in _NEWLINE_SAFE_AFTER
+        ):
+            out.append("\n")
+        elif (
+            (_is_identifier_char(last) and _is_identifier_char(next_char))
+            or (last in "+-/" and next_char in "+-/")
+            or (last.isdigit() and next_char == ".")
+        ):
+            out.append(" ")
+        pending = ""
+
+    while i < length:
+        char = js[i]
+        if char in " \t\r\n\f\v":
+            if char == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+            continue
+        if char == "/" and js.startswith("//", i):
+            end = js.find("\n", i)
+            i = length if end < 0 else end
+            continue
+        if char == "/" and js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            if end < 0:
+                return js
+            comment = js[i + 2 : end]
+            i = end + 2
+            if any(char in _LINE_TERMINATORS for char in comment):
+                pending = "\n"  # 改行を含むコメントは改行と同じく自動セミコロン挿入に関わる
+            elif not pending:
+                pending = " "
+            continue
+
+        start = i
+        closes_header = False
+        if char in "'\"":
+            i = _skip_quoted(js, i)
+        elif char == "`":
+            i = _skip_template(js, i)
+        elif char == "/" and (
+            not last
+            or last in _REGEX_PRECEDERS
+            or after_header
+            or _word_before(js, i) in _REGEX_KEYWORDS
+        ):
+            i = _skip_regex(js, i)
+            if i < 0:
+                return js
+        else:
+            if char == "(":
+                headers.append(_word_before(js, i) in _HEADER_KEYWORDS)
+            elif char == ")":
+                if not headers:
+                    return js
+                closes_header = headers.pop()
+            i += 1
+        flush(char)
+        out.append(js[start:i])
+        last = js[i - 1]
+        after_header = closes_header
+    if headers:
+        return js
+    return "".join(out)
+
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_STRING_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_CSS_SPACE_AROUND_RE = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """
+    CSS のコメントと不要な空白を除く
+
+    Args:
+        css: CSS のソース
+
+    Returns:
+        str: 縮小した CSS
+    """
+    css = _CSS_COMMENT_RE.sub("", css)
+    pieces: list[str] = []
+    cursor = 0
+    for match in _CSS_STRING_RE.finditer(css):
+        pieces.append(_minify_css_code(css[cursor : match.start()]))
+        pieces.append(match.group(1))
+        cursor = match.end()
+    pieces.append(_minify_css_code(css[cursor:]))
+    return "".join(pieces).strip()
+
+
+def _minify_css_code(code: str) -> str:
+    code = re.sub(r"\s+", " ", code)
+    code = _CSS_SPACE_AROUND_RE.sub(r"\1", code)
+    code = code.replace(": ", ":").replace(";}", "}")
+    return code
+
+
+def _minify_script(attrs: str, body: str) -> str:
+    script_type = _attributes(attrs).get("type", "").lower()
+    if script_type not in _JAVASCRIPT_TYPES and script_type != "module":
+        return body  # JSON などのデータブロックはそのまま
+    return minify_js(body)
+
+
+def minify_html(html: str) -> str:
+    """
+    HTML のコメント・空白とインラインの CSS / JavaScript を縮小する
+
+    pre / textarea の中身、JavaScript 以外の type のスクリプトはそのまま残す。
+    ブロック要素の間の空白だけのテキストは除き、それ以外の空白は1文字にまとめる。
+
+    Args:
+        html: HTML
+
+    Returns:
+        str: 縮小した HTML
+    """
+    tokens: list[str] = []
+    for match in _HTML_TOKEN_RE.finditer(html):
+        token = match.group(0)
+        raw = (match.group("raw") or "").lower()
+        if token.startswith("<!--"):
+            if token.startswith("<!--[if"):
+                tokens.append(token)
+            continue
+        if raw in ("script", "style"):
+            attrs, body = match.group("attrs"), match.group("body")
+            body = _minify_script(attrs, body) if raw == "script" else minify_css(body)
+            open_tag = match.group(0)[: match.start("body") - match.start()]
+            tokens.append(f"{open_tag}{body}</{match.group('raw')}>")
+        elif raw or token.startswith("<"):
+            tokens.append(token)
+        else:
+            tokens.append(re.sub(r"\s+", " ", token))
+
+    pieces: list[str] = []
+    for index, token in enumerate(tokens):
+        if token == " " and (_is_block(tokens, index - 1) or _is_block(tokens, index + 1)):
+            continue
+        pieces.append(token)
+    return "".join(pieces).strip()
+
+
+def _is_block(tokens: list[str], index: int) -> bool:
+    if not 0 <= index < len(tokens) or not tokens[index].startswith("<"):
+        return index < 0 or index >= len(tokens)
+    match = _TAG_NAME_RE.match(tokens[index])
+    return match is None or match.group(1).lower() in _BLOCK_TAGS
+
+
+def optimize_template(html_template: str, injected_scripts: str) -> tuple[str, str]:
+    """
+    注入前のテンプレートと </body> の直前に注入するスクリプトを最適化する
+
+    注入するスクリプトは連続するインラインスクリプトを1つにまとめ、
+    テンプレートが既に同期的に読み込んでいる外部リソースの読み込みを除く。
+
+    Args:
+        html_template: データ注入前の HTML テンプレート
+        injected_scripts: テンプレートの末尾に注入するスクリプト
+
+    Returns:
+        tuple: (最適化したテンプレート, 最適化した注入スクリプト)
+    """
+    template, _ = dedupe_resources(html_template)
+    scripts, _ = dedupe_resources(
+        merge_inline_scripts(injected_scripts), loaded_resources(template)
+    )
+    return minify_html(template), minify_html(scripts)
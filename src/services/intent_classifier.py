@@ -0,0 +1,333 @@
+"""
+IntentClassifier - チャットメッセージのローカル意図分類
+
+責務:
+- 日本語キーワード規則による明らかな意図の判定
+- 文字 n-gram のナイーブベイズモデルによる意図の確率推定
+- 確信度がしきい値未満の場合の判定保留（ChatHandler が LLM に問い合わせる）
+
+ラベルは ChatHandler の Intent の値（"question" など）。
+モデルはこのモジュールに同梱した学習用例文から初回使用時に学習する（数ミリ秒）。
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from functools import cache
+
+INTENT_LABELS = ("question", "add_chart", "analyze", "summarize", "general")
+
+# 既定の確信度しきい値（これ未満は LLM で分類する）
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+
+NGRAM_SIZES = (1, 2, 3)
+
+# キーワード規則（意図 → (パターン, 対数オッズへの加点)）
+KEYWORD_RULES: dict[str, tuple[tuple[str, float], ...]] = {
+    "add_chart": (
+        (r"グラフ|チャート|可視化|プロット|ヒストグラム|散布図|ヒートマップ", 3.0),
+        (r"(棒|円|折れ線|積み上げ)(グラフ)?", 1.5),
+        (r"(見せて|描いて|表示して|追加して|出して)", 1.0),
+    ),
+    "summarize": (
+        (r"まとめ|要約|サマリ|レポート|総括|概要|要点", 3.0),
+        (r"(ざっくり|簡単に|一言で)", 1.0),
+    ),
+    "analyze": (
+        (r"分析|比較|相関|傾向|トレンド|要因|関係性?|影響|内訳|推移|季節性|外れ値|異常", 2.5),
+        (r"(比べて|調べて|掘り下げ|深掘り)", 1.5),
+    ),
+    "question": (
+        (r"[?？]$|何|なぜ|なんで|どこ|どれ|どの|いくつ|いくら|誰|いつ|どう", 1.5),
+        (r"一番|最も|最大|最小|最高|最低|平均|合計|何件|何人|何個|割合", 1.5),
+        (r"(教えて|知りたい|ですか|ますか)", 1.0),
+    ),
+    "general": (
+        (r"^(こんにちは|こんばんは|おはよう|はじめまして|ありがとう|よろしく|さようなら)", 4.0),
+        (r"(ありがとう|助かりました|すごい|了解|わかりました|ok)", 2.0),
+        (r"(使い方|何ができ|できること|あなたは)", 2.0),
+    ),
+}
+
+# キーワード直後の否定（「グラフは要らない」など）。一致した規則の加点を打ち消す
+NEGATION_PATTERN = r".{0,3}?(要らない|いらない|要りません|いりません|不要|なしで|無しで|なくていい)"
+NEGATION_WINDOW = 8
+
+# 学習用例文（意図ごと）
+TRAINING_EXAMPLES: dict[str, tuple[str, ...]] = {
+    "question": (
+        "売上が一番高いのはどこ？",
+        "平均単価はいくらですか",
+        "データは何件ありますか",
+        "最も売れた商品は何？",
+        "なぜ3月は売上が少ないの？",
+        "東京の合計売上を教えて",
+        "顧客数は何人？",
+        "一番利益率が低いカテゴリはどれ",
+        "最大の注文金額はいくら",
+        "いつが一番売れた？",
+        "大阪の売上はどのくらいですか",
+        "欠損値はありますか",
+        "返品率は何パーセント？",
+        "カラムはいくつありますか",
+        "最新の日付はいつ？",
+        "男性と女性どちらが多い？",
+        "中央値はいくつ",
+        "一番多い地域を知りたい",
+    ),
+    "add_chart": (
+        "地域別の売上グラフを追加して",
+        "月別の推移を折れ線グラフで見せて",
+        "カテゴリ別の構成比を円グラフにして",
+        "価格の分布をヒストグラムで表示して",
+        "売上と利益の散布図を描いて",
+        "商品別の棒グラフを出して",
+        "曜日ごとのヒートマップを追加",
+        "年齢層別のグラフが見たい",
+        "チャートを追加してほしい",
+        "地域別に可視化して",
+        "店舗ごとの売上をプロットして",
+        "積み上げ棒グラフで比較できるようにして",
+        "月次の売上を図にして",
+        "グラフで見せて",
+    ),
+    "analyze": (
+        "東京と大阪を比較して分析して",
+        "売上と広告費の相関を見て",
+        "売上が下がった要因を分析して",
+        "季節性があるか調べて",
+        "顧客セグメントごとの傾向を分析",
+        "外れ値がないか確認して",
+        "利益率の推移を深掘りして",
+        "カテゴリ間の違いを比べて",
+        "トレンドを分析してほしい",
+        "売上に影響している要素を調べて",
+        "地域ごとの内訳を分析して",
+        "前年と比較して変化を分析",
+        "異常な値を検出して",
+        "購買パターンを分析して",
+    ),
+    "summarize": (
+        "このデータをまとめて",
+        "結果を要約して",
+        "レポートにして",
+        "全体の概要を教えて",
+        "要点を3つにまとめて",
+        "ダッシュボードの内容をサマリーして",
+        "経営層向けに総括して",
+        "ざっくりまとめてほしい",
+        "一言で言うとどういうデータ？",
+        "主な発見をまとめてください",
+        "報告用に簡潔にまとめて",
+        "今日の分析をレポートにまとめて",
+    ),
+    "general": (
+        "こんにちは",
+        "ありがとう",
+        "はじめまして",
+        "よろしくお願いします",
+        "助かりました",
+        "了解です",
+        "あなたは誰？",
+        "何ができるの？",
+        "使い方を教えて",
+        "おはよう",
+        "すごいですね",
+        "わかりました",
+        "こんばんは",
+        "また明日",
+    ),
+}
+
+_COMPILED_RULES = {
+    intent: tuple((re.compile(pattern), weight) for pattern, weight in rules)
+    for intent, rules in KEYWORD_RULES.items()
+}
+_NEGATION_RE = re.compile(NEGATION_PATTERN)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class IntentPrediction:
+    """
+    ローカル分類の結果
+
+    Attributes:
+        intent: 確率が最も高い意図（INTENT_LABELS のいずれか）
+        confidence: その意図の確率（0〜1）
+        probabilities: 意図ごとの確率
+    """
+
+    intent: str
+    confidence: float
+    probabilities: dict[str, float]
+
+
+def normalize(message: str) -> str:
+    """
+    全角英数の半角化・小文字化・空白除去を行う
+
+    Args:
+        message: ユーザーメッセージ
+
+    Returns:
+        str: 正規化したメッセージ
+    """
+    return _SPACE_RE.sub("", unicodedata.normalize("NFKC", message)).lower()
+
+
+def char_ngrams(text: str) -> Counter:
+    """
+    文字 n-gram（NGRAM_SIZES）の出現回数を返す
+
+    Args:
+        text: 正規化済みのテキスト
+
+    Returns:
+        Counter: n-gram → 出現回数
+    """
+    padded = f"^{text}$"
+    return Counter(
+        padded[i : i + size] for size in NGRAM_SIZES for i in range(len(padded) - size + 1)
+    )
+
+
+class NgramModel:
+    """文字 n-gram の多項ナイーブベイズ"""
+
+    def __init__(self, examples: dict[str, tuple[str, ...]], alpha: float = 0.5):
+        """
+        Args:
+            examples: 意図ごとの学習用例文
+            alpha: 加算スムージングの係数
+        """
+        self.labels = tuple(examples)
+        self.vocabulary: set[str] = set()
+        counts: dict[str, Counter] = {}
+        for label, texts in examples.items():
+            counts[label] = Counter()
+            for text in texts:
+                counts[label].update(char_ngrams(normalize(text)))
+            self.vocabulary.update(counts[label])
+        vocabulary_size = len(self.vocabulary)
+        total_examples = sum(len(texts) for texts in examples.values())
+
+        self.log_prior = {
+            label: math.log(len(texts) / total_examples) for label, texts in examples.items()
+        }
+        self.log_likelihood: dict[str, dict[str, float]] = {}
+        self.log_unseen: dict[str, float] = {}
+        for label, counter in counts.items():
+            denominator = sum(counter.values()) + alpha * vocabulary_size
+            self.log_likelihood[label] = {
+                gram: math.log((count + alpha) / denominator) for gram, count in counter.items()
+            }
+            self.log_unseen[label] = math.log(alpha / denominator)
+
+    def log_scores(self, text: str) -> dict[str, float]:
+        """
+        意図ごとの対数尤度（学習語彙にない n-gram は無視し、n-gram 数で平均する）
+
+        Args:
+            text: 正規化済みのテキスト
+
+        Returns:
+            dict: 意図 → 1 n-gram あたりの対数尤度 + 対数事前確率
+        """
+        grams = {gram: n for gram, n in char_ngrams(text).items() if gram in self.vocabulary}
+        total = sum(grams.values())
+        scores = {}
+        for label in self.labels:
+            likelihood = self.log_likelihood[label]
+            unseen = self.log_unseen[label]
+            log_sum = sum(n * likelihood.get(gram, unseen) for gram, n in grams.items())
+            scores[label] = self.log_prior[label] + (log_sum / total if total else 0.0)
+        return scores
+
+
+@cache
+def _default_model() -> NgramModel:
+    return NgramModel(TRAINING_EXAMPLES)
+
+
+def _matches_affirmatively(pattern: re.Pattern, text: str) -> bool:
+    """否定されていない一致が1つでもあるか（直後の数文字に否定語があれば否定とみなす）"""
+    return any(
+        not _NEGATION_RE.match(text, match.end(), match.end() + NEGATION_WINDOW)
+        for match in pattern.finditer(text)
+    )
+
+
+def _softmax(scores: dict[str, float]) -> dict[str, float]:
+    peak = max(scores.values())
+    exps = {label: math.exp(score - peak) for label, score in scores.items()}
+    total = sum(exps.values())
+    return {label: value / total for label, value in exps.items()}
+
+
+class IntentClassifier:
+    """キーワード規則と文字 n-gram モデルを組み合わせたローカル意図分類器"""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+        model: NgramModel | None = None,
+        ngram_weight: float = 4.0,
+    ):
+        """
+        Args:
+            threshold: ローカルの判定を採用する確信度（これ未満は None を返す）
+            model: 文字 n-gram モデル（None の場合は同梱の例文で学習したもの）
+            ngram_weight: n-gram モデルの平均対数尤度に掛ける重み
+
+        Raises:
+            ValueError: threshold が 0〜1 の範囲外の場合
+        """
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError("threshold は 0〜1 で指定してください")
+        self.threshold = threshold
+        self.model = model or _default_model()
+        self.ngram_weight = ngram_weight
+
+    def predict(self, message: str) -> IntentPrediction:
+        """
+        意図ごとの確率を推定する
+
+        キーワード規則の一致は、その意図の対数オッズへの加点として
+        n-gram モデルのスコアと足し合わせる。直後に否定語が続く一致
+        （「グラフは要らない」など）は加点しない。
+
+        Args:
+            message: ユーザーメッセージ
+
+        Returns:
+            IntentPrediction: 推定結果
+        """
+        text = normalize(message)
+        model_scores = self.model.log_scores(text)
+        scores = {}
+        for label in self.model.labels:
+            rule_score = sum(
+                weight
+                for pattern, weight in _COMPILED_RULES.get(label, ())
+                if _matches_affirmatively(pattern, text)
+            )
+            scores[label] = self.ngram_weight * model_scores[label] + rule_score
+        probabilities = _softmax(scores)
+        intent = max(probabilities, key=probabilities.__getitem__)
+        return IntentPrediction(intent, probabilities[intent], probabilities)
+
+    def classify(self, message: str) -> str | None:
+        """
+        確信度がしきい値以上であれば意図を返す
+
+        Args:
+            message: ユーザーメッセージ
+
+        Returns:
+            str | None: 意図（確信度が足りない場合は None）
+        """
+        prediction = self.predict(message)
+        return prediction.intent if prediction.confidence >= self.threshold else None
@@ -1,3 +1,4 @@
+import copy
 import json
 import time
 from collections.abc import Callable
@@ -5,75 +6,46 @@ from collections.abc import Callable
 import pandas as pd
 
 from src.services.ai_generator import GenerationResult
-
-
-class MockAIGenerator:
-    """
-    APIコストを節約するためのモックジェネレーター。
-    Titanicデータセットに基づいた「Executive Theme」のダッシュボードを即座に返します。
-    """
-
-    def generate_oneshot(
-        self, df: pd.DataFrame, progress_callback: Callable[[int, str], None] | None = None
-    ) -> GenerationResult:
-        """
-        モックデータを生成して返します。入力DFは無視されます。
-        """
-        print("MOCK MODE: Generating executive dashboard without API call...")
-
-        if progress_callback:
-            progress_callback(1, "デモデータを準備中...")
-            time.sleep(0.5)
-            progress_callback(2, "エグゼクティブ・インサイトを抽出中...")
-            time.sleep(0.5)
-            progress_callback(3, "ビジュアリゼーションを構築中...")
-            time.sleep(0.5)
-            progress_callback(4, "完了")
-
-        # 1. Mock JSON Data (Executive Insight)
-        mock_data = {
-            "kpi": {
-                "total_passengers": 891,
-                "survival_rate": "38.4%",
-                "avg_fare": "$32.20",
-                "first_class_survival": "62.9%",
-            },
-            "charts": {
-                "survival_by_class": {
-                    "labels": ["1st Class", "2nd Class", "3rd Class"],
-                    "datasets": [
-                        {"label": "Survival Rate", "data": [62.9, 47.3, 24.2], "type": "bar"}
-                    ],
-                },
-                "survival_by_gender": {
-                    "labels": ["Female", "Male"],
-                    "datasets": [{"label": "Survivors", "data": [233, 109], "type": "doughnut"}],
-                },
-                "age_distribution": {
-                    "labels": ["0-10", "11-20", "21-30", "31-40", "41-50", "51-60", "60+"],
-                    "datasets": [
-                        {
-                            "label": "Passenger Count",
-                            "data": [64, 115, 230, 155, 86, 42, 22],
-                            "type": "line",
-                            "fill": True,
-                        }
-                    ],
-                },
-                "fare_analysis": {
-                    "labels": ["S", "C", "Q"],
-                    "datasets": [
-                        {"label": "Average Fare", "data": [27.07, 59.95, 13.27], "type": "radar"}
-                    ],
-                },
-            },
-            "insight_summary": "Overall survival rate was 38.4%. First-class passengers had a significantly higher survival chance (62.9%) compared to 3rd class (24.2%). Females were prioritized in rescue operations.",
-        }
-
-        # 2. Mock Python Code (Just for display)
-
-        # 3. Mock HTML Template (Executive Theme applied)
-        mock_html = """
+from src.services.cancellation import CancellationToken
+
+# Mock JSON Data (Executive Insight)
+MOCK_DASHBOARD_DATA = {
+    "kpi": {
+        "total_passengers": 891,
+        "survival_rate": "38.4%",
+        "avg_fare": "$32.20",
+        "first_class_survival": "62.9%",
+    },
+    "charts": {
+        "survival_by_class": {
+            "labels": ["1st Class", "2nd Class", "3rd Class"],
+            "datasets": [{"label": "Survival Rate", "data": [62.9, 47.3, 24.2], "type": "bar"}],
+        },
+        "survival_by_gender": {
+            "labels": ["Female", "Male"],
+            "datasets": [{"label": "Survivors", "data": [233, 109], "type": "doughnut"}],
+        },
+        "age_distribution": {
+            "labels": ["0-10", "11-20", "21-30", "31-40", "41-50", "51-60", "60+"],
+            "datasets": [
+                {
+                    "label": "Passenger Count",
+                    "data": [64, 115, 230, 155, 86, 42, 22],
+                    "type": "line",
+                    "fill": True,
+                }
+            ],
+        },
+        "fare_analysis": {
+            "labels": ["S", "C", "Q"],
+            "datasets": [{"label": "Average Fare", "data": [27.07, 59.95, 13.27], "type": "radar"}],
+        },
+    },
+    "insight_summary": "Overall survival rate was 38.4%. First-class passengers had a significantly higher survival chance (62.9%) compared to 3rd class (24.2%). Females were prioritized in rescue operations.",
+}
+
+# Mock HTML Template (Executive Theme applied)
+MOCK_DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="ja">
 <head>
@@ -316,11 +288,50 @@ class MockAIGenerator:
 </body>
 </html>
 """
+
+MOCK_BLUEPRINT = "## Mock Blueprint\n- This is a pre-defined demo blueprint."
+
+
+class MockAIGenerator:
+    """
+    APIコストを節約するためのモックジェネレーター。
+    Titanicデータセットに基づいた「Executive Theme」のダッシュボードを即座に返します。
+    """
+
+    def generate_oneshot(
+        self,
+        df: pd.DataFrame,
+        progress_callback: Callable[[int, str], None] | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> GenerationResult:
+        """
+        モックデータを生成して返します。入力DFは無視されます。
+        キャンセルトークンは AIGenerator と同じく各ステップの前に確認します。
+        """
+        print("MOCK MODE: Generating executive dashboard without API call...")
+
+        if progress_callback:
+            steps = [
+                "デモデータを準備中...",
+                "エグゼクティブ・インサイトを抽出中...",
+                "ビジュアリゼーションを構築中...",
+            ]
+            for step, message in enumerate(steps, start=1):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                progress_callback(step, message)
+                time.sleep(0.5)
+            progress_callback(4, "完了")
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        mock_data = copy.deepcopy(MOCK_DASHBOARD_DATA)
+
         # Inject JSON into HTML locally to mimic AIGenerator.assemble_html
-        assembled_html = mock_html.replace("{{JSON_DATA}}", json.dumps(mock_data))
+        assembled_html = MOCK_DASHBOARD_HTML.replace("{{JSON_DATA}}", json.dumps(mock_data))
 
         return GenerationResult(
             html=assembled_html,
             data=mock_data,
-            blueprint="## Mock Blueprint\n- This is a pre-defined demo blueprint.",
+            blueprint=MOCK_BLUEPRINT,
         )
@@ -0,0 +1,186 @@
+"""
+ModelCassette - モデル呼び出しの記録・再生
+
+責務:
+- プロンプトと応答の組を JSONL カセットへ追記記録
+- 記録済み応答の決定的な再生（記録時のレイテンシ再現は任意）
+- 環境変数からのカセット設定
+
+一度実際のセッションを記録しておけば、ベンチマークではモデル時間を除いた
+自前の処理（パース・exec・組み立て・チャット）だけを安定して計測できる。
+
+カセットの1行は次の形式（プロンプト本文は保存せずハッシュと先頭のみ）:
+    {"model": "...", "key": "<sha256>", "prompt_head": "...", "text": "...", "latency_ms": 812.4}
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+CASSETTE_MODES = ("record", "replay")
+
+# デバッグ用に保存するプロンプト先頭の文字数
+PROMPT_HEAD_CHARS = 120
+
+
+class CassetteMissError(LookupError):
+    """再生モードで該当する記録が見つからない"""
+
+    def __init__(self, model: str, key: str) -> None:
+        super().__init__(f"カセットに記録がありません（model: {model}, key: {key[:12]}）")
+        self.model = model
+        self.key = key
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    """モデル名とプロンプトから記録の照合キーを作る"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()
+
+
+@dataclass
+class CassetteEntry:
+    model: str
+    key: str
+    text: str
+    latency_ms: float
+    prompt_head: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "model": self.model,
+                "key": self.key,
+                "prompt_head": self.prompt_head,
+                "text": self.text,
+                "latency_ms": round(self.latency_ms, 1),
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+
+@dataclass
+class ModelCassette:
+    """
+    モデル呼び出しのカセット
+
+    mode="record" では record() のたびに1行追記する（プロセス間で同じファイルに
+    追記しても行単位で書き込む）。mode="replay" では同じキーの記録を記録順に返し、
+    使い切った後は最後の記録を返し続ける。
+
+    Attributes:
+        path: カセットファイルのパス
+        mode: "record" または "replay"
+        replay_latency: 再生時に記録されたレイテンシだけ待機するか
+        latency_scale: 再生時の待機時間の倍率
+    """
+
+    path: Path
+    mode: str = "replay"
+    replay_latency: bool = False
+    latency_scale: float = 1.0
+    _entries: dict[str, list[CassetteEntry]] = field(default_factory=dict, init=False, repr=False)
+    _cursors: dict[str, int] = field(
+        default_factory=lambda: defaultdict(int), init=False, repr=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        if self.mode not in CASSETTE_MODES:
+            raise ValueError(f"未対応のカセットモードです: {self.mode}")
+        if self.latency_scale < 0:
+            raise ValueError("latency_scale は 0 以上で指定してください")
+        if self.replaying:
+            if not self.path.exists():
+                raise FileNotFoundError(f"カセットファイルが見つかりません: {self.path}")
+            self._entries = self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _load(self) -> dict[str, list[CassetteEntry]]:
+        entries: dict[str, list[CassetteEntry]] = defaultdict(list)
+        with self.path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError:
+                    # 記録中断で最終行が途切れている場合は無視する
+                    continue
+                entry = CassetteEntry(
+                    model=raw["model"],
+                    key=raw["key"],
+                    text=raw["text"],
+                    latency_ms=float(raw.get("latency_ms", 0.0)),
+                    prompt_head=raw.get("prompt_head", ""),
+                )
+                entries[entry.key].append(entry)
+        return dict(entries)
+
+    def record(self, model: str, prompt: str, text: str, latency_ms: float) -> None:
+        """応答を1行追記する"""
+        entry = CassetteEntry(
+            model=model,
+            key=prompt_key(model, prompt),
+            text=text,
+            latency_ms=latency_ms,
+            prompt_head=prompt[:PROMPT_HEAD_CHARS],
+        )
+        line = (entry.to_json() + "\n").encode("utf-8")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._entries.setdefault(entry.key, []).append(entry)
+
+    def replay(self, model: str, prompt: str) -> CassetteEntry:
+        """
+        記録済みの応答を返す
+
+        Raises:
+            CassetteMissError: 該当する記録がない場合
+        """
+        key = prompt_key(model, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(model, key)
+            index = min(self._cursors[key], len(entries) - 1)
+            self._cursors[key] += 1
+        entry = entries[index]
+        if self.replay_latency and entry.latency_ms > 0:
+            time.sleep(entry.latency_ms / 1000.0 * self.latency_scale)
+        return entry
+
+    @classmethod
+    def from_env(cls) -> "ModelCassette | None":
+        """
+        環境変数からカセットを生成する
+
+        GEMINI_CASSETTE: カセットファイルのパス（未設定なら None）
+        GEMINI_CASSETTE_MODE: "record" / "replay"（既定は replay）
+        GEMINI_CASSETTE_LATENCY: 再生時の待機倍率（未設定なら待機しない）
+        """
+        path = os.getenv("GEMINI_CASSETTE")
+        if not path:
+            return None
+        latency = os.getenv("GEMINI_CASSETTE_LATENCY")
+        return cls(
+            path=Path(path),
+            mode=os.getenv("GEMINI_CASSETTE_MODE", "replay"),
+            replay_latency=latency is not None,
+            latency_scale=float(latency) if latency else 1.0,
+        )
@@ -0,0 +1,180 @@
+"""
+PayloadCompression - 大きな埋め込みデータの圧縮
+
+責務:
+- JSON の gzip + base64 圧縮
+- 圧縮データ要素とブラウザ側の展開スクリプト（DecompressionStream）の注入
+- データを参照するスクリプトを展開完了まで遅延させる書き換え
+
+データ宣言（const dashboardData = ...）を含むスクリプト以降の <script> は
+type を書き換えて実行を止め、展開後に元の順序で実行する。展開は非同期のため、
+遅延実行中に登録された DOMContentLoaded / load ハンドラーと window.onload は
+イベントが発火済みであればその場で呼び出す。
+"""
+
+import base64
+import gzip
+import re
+
+# 以下の3つは COMPRESSED_DATA_LOADER_SCRIPT 内の値と揃える
+# プレースホルダーに埋め込む式（展開後の値を指す）
+COMPRESSED_DATA_EXPRESSION = "window.__DASHBOARD_DATA__"
+COMPRESSED_DATA_ELEMENT_ID = "dashboard-data-gz"
+DEFERRED_SCRIPT_TYPE = "text/x-dashboard-deferred"
+
+COMPRESSED_DATA_LOADER_SCRIPT = """
+<script>
+(function() {
+    // === Compressed Data Loader (Injected by AIGenerator) ===
+    var DEFERRED = 'text/x-dashboard-deferred';
+
+    async function inflate() {
+        var encoded = document.getElementById('dashboard-data-gz').textContent.trim();
+        var binary = atob(encoded);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return JSON.parse(await new Response(stream).text());
+    }
+
+    function domReady() {
+        if (document.readyState !== 'loading') return Promise.resolve();
+        return new Promise(function(resolve) {
+            document.addEventListener('DOMContentLoaded', resolve, { once: true });
+        });
+    }
+
+    function patchLateListeners() {
+        var targets = [
+            [document, 'DOMContentLoaded', function() { return document.readyState !== 'loading'; }],
+            [window, 'load', function() { return document.readyState === 'complete'; }]
+        ];
+        targets.forEach(function(entry) {
+            var target = entry[0], type = entry[1], fired = entry[2];
+            var original = EventTarget.prototype.addEventListener;
+            target.addEventListener = function(eventType, listener, options) {
+                if (eventType === type && fired() && listener) {
+                    setTimeout(function() {
+                        var event = new Event(type);
+                        if (typeof listener === 'function') listener.call(target, event);
+                        else listener.handleEvent(event);
+                    });
+                    return;
+                }
+                return original.call(this, eventType, listener, options);
+            };
+        });
+        return function() {
+            delete document.addEventListener;
+            delete window.addEventListener;
+        };
+    }
+
+    function runScript(original) {
+        return new Promise(function(resolve) {
+            var script = document.createElement('script');
+            Array.prototype.forEach.call(original.attributes, function(attr) {
+                if (attr.name !== 'type') script.setAttribute(attr.name, attr.value);
+            });
+            if (original.dataset.deferredType) script.type = original.dataset.deferredType;
+            if (original.src) {
+                script.onload = script.onerror = resolve;
+            } else {
+                script.textContent = original.textContent;
+            }
+            original.replaceWith(script);
+            if (!original.src) resolve();
+        });
+    }
+
+    var pending = typeof DecompressionStream === 'undefined'
+        ? Promise.reject(new Error('DecompressionStream is not supported'))
+        : inflate();
+
+    (async function() {
+        try {
+            window.__DASHBOARD_DATA__ = await pending;
+        } catch (e) {
+            console.error('Compressed Data Loader Error:', e);
+            await domReady();
+            document.body.insertAdjacentHTML('afterbegin',
+                '<p style="padding:1rem;color:#f87171">データを展開できませんでした。' +
+                '最新のブラウザで開いてください。</p>');
+            return;
+        }
+        await domReady();
+        var previousOnload = window.onload;
+        var restore = patchLateListeners();
+        try {
+            var scripts = document.querySelectorAll('script[type="' + DEFERRED + '"]');
+            for (var i = 0; i < scripts.length; i++) await runScript(scripts[i]);
+        } finally {
+            restore();
+        }
+        if (document.readyState === 'complete' && typeof window.onload === 'function'
+                && window.onload !== previousOnload) {
+            window.onload(new Event('load'));
+        }
+    })();
+})();
+</script>
+"""
+
+_SCRIPT_TAG_RE = re.compile(r"<script\b([^>]*)>", re.IGNORECASE)
+_TYPE_ATTR_RE = re.compile(r"""\btype\s*=\s*(["']?)([^"'\s>]*)\1""", re.IGNORECASE)
+_JAVASCRIPT_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+
+def compress_json(json_data: str) -> str:
+    """
+    JSON 文字列を gzip で圧縮して base64 にする
+
+    mtime を固定し、同じ入力から同じ出力になるようにする。
+
+    Args:
+        json_data: JSON 文字列
+
+    Returns:
+        str: base64 文字列
+    """
+    compressed = gzip.compress(json_data.encode("utf-8"), compresslevel=6, mtime=0)
+    return base64.b64encode(compressed).decode("ascii")
+
+
+def _defer_script_tag(match: re.Match) -> str:
+    attributes = match.group(1)
+    type_match = _TYPE_ATTR_RE.search(attributes)
+    if type_match is None:
+        return f'<script type="{DEFERRED_SCRIPT_TYPE}"{attributes}>'
+    if type_match.group(2).lower() not in _JAVASCRIPT_TYPES:
+        return match.group(0)  # JSON などのデータブロックはそのまま
+    replacement = f'type="{DEFERRED_SCRIPT_TYPE}" data-deferred-type="{type_match.group(2)}"'
+    attributes = _TYPE_ATTR_RE.sub(replacement, attributes, count=1)
+    return f"<script{attributes}>"
+
+
+def embed_compressed(html: str, json_data: str) -> str:
+    """
+    COMPRESSED_DATA_EXPRESSION を参照する HTML に圧縮データと展開スクリプトを埋め込む
+
+    式がスクリプト内にない場合（テンプレートの形が想定外）は、圧縮せずに
+    JSON をそのまま埋め込む。
+
+    Args:
+        html: データ宣言に COMPRESSED_DATA_EXPRESSION を注入済みの HTML
+        json_data: JSON 文字列
+
+    Returns:
+        str: 完成したHTML
+    """
+    position = html.find(COMPRESSED_DATA_EXPRESSION)
+    script_start = html.rfind("<script", 0, position) if position >= 0 else -1
+    if script_start < 0 or "</script" in html[script_start:position].lower():
+        return html.replace(COMPRESSED_DATA_EXPRESSION, json_data)
+
+    deferred = _SCRIPT_TAG_RE.sub(_defer_script_tag, html[script_start:])
+    payload = (
+        f'<script type="application/gzip+base64" id="{COMPRESSED_DATA_ELEMENT_ID}">'
+        f"{compress_json(json_data)}</script>"
+    )
+    return html[:script_start] + payload + COMPRESSED_DATA_LOADER_SCRIPT + deferred
@@ -0,0 +1,165 @@
+"""
+PayloadPruning - HTML テンプレートが参照しないデータの除外
+
+責務:
+- テンプレートのデータ変数名（const dashboardData = {{JSON_DATA}} の左辺）の特定
+- テンプレート内の JavaScript が読む dashboardData.x.y 形式のパスの静的抽出
+- 参照されないキーを除いた集計結果のコピーの作成
+
+解析は保守的に行う。動的なキー参照（dashboardData[key]）や変数への代入、
+関数への受け渡しなど、パスが途切れる参照ではその時点のサブツリーを丸ごと残す。
+if 条件・!・&&・三項演算子での参照は値を読むので参照とみなす。読まない参照として
+扱うのは typeof dashboardData === 'undefined'（変数自体の存在チェック）と
+'キー' in dashboardData.x（そのキーだけを残す）のみ。
+"""
+
+import re
+from typing import Any
+
+DEFAULT_DATA_VARIABLE = "dashboardData"
+
+_PLACEHOLDER = r"\{\{\s*JSON_DATA\s*\}\}"
+_IDENTIFIER = r"[^\W\d][\w$]*|\$[\w$]*"
+
+_DECLARATION_RE = re.compile(
+    rf"(?:(?:const|let|var)\s+|window\s*\.\s*)({_IDENTIFIER})\s*=\s*{_PLACEHOLDER}"
+)
+_DOT_RE = re.compile(rf"\s*(?:\?\.|\.)\s*({_IDENTIFIER})")
+_BRACKET_RE = re.compile(r"""\s*(?:\?\.)?\s*\[\s*(["'`])((?:(?!\1)[^\\$])*)\1\s*\]""")
+_ASSIGNMENT_RE = re.compile(r"\s*=(?![=>])")
+_TYPEOF_BEFORE_RE = re.compile(r"\btypeof\s*$")
+_UNDEFINED_AFTER_RE = re.compile(r"""\s*[!=]==?\s*(["'])undefined\1""")
+_IN_BEFORE_RE = re.compile(r"""(["'])((?:(?!\1)[^\\$])*)\1\s+in\s+$""")
+# パスの後に続くと、in の対象がパスの指す値ではなくなる
+_MEMBER_AFTER_RE = re.compile(r"\s*(?:[\[(.]|\?\.)")
+
+# プレーンオブジェクトに対して呼べるメンバー（参照されたら丸ごと残す）
+_OBJECT_MEMBERS = frozenset(
+    {
+        "constructor",
+        "hasOwnProperty",
+        "isPrototypeOf",
+        "propertyIsEnumerable",
+        "toLocaleString",
+        "toString",
+        "valueOf",
+        "__proto__",
+    }
+)
+
+
+def data_variable_name(html_template: str) -> str | None:
+    """
+    テンプレートでデータを受け取る変数名を返す
+
+    プレースホルダーがない場合は AIGenerator.inject_json のフォールバックと同じく
+    dashboardData とみなす。プレースホルダーが単純な代入以外で使われている場合は None。
+
+    Args:
+        html_template: HTMLテンプレート
+
+    Returns:
+        str | None: 変数名
+    """
+    if not re.search(_PLACEHOLDER, html_template):
+        return DEFAULT_DATA_VARIABLE
+    names = {match.group(1) for match in _DECLARATION_RE.finditer(html_template)}
+    placeholders = len(re.findall(_PLACEHOLDER, html_template))
+    if len(names) != 1 or placeholders != len(_DECLARATION_RE.findall(html_template)):
+        return None
+    return names.pop()
+
+
+def find_data_references(html: str, variable: str) -> set[tuple[str, ...]] | None:
+    """
+    テンプレートが読むデータのパスを抽出する
+
+    Args:
+        html: HTMLテンプレート（スクリプト・イベントハンドラーを含む全文）
+        variable: データ変数名
+
+    Returns:
+        set | None: パス（キーのタプル）の集合。() は全体の参照。
+            変数自体の存在チェック以外の参照が1つもない場合は None（判断できないため）
+    """
+    root_re = re.compile(rf"(?<![\w$]){re.escape(variable)}(?![\w$])")
+    paths: set[tuple[str, ...]] = set()
+    for match in root_re.finditer(html):
+        path: list[str] = []
+        position = match.end()
+        while True:
+            step = _DOT_RE.match(html, position) or _BRACKET_RE.match(html, position)
+            if step is None:
+                break
+            path.append(step.group(step.lastindex))
+            position = step.end()
+
+        if not path and _ASSIGNMENT_RE.match(html, position):
+            continue  # 宣言・代入
+        before = html[max(match.start() - 256, 0) : match.start()]
+        if (
+            not path
+            and _TYPEOF_BEFORE_RE.search(before)
+            and _UNDEFINED_AFTER_RE.match(html, position)
+        ):
+            continue  # 変数自体の存在チェック
+        key_check = _IN_BEFORE_RE.search(before)
+        if key_check and not _MEMBER_AFTER_RE.match(html, position):
+            path.append(key_check.group(2))  # 'キー' in ...: そのキーだけを残す
+        paths.add(tuple(path))
+    return paths or None
+
+
+def _build_trie(paths: set[tuple[str, ...]]) -> dict | None:
+    """パスの木を作る（値が None のノードはサブツリー全体を残す）"""
+    trie: dict = {}
+    for path in sorted(paths, key=len):
+        if not path:
+            return None
+        node = trie
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if node is None:
+                break
+        else:
+            node[path[-1]] = None
+    return trie
+
+
+def _prune(value: Any, node: dict | None, path: str, dropped: dict[str, Any]) -> Any:
+    if node is None or not isinstance(value, dict) or _OBJECT_MEMBERS & node.keys():
+        return value
+    pruned = {}
+    for key, item in value.items():
+        name = str(key)
+        child_path = f"{path}.{name}" if path else name
+        if name in node:
+            pruned[key] = _prune(item, node[name], child_path, dropped)
+        else:
+            dropped[child_path] = item
+    return pruned
+
+
+def prune_unreferenced(html_template: str, data: Any) -> tuple[Any, dict[str, Any]]:
+    """
+    テンプレートが参照しないキーを除いた集計結果を返す
+
+    解析できない場合（変数名が特定できない、参照が見つからない）は何も除かない。
+    元の集計結果は変更しない。
+
+    Args:
+        html_template: HTMLテンプレート
+        data: 集計結果
+
+    Returns:
+        tuple: (除外後の集計結果, 除外したパス → 値)
+    """
+    variable = data_variable_name(html_template)
+    if variable is None or not isinstance(data, dict):
+        return data, {}
+    paths = find_data_references(html_template, variable)
+    if paths is None:
+        return data, {}
+
+    dropped: dict[str, Any] = {}
+    return _prune(data, _build_trie(paths), "", dropped), dropped
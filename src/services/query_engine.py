@@ -0,0 +1,511 @@
+"""
+QueryEngine - チャットの定量的な質問をローカルの pandas 集計で答える
+
+責務:
+- 集計クエリ（集計対象・集計方法・グループ・期間・絞り込み・上位 N 件）の表現
+- 日本語の質問文からのクエリ組み立て（明らかなものだけ。曖昧なものは None）
+- モデルが返した JSON 形式のクエリ仕様の検証
+- ベクトル化した pandas 処理でのクエリ実行と回答文の作成（計算時間を含む）
+"""
+
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+
+from src.services.chart_filters import FilterCondition, MaskCache, filter_frame
+from src.services.intent_classifier import normalize
+
+if TYPE_CHECKING:
+    # rollup_cube はこのモジュールの TIME_BUCKETS などを使うため、型注釈にだけ使う
+    from src.services.rollup_cube import RollupCube
+
+# 集計方法 → 回答文での表記
+AGGREGATIONS = {
+    "sum": "合計",
+    "mean": "平均",
+    "median": "中央値",
+    "max": "最大値",
+    "min": "最小値",
+    "count": "件数",
+}
+
+# 期間の粒度 → (Period の freq, 回答文での表記)
+TIME_BUCKETS = {
+    "day": ("D", "日"),
+    "week": ("W", "週"),
+    "month": ("M", "月"),
+    "quarter": ("Q", "四半期"),
+    "year": ("Y", "年"),
+}
+
+# 値で絞り込むカラムのユニーク数の上限（ID のようなカラムは走査しない）
+MAX_FILTER_CARDINALITY = 1000
+
+# ユニーク数が多すぎるカラムを見切るために先に調べる行数
+FILTER_PROBE_ROWS = 10_000
+
+# グループ数の上限を指定しない場合に回答文へ載せる行数
+DEFAULT_ANSWER_ROWS = 10
+
+_DATE_NAME_RE = re.compile(r"日付|日時|年月|date|time|day|month", re.IGNORECASE)
+_NON_QUERY_RE = re.compile(
+    r"グラフ|チャート|可視化|プロット|図に|分析|傾向|トレンド|相関|なぜ|なんで|理由|要因|まとめ|要約|"
+    r"レポート|特徴"
+)
+_TOP_RE = re.compile(r"(?:トップ|上位|ベスト|top)(\d+)|(\d+)(?:位まで|件まで)")
+_BOTTOM_RE = re.compile(r"(?:下位|ワースト|bottom|worst)(\d+)")
+_HIGHEST_RE = re.compile(r"(?:一番|最も|いちばん)(?:高|多|大き|売れ|良)")
+_LOWEST_RE = re.compile(r"(?:一番|最も|いちばん)(?:低|少な|小さ|悪)")
+_COUNT_RE = re.compile(r"件数|何件|行数|何行|レコード数")
+# 集計クエリで表せない条件（否定・しきい値・割合・前年比や相対的な期間）
+_UNSUPPORTED_RE = re.compile(
+    r"以外|除く|除いた|除外|以上|以下|未満|超|より(?:多|少|大|小|高|低|上|下)|"
+    r"割合|比率|構成比|シェア|占め|前年|前月|前週|昨年|去年|今年|今月|先月|先週|"
+    r"増加|減少|伸び|成長率"
+)
+_DIGIT_RE = re.compile(r"\d")
+_AGGREGATION_PATTERNS = (
+    ("mean", re.compile(r"平均")),
+    ("median", re.compile(r"中央値")),
+    ("max", re.compile(r"最大|最高値")),
+    ("min", re.compile(r"最小|最低値")),
+    ("sum", re.compile(r"合計|総|トータル|累計")),
+)
+_TIME_BUCKET_PATTERNS = (
+    ("quarter", re.compile(r"四半期")),
+    ("day", re.compile(r"日別|日ごと|毎日|日次")),
+    ("week", re.compile(r"週別|週ごと|毎週|週次")),
+    ("month", re.compile(r"月別|月ごと|毎月|月次")),
+    ("year", re.compile(r"年別|年ごと|毎年|年次|年度別")),
+)
+
+
+@dataclass
+class QuerySpec:
+    """
+    集計クエリ
+
+    Attributes:
+        measure: 集計対象の数値カラム（None の場合は行数を数える）
+        aggregation: 集計方法（AGGREGATIONS のいずれか）
+        group_by: グループ化するカラム（None の場合は全体を1つの値に集計する）
+        time_bucket: group_by が日付カラムの場合の期間の粒度（TIME_BUCKETS のいずれか）
+        filters: カラム → 値 の等値条件
+        top_k: 集計値の上位（ascending=True の場合は下位）何件を返すか
+        ascending: True の場合は集計値の小さい順
+    """
+
+    measure: str | None = None
+    aggregation: str = "sum"
+    group_by: str | None = None
+    time_bucket: str | None = None
+    filters: dict[str, Any] = field(default_factory=dict)
+    top_k: int | None = None
+    ascending: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], df: pd.DataFrame) -> "QuerySpec":
+        """
+        JSON 形式のクエリ仕様を検証して QuerySpec にする
+
+        モデルが返したクエリ仕様の唯一の検証のため、execute_query が失敗する仕様・
+        意図と異なる結果になる仕様（"false" の ascending など）はここで拒否する。
+
+        Args:
+            data: クエリ仕様（QuerySpec と同じキー）
+            df: 対象のデータ（カラムと数値カラムの判定に使う）
+
+        Returns:
+            QuerySpec: 検証済みのクエリ
+
+        Raises:
+            ValueError: 未知のキー・カラム・集計方法・粒度を含む場合、filters が
+                カラム → スカラー値の dict でない場合、count 以外の集計の measure が
+                数値カラムでない場合、top_k が1以上の整数でない場合、ascending が
+                bool でない場合
+        """
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"未知のキーです: {sorted(unknown)}")
+        spec = cls(**data)
+        if not isinstance(spec.filters, dict) or not all(
+            isinstance(value, (str, int, float)) for value in spec.filters.values()
+        ):
+            raise ValueError("filters はカラム → 値（スカラー）の dict で指定してください")
+        if spec.aggregation == "count":
+            spec.measure = None
+        for column in [spec.measure, spec.group_by, *spec.filters]:
+            if column is not None and column not in df.columns:
+                raise ValueError(f"存在しないカラムです: {column}")
+        if spec.aggregation not in AGGREGATIONS:
+            raise ValueError(f"未対応の集計方法です: {spec.aggregation}")
+        if spec.measure is None and spec.aggregation != "count":
+            raise ValueError("count 以外の集計には measure が必要です")
+        if spec.measure is not None and (
+            not pd.api.types.is_numeric_dtype(df[spec.measure])
+            or pd.api.types.is_bool_dtype(df[spec.measure])
+        ):
+            raise ValueError(f"数値カラムではありません: {spec.measure}")
+        if spec.time_bucket is not None and (
+            spec.time_bucket not in TIME_BUCKETS or spec.group_by is None
+        ):
+            raise ValueError(f"未対応の期間の粒度です: {spec.time_bucket}")
+        if spec.top_k is not None and (
+            not isinstance(spec.top_k, int) or isinstance(spec.top_k, bool) or spec.top_k < 1
+        ):
+            raise ValueError("top_k は1以上の整数で指定してください")
+        if not isinstance(spec.ascending, bool):
+            raise ValueError("ascending は true / false で指定してください")
+        return spec
+
+
+@dataclass
+class QueryResult:
+    """
+    クエリの実行結果
+
+    Attributes:
+        spec: 実行したクエリ
+        value: 全体の集計値（group_by がある場合は None）
+        rows: (グループ, 集計値) のリスト（group_by がない場合は空）
+        group_count: 絞り込み後のグループ数（top_k で切り詰める前）
+        row_count: 絞り込み後の行数
+        elapsed_ms: 計算時間（ミリ秒）
+    """
+
+    spec: QuerySpec
+    value: float | None
+    rows: list[tuple[Any, float]]
+    group_count: int
+    row_count: int
+    elapsed_ms: float
+
+    def to_dict(self) -> dict[str, Any]:
+        """ChatResponse.data 用の辞書"""
+        return {
+            "query": asdict(self.spec),
+            "value": self.value,
+            "rows": [list(row) for row in self.rows],
+            "group_count": self.group_count,
+            "row_count": self.row_count,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+    def to_text(self) -> str:
+        """
+        回答文を作る
+
+        Returns:
+            str: 集計結果と計算時間を含む回答文
+        """
+        spec = self.spec
+        subject = "".join(f"{value}の" for value in spec.filters.values())
+        target = f"{spec.measure}の{AGGREGATIONS[spec.aggregation]}"
+        if spec.measure is None:
+            target = "件数"
+        footer = f"（{self.row_count:,} 行をローカルで集計・計算時間 {self.elapsed_ms:.1f} ms）"
+
+        if spec.group_by is None:
+            if self.value is None:
+                return f"{subject}{target}を計算できる行がありません。{footer}"
+            return f"{subject}{target}は {_format_number(self.value)} です。{footer}"
+
+        group = spec.group_by
+        if spec.time_bucket is not None:
+            group = f"{group}（{TIME_BUCKETS[spec.time_bucket][1]}）"
+        if spec.top_k is not None:
+            order = "下位" if spec.ascending else "上位"
+            heading = f"{subject}{group}別の{target}（{order}{len(self.rows)}件）:"
+        else:
+            heading = f"{subject}{group}別の{target}:"
+        lines = [heading]
+        for rank, (label, value) in enumerate(self.rows[:DEFAULT_ANSWER_ROWS], start=1):
+            lines.append(f"{rank}. {label}: {_format_number(value)}")
+        if len(self.rows) > DEFAULT_ANSWER_ROWS:
+            lines.append(f"ほか {len(self.rows) - DEFAULT_ANSWER_ROWS:,} 件")
+        if not self.rows:
+            lines.append("該当する行がありません。")
+        lines.append(footer)
+        return "\n".join(lines)
+
+
+def _format_number(value: float) -> str:
+    if float(value).is_integer():
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def is_date_column(df: pd.DataFrame, column: Any) -> bool:
+    """
+    カラムが日付かどうかを判定する
+
+    datetime 型、または名前が日付らしい文字列カラムで先頭の値を日付として
+    解釈できるものを日付とみなす。
+
+    Args:
+        df: 対象のデータ
+        column: カラム名
+
+    Returns:
+        bool: 日付カラムの場合 True
+    """
+    series = df[column]
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    if (
+        not isinstance(column, str)
+        or not _DATE_NAME_RE.search(column)
+        or pd.api.types.is_numeric_dtype(series)
+        or pd.api.types.is_bool_dtype(series)
+    ):
+        return False
+    sample = series.dropna().head(20)
+    return bool(len(sample)) and bool(pd.to_datetime(sample, errors="coerce").notna().all())
+
+
+def detect_date_column(df: pd.DataFrame) -> str | None:
+    """
+    日付カラムを推定する
+
+    datetime 型のカラムを優先し、なければ名前が日付らしい文字列カラムのうち
+    先頭の値を日付として解釈できるものを返す。
+
+    Args:
+        df: 対象のデータ
+
+    Returns:
+        str | None: 日付カラム名（見つからない場合は None）
+    """
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            return column
+    for column in df.columns:
+        if is_date_column(df, column):
+            return column
+    return None
+
+
+def _categorical_columns(df: pd.DataFrame, date_column: str | None) -> list[str]:
+    return [
+        column
+        for column in df.columns
+        if column != date_column and not pd.api.types.is_numeric_dtype(df[column])
+    ]
+
+
+def _low_cardinality_values(series: pd.Series) -> list[Any] | None:
+    """ユニーク値（MAX_FILTER_CARDINALITY を超える場合は先頭の行で見切って None）"""
+    if series.iloc[:FILTER_PROBE_ROWS].nunique() > MAX_FILTER_CARDINALITY:
+        return None
+    values = series.dropna().unique()
+    return None if len(values) > MAX_FILTER_CARDINALITY else list(values)
+
+
+def _mentioned(columns: list[str], text: str) -> list[str]:
+    """text に名前が現れるカラム（長い名前を優先し、出現位置順）"""
+    found: list[tuple[int, str]] = []
+    taken: list[tuple[int, int]] = []
+    for column in sorted(columns, key=lambda name: -len(str(name))):
+        key = normalize(str(column))
+        position = text.find(key) if key else -1
+        if position < 0 or any(start <= position < end for start, end in taken):
+            continue
+        found.append((position, column))
+        taken.append((position, position + len(key)))
+    return [column for _, column in sorted(found)]
+
+
+def parse_query(message: str, df: pd.DataFrame) -> QuerySpec | None:
+    """
+    質問文から集計クエリを組み立てる
+
+    集計対象のカラム（または件数）と、集計方法・上位 N 件・グループ・期間のいずれかが
+    はっきり読み取れる質問だけを対象とする。グラフ・分析・まとめの依頼や、
+    否定・しきい値・割合・特定の年や日付など読み取れない条件を含む質問は対象外
+    （一部だけ読み取った条件で集計すると、正しく見える誤った回答になるため）。
+
+    Args:
+        message: ユーザーメッセージ
+        df: 対象のデータ
+
+    Returns:
+        QuerySpec | None: クエリ（読み取れない場合は None）
+    """
+    text = normalize(message)
+    if _NON_QUERY_RE.search(text) or _UNSUPPORTED_RE.search(text):
+        return None
+
+    numeric = [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])]
+    date_column = detect_date_column(df)
+    categorical = _categorical_columns(df, date_column)
+
+    measures = _mentioned(numeric, text)
+    count = bool(_COUNT_RE.search(text))
+    if not measures and not count:
+        return None
+    if measures and count:
+        # 「数量が10以上の件数」のようにカラムは件数の条件のことがある
+        return None
+    spec = QuerySpec(measure=None if count and not measures else measures[0])
+    if spec.measure is None:
+        spec.aggregation = "count"
+
+    dimensions = {}
+    for column in categorical:
+        values = _low_cardinality_values(df[column])
+        if values is None:
+            continue
+        dimensions[column] = values
+        for value in values:
+            key = normalize(str(value))
+            if len(key) >= 2 and key in text:
+                spec.filters[column] = value.item() if hasattr(value, "item") else value
+                break
+
+    groups = [column for column in _mentioned(categorical, text) if column not in spec.filters]
+    for bucket, pattern in _TIME_BUCKET_PATTERNS:
+        if date_column is not None and pattern.search(text):
+            spec.group_by, spec.time_bucket = date_column, bucket
+            break
+    else:
+        if groups:
+            spec.group_by = groups[0]
+
+    signal = spec.group_by is not None or count
+    if spec.measure is not None:
+        for aggregation, pattern in _AGGREGATION_PATTERNS:
+            if pattern.search(text):
+                spec.aggregation = aggregation
+                signal = True
+                break
+
+    ranking = None
+    if match := _BOTTOM_RE.search(text):
+        ranking = (int(match.group(1)), True)
+    elif match := _TOP_RE.search(text):
+        ranking = (int(match.group(1) or match.group(2)), False)
+    elif _HIGHEST_RE.search(text):
+        ranking = (1, False)
+    elif _LOWEST_RE.search(text):
+        ranking = (1, True)
+    if ranking is not None:
+        spec.top_k, spec.ascending = ranking
+        signal = True
+        if spec.group_by is None:
+            # 「売上トップ5」のようにグループが書かれていない場合は先頭のカテゴリカラム
+            candidates = [
+                column
+                for column, values in dimensions.items()
+                if column not in spec.filters and len(values) < len(df)
+            ]
+            if not candidates:
+                return None
+            spec.group_by = candidates[0]
+
+    if spec.top_k is not None and spec.top_k < 1:
+        return None
+    if _DIGIT_RE.search(_unparsed(text, spec, measures)):
+        # 年・日付・しきい値など、クエリにしていない数値が残っている
+        return None
+    return spec if signal else None
+
+
+def _unparsed(text: str, spec: QuerySpec, measures: list[str]) -> str:
+    """質問文から読み取った部分（上位 N 件・絞り込みの値・カラム名）を除いた残り"""
+    for pattern in (_BOTTOM_RE, _TOP_RE):
+        text = pattern.sub("", text)
+    names = [*spec.filters.values(), *spec.filters, *measures]
+    if spec.group_by is not None:
+        names.append(spec.group_by)
+    for name in sorted((normalize(str(name)) for name in names), key=len, reverse=True):
+        if name:
+            text = text.replace(name, "")
+    return text
+
+
+def execute_query(
+    spec: QuerySpec,
+    df: pd.DataFrame,
+    mask_cache: MaskCache | None = None,
+    cube: "RollupCube | None" = None,
+) -> QueryResult:
+    """
+    クエリを実行する
+
+    絞り込みはブールマスク（mask_cache の index_columns が True の場合は転置インデックス
+    から取り出した行）、グループ集計は groupby(observed=True)、上位 N 件は
+    nlargest / nsmallest で行う。cube を渡すと、キューブで答えられるクエリ
+    （中央値以外の集計方法で、グループと絞り込みのカラムがキューブの次元のもの）は
+    キューブの集計表から集計する（集計値が同じグループの並び順は生データで
+    集計した場合と異なることがある）。
+
+    Args:
+        spec: クエリ
+        df: 対象のデータ
+        mask_cache: 絞り込みのマスク・インデックスのキャッシュ（None の場合は毎回計算する）
+        cube: ロールアップキューブ（df から作ったもの。None の場合は df を集計する）
+
+    Returns:
+        QueryResult: 実行結果
+
+    Raises:
+        ValueError: クエリが存在しないカラムを参照している場合
+    """
+    started = time.perf_counter()
+    QuerySpec.from_dict(asdict(spec), df)
+
+    conditions = [FilterCondition(column, "eq", (value,)) for column, value in spec.filters.items()]
+    if cube is not None and cube.matches(df):
+        measure = (spec.measure, "count" if spec.measure is None else spec.aggregation)
+        answer = cube.aggregate(spec.group_by, spec.time_bucket, [measure], conditions)
+        if answer is not None and spec.group_by is None:
+            value = None if pd.isna(answer.values[0]) else float(answer.values[0])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            return QueryResult(spec, value, [], 0, answer.row_count, elapsed_ms)
+        if answer is not None:
+            return _grouped_result(spec, answer.values[0].dropna(), answer.row_count, started)
+
+    columns = [column for column in (spec.measure, spec.group_by) if column is not None]
+    frame = filter_frame(df, conditions, mask_cache, columns=columns) if conditions else df
+
+    values = frame[spec.measure] if spec.measure is not None else None
+    if spec.group_by is None:
+        if values is None:
+            value = float(len(frame))
+        else:
+            result = values.agg(spec.aggregation)
+            value = None if pd.isna(result) else float(result)
+        return QueryResult(spec, value, [], 0, len(frame), (time.perf_counter() - started) * 1000)
+
+    keys = frame[spec.group_by]
+    if spec.time_bucket is not None:
+        keys = pd.to_datetime(keys, errors="coerce").dt.to_period(TIME_BUCKETS[spec.time_bucket][0])
+    if values is None:
+        grouped = keys.groupby(keys, observed=True, sort=False).size()
+    else:
+        grouped = values.groupby(keys, observed=True, sort=False).agg(spec.aggregation).dropna()
+    return _grouped_result(spec, grouped, len(frame), started)
+
+
+def _grouped_result(
+    spec: QuerySpec, grouped: pd.Series, row_count: int, started: float
+) -> QueryResult:
+    """グループごとの集計値を上位 N 件・並び順に絞って QueryResult にする"""
+    group_count = len(grouped)
+    if spec.top_k is not None:
+        if spec.ascending:
+            grouped = grouped.nsmallest(spec.top_k)
+        else:
+            grouped = grouped.nlargest(spec.top_k)
+    elif spec.time_bucket is not None:
+        grouped = grouped.sort_index()
+    else:
+        grouped = grouped.sort_values(ascending=spec.ascending)
+
+    rows = [(str(label), float(value)) for label, value in grouped.items()]
+    return QueryResult(
+        spec, None, rows, group_count, row_count, (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,464 @@
+"""
+RollupCube - アップロード時に事前集計するロールアップキューブ
+
+責務:
+- 主な数値カラム（メジャー）の合計・件数・最小・最大の事前集計
+  （カーディナリティの低いカラム（次元）ごと・次元の2つ組ごと・日付の粒度ごと）
+- 事前集計からのグループ集計・絞り込み付きの集計（行数ではなくグループ数に比例）
+- バックグラウンドでのキューブの構築
+
+キューブは「次元の組 → 集計表」の辞書で、集計表はその次元をインデックス、
+(メジャー, 統計量) をカラムに持つ。生データを走査するのは次元の2つ組と日単位の
+日付の組み合わせだけで、1つの次元の集計表や週・月・四半期・年の集計表は
+それを集計し直して作る。平均は合計と件数から求める。中央値や範囲の絞り込みなど
+キューブで答えられない集計は None を返し、呼び出し側が生データで計算する。
+キューブは構築した DataFrame オブジェクトにだけ使い（weakref で同一性を判定する）、
+値を変えたコピーや並べ替えたデータには使わない。
+"""
+
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.services.chart_filters import FilterCondition
+from src.services.query_engine import TIME_BUCKETS, detect_date_column
+
+logger = logging.getLogger(__name__)
+
+# 次元にするカラムのユニーク数の上限
+MAX_DIMENSION_CARDINALITY = 100
+
+# 次元・メジャーにするカラムの数の上限（カラムの順に選ぶ）
+MAX_DIMENSIONS = 8
+MAX_MEASURES = 10
+
+# 1つの集計表のグループ数の上限（これを超える組み合わせは事前集計しない）
+MAX_CUBOID_GROUPS = 200_000
+
+# 事前集計する統計量
+CUBE_STATS = ("sum", "count", "min", "max")
+
+# キューブから答えられる集計方法
+CUBE_AGGREGATIONS = frozenset({"sum", "count", "min", "max", "mean"})
+
+# グループの行数のカラム
+SIZE_COLUMN = ("__rows__", "size")
+
+# 統計量 → 集計表を集計し直すときの集計方法
+_ROLLUP = {"sum": "sum", "count": "sum", "size": "sum", "min": "min", "max": "max"}
+
+# 次元のキー: (カラム名, 日付の粒度)（日付以外の次元の粒度は None）
+DimensionKey = tuple[str, str | None]
+
+
+@dataclass
+class CubeAnswer:
+    """
+    キューブから求めた集計
+
+    Attributes:
+        values: メジャーごとの集計値（グループ集計の場合はグループをインデックスにした
+            Series、それ以外はスカラー）
+        row_count: 絞り込み後の行数
+    """
+
+    values: list[Any]
+    row_count: int
+
+
+class RollupCube:
+    """事前集計したロールアップキューブ"""
+
+    def __init__(
+        self,
+        cuboids: dict[frozenset[DimensionKey], pd.DataFrame],
+        dimensions: list[str],
+        measures: list[str],
+        date_column: str | None,
+        date_range: tuple[pd.Timestamp, pd.Timestamp] | None,
+        row_count: int,
+        source: pd.DataFrame,
+        build_ms: float = 0.0,
+    ):
+        """
+        Args:
+            cuboids: 次元の組 → 集計表
+            dimensions: 次元のカラム（日付カラムを除く）
+            measures: メジャーのカラム
+            date_column: 日付カラム（ない場合は None）
+            date_range: 日付の最小値と最大値
+            row_count: 元のデータの行数
+            source: 元のデータ（弱参照で保持し、同じオブジェクトかどうかの判定に使う）
+            build_ms: 構築にかかった時間（ミリ秒）
+        """
+        self.cuboids = cuboids
+        self.dimensions = dimensions
+        self.measures = measures
+        self.date_column = date_column
+        self.date_range = date_range
+        self.row_count = row_count
+        self._source = weakref.ref(source)
+        self.build_ms = build_ms
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "RollupCube":
+        """
+        データフレームからキューブを作る
+
+        次元はユニーク数が MAX_DIMENSION_CARDINALITY 以下の数値・日付以外のカラム、
+        メジャーは真偽値以外の数値カラム。日付カラムがあれば日単位の期間も次元にする。
+
+        Args:
+            df: 元のデータ
+
+        Returns:
+            RollupCube: キューブ
+        """
+        started = time.perf_counter()
+        date_column = detect_date_column(df)
+        dimensions = [
+            column
+            for column in df.columns
+            if column != date_column
+            and not pd.api.types.is_numeric_dtype(df[column])
+            and not pd.api.types.is_datetime64_any_dtype(df[column])
+            and df[column].nunique() <= MAX_DIMENSION_CARDINALITY
+        ][:MAX_DIMENSIONS]
+        measures = [
+            column
+            for column in df.columns
+            if column != date_column
+            and pd.api.types.is_numeric_dtype(df[column])
+            and not pd.api.types.is_bool_dtype(df[column])
+        ][:MAX_MEASURES]
+
+        keys: dict[DimensionKey, pd.Series] = {(column, None): df[column] for column in dimensions}
+        cardinality = {key: df[key[0]].nunique() + 1 for key in keys}
+        date_range = None
+        dates = None
+        if date_column is not None:
+            dates = df[date_column]
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors="coerce")
+            start, end = dates.min(), dates.max()
+            if not pd.isna(start):
+                date_range = (start, end)
+                keys[(date_column, "day")] = dates.dt.to_period("D")
+                cardinality[(date_column, "day")] = (end - start).days + 2
+        if date_range is None:
+            date_column = None
+
+        cuboids: dict[frozenset[DimensionKey], pd.DataFrame] = {}
+        base = list(keys)
+        for group in combinations(base, 2) if len(base) > 1 else [tuple(base)]:
+            if group and np.prod([cardinality[key] for key in group]) <= MAX_CUBOID_GROUPS:
+                cuboids[frozenset(group)] = _aggregate_rows(
+                    df, [keys[key] for key in group], measures, dates if _has_date(group) else None
+                )
+
+        # 1つの次元の集計表は、その次元を含む最小の2つ組を集計し直して作る
+        for key in base:
+            if frozenset([key]) in cuboids:
+                continue
+            pairs = [table for group, table in cuboids.items() if key in group]
+            if pairs:
+                source = min(pairs, key=len)
+                cuboids[frozenset([key])] = _rollup(source, [source.index.get_level_values(key[0])])
+            elif cardinality[key] <= MAX_CUBOID_GROUPS:
+                cuboids[frozenset([key])] = _aggregate_rows(
+                    df, [keys[key]], measures, dates if _has_date([key]) else None
+                )
+
+        # 週・月・四半期・年の集計表は日単位の集計表を集計し直して作る
+        if date_column is not None:
+            for group, table in list(cuboids.items()):
+                if (date_column, "day") not in group:
+                    continue
+                for grain in TIME_BUCKETS:
+                    if grain == "day":
+                        continue
+                    regrained = [
+                        level.asfreq(TIME_BUCKETS[grain][0]) if name == date_column else level
+                        for name, level in zip(
+                            table.index.names,
+                            (table.index.get_level_values(i) for i in range(table.index.nlevels)),
+                            strict=True,
+                        )
+                    ]
+                    others = group - {(date_column, "day")}
+                    cuboids[frozenset({*others, (date_column, grain)})] = _rollup(table, regrained)
+
+        build_ms = (time.perf_counter() - started) * 1000
+        return cls(
+            cuboids,
+            dimensions,
+            measures,
+            date_column,
+            date_range,
+            len(df),
+            df,
+            build_ms,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """集計表の合計バイト数（インデックスを含む）"""
+        return sum(int(table.memory_usage(index=True).sum()) for table in self.cuboids.values())
+
+    @property
+    def group_count(self) -> int:
+        """集計表の合計行数"""
+        return sum(len(table) for table in self.cuboids.values())
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """
+        データフレームがキューブの元のデータそのものかどうか
+
+        行数とカラムが同じでも、値を変えたコピーや並べ替えたデータは別のデータとみなす
+        （TimePartitions と同じくオブジェクトの同一性で判定する）。同じオブジェクトの値を
+        その場で書き換えた場合は検知しないため、データを変更したら作り直す。
+
+        Args:
+            df: データフレーム
+
+        Returns:
+            bool: 元のデータと同じオブジェクトの場合 True
+        """
+        return self._source() is df and len(df) == self.row_count
+
+    def date_span(
+        self, conditions: list[FilterCondition] | None = None
+    ) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        """
+        絞り込み後の日付の最小値と最大値
+
+        Args:
+            conditions: 等値・「いずれか」の絞り込み条件
+
+        Returns:
+            tuple | None: (最小値, 最大値)（該当する行がない場合は (NaT, NaT)）。
+                日付カラムがない場合やキューブで答えられない条件の場合は None
+        """
+        if self.date_column is None:
+            return None
+        if not conditions:
+            return self.date_range
+        table = self._cuboid_for(conditions, {(self.date_column, "day")})
+        if table is None:
+            return None
+        table = _filtered(table, conditions)
+        return table[(self.date_column, "min")].min(), table[(self.date_column, "max")].max()
+
+    def aggregate(
+        self,
+        by: str | None,
+        grain: str | None,
+        measures: list[tuple[str | None, str]],
+        conditions: list[FilterCondition] | None = None,
+    ) -> CubeAnswer | None:
+        """
+        キューブから集計する
+
+        Args:
+            by: グループにするカラム（None の場合は全体の集計）
+            grain: by が日付カラムの場合の粒度（TIME_BUCKETS のキー）
+            measures: (メジャー, 集計方法) のリスト（メジャーが None の count は行数）
+            conditions: 等値・「いずれか」の絞り込み条件
+
+        Returns:
+            CubeAnswer | None: 集計結果（キューブで答えられない場合は None）。グループは
+                キーの昇順で、キーが欠損のグループは含めない
+        """
+        conditions = conditions or []
+        for measure, aggregation in measures:
+            if aggregation not in CUBE_AGGREGATIONS:
+                return None
+            if (measure is None and aggregation != "count") or (
+                measure is not None and measure not in self.measures
+            ):
+                return None
+
+        needed: set[DimensionKey] = set()
+        if by is not None:
+            if by == self.date_column and grain in TIME_BUCKETS:
+                needed.add((by, grain))
+            elif by in self.dimensions and grain is None:
+                needed.add((by, None))
+            else:
+                return None
+        table = self._cuboid_for(conditions, needed)
+        if table is None:
+            return None
+        table = _filtered(table, conditions)
+        row_count = int(table[SIZE_COLUMN].sum())
+
+        if by is None:
+            return CubeAnswer([_scalar(table, *measure) for measure in measures], row_count)
+        # 等値で絞り込んだ次元は1つの値しか残らないため、集計し直さずに外す
+        fixed = [
+            condition.column
+            for condition in conditions
+            if condition.kind == "eq" and condition.column != by
+        ]
+        if fixed and table.index.nlevels > len(fixed):
+            table = table.droplevel(fixed)
+        if table.index.nlevels > 1:
+            table = _rollup(table, [table.index.get_level_values(by)])
+        table = table[table.index.notna()]
+        return CubeAnswer([_series(table, *measure) for measure in measures], row_count)
+
+    def _cuboid_for(
+        self, conditions: list[FilterCondition], needed: set[DimensionKey]
+    ) -> pd.DataFrame | None:
+        """条件のカラムと needed の次元をすべて含む最も小さい集計表"""
+        needed = set(needed)
+        for condition in conditions:
+            if condition.kind not in ("eq", "in") or condition.column not in self.dimensions:
+                return None
+            needed.add((condition.column, None))
+        candidates = [
+            table
+            for group, table in self.cuboids.items()
+            if needed <= group and (needed or len(group) == 1)
+        ]
+        return min(candidates, key=len) if candidates else None
+
+
+def _has_date(group: Any) -> bool:
+    """次元の組に日付の期間が含まれるかどうか"""
+    return any(grain is not None for _, grain in group)
+
+
+def _filtered(table: pd.DataFrame, conditions: list[FilterCondition]) -> pd.DataFrame:
+    """集計表のうち条件に合うグループ"""
+    if not conditions:
+        return table
+    mask = np.ones(len(table), dtype=bool)
+    for condition in conditions:
+        level = table.index.get_level_values(condition.column)
+        if condition.kind == "eq":
+            mask &= np.asarray(level == condition.values[0], dtype=bool)
+        else:
+            mask &= level.isin(condition.values)
+    return table[mask]
+
+
+def _aggregate_rows(
+    df: pd.DataFrame, keys: list[pd.Series], measures: list[str], dates: pd.Series | None
+) -> pd.DataFrame:
+    """
+    生データをキーで集計した集計表（キーが欠損の行も1つのグループにまとめる）
+
+    dates を渡すと、グループごとの日時の最小値・最大値も持たせる（絞り込み後の
+    期間の長さを求めるため）。
+    """
+    grouped = df.groupby(keys, sort=True, dropna=False, observed=True)
+    sizes = grouped.size()
+    if measures:
+        table = grouped[measures].agg(list(CUBE_STATS))
+    else:
+        table = pd.DataFrame(index=sizes.index)
+    if dates is not None:
+        span = dates.groupby(keys, sort=True, dropna=False, observed=True).agg(["min", "max"])
+        for stat in ("min", "max"):
+            table[(dates.name, stat)] = span[stat]
+    table[SIZE_COLUMN] = sizes
+    return _compact(table)
+
+
+def _rollup(table: pd.DataFrame, keys: list[Any]) -> pd.DataFrame:
+    """集計表を別のキーで集計し直す（合計・件数は合計、最小・最大はその最小・最大）"""
+    parts = []
+    for method in ("sum", "min", "max"):
+        # カラムは位置で選ぶ（MultiIndex のカラム名での選択は固定費が大きい）
+        positions = [i for i, column in enumerate(table.columns) if _ROLLUP[column[1]] == method]
+        if positions:
+            grouped = table.iloc[:, positions].groupby(keys, sort=True, dropna=False, observed=True)
+            parts.append(getattr(grouped, method)())
+    return _compact(pd.concat(parts, axis=1)[table.columns])
+
+
+def _compact(table: pd.DataFrame) -> pd.DataFrame:
+    """件数のカラムを int32 にする"""
+    counts = [column for column in table.columns if column[1] in ("count", "size")]
+    if counts and (table.empty or int(table[SIZE_COLUMN].max()) < np.iinfo(np.int32).max):
+        return table.astype(dict.fromkeys(counts, np.int32))
+    return table
+
+
+def _series(table: pd.DataFrame, measure: str | None, aggregation: str) -> pd.Series:
+    """集計表の1つのメジャーの集計値"""
+    if measure is None:
+        series = table[SIZE_COLUMN].astype(np.int64)
+    elif aggregation == "mean":
+        counts = table[(measure, "count")]
+        series = table[(measure, "sum")] / counts.where(counts > 0)
+    elif aggregation == "count":
+        series = table[(measure, "count")].astype(np.int64)
+    else:
+        series = table[(measure, aggregation)]
+    return series.rename(measure)
+
+
+def _scalar(table: pd.DataFrame, measure: str | None, aggregation: str) -> Any:
+    """集計表の全グループをまとめた1つのメジャーの集計値"""
+    if measure is None:
+        return int(table[SIZE_COLUMN].sum())
+    if aggregation == "mean":
+        count = table[(measure, "count")].sum()
+        return table[(measure, "sum")].sum() / count if count else float("nan")
+    if aggregation in ("sum", "count"):
+        return table[(measure, aggregation)].sum()
+    return getattr(table[(measure, aggregation)], aggregation)()
+
+
+class CubeBuild:
+    """
+    バックグラウンドでのキューブの構築
+
+    構築中や構築に失敗した場合、cube は None（呼び出し側は生データで集計する）。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Args:
+            df: 元のデータ（構築中に書き換えないこと）
+        """
+        self.cube: RollupCube | None = None
+        self.error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, args=(df,), name="majin-rollup-cube", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, df: pd.DataFrame) -> None:
+        try:
+            self.cube = RollupCube.build(df)
+        except Exception as error:
+            logger.warning("ロールアップキューブを構築できませんでした: %s", error)
+            self.error = error
+
+    @property
+    def done(self) -> bool:
+        """構築が終わったかどうか（失敗した場合も True）"""
+        return not self._thread.is_alive()
+
+    def wait(self, timeout: float | None = None) -> RollupCube | None:
+        """
+        構築が終わるまで待つ
+
+        Args:
+            timeout: 待つ秒数の上限（None の場合は終わるまで）
+
+        Returns:
+            RollupCube | None: キューブ（終わっていない・失敗した場合は None）
+        """
+        self._thread.join(timeout)
+        return self.cube
@@ -0,0 +1,223 @@
+"""
+TimePartitions - 日付カラムで並べた行のパーティション
+
+責務:
+- 日付カラムの値で行を並べた配置（並べ替えの順序と並べた日時）の構築
+- 一定行数ごとのパーティションの境界（開始行・最小値・最大値）の保持
+- 日付の範囲に合う行の位置の取り出し（パーティションを二分探索し、全行を走査しない）
+
+データがすでに日付順の場合（取引履歴の CSV など）は並べ替えの順序を持たず、
+範囲に合う行は連続した位置になる。日時として解釈できない値の行はどの範囲にも含めない
+（日付の範囲のマスクと同じ）。行の位置は構築した DataFrame オブジェクトにだけ使い
+（weakref で同一性を判定する）、並べ替えたデータや値を変えたコピーには使わない。
+"""
+
+import time
+import weakref
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# 1つのパーティションの行数
+PARTITION_ROWS = 65_536
+
+
+def date_bounds(
+    low: Any, high: Any, tz: Any = None
+) -> tuple[pd.Timestamp | None, pd.Timestamp | None, bool]:
+    """
+    日付の範囲の下限・上限を日時にする
+
+    時刻のない上限はその日の終わりまでを含める（翌日の0時未満にする）。
+
+    Args:
+        low: 下限（None の場合は下限なし）
+        high: 上限（None の場合は上限なし）
+        tz: 比較するカラムのタイムゾーン（None の場合はタイムゾーンなし）
+
+    Returns:
+        tuple: (下限, 上限, 上限を含むかどうか)
+
+    Raises:
+        TypeError, ValueError: 日時として解釈できない場合
+    """
+    low = None if low is None else pd.Timestamp(low)
+    high = None if high is None else pd.Timestamp(high)
+    upper_inclusive = True
+    if high is not None and high == high.normalize():
+        high += pd.Timedelta(days=1)
+        upper_inclusive = False
+    if tz is not None:
+        low = None if low is None else low.tz_localize(tz)
+        high = None if high is None else high.tz_localize(tz)
+    return low, high, upper_inclusive
+
+
+def _nanoseconds(timestamp: pd.Timestamp | None) -> int | None:
+    """日時のナノ秒の値（タイムゾーン付きは UTC。表せない場合は None）"""
+    try:
+        return timestamp.as_unit("ns").value
+    except (OverflowError, pd.errors.OutOfBoundsDatetime):
+        return None
+
+
+class TimePartitions:
+    """日付カラムで並べた行のパーティション"""
+
+    def __init__(
+        self,
+        date_column: str,
+        keys: np.ndarray,
+        order: np.ndarray | None,
+        tz: Any,
+        source: pd.DataFrame,
+        partition_rows: int = PARTITION_ROWS,
+        build_ms: float = 0.0,
+    ):
+        """
+        Args:
+            date_column: 日付カラム
+            keys: 日付順に並べた日時（ナノ秒の整数。解釈できない値は先頭にまとめる）
+            order: 並べた位置 → 元の行の位置（元のデータがすでに日付順の場合は None）
+            tz: 日付カラムのタイムゾーン
+            source: 元のデータ（弱参照で保持し、同じオブジェクトかどうかの判定に使う）
+            partition_rows: 1つのパーティションの行数
+            build_ms: 構築にかかった時間（ミリ秒）
+        """
+        self.date_column = date_column
+        self.keys = keys
+        self.order = order
+        self.tz = tz
+        self._source = weakref.ref(source)
+        self.build_ms = build_ms
+        self.missing = int(np.searchsorted(keys, np.iinfo(np.int64).min, side="right"))
+        self.offsets = np.arange(self.missing, len(keys), partition_rows)
+        self.mins = keys[self.offsets]
+        self.maxs = keys[np.minimum(self.offsets + partition_rows, len(keys)) - 1]
+
+    @classmethod
+    def build(
+        cls, df: pd.DataFrame, date_column: str, partition_rows: int = PARTITION_ROWS
+    ) -> "TimePartitions | None":
+        """
+        データフレームの日付カラムでパーティションを作る
+
+        Args:
+            df: 元のデータ
+            date_column: 日付カラム（datetime 型、または日付の文字列のカラム）
+            partition_rows: 1つのパーティションの行数
+
+        Returns:
+            TimePartitions | None: パーティション（日時として扱えないカラムの場合は None）
+
+        Raises:
+            ValueError: partition_rows が1未満の場合
+        """
+        if partition_rows < 1:
+            raise ValueError("partition_rows は1以上にしてください")
+        started = time.perf_counter()
+        dates = df[date_column]
+        try:
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                # タイムゾーンが混在する文字列は ValueError になる
+                dates = pd.to_datetime(dates, errors="coerce")
+            keys = dates.dt.as_unit("ns").array.asi8
+        except ValueError:
+            # ナノ秒で表せない日時（OutOfBoundsDatetime）も含む
+            return None
+
+        # 解釈できない値（NaT）は int64 の最小値なので、並べると先頭に集まる
+        order = None
+        if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            if len(order) <= np.iinfo(np.int32).max:
+                order = order.astype(np.int32)
+        build_ms = (time.perf_counter() - started) * 1000
+        return cls(date_column, keys, order, dates.dt.tz, df, partition_rows, build_ms)
+
+    @property
+    def partition_count(self) -> int:
+        """パーティションの数"""
+        return len(self.offsets)
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """
+        データフレームがパーティションの元のデータそのものかどうか
+
+        行数とカラムが同じでも、並べ替えたデータや値を変えたコピーは別のデータとみなす
+        （MaskCache と同じくオブジェクトの同一性で判定する）。同じオブジェクトの値を
+        その場で書き換えた場合は検知しないため、データを変更したら作り直す。
+
+        Args:
+            df: データフレーム
+
+        Returns:
+            bool: 元のデータと同じオブジェクトの場合 True
+        """
+        return self._source() is df and len(df) == len(self.keys)
+
+    def rows(self, df: pd.DataFrame, column: str, low: Any, high: Any) -> np.ndarray | None:
+        """
+        日付の範囲に合う行の位置（昇順）
+
+        Args:
+            df: データフレーム
+            column: 絞り込むカラム
+            low: 下限（None の場合は下限なし）
+            high: 上限（None の場合は上限なし。時刻のない場合はその日の終わりまで）
+
+        Returns:
+            np.ndarray | None: 元のデータの行の位置。カラムが日付カラムでない場合、
+                データが元のデータと異なる場合、範囲がナノ秒の日時で表せない場合、
+                タイムゾーンの有無がカラムと異なる場合は None
+
+        Raises:
+            ValueError: 範囲を日時として解釈できない場合
+        """
+        if column != self.date_column or not self.matches(df):
+            return None
+        try:
+            low, high, upper_inclusive = date_bounds(low, high, self.tz)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{column} の日付を解釈できません: {e}") from e
+        bounds = [bound for bound in (low, high) if bound is not None]
+        if any((bound.tz is None) != (self.tz is None) for bound in bounds):
+            return None
+        low_ns = None if low is None else _nanoseconds(low)
+        high_ns = None if high is None else _nanoseconds(high)
+        if (low is not None and low_ns is None) or (high is not None and high_ns is None):
+            return None
+
+        start, stop = self._row_range(low_ns, high_ns, upper_inclusive)
+        if self.order is None:
+            return np.arange(start, stop)
+        return np.sort(self.order[start:stop])
+
+    def _row_range(
+        self, low: int | None, high: int | None, upper_inclusive: bool
+    ) -> tuple[int, int]:
+        """並べた位置での範囲 [start, stop)（境界のパーティションの中だけを二分探索する）"""
+        start, stop = self.missing, len(self.keys)
+        if low is not None:
+            # 最大値が下限以上の最初のパーティション
+            first = int(np.searchsorted(self.maxs, low, side="left"))
+            if first == len(self.offsets):
+                return stop, stop
+            begin, end = self._partition(first)
+            start = begin + int(np.searchsorted(self.keys[begin:end], low, side="left"))
+        if high is not None:
+            # 最小値が上限以下（上限を含まない場合は上限未満）の最後のパーティション
+            side = "right" if upper_inclusive else "left"
+            last = int(np.searchsorted(self.mins, high, side=side)) - 1
+            if last < 0:
+                return start, start
+            begin, end = self._partition(last)
+            stop = begin + int(np.searchsorted(self.keys[begin:end], high, side=side))
+        return start, max(start, stop)
+
+    def _partition(self, i: int) -> tuple[int, int]:
+        begin = int(self.offsets[i])
+        end = int(self.offsets[i + 1]) if i + 1 < len(self.offsets) else len(self.keys)
+        return begin, end
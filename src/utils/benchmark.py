@@ -0,0 +1,370 @@
+"""
+Benchmark - 繰り返し計測とベースライン比較
+
+責務:
+- 関数の繰り返し計測（中央値・IQR）
+- マシン性能差を吸収するための較正ワークロード
+- ベースライン（JSON）の保存・読み込み
+- ベースラインとの比較による回帰判定
+- 入力サイズに対する計算量（スケーリング指数）の推定
+
+ベースラインには「中央値 ÷ 較正ワークロードの中央値」で正規化した値を保存する。
+CI ランナーと開発機のように速度が異なる環境でも、同じベースラインと比較できる。
+"""
+
+import gc
+import json
+import statistics
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# 1ラウンドあたりの最小計測時間（これより短い処理は内側で複数回実行する）
+MIN_ROUND_SECONDS = 0.01
+
+BASELINE_SCHEMA_VERSION = 1
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    1ケースの計測結果
+
+    Attributes:
+        name: ケース名
+        samples: 各ラウンドの1回あたり実行時間（秒）
+        number: 1ラウンド内の実行回数
+        calibration: 直前に計測した較正ワークロードの中央値（秒、0 なら未較正）
+    """
+
+    name: str
+    samples: list[float]
+    number: int = 1
+    calibration: float = 0.0
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def q1(self) -> float:
+        return _quantile(self.samples, 0.25)
+
+    @property
+    def q3(self) -> float:
+        return _quantile(self.samples, 0.75)
+
+    @property
+    def iqr(self) -> float:
+        return self.q3 - self.q1
+
+    @property
+    def normalized(self) -> float:
+        """較正ワークロードに対する相対値（未較正なら秒のまま）"""
+        if self.calibration <= 0:
+            return self.median
+        return self.median / self.calibration
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "median": self.median,
+            "iqr": self.iqr,
+            "normalized": self.normalized,
+            "rounds": len(self.samples),
+            "number": self.number,
+        }
+
+
+@dataclass
+class Comparison:
+    """ベースラインとの比較結果"""
+
+    name: str
+    current: float
+    baseline: float | None
+    change_pct: float | None
+    status: str  # "ok" / "regression" / "improved" / "new"
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    計測ケース
+
+    setup の戻り値が func に渡される。setup は計測対象に含まれない。
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    setup: Callable[[], Any] = field(default=lambda: None)
+
+
+def _quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _autorange(func: Callable[[], Any], min_seconds: float) -> int:
+    """1ラウンドが min_seconds 以上になる実行回数を求める"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_seconds / 10 else 2
+
+
+def measure(
+    func: Callable[[], Any],
+    name: str = "",
+    rounds: int = 7,
+    warmup: int = 1,
+    min_round_seconds: float = MIN_ROUND_SECONDS,
+) -> BenchmarkResult:
+    """
+    関数を繰り返し実行して計測する
+
+    Args:
+        func: 計測対象（引数なし）
+        name: ケース名
+        rounds: 計測ラウンド数
+        warmup: 計測前の空実行回数
+        min_round_seconds: 1ラウンドの最小時間（短い処理は内側で繰り返す）
+
+    Returns:
+        BenchmarkResult: 各ラウンドの1回あたり時間
+
+    Raises:
+        ValueError: rounds が 1 未満の場合
+    """
+    if rounds < 1:
+        raise ValueError("rounds は 1 以上で指定してください")
+
+    for _ in range(warmup):
+        func()
+    number = _autorange(func, min_round_seconds) if min_round_seconds > 0 else 1
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return BenchmarkResult(name=name, samples=samples, number=number)
+
+
+def run_case(
+    case: BenchmarkCase, rounds: int = 7, warmup: int = 1, calibration_rounds: int = 3
+) -> BenchmarkResult:
+    """
+    BenchmarkCase を計測する
+
+    setup は1回だけ実行する。計測の直前に較正ワークロードも計測し、
+    長時間のスイート実行中に起きるマシン速度の変動を正規化値から除く。
+    calibration_rounds=0 の場合は較正しない。
+    """
+    state = case.setup()
+    result = measure(lambda: case.func(state), name=case.name, rounds=rounds, warmup=warmup)
+    if calibration_rounds > 0:
+        result.calibration = calibrate(rounds=calibration_rounds)
+    return result
+
+
+def _calibration_workload() -> None:
+    # インタプリタ処理と numpy のメモリアクセスを半々程度含む固定ワークロード
+    values = [(i * 7919) % 10007 for i in range(100_000)]
+    values.sort()
+    sum(values)
+    array = np.arange(500_000, dtype=np.float64)
+    np.sort((array * 7919.0) % 10007.0)
+    array.cumsum()
+
+
+def calibrate(rounds: int = 7) -> float:
+    """較正ワークロードの中央値（秒）を返す"""
+    return measure(_calibration_workload, name="calibration", rounds=rounds, warmup=1).median
+
+
+def compare(
+    results: Iterable[BenchmarkResult],
+    baselines: dict[str, float],
+    threshold_pct: float = 25.0,
+) -> list[Comparison]:
+    """
+    正規化した計測値をベースラインと比較する
+
+    Args:
+        results: 計測結果（run_case で較正済みのもの）
+        baselines: ケース名 → 正規化済みベースライン
+        threshold_pct: 回帰・改善とみなす変化率（%）
+
+    Returns:
+        list[Comparison]: 結果と同じ順序の比較結果
+    """
+    comparisons = []
+    for result in results:
+        current = result.normalized
+        baseline = baselines.get(result.name)
+        if baseline is None or baseline <= 0:
+            comparisons.append(Comparison(result.name, current, None, None, "new"))
+            continue
+        change_pct = (current - baseline) / baseline * 100.0
+        if change_pct > threshold_pct:
+            status = "regression"
+        elif change_pct < -threshold_pct:
+            status = "improved"
+        else:
+            status = "ok"
+        comparisons.append(Comparison(result.name, current, baseline, change_pct, status))
+    return comparisons
+
+
+@dataclass
+class ScalingFit:
+    """
+    time ≈ coefficient × size^exponent の当てはめ結果
+
+    Attributes:
+        name: 対象名
+        exponent: スケーリング指数（1.0 で線形、2.0 で二乗）
+        coefficient: 係数（秒）
+        r_squared: 両対数空間での決定係数
+        sizes: 当てはめに使ったサイズ
+    """
+
+    name: str
+    exponent: float
+    coefficient: float
+    r_squared: float
+    sizes: list[int] = field(default_factory=list)
+
+
+def fit_scaling_exponent(
+    sizes: Iterable[int], seconds: Iterable[float], name: str = ""
+) -> ScalingFit:
+    """
+    両対数空間の最小二乗で経験的なスケーリング指数を求める
+
+    Args:
+        sizes: 入力サイズ（行数など）
+        seconds: 各サイズの計測時間
+        name: 対象名
+
+    Returns:
+        ScalingFit: 当てはめ結果
+
+    Raises:
+        ValueError: 異なるサイズが2点未満、または値が正でない場合
+    """
+    size_list = [int(size) for size in sizes]
+    time_list = [float(value) for value in seconds]
+    if len(size_list) != len(time_list):
+        raise ValueError("sizes と seconds の長さが一致しません")
+    if len(set(size_list)) < 2:
+        raise ValueError("スケーリング指数の推定には異なるサイズが2点以上必要です")
+    if min(size_list) <= 0 or min(time_list) <= 0:
+        raise ValueError("sizes と seconds は正の値で指定してください")
+
+    log_sizes = np.log(np.asarray(size_list, dtype=np.float64))
+    log_times = np.log(np.asarray(time_list, dtype=np.float64))
+    exponent, intercept = np.polyfit(log_sizes, log_times, 1)
+    predicted = exponent * log_sizes + intercept
+    residual = float(np.sum((log_times - predicted) ** 2))
+    total = float(np.sum((log_times - log_times.mean()) ** 2))
+    r_squared = 1.0 - residual / total if total > 0 else 1.0
+    return ScalingFit(
+        name=name,
+        exponent=float(exponent),
+        coefficient=float(np.exp(intercept)),
+        r_squared=r_squared,
+        sizes=size_list,
+    )
+
+
+def log_spaced_sizes(min_size: int, max_size: int, points_per_decade: int = 2) -> list[int]:
+    """
+    min_size から max_size まで対数等間隔のサイズ列を作る（両端を含む）
+
+    Raises:
+        ValueError: 範囲または points_per_decade が不正な場合
+    """
+    if min_size < 1 or max_size < min_size:
+        raise ValueError("サイズの範囲が不正です")
+    if points_per_decade < 1:
+        raise ValueError("points_per_decade は 1 以上で指定してください")
+    decades = np.log10(max_size / min_size)
+    count = max(int(round(decades * points_per_decade)) + 1, 2)
+    sizes = np.logspace(np.log10(min_size), np.log10(max_size), count)
+    return sorted({int(round(size)) for size in sizes})
+
+
+def load_baselines(path: Path) -> dict[str, float]:
+    """ベースラインファイルを読み込む（存在しなければ空）"""
+    if not path.exists():
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if payload.get("version") != BASELINE_SCHEMA_VERSION:
+        raise ValueError(f"未対応のベースライン形式です: {payload.get('version')}")
+    return {name: float(value) for name, value in payload["benchmarks"].items()}
+
+
+def save_baselines(
+    path: Path, results: Iterable[BenchmarkResult], merge: bool = True
+) -> dict[str, float]:
+    """
+    計測結果を正規化してベースラインファイルに保存する
+
+    merge=True の場合、今回計測していないケースの既存値は残す。
+    """
+    baselines = load_baselines(path) if merge else {}
+    for result in results:
+        baselines[result.name] = round(result.normalized, 6)
+    payload = {
+        "version": BASELINE_SCHEMA_VERSION,
+        "unit": "median / calibration",
+        "benchmarks": dict(sorted(baselines.items())),
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return baselines
+
+
+def format_report(results: list[BenchmarkResult], comparisons: list[Comparison]) -> str:
+    """計測結果と比較を表形式の文字列にする"""
+    lines = [
+        f"{'benchmark':<40} {'median':>10} {'iqr':>10} {'vs base':>9}  status",
+        "-" * 82,
+    ]
+    for result, comparison in zip(results, comparisons):
+        change = "-" if comparison.change_pct is None else f"{comparison.change_pct:+.1f}%"
+        lines.append(
+            f"{result.name:<40} {_format_seconds(result.median):>10} "
+            f"{_format_seconds(result.iqr):>10} {change:>9}  {comparison.status}"
+        )
+    return "\n".join(lines)
+
+
+def _format_seconds(value: float) -> str:
+    if value >= 1.0:
+        return f"{value:.3f}s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value * 1e6:.1f}us"
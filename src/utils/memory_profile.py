@@ -0,0 +1,220 @@
+"""
+MemoryProfile - 処理段階ごとのピークメモリ計測
+
+責務:
+- tracemalloc による Python ヒープのピーク・保持量の段階別計測
+- プロセス RSS の段階別増分（バックグラウンドでのサンプリング）
+- ピークを引き起こした段階の特定と表形式レポート
+
+RSS は解放後もアロケータが OS に返さないことが多いため、後半の段階の
+RSS 増分は小さく出やすい。ヒープ側（tracemalloc）と合わせて判断すること。
+"""
+
+import os
+import threading
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# RSS サンプリング間隔（秒）
+RSS_SAMPLE_INTERVAL = 0.002
+
+_STATM_PATH = "/proc/self/statm"
+
+
+def current_rss() -> int | None:
+    """
+    現在のプロセス RSS（バイト）を返す
+
+    /proc が使えない環境では None を返す。
+    """
+    try:
+        with open(_STATM_PATH, encoding="ascii") as fh:
+            resident_pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class _RssSampler:
+    """段階の実行中に RSS の最大値を記録するスレッド"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL) -> None:
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.peak = current_rss()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self) -> "_RssSampler":
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+@dataclass
+class StageMemory:
+    """
+    1段階のメモリ計測結果（バイト）
+
+    Attributes:
+        stage: 段階名
+        heap_peak: 段階開始時からの Python ヒープ増加のピーク
+        heap_retained: 段階終了時に残ったヒープ増加
+        rss_peak: 段階開始時からの RSS 増加のピーク（計測不可なら None）
+        rss_retained: 段階終了時に残った RSS 増加（計測不可なら None）
+    """
+
+    stage: str
+    heap_peak: int
+    heap_retained: int
+    rss_peak: int | None = None
+    rss_retained: int | None = None
+
+    @property
+    def peak(self) -> int:
+        """ヒープと RSS のうち大きい方のピーク増加"""
+        return max(self.heap_peak, self.rss_peak or 0)
+
+
+@dataclass
+class MemoryReport:
+    """段階別計測結果の集まり"""
+
+    label: str = ""
+    stages: list[StageMemory] = field(default_factory=list)
+
+    @property
+    def peak_stage(self) -> StageMemory | None:
+        """ピーク増加が最大の段階"""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda stage: stage.peak)
+
+    def to_dict(self) -> dict:
+        peak = self.peak_stage
+        return {
+            "label": self.label,
+            "peak_stage": peak.stage if peak else None,
+            "stages": [
+                {
+                    "stage": s.stage,
+                    "heap_peak": s.heap_peak,
+                    "heap_retained": s.heap_retained,
+                    "rss_peak": s.rss_peak,
+                    "rss_retained": s.rss_retained,
+                }
+                for s in self.stages
+            ],
+        }
+
+    def format_table(self) -> str:
+        """段階別の表を文字列にする（ピーク段階に印を付ける）"""
+        peak = self.peak_stage
+        lines = [
+            f"== {self.label} ==" if self.label else "",
+            f"{'stage':<16} {'heap peak':>11} {'heap kept':>11} {'rss peak':>11} {'rss kept':>11}",
+            "-" * 64,
+        ]
+        for stage in self.stages:
+            marker = "  <-- peak" if stage is peak else ""
+            lines.append(
+                f"{stage.stage:<16} {_format_bytes(stage.heap_peak):>11} "
+                f"{_format_bytes(stage.heap_retained):>11} {_format_bytes(stage.rss_peak):>11} "
+                f"{_format_bytes(stage.rss_retained):>11}{marker}"
+            )
+        return "\n".join(line for line in lines if line)
+
+
+class MemoryProfiler:
+    """
+    段階ごとのメモリを計測する
+
+    使い方:
+        with MemoryProfiler("1M rows") as profiler:
+            with profiler.stage("load"):
+                df = load()
+        print(profiler.report.format_table())
+
+    tracemalloc が既に有効な場合はそのまま利用し、終了時も停止しない。
+    """
+
+    def __init__(self, label: str = "", sample_rss: bool = True) -> None:
+        self.report = MemoryReport(label=label)
+        self._sample_rss = sample_rss
+        self._started_tracing = False
+
+    def __enter__(self) -> "MemoryProfiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        1段階を計測する
+
+        Raises:
+            RuntimeError: プロファイラの with ブロック外で呼ばれた場合
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("MemoryProfiler の with ブロック内で使用してください")
+
+        tracemalloc.reset_peak()
+        heap_before = tracemalloc.get_traced_memory()[0]
+        rss_before = current_rss() if self._sample_rss else None
+        sampler = _RssSampler() if rss_before is not None else None
+        try:
+            if sampler is not None:
+                with sampler:
+                    yield
+            else:
+                yield
+        finally:
+            heap_after, heap_peak = tracemalloc.get_traced_memory()
+            rss_peak = rss_retained = None
+            if sampler is not None and sampler.peak is not None:
+                rss_after = current_rss() or sampler.peak
+                rss_peak = max(sampler.peak - rss_before, 0)
+                rss_retained = rss_after - rss_before
+            self.report.stages.append(
+                StageMemory(
+                    stage=name,
+                    heap_peak=max(heap_peak - heap_before, 0),
+                    heap_retained=heap_after - heap_before,
+                    rss_peak=rss_peak,
+                    rss_retained=rss_retained,
+                )
+            )
+
+
+def _format_bytes(value: int | None) -> str:
+    if value is None:
+        return "-"
+    sign = "-" if value < 0 else ""
+    size = float(abs(value))
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{sign}{size:.0f}{unit}" if unit == "B" else f"{sign}{size:.1f}{unit}"
+        size /= 1024
+    return f"{sign}{size:.2f}GB"
@@ -8,11 +8,18 @@ AIGenerator のテスト
 - ワンショット生成（統合）
 """
 
+import threading
 from unittest.mock import Mock
 
 import pytest
 
 from src.services.ai_generator import AIGenerator, GenerationResult
+from src.services.cancellation import (
+    CancellationToken,
+    GenerationCancelledError,
+    PhaseTimeoutError,
+    PhaseTimeouts,
+)
 
 
 class TestAIGeneratorBlueprint:
@@ -379,3 +386,142 @@ def aggregate_all_data(df):
         steps = [call[0] for call in progress_calls]
         assert 1 in steps
         assert 2 in steps
+
+
+class TestAIGeneratorCancellation:
+    """キャンセル・フェーズ別タイムアウトのテスト"""
+
+    CODE_RESPONSE = """
+```python
+def aggregate_all_data(df):
+    return {"kpi": {}}
+```
+
+```html
+<!DOCTYPE html><html><body></body></html>
+```
+"""
+
+    def test_generate_oneshot_cancelled_before_start(self, sample_dataframe):
+        # Given: Token cancelled before generation
+        mock_model = Mock()
+        token = CancellationToken()
+        token.cancel("wrong file")
+        generator = AIGenerator(model=mock_model)
+
+        # When & Then: No model call is made
+        with pytest.raises(GenerationCancelledError, match="wrong file"):
+            generator.generate_oneshot(sample_dataframe, cancel_token=token)
+        mock_model.generate_content.assert_not_called()
+
+    def test_generate_oneshot_cancelled_between_phases(self, sample_dataframe):
+        # Given: Cancellation requested while the blueprint call completes
+        token = CancellationToken()
+
+        def blueprint_then_cancel(prompt):
+            token.cancel()
+            return Mock(text="Blueprint")
+
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = blueprint_then_cancel
+        progress_calls = []
+        generator = AIGenerator(model=mock_model)
+
+        # When & Then: Code generation is never requested
+        with pytest.raises(GenerationCancelledError):
+            generator.generate_oneshot(
+                sample_dataframe,
+                progress_callback=lambda step, message: progress_calls.append(step),
+                cancel_token=token,
+            )
+        assert mock_model.generate_content.call_count == 1
+        assert progress_calls == [1]
+
+    def test_in_flight_model_call_released_on_cancel(self, sample_dataframe):
+        # Given: A model call that hangs
+        release = threading.Event()
+
+        def hanging(prompt):
+            release.wait(10)
+            return Mock(text="late")
+
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = hanging
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        generator = AIGenerator(model=mock_model)
+
+        # When & Then: Caller is released with phase info
+        with pytest.raises(GenerationCancelledError, match="blueprint"):
+            generator.generate_oneshot(sample_dataframe, cancel_token=token)
+        release.set()
+
+    def test_code_phase_timeout(self, sample_dataframe):
+        # Given: Code generation slower than its deadline
+        release = threading.Event()
+        calls = []
+
+        def model_call(prompt):
+            calls.append(prompt)
+            if len(calls) == 2:
+                release.wait(10)
+            return Mock(text="Blueprint")
+
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = model_call
+        generator = AIGenerator(model=mock_model, timeouts=PhaseTimeouts(code=0.05))
+
+        # When & Then: PhaseTimeoutError names the code phase
+        with pytest.raises(PhaseTimeoutError) as excinfo:
+            generator.generate_oneshot(sample_dataframe)
+        release.set()
+        assert excinfo.value.phase == "code"
+
+    def test_aggregation_timeout_skips_repair(self, sample_dataframe):
+        # Given: Aggregation code that runs longer than the deadline
+        mock_model = Mock()
+        py_code = """
+import time
+def aggregate_all_data(df):
+    time.sleep(1)
+    return {}
+"""
+        generator = AIGenerator(model=mock_model, timeouts=PhaseTimeouts(aggregation=0.05))
+
+        # When & Then: Timeout is raised and no repair call is made
+        with pytest.raises(PhaseTimeoutError, match="aggregation"):
+            generator.execute_aggregation(py_code, sample_dataframe)
+        mock_model.generate_content.assert_not_called()
+
+    def test_repair_cancelled_propagates(self, sample_dataframe):
+        # Given: Runtime error whose repair call observes a cancelled token
+        token = CancellationToken()
+
+        def cancel_then_respond(prompt):
+            token.cancel()
+            return Mock(text="```python\ndef aggregate_all_data(df):\n    return {}\n```")
+
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = cancel_then_respond
+        generator = AIGenerator(model=mock_model)
+        bad_code = "def aggregate_all_data(df):\n    raise KeyError('x')"
+
+        # When & Then: Repaired code is not executed after cancellation
+        with pytest.raises(GenerationCancelledError, match="aggregation"):
+            generator.execute_aggregation(bad_code, sample_dataframe, cancel_token=token)
+
+    def test_generate_oneshot_with_timeouts_succeeds(self, sample_dataframe):
+        # Given: Generous deadlines on every phase
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text="Blueprint"),
+            Mock(text=self.CODE_RESPONSE),
+        ]
+        timeouts = PhaseTimeouts(blueprint=5, code=5, repair=5, aggregation=5, assembly=5)
+        generator = AIGenerator(model=mock_model, timeouts=timeouts)
+
+        # When: Generating with an active token
+        result = generator.generate_oneshot(sample_dataframe, cancel_token=CancellationToken())
+
+        # Then: Result produced normally
+        assert result.data == {"kpi": {}}
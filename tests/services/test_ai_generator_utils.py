@@ -1,10 +1,19 @@
+import json
+import re
+from unittest.mock import Mock
+
+import numpy as np
 import pandas as pd
 import pytest
 
 from src.services.ai_generator import (
+    CHART_SAFETY_NET_SCRIPT,
+    DIRECT_VIEW_SCRIPT,
+    AIGenerator,
     _coerce_json_value,
     _format_runtime_error,
     _format_syntax_error,
+    _isoformat_datetime64,
     _safe_fillna,
     _safe_mul,
     _safe_tolist,
@@ -75,6 +84,207 @@ def test_coerce_json_value():
     assert coerced["bytes"] == "hello"
 
 
+def _reference_coerce(value):
+    """要素単位で変換していた従来の実装（一括変換の出力比較用）"""
+    if isinstance(value, dict):
+        return {str(key): _reference_coerce(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_reference_coerce(item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except Exception:
+        pass
+    if isinstance(value, (pd.Series, pd.Index)):
+        return [_reference_coerce(item) for item in value.tolist()]
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return value.total_seconds()
+    if hasattr(value, "item"):
+        try:
+            return value.item()
+        except Exception:
+            pass
+    if hasattr(value, "tolist"):
+        try:
+            return value.tolist()
+        except Exception:
+            pass
+    return value
+
+
+def _datetimes(unit):
+    per_second = {"s": 1, "ms": 10**3, "us": 10**6, "ns": 10**9}[unit]
+    rng = np.random.default_rng(7)
+    ticks = rng.integers(-(2 * 10**9), 2 * 10**9, 200) * per_second
+    ticks[::3] += rng.integers(0, per_second, len(ticks[::3]))
+    if per_second >= 10**6:
+        ticks[1::3] += 1000  # マイクロ秒ちょうどの端数
+    values = ticks.astype(f"datetime64[{unit}]")
+    values[::13] = np.datetime64("NaT")
+    return values
+
+
+COERCION_CASES = {
+    "float_nan": pd.Series([1.5, np.nan, np.inf, -np.inf, -0.0]),
+    "float32": pd.Series(np.array([1.1, np.nan], dtype=np.float32)),
+    "int": pd.Series([-(10**12), 0, 10**12]),
+    "uint": pd.Series(np.arange(3, dtype=np.uint64)),
+    "bool": pd.Series([True, False]),
+    "nullable_int": pd.Series([1, None, 3], dtype="Int64"),
+    "string": pd.Series(["a", None, "c"]),
+    "object": pd.Series(["a", 1, None, np.nan, pd.Timestamp("2024-01-01"), [1, np.nan]]),
+    "category": pd.Series(["a", "b", None], dtype="category"),
+    "timedelta": pd.Series(pd.to_timedelta([1234567891, -1500, None], unit="ns")),
+    "tz_aware": pd.Series(pd.date_range("2024-03-30", periods=5, freq="13h", tz="Europe/Berlin")),
+    "datetime_s": pd.Series(_datetimes("s")),
+    "datetime_ms": pd.Series(_datetimes("ms")),
+    "datetime_us": pd.Index(_datetimes("us")),
+    "datetime_ns": pd.Series(_datetimes("ns")),
+    "datetime_day": pd.Series(np.array(["2024-01-01", "NaT"], dtype="datetime64[D]")),
+    "datetime_far_future": pd.Series(np.array(["12000-01-01T00:00:01"], dtype="datetime64[s]")),
+    "float_index": pd.Index([1.5, np.nan]),
+    "multi_index": pd.MultiIndex.from_tuples([(1, "a"), (2, "b")]),
+    "empty_series": pd.Series([], dtype=float),
+    "single_nan_series": pd.Series([np.nan]),
+    "ndarray": np.array([1.0, 2.0]),
+    "ndarray_2d": np.arange(6).reshape(2, 3),
+    "ndarray_size1_nan": np.array([np.nan]),
+    "ndarray_size1": np.array([3]),
+    "ndarray_0d": np.array(2.5),
+    "ndarray_empty": np.array([]),
+    "numpy_scalars": [
+        np.float64("nan"),
+        np.int64(3),
+        np.bool_(True),
+        np.str_("x"),
+        np.float32(1.5),
+    ],
+    "python_scalars": [1, 1.5, float("nan"), "x", None, True, b"bytes", (1, 2), {3}],
+    "pandas_scalars": [pd.Timestamp("2024-01-01 00:00:00.5"), pd.NaT, pd.Timedelta("1.5s"), pd.NA],
+    "dict_keys": {1: "a", np.int64(2): "b", pd.Timestamp("2024-01-01"): "c", None: "d"},
+}
+
+
+@pytest.mark.parametrize("name", list(COERCION_CASES))
+def test_coerce_json_value_matches_elementwise(name):
+    # Given: Value covering one dtype / container shape
+    value = COERCION_CASES[name]
+
+    # When: Coercing with the bulk encoder and the element-wise reference
+    bulk = json.dumps(_coerce_json_value(value), ensure_ascii=False)
+    reference = json.dumps(_reference_coerce(value), ensure_ascii=False)
+
+    # Then: Byte-identical JSON
+    assert bulk == reference
+
+
+def test_isoformat_datetime64_unsupported_unit():
+    # Given: Day-resolution array (never produced by pandas Series)
+    values = np.array(["2024-01-01"], dtype="datetime64[D]")
+
+    # When & Then: Caller falls back to element-wise conversion
+    assert _isoformat_datetime64(values) is None
+
+
+def test_coerce_json_value_leaves_unsupported_objects():
+    # Given: DataFrame (not JSON serializable, returned unchanged as before)
+    df = pd.DataFrame({"a": [1]})
+
+    # When & Then: Same object comes back
+    assert _coerce_json_value(df) is df
+
+
+def _reference_inject(html_template, json_data):
+    """多パス版の inject_json（単一走査版と出力を比べるための参照実装）"""
+    pattern = r"\{\{\s*JSON_DATA\s*\}\}"
+    if re.search(pattern, html_template):
+        html = re.sub(pattern, lambda _: json_data, html_template)
+    else:
+        var_pattern = r"(const\s+dashboardData\s*=\s*)(.*?)(\s*;)"
+        if re.search(var_pattern, html_template, re.DOTALL):
+            html = re.sub(
+                var_pattern, f"\\1{json_data}\\3", html_template, count=1, flags=re.DOTALL
+            )
+        elif "const dashboardData =" in html_template:
+            html = re.sub(
+                r"const\s+dashboardData\s*=",
+                f"// replaced\nconst dashboardData = {json_data}; //",
+                html_template,
+                count=1,
+            )
+        else:
+            script = f"<script>const dashboardData = {json_data};</script>"
+            if "</body>" in html_template:
+                html = html_template.replace("</body>", f"{script}</body>")
+            else:
+                html = html_template + script
+    for script in (CHART_SAFETY_NET_SCRIPT, DIRECT_VIEW_SCRIPT):
+        if "</body>" in html:
+            html = html.replace("</body>", f"{script}</body>")
+        else:
+            html += script
+    return html
+
+
+INJECTION_TEMPLATES = {
+    "placeholder": "<html><body><script>const d = {{JSON_DATA}};</script></body></html>",
+    "placeholder_spaced": "<body><script>var a = {{ JSON_DATA }}; var b = {{JSON_DATA}};</script>",
+    "placeholder_no_body": "<script>const dashboardData = {{JSON_DATA}};</script>",
+    "declaration": "<body><script>\nconst dashboardData = {\n  old: 1\n} ;\nrun();</script></body>",
+    "declaration_twice": "<script>const  dashboardData={};const dashboardData = [];</script></body>",
+    "declaration_empty": "<script>const dashboardData =   ;</script></body>",
+    "declaration_unterminated": "<body><script>const dashboardData = </script></body>",
+    "declaration_unterminated_loose": "<body><script>const  dashboardData=</script></body>",
+    "no_declaration": "<html><body><div>x</div></body></html>",
+    "no_body": "<div>no body</div>",
+}
+
+
+@pytest.mark.parametrize("name", list(INJECTION_TEMPLATES))
+def test_inject_json_matches_multi_pass(name):
+    # Given: Template exercising one injection path (single </body>, no backslashes)
+    template = INJECTION_TEMPLATES[name]
+    json_data = json.dumps({"売上": [1, 2.5], "地域": "東京"}, ensure_ascii=False)
+
+    # When: Injecting with the single-pass engine and the multi-pass reference
+    result = AIGenerator(model=Mock()).inject_json(template, json_data)
+
+    # Then: Identical output
+    assert result == _reference_inject(template, json_data)
+
+
+def test_inject_json_keeps_backslash_escapes():
+    # Given: JSON with escapes (the regex-template replacement used to expand them)
+    template = "<script>const dashboardData = {};</script>"
+    json_data = json.dumps({"text": 'line1\nline2 "q" \u0001'})
+
+    # When
+    result = AIGenerator(model=Mock()).inject_json(template, json_data)
+
+    # Then: Escapes are embedded verbatim
+    assert f"const dashboardData = {json_data};" in result
+
+
+def test_inject_json_ignores_body_tag_inside_data():
+    # Given: Payload containing a closing body tag
+    template = "<body><script>const dashboardData = {{JSON_DATA}};</script></body>"
+    json_data = json.dumps({"html": "<p></body>"})
+
+    # When
+    result = AIGenerator(model=Mock()).inject_json(template, json_data)
+
+    # Then: Scripts are injected only before the template's own </body>
+    assert f"const dashboardData = {json_data};" in result
+    assert result.count(CHART_SAFETY_NET_SCRIPT) == 1
+    assert result.endswith(DIRECT_VIEW_SCRIPT + "</body>")
+
+
 def test_format_syntax_error():
     # Given: A simulated SyntaxError
     code = "def foo()\n  pass"
@@ -0,0 +1,265 @@
+"""
+AssetBundler のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| AB-N-01    | manifest にある script / stylesheet         | Equivalence       | フィンガープリント付きでインライン化     |
+| AB-N-02    | テンプレートと注入スクリプトの両方で参照    | Equivalence       | テンプレート側に1回だけインライン化      |
+| AB-N-03    | <style> 内の @import と CSS 内の url()      | Equivalence       | CSS を展開し url() は data URI になる    |
+| AB-N-04    | 事前ビルドの Tailwind CSS                   | Equivalence       | 使われているクラスのルールだけ残る       |
+| AB-N-05    | Tailwind の CDN スクリプト                  | Equivalence       | スクリプトとしてインライン化             |
+| AB-N-06    | vendor_assets                               | Equivalence       | 取得したファイルと manifest を書き出す   |
+| AB-N-07    | assets 付きの assemble_html                 | Equivalence       | CDN を参照せずデータはそのまま           |
+| AB-N-08    | 取得元がローカルのファイルパス              | Equivalence       | ファイルを読んで保存する                 |
+| AB-B-01    | manifest にない URL・async                  | Boundary          | CDN の参照のまま残す                     |
+| AB-B-02    | </script> を含むアセット                    | Boundary          | 要素を閉じないようにエスケープ           |
+| AB-B-03    | manifest にあるがファイルがない             | Boundary          | CDN の参照のまま残し警告する             |
+| AB-A-01    | manifest.json がない                        | Abnormal          | ValueError                               |
+"""
+
+import json
+import logging
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.ai_generator import INJECTED_SCRIPTS, AIGenerator
+from src.services.asset_bundler import (
+    MANIFEST_NAME,
+    TAILWIND_CDN_URL,
+    AssetBundler,
+    fingerprint,
+    parse_css,
+    purge_css,
+    vendor_assets,
+)
+
+CHART_URL = "https://cdn.jsdelivr.net/npm/chart.js"
+LUCIDE_URL = "https://unpkg.com/lucide@latest"
+FONT_CSS_URL = "https://fonts.googleapis.com/css2?family=DM+Sans"
+FONT_URL = "https://fonts.gstatic.com/s/dmsans/v1/dm.woff2"
+
+SOURCES = {
+    CHART_URL: "https://cdn.example/chart.umd.min.js",
+    LUCIDE_URL: None,
+    FONT_CSS_URL: None,
+}
+CONTENTS = {
+    "https://cdn.example/chart.umd.min.js": b"window.Chart=function(){};",
+    LUCIDE_URL: b"window.lucide={createIcons:function(){}};",
+    FONT_CSS_URL: f"@font-face{{font-family:'DM Sans';src:url({FONT_URL}) format('woff2')}}".encode(),
+    FONT_URL: b"wOF2",
+}
+
+TAILWIND_CSS = r"""
+*,::before{box-sizing:border-box}
+.p-4{padding:1rem}
+.p-8{padding:2rem}
+.text-sky-400,.text-red-400{color:#38bdf8}
+.hover\:bg-sky-400:hover{background:#38bdf8}
+@media (min-width:768px){.md\:grid-cols-4{grid-template-columns:repeat(4,1fr)}.md\:p-8{padding:2rem}}
+@media (min-width:1536px){.\32xl\:p-4{padding:1rem}}
+@keyframes spin{to{transform:rotate(360deg)}}
+"""
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    vendor_assets(tmp_path, SOURCES, fetch=CONTENTS.__getitem__)
+    return tmp_path
+
+
+def _add_asset(directory, url, name, content):
+    (directory / name).write_text(content, encoding="utf-8")
+    manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    manifest["assets"][url] = name
+    (directory / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+
+
+class TestVendorAssets:
+    """アセットディレクトリ作成のテスト"""
+
+    def test_files_and_manifest_written(self, asset_dir):
+        # Given / When: The fixture vendors the assets (AB-N-06)
+        manifest = json.loads((asset_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+
+        # Then: Nested font URL is vendored too, file names carry the fingerprint
+        assert set(manifest["assets"]) == {CHART_URL, LUCIDE_URL, FONT_CSS_URL, FONT_URL}
+        chart_file = manifest["assets"][CHART_URL]
+        assert chart_file == f"chart.{fingerprint(CONTENTS[SOURCES[CHART_URL]])}.js"
+        assert (asset_dir / chart_file).read_bytes() == CONTENTS[SOURCES[CHART_URL]]
+        assert manifest["assets"][FONT_CSS_URL].endswith(".css")
+        assert manifest["assets"][FONT_URL].endswith(".woff2")
+
+    def test_local_source_read(self, tmp_path):
+        # Given (AB-N-08): A prebuilt Tailwind CSS on disk, as passed by --tailwind-css
+        source = tmp_path / "tailwind.full.css"
+        source.write_text(TAILWIND_CSS, encoding="utf-8")
+
+        # When
+        assets = vendor_assets(tmp_path / "vendor", {TAILWIND_CDN_URL: str(source)})
+
+        # Then
+        saved = tmp_path / "vendor" / assets[TAILWIND_CDN_URL]
+        assert saved.suffix == ".css"
+        assert saved.read_text(encoding="utf-8") == TAILWIND_CSS
+
+
+class TestBundle:
+    """インライン化のテスト"""
+
+    def test_script_and_stylesheet_inlined(self, asset_dir):
+        # Given (AB-N-01)
+        bundler = AssetBundler(asset_dir)
+        html = f'<script src="{CHART_URL}"></script><link rel="stylesheet" href="{FONT_CSS_URL}">'
+
+        # When
+        bundled = bundler.bundle(html)
+
+        # Then
+        chart = bundler.resolve(CHART_URL)
+        assert bundled.startswith(
+            f'<script data-asset="{chart.file}" data-fingerprint="{chart.fingerprint}">'
+            "window.Chart=function(){};</script><style "
+        )
+        assert CHART_URL not in bundled
+        assert "url(data:font/woff2;base64,d09GMg==)" in bundled
+
+    def test_shared_asset_inlined_once(self, asset_dir):
+        # Given (AB-N-02)
+        bundler = AssetBundler(asset_dir)
+        template = f'<head><script src="{LUCIDE_URL}"></script></head><body></body>'
+
+        # When
+        bundled_template, scripts = bundler.bundle_template(template, INJECTED_SCRIPTS)
+
+        # Then
+        assert "window.lucide=" in bundled_template
+        assert LUCIDE_URL not in scripts
+        assert "window.lucide=" not in scripts
+        assert "Safety Net" in scripts
+
+    def test_css_import_inlined(self, asset_dir):
+        # Given (AB-N-03)
+        bundler = AssetBundler(asset_dir)
+        html = f"<style>@import url('{FONT_CSS_URL}');\nbody{{margin:0}}</style>"
+
+        # When
+        bundled = bundler.bundle(html)
+
+        # Then
+        assert bundled.startswith("<style>@font-face{font-family:'DM Sans';src:url(data:")
+        assert bundled.endswith("body{margin:0}</style>")
+
+    def test_unknown_and_async_untouched(self, asset_dir):
+        # Given (AB-B-01)
+        html = (
+            '<script src="https://example.com/x.js"></script>'
+            f'<script async src="{CHART_URL}"></script><link rel="icon" href="{FONT_CSS_URL}">'
+        )
+
+        # When / Then
+        assert AssetBundler(asset_dir).bundle(html) == html
+
+    def test_closing_tag_escaped(self, asset_dir):
+        # Given (AB-B-02)
+        _add_asset(asset_dir, "https://example.com/x.js", "x.js", "var s='</script>';")
+
+        # When
+        bundled = AssetBundler(asset_dir).bundle('<script src="https://example.com/x.js"></script>')
+
+        # Then
+        assert "var s='<\\/script>';</script>" in bundled
+
+    def test_missing_file_falls_back_to_cdn(self, asset_dir, caplog):
+        # Given (AB-B-03)
+        bundler = AssetBundler(asset_dir)
+        (asset_dir / bundler.manifest[CHART_URL]).unlink()
+        html = f'<script src="{CHART_URL}"></script>'
+
+        # When
+        with caplog.at_level(logging.WARNING, logger="src.services.asset_bundler"):
+            bundled = bundler.bundle(html)
+
+        # Then
+        assert bundled == html
+        assert "アセットを読み込めません" in caplog.text
+
+    def test_missing_manifest(self, tmp_path):
+        # Given / When / Then (AB-A-01)
+        with pytest.raises(ValueError):
+            AssetBundler(tmp_path)
+
+
+class TestTailwind:
+    """Tailwind の置き換えのテスト"""
+
+    def test_prebuilt_css_purged(self, asset_dir):
+        # Given (AB-N-04)
+        _add_asset(asset_dir, TAILWIND_CDN_URL, "tailwind.css", TAILWIND_CSS)
+        html = (
+            f'<script src="{TAILWIND_CDN_URL}"></script>'
+            '<div class="p-4 md:grid-cols-4 hover:bg-sky-400 2xl:p-4">'
+            "<script>el.classList.add('text-sky-400')</script></div>"
+        )
+
+        # When
+        bundled = AssetBundler(asset_dir).bundle(html)
+
+        # Then
+        assert TAILWIND_CDN_URL not in bundled
+        assert "*,::before{box-sizing:border-box}.p-4{padding:1rem}" in bundled
+        assert ".text-sky-400{color:#38bdf8}" in bundled
+        assert r".hover\:bg-sky-400:hover" in bundled
+        assert r"@media (min-width:768px){.md\:grid-cols-4" in bundled
+        assert r".\32xl\:p-4" in bundled
+        assert ".p-8" not in bundled
+        assert "md\\:p-8" not in bundled
+        assert "@keyframes spin" in bundled
+        assert "window.tailwind=window.tailwind||{}" in bundled
+
+    def test_cdn_script_inlined(self, asset_dir):
+        # Given (AB-N-05)
+        _add_asset(asset_dir, TAILWIND_CDN_URL, "tailwind.js", "window.tailwind={};")
+
+        # When
+        bundled = AssetBundler(asset_dir).bundle(f'<script src="{TAILWIND_CDN_URL}"></script>')
+
+        # Then
+        assert bundled == (
+            f'<script data-asset="tailwind.js" data-fingerprint="{fingerprint(b"window.tailwind={};")}">'
+            "window.tailwind={};</script>"
+        )
+
+    def test_purge_keeps_only_matching_selectors(self):
+        # Given
+        nodes = parse_css(".a,.b{color:red}.a.c{color:blue}")
+
+        # When / Then
+        assert purge_css(nodes, {"a"}) == ".a{color:red}"
+        assert purge_css(nodes, {"a", "b", "c"}) == ".a,.b{color:red}.a.c{color:blue}"
+
+
+class TestAssembleHtmlAssets:
+    """assemble_html への組み込みのテスト"""
+
+    def test_offline_dashboard(self, asset_dir):
+        # Given (AB-N-07)
+        generator = AIGenerator(
+            model=Mock(), assets=AssetBundler(asset_dir), optimize_output=True, prune_payload=False
+        )
+        template = (
+            f'<html><head><script src="{CHART_URL}"></script>'
+            f'<link href="{FONT_CSS_URL}" rel="stylesheet"></head>'
+            "<body><script>const dashboardData = {{JSON_DATA}};</script></body></html>"
+        )
+
+        # When
+        html = generator.assemble_html(template, {"url": LUCIDE_URL})
+
+        # Then: No CDN reference remains except inside the embedded data
+        assert "src=" not in html
+        assert "<link" not in html
+        assert f'const dashboardData={{"url": "{LUCIDE_URL}"}};' in html
+        assert html.count("window.lucide=") == 1
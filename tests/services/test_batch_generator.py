@@ -0,0 +1,302 @@
+"""
+BatchGenerator のテスト
+
+責務:
+- CSV収集とジョブ計画
+- 逐次・プロセスプールでの一括生成
+- レジューム
+- モデル同時呼び出し数の制限
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.batch_generator import (
+    STATE_FILE_NAME,
+    SUMMARY_FILE_NAME,
+    BatchConfig,
+    ThrottledModel,
+    discover_csv_files,
+    load_completed,
+    plan_jobs,
+    run_batch,
+)
+from src.services.cancellation import PhaseTimeouts
+
+CODE_RESPONSE = """
+```python
+def aggregate_all_data(df):
+    return {"kpi": {"rows": len(df), "total": int(df["売上"].sum())}}
+```
+
+```html
+<!DOCTYPE html><html><body><script>const dashboardData = {{JSON_DATA}};</script></body></html>
+```
+"""
+
+
+class FakeModel:
+    """Phase1 には Blueprint、Phase2 にはコードを返すモデル"""
+
+    def generate_content(self, prompt):
+        if "aggregate_all_data" in prompt:
+            return SimpleNamespace(text=CODE_RESPONSE)
+        return SimpleNamespace(text="Blueprint")
+
+
+class TimeoutRecordingModel(FakeModel):
+    """generate_content の timeout を受け付け、渡された値を記録するモデル"""
+
+    supports_timeout = True
+
+    def __init__(self):
+        self.timeouts = []
+
+    def generate_content(self, prompt, timeout=None):
+        self.timeouts.append(timeout)
+        return super().generate_content(prompt)
+
+
+class FailingModel:
+    def generate_content(self, prompt):
+        raise RuntimeError("quota exceeded")
+
+
+def fake_model_factory(model_name):
+    return FakeModel()
+
+
+def failing_model_factory(model_name):
+    return FailingModel()
+
+
+@pytest.fixture
+def csv_dir(tmp_path, sample_csv_utf8):
+    source = tmp_path / "in"
+    (source / "nested").mkdir(parents=True)
+    (source / "store_a.csv").write_text(sample_csv_utf8, encoding="utf-8")
+    (source / "store_b.csv").write_text(sample_csv_utf8, encoding="utf-8")
+    (source / "nested" / "store_a.csv").write_text(sample_csv_utf8, encoding="utf-8")
+    (source / "notes.txt").write_text("ignored", encoding="utf-8")
+    return source
+
+
+class TestDiscovery:
+    """CSV収集・ジョブ計画のテスト"""
+
+    def test_discover_directory_glob_and_file(self, csv_dir):
+        # Given: Directory, recursive glob and explicit file inputs (overlapping)
+        inputs = [str(csv_dir), str(csv_dir / "**" / "*.csv"), str(csv_dir / "store_a.csv")]
+
+        # When: Discovering
+        files = discover_csv_files(inputs)
+
+        # Then: Unique, sorted CSV files only
+        assert [f.name for f in files] == ["store_a.csv", "store_a.csv", "store_b.csv"]
+        assert len(set(files)) == 3
+
+    def test_discover_nothing(self, tmp_path):
+        # Given: Pattern that matches nothing
+        # When & Then: Empty list
+        assert discover_csv_files([str(tmp_path / "*.csv")]) == []
+
+    def test_plan_jobs_disambiguates_duplicate_stems(self, csv_dir, tmp_path):
+        # Given: Two files named store_a.csv
+        files = discover_csv_files([str(csv_dir / "**" / "*.csv")])
+
+        # When: Planning jobs
+        jobs = plan_jobs(files, tmp_path / "out")
+
+        # Then: Output stems are unique and stable
+        assert sorted(job.output_stem for job in jobs) == ["store_a", "store_a-2", "store_b"]
+
+
+class TestRunBatch:
+    """一括生成のテスト"""
+
+    def test_sequential_generates_outputs_and_summary(self, csv_dir, tmp_path):
+        # Given: Sequential mode with a fake model
+        out = tmp_path / "out"
+        config = BatchConfig(inputs=[str(csv_dir)], output_dir=out, workers=0)
+
+        # When: Running the batch
+        report = run_batch(config, model_factory=fake_model_factory)
+
+        # Then: HTML/JSON written per file, timings recorded, summary saved
+        assert report.succeeded == 2
+        data = json.loads((out / "store_a.json").read_text(encoding="utf-8"))
+        assert data == {"kpi": {"rows": 5, "total": 65000}}
+        assert '"total": 65000' in (out / "store_b.html").read_text(encoding="utf-8")
+        timings = report.results[0].timings
+        assert {"load", "blueprint", "code", "aggregation", "assembly", "total"} <= set(timings)
+        summary = json.loads((out / SUMMARY_FILE_NAME).read_text(encoding="utf-8"))
+        assert summary["succeeded"] == 2
+        assert "store_a.csv" in report.format_table()
+
+    def test_phase_timeouts_reach_model(self, csv_dir, tmp_path):
+        # Given: A model that accepts request timeouts, behind the batch throttle
+        models = []
+
+        def factory(model_name):
+            models.append(TimeoutRecordingModel())
+            return models[-1]
+
+        config = BatchConfig(
+            inputs=[str(csv_dir / "store_b.csv")],
+            output_dir=tmp_path / "out",
+            workers=0,
+            timeouts=PhaseTimeouts(blueprint=5.0, code=7.0),
+        )
+
+        # When: Running the batch
+        report = run_batch(config, model_factory=factory)
+
+        # Then: Each model request carries its phase deadline
+        assert report.succeeded == 1
+        assert models[0].timeouts == [5.0, 7.0]
+
+    def test_resume_skips_completed_files(self, csv_dir, tmp_path):
+        # Given: A completed first run
+        out = tmp_path / "out"
+        config = BatchConfig(inputs=[str(csv_dir)], output_dir=out, workers=0)
+        run_batch(config, model_factory=fake_model_factory)
+
+        # When: Re-running after one source changed
+        (csv_dir / "store_b.csv").write_text("日付,売上\n2024-01-01,1\n", encoding="utf-8")
+        seen = []
+        report = run_batch(config, model_factory=fake_model_factory, on_result=seen.append)
+
+        # Then: Unchanged file skipped, changed file regenerated
+        statuses = {Path(r.source).name: r.status for r in report.results}
+        assert statuses == {"store_a.csv": "skipped", "store_b.csv": "ok"}
+        assert len(seen) == 2
+
+    def test_resume_regenerates_when_output_missing(self, csv_dir, tmp_path):
+        # Given: Completed run whose HTML output was deleted
+        out = tmp_path / "out"
+        config = BatchConfig(inputs=[str(csv_dir)], output_dir=out, workers=0)
+        run_batch(config, model_factory=fake_model_factory)
+        (out / "store_a.html").unlink()
+
+        # When: Re-running
+        report = run_batch(config, model_factory=fake_model_factory)
+
+        # Then: Only the incomplete file is regenerated
+        assert report.succeeded == 1
+        assert report.skipped == 1
+
+    def test_no_resume_regenerates_everything(self, csv_dir, tmp_path):
+        # Given: Completed run
+        out = tmp_path / "out"
+        config = BatchConfig(inputs=[str(csv_dir)], output_dir=out, workers=0)
+        run_batch(config, model_factory=fake_model_factory)
+
+        # When: Re-running with resume disabled
+        config.resume = False
+        report = run_batch(config, model_factory=fake_model_factory)
+
+        # Then: Nothing skipped
+        assert report.skipped == 0
+        assert report.succeeded == 2
+
+    def test_failures_are_reported_not_raised(self, csv_dir, tmp_path):
+        # Given: Model that always fails
+        out = tmp_path / "out"
+        config = BatchConfig(inputs=[str(csv_dir)], output_dir=out, workers=0)
+
+        # When: Running
+        report = run_batch(config, model_factory=failing_model_factory)
+
+        # Then: Errors recorded with message, not marked completed
+        assert report.failed == 2
+        assert "RuntimeError: quota exceeded" in report.results[0].error
+        assert load_completed(out) == {}
+        assert report.to_dict()["median_total"] is None
+
+    def test_no_input_files_raises(self, tmp_path):
+        # Given: Empty input directory
+        config = BatchConfig(inputs=[str(tmp_path)], output_dir=tmp_path / "out", workers=0)
+
+        # When & Then: ValueError
+        with pytest.raises(ValueError, match="CSVファイルが見つかりません"):
+            run_batch(config, model_factory=fake_model_factory)
+
+    def test_process_pool(self, csv_dir, tmp_path):
+        # Given: Two worker processes
+        out = tmp_path / "out"
+        config = BatchConfig(
+            inputs=[str(csv_dir / "**" / "*.csv")], output_dir=out, workers=2, max_model_calls=1
+        )
+
+        # When: Running
+        report = run_batch(config, model_factory=fake_model_factory)
+
+        # Then: All files generated in input order
+        assert report.succeeded == 3
+        assert [r.status for r in report.results] == ["ok", "ok", "ok"]
+        assert (out / "store_a-2.html").exists()
+
+
+class TestLoadCompleted:
+    """状態ファイル読み込みのテスト"""
+
+    def test_ignores_truncated_lines(self, tmp_path):
+        # Given: State file with a truncated last line
+        (tmp_path / STATE_FILE_NAME).write_text(
+            '{"source": "a.csv", "status": "ok", "fingerprint": "1-2"}\n'
+            '{"source": "b.csv", "status": "error", "fingerprint": "3-4"}\n'
+            '{"source": "c.csv", "sta',
+            encoding="utf-8",
+        )
+
+        # When & Then: Only successful entries are returned
+        assert load_completed(tmp_path) == {"a.csv": "1-2"}
+
+
+class TestThrottledModel:
+    """モデル同時呼び出し数制限のテスト"""
+
+    def test_limits_concurrent_calls(self):
+        # Given: Model that tracks concurrency, limited to 2 concurrent calls
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        class SlowModel:
+            def generate_content(self, prompt):
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                time.sleep(0.02)
+                with lock:
+                    state["active"] -= 1
+                return prompt
+
+        model = ThrottledModel(SlowModel(), threading.BoundedSemaphore(2))
+
+        # When: Calling from 6 threads
+        threads = [threading.Thread(target=model.generate_content, args=("p",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Then: Never more than 2 in flight
+        assert state["peak"] <= 2
+
+    def test_forwards_timeout(self):
+        # Given: A wrapped model that accepts timeouts and one that does not
+        inner = TimeoutRecordingModel()
+        model = ThrottledModel(inner, threading.BoundedSemaphore(1))
+
+        # When
+        model.generate_content("p", timeout=3.0)
+
+        # Then
+        assert inner.timeouts == [3.0]
+        assert model.supports_timeout is True
+        assert ThrottledModel(FakeModel(), threading.Semaphore(1)).supports_timeout is False
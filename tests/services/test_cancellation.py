@@ -0,0 +1,199 @@
+"""
+キャンセル・フェーズ別タイムアウトのテスト
+
+観点表:
+| Case ID    | Input / Precondition                 | Perspective       | Expected Result                   |
+| ---------- | ------------------------------------ | ----------------- | --------------------------------- |
+| CAN-N-01   | トークン・期限なし                   | Equivalence       | 呼び出し元スレッドで実行される    |
+| CAN-N-02   | 期限内に完了                         | Equivalence       | 戻り値が返る                      |
+| CAN-A-01   | 実行中にキャンセル                   | Abnormal          | 即座に GenerationCancelledError   |
+| CAN-A-02   | 期限超過                             | Abnormal          | PhaseTimeoutError（phase 付き）   |
+| CAN-A-03   | func が例外を送出                    | Abnormal          | 同じ例外が再送出される            |
+| CAN-B-01   | 開始前にキャンセル済み               | Boundary          | func は呼ばれない                 |
+| CAN-B-02   | timeout=0                            | Boundary - 0      | 即座に PhaseTimeoutError          |
+| CAN-N-03   | フェーズの期限 + GenAIModelAdapter   | Equivalence       | HTTP タイムアウト（ミリ秒）が付く |
+| CAN-B-03   | 期限のないフェーズ                   | Boundary          | HTTP タイムアウトを付けない       |
+"""
+
+import threading
+import time
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from src.services.ai_generator import AIGenerator
+from src.services.cancellation import (
+    CancellationToken,
+    GenerationCancelledError,
+    PhaseTimeoutError,
+    PhaseTimeouts,
+    run_with_deadline,
+)
+from src.services.genai_adapter import GenAIModelAdapter
+
+
+class TestCancellationToken:
+    """CancellationToken のテスト"""
+
+    def test_cancel_sets_state_and_reason(self):
+        # Given: A fresh token
+        token = CancellationToken()
+        assert not token.cancelled
+
+        # When: Cancelling with a reason twice
+        token.cancel("wrong file")
+        token.cancel("ignored")
+
+        # Then: First reason is kept
+        assert token.cancelled
+        assert token.reason == "wrong file"
+        assert token.wait(0) is True
+
+    def test_raise_if_cancelled_message(self):
+        # Given: Cancelled token
+        token = CancellationToken()
+        token.cancel("stop")
+
+        # When & Then: Error carries phase and reason
+        with pytest.raises(GenerationCancelledError, match=r"phase: code.*stop") as excinfo:
+            token.raise_if_cancelled("code")
+        assert excinfo.value.phase == "code"
+
+    def test_raise_if_cancelled_noop(self):
+        # Given: Active token
+        token = CancellationToken()
+
+        # When & Then: No error
+        token.raise_if_cancelled("code")
+
+
+class TestPhaseTimeouts:
+    """PhaseTimeouts のテスト"""
+
+    def test_for_phase(self):
+        # Given: Timeouts with a single phase configured
+        timeouts = PhaseTimeouts(aggregation=5.0)
+
+        # When & Then: Configured, unconfigured and unknown phases
+        assert timeouts.for_phase("aggregation") == 5.0
+        assert timeouts.for_phase("blueprint") is None
+        assert timeouts.for_phase("unknown") is None
+
+
+class TestRunWithDeadline:
+    """run_with_deadline のテスト"""
+
+    def test_runs_inline_without_token_and_timeout(self):
+        # Given: No deadline and no token
+        caller = threading.get_ident()
+
+        # When: Running
+        result = run_with_deadline(threading.get_ident, phase="blueprint")
+
+        # Then: Executed on caller thread (CAN-N-01)
+        assert result == caller
+
+    def test_returns_value_within_deadline(self):
+        # Given: A fast function
+        func = Mock(return_value="ok")
+
+        # When: Running with a generous timeout
+        result = run_with_deadline(func, "a", phase="code", timeout=5.0, key="v")
+
+        # Then: Value returned and arguments forwarded (CAN-N-02)
+        assert result == "ok"
+        func.assert_called_once_with("a", key="v")
+
+    def test_cancel_releases_caller_promptly(self):
+        # Given: A call that blocks for a long time
+        token = CancellationToken()
+        release = threading.Event()
+
+        def slow():
+            release.wait(10)
+            return "late"
+
+        threading.Timer(0.05, token.cancel, args=("user",)).start()
+
+        # When: Cancelled while waiting
+        start = time.perf_counter()
+        with pytest.raises(GenerationCancelledError, match="user"):
+            run_with_deadline(slow, phase="blueprint", token=token)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+        # Then: Caller released well before the call finishes (CAN-A-01)
+        assert elapsed < 2.0
+
+    def test_timeout_raises_phase_timeout(self):
+        # Given: A call slower than the deadline
+        release = threading.Event()
+
+        # When & Then: PhaseTimeoutError with phase info (CAN-A-02)
+        with pytest.raises(PhaseTimeoutError, match="aggregation") as excinfo:
+            run_with_deadline(release.wait, 10, phase="aggregation", timeout=0.05)
+        release.set()
+        assert excinfo.value.phase == "aggregation"
+        assert excinfo.value.timeout == 0.05
+        assert isinstance(excinfo.value, TimeoutError)
+
+    def test_zero_timeout(self):
+        # Given: timeout=0 (CAN-B-02)
+        release = threading.Event()
+
+        # When & Then: Times out immediately
+        with pytest.raises(PhaseTimeoutError):
+            run_with_deadline(release.wait, 10, phase="code", timeout=0)
+        release.set()
+
+    def test_reraises_function_error(self):
+        # Given: A failing function
+        def boom():
+            raise KeyError("missing")
+
+        # When & Then: Same exception type surfaces (CAN-A-03)
+        with pytest.raises(KeyError, match="missing"):
+            run_with_deadline(boom, phase="aggregation", token=CancellationToken())
+
+    def test_already_cancelled_skips_call(self):
+        # Given: Token cancelled before start (CAN-B-01)
+        token = CancellationToken()
+        token.cancel()
+        func = Mock()
+
+        # When & Then: Raises without calling func
+        with pytest.raises(GenerationCancelledError):
+            run_with_deadline(func, phase="code", token=token)
+        func.assert_not_called()
+
+
+class TestModelRequestTimeout:
+    """モデル呼び出しの HTTP タイムアウトのテスト"""
+
+    def test_phase_timeout_passed_to_request(self):
+        # Given: An adapter over a mock client and a blueprint deadline (CAN-N-03)
+        client = Mock()
+        client.models.generate_content.return_value = Mock(text="blueprint")
+        adapter = GenAIModelAdapter(client, model_name="m")
+        generator = AIGenerator(model=adapter, timeouts=PhaseTimeouts(blueprint=2.5))
+
+        # When
+        generator.generate_blueprint(pd.DataFrame({"a": [1]}))
+
+        # Then: The request carries the same deadline in milliseconds
+        config = client.models.generate_content.call_args.kwargs["config"]
+        assert config.http_options.timeout == 2500
+
+    def test_no_timeout_without_deadline(self):
+        # Given: No deadline for the phase (CAN-B-03)
+        client = Mock()
+        client.models.generate_content.return_value = Mock(text="blueprint")
+        generator = AIGenerator(model=GenAIModelAdapter(client, model_name="m"))
+
+        # When
+        generator.generate_blueprint(pd.DataFrame({"a": [1]}))
+
+        # Then
+        client.models.generate_content.assert_called_once()
+        assert "config" not in client.models.generate_content.call_args.kwargs
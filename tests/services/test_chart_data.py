@@ -0,0 +1,309 @@
+"""
+ChartData のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| CD-N-01    | x・y・aggregation だけの仕様                | Equivalence       | 従来どおりラベル順の1系列                |
+| CD-N-02    | 複数の y・集計方法                          | Equivalence       | 系列ごとに pandas の集計と一致           |
+| CD-N-03    | top_n                                       | Equivalence       | 上位 N 件と残りをまとめた「その他」      |
+| CD-N-04    | top_n + mean / median                       | Equivalence       | 「その他」は残りの行全体の平均・中央値   |
+| CD-N-05    | sort（asc / none）                          | Equivalence       | 下位 N 件・出現順                        |
+| CD-N-06    | 複数系列のデータから generate_chart_html    | Equivalence       | 系列ごとのデータセット                   |
+| CD-N-07    | 日付の x（2年分の1時間ごとのデータ）        | Equivalence       | 点数に収まる月単位に丸めて期間順         |
+| CD-N-08    | time_bucket の指定・日付らしい文字列の x    | Equivalence       | 指定した粒度・文字列も日付として丸める   |
+| CD-B-01    | top_n がグループ数以上 / other=False        | Boundary          | 「その他」を付けない                     |
+| CD-B-02    | 未対応の集計方法・並び順                    | Boundary          | sum・ラベル順として扱う                  |
+| CD-B-03    | カテゴリ型の x に使われないカテゴリ         | Boundary          | observed=True で出現しない               |
+| CD-B-04    | time_bucket="none"・未対応の粒度・全て欠損  | Boundary          | 丸めない / 自動で選ぶ / 丸めない         |
+| CD-B-05    | top_n が "5"・5.0・True・0・-1              | Boundary          | 無視して全グループ（「その他」なし）     |
+| CD-A-01    | 存在しない y を含む                         | Abnormal          | 空のデータ                               |
+"""
+
+import json
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.chart_data import (
+    OTHER_LABEL,
+    build_chart_data,
+    chart_measures,
+    choose_time_bucket,
+)
+from src.services.chat_handler import ChatHandler
+
+
+@pytest.fixture
+def customers_df():
+    rng = np.random.default_rng(0)
+    rows = 2_000
+    return pd.DataFrame(
+        {
+            "顧客ID": rng.integers(0, 300, rows),
+            "地域": rng.choice(["東京", "大阪", "福岡"], rows),
+            "売上": rng.integers(100, 10_000, rows),
+            "利益": rng.normal(100, 50, rows),
+        }
+    )
+
+
+class TestChartMeasures:
+    """系列の解釈のテスト"""
+
+    @pytest.mark.parametrize(
+        ("spec", "expected"),
+        [
+            ({"y": "売上"}, [("売上", "sum")]),
+            ({"y": ["売上", "利益"], "aggregation": "mean"}, [("売上", "mean"), ("利益", "mean")]),
+            (
+                {"y": ["売上", "利益"], "aggregation": ["sum", "max"]},
+                [("売上", "sum"), ("利益", "max")],
+            ),
+            ({"y": "売上", "aggregation": ["sum", "count"]}, [("売上", "sum"), ("売上", "count")]),
+            ({"y": "売上", "aggregation": "unknown"}, [("売上", "sum")]),
+        ],
+    )
+    def test_measures(self, spec, expected):
+        # Given / When / Then (CD-B-02)
+        assert chart_measures(spec) == expected
+
+
+class TestBuildChartData:
+    """集計のテスト"""
+
+    def test_single_series_sorted_by_label(self, sample_dataframe):
+        # Given (CD-N-01)
+        spec = {"x": "地域", "y": "売上", "aggregation": "sum"}
+
+        # When
+        data = build_chart_data(spec, sample_dataframe)
+
+        # Then
+        expected = sample_dataframe.groupby("地域")["売上"].sum()
+        assert data["labels"] == expected.index.tolist()
+        assert data["values"] == expected.tolist()
+        assert data["group_count"] == 3
+        assert json.dumps(data)
+
+    def test_multiple_series_in_one_pass(self, customers_df):
+        # Given (CD-N-02)
+        spec = {"x": "地域", "y": ["売上", "利益", "売上"], "aggregation": ["sum", "mean", "count"]}
+
+        # When
+        data = build_chart_data(spec, customers_df)
+
+        # Then
+        grouped = customers_df.groupby("地域")
+        assert [item["label"] for item in data["series"]] == [
+            "売上（合計）",
+            "利益（平均）",
+            "売上（件数）",
+        ]
+        assert data["series"][0]["values"] == grouped["売上"].sum().tolist()
+        assert data["series"][1]["values"] == pytest.approx(grouped["利益"].mean().tolist())
+        assert data["series"][2]["values"] == grouped["売上"].count().tolist()
+        assert data["values"] == data["series"][0]["values"]
+
+    def test_top_n_with_other_bucket(self, customers_df):
+        # Given (CD-N-03)
+        spec = {"x": "顧客ID", "y": ["売上", "利益"], "aggregation": ["sum", "max"], "top_n": 5}
+
+        # When
+        data = build_chart_data(spec, customers_df)
+
+        # Then
+        sums = customers_df.groupby("顧客ID")["売上"].sum()
+        top = sums.nlargest(5)
+        rest = customers_df[~customers_df["顧客ID"].isin(top.index)]
+        assert data["labels"] == [*top.index.tolist(), OTHER_LABEL]
+        assert data["values"] == [*top.tolist(), int(rest["売上"].sum())]
+        assert data["series"][1]["values"][-1] == pytest.approx(rest["利益"].max())
+        assert data["group_count"] == sums.size
+        assert sum(data["values"]) == customers_df["売上"].sum()
+
+    @pytest.mark.parametrize("aggregation", ["mean", "median"])
+    def test_other_bucket_uses_remaining_rows(self, customers_df, aggregation):
+        # Given (CD-N-04)
+        spec = {"x": "顧客ID", "y": "売上", "aggregation": aggregation, "top_n": 3}
+
+        # When
+        data = build_chart_data(spec, customers_df)
+
+        # Then
+        top_labels = data["labels"][:-1]
+        rest = customers_df[~customers_df["顧客ID"].isin(top_labels)]
+        assert data["values"][-1] == pytest.approx(rest["売上"].agg(aggregation))
+
+    def test_bottom_n_and_appearance_order(self, sample_dataframe):
+        # Given (CD-N-05)
+        bottom = {"x": "商品名", "y": "売上", "top_n": 1, "sort": "asc"}
+        unsorted = {"x": "地域", "y": "売上", "sort": "none"}
+
+        # When / Then
+        assert build_chart_data(bottom, sample_dataframe)["labels"] == ["商品C", OTHER_LABEL]
+        assert build_chart_data(unsorted, sample_dataframe)["labels"] == ["東京", "大阪", "福岡"]
+
+    def test_top_n_in_label_order(self, customers_df):
+        # Given (CD-N-05)
+        spec = {"x": "顧客ID", "y": "売上", "top_n": 4, "sort": "label", "other": False}
+
+        # When
+        data = build_chart_data(spec, customers_df)
+
+        # Then
+        top = customers_df.groupby("顧客ID")["売上"].sum().nlargest(4)
+        assert data["labels"] == sorted(top.index.tolist())
+
+    @pytest.mark.parametrize("spec", [{"top_n": 3}, {"top_n": 1, "other": False}])
+    def test_no_other_bucket(self, sample_dataframe, spec):
+        # Given (CD-B-01)
+        spec = {"x": "地域", "y": "売上", **spec}
+
+        # When
+        data = build_chart_data(spec, sample_dataframe)
+
+        # Then
+        assert OTHER_LABEL not in data["labels"]
+        assert data["labels"][0] == "大阪"
+
+    @pytest.mark.parametrize("top_n", ["5", 5.0, True, 0, -1, None])
+    def test_invalid_top_n_ignored(self, customers_df, top_n):
+        # Given (CD-B-05)
+        spec = {"x": "地域", "y": "売上", "top_n": top_n}
+
+        # When
+        data = build_chart_data(spec, customers_df)
+
+        # Then
+        assert data == build_chart_data({"x": "地域", "y": "売上"}, customers_df)
+        assert data["labels"] == ["大阪", "東京", "福岡"]
+
+    def test_unknown_sort_falls_back_to_label(self, sample_dataframe):
+        # Given (CD-B-02)
+        spec = {"x": "地域", "y": "売上", "sort": "random"}
+
+        # When / Then
+        assert build_chart_data(spec, sample_dataframe)["labels"] == ["大阪", "東京", "福岡"]
+
+    def test_unobserved_categories_skipped(self, sample_dataframe):
+        # Given (CD-B-03)
+        df = sample_dataframe.assign(
+            地域=pd.Categorical(
+                sample_dataframe["地域"], categories=["東京", "大阪", "福岡", "札幌"]
+            )
+        )
+
+        # When
+        data = build_chart_data({"x": "地域", "y": "売上"}, df)
+
+        # Then
+        assert data["labels"] == ["東京", "大阪", "福岡"]
+
+    def test_missing_y_column(self, sample_dataframe):
+        # Given / When / Then (CD-A-01)
+        data = build_chart_data({"x": "地域", "y": ["売上", "利益"]}, sample_dataframe)
+        assert data == {"labels": [], "values": []}
+
+
+@pytest.fixture
+def hourly_df():
+    rows = 2 * 365 * 24
+    return pd.DataFrame(
+        {
+            "日付": pd.date_range("2023-01-01", periods=rows, freq="h"),
+            "売上": np.arange(rows) % 100,
+        }
+    )
+
+
+class TestTimeBuckets:
+    """日付の x の丸めのテスト"""
+
+    def test_auto_bucket_fits_max_points(self, hourly_df):
+        # Given (CD-N-07)
+        spec = {"x": "日付", "y": "売上"}
+
+        # When
+        data = build_chart_data(spec, hourly_df)
+
+        # Then
+        expected = hourly_df.groupby(hourly_df["日付"].dt.to_period("M"))["売上"].sum()
+        assert data["time_bucket"] == "month"
+        assert data["labels"][:2] == ["2023-01", "2023-02"]
+        assert data["values"] == expected.tolist()
+        assert data["group_count"] == 24
+
+    @pytest.mark.parametrize(
+        ("days", "max_points", "expected"),
+        [(30, 60, "day"), (120, 60, "week"), (720, 60, "month"), (720, 10, "quarter"),
+         (10_000, 60, "year")],
+    )  # fmt: skip
+    def test_choose_time_bucket(self, days, max_points, expected):
+        # Given
+        start = pd.Timestamp("2020-01-01")
+
+        # When / Then (CD-N-07)
+        assert choose_time_bucket(start, start + pd.Timedelta(days=days), max_points) == expected
+
+    def test_bucket_override_and_string_dates(self, hourly_df):
+        # Given (CD-N-08)
+        text_dates = hourly_df.assign(日付=hourly_df["日付"].dt.strftime("%Y-%m-%d %H:%M"))
+        weekly = {"x": "日付", "y": "売上", "time_bucket": "week"}
+        quarterly = {"x": "日付", "y": "売上", "aggregation": "max", "time_bucket": "quarter"}
+
+        # When
+        weekly_data = build_chart_data(weekly, text_dates)
+        quarterly_data = build_chart_data(quarterly, hourly_df)
+
+        # Then
+        assert weekly_data["time_bucket"] == "week"
+        assert weekly_data["labels"][:2] == ["2022-12-26", "2023-01-02"]
+        assert sum(weekly_data["values"]) == hourly_df["売上"].sum()
+        assert quarterly_data["labels"][0] == "2023Q1"
+        assert quarterly_data["values"][0] == 99
+
+    def test_max_points_in_spec(self, hourly_df):
+        # Given (CD-N-08)
+        spec = {"x": "日付", "y": "売上", "max_points": 1000}
+
+        # When / Then
+        assert build_chart_data(spec, hourly_df)["time_bucket"] == "day"
+
+    def test_no_bucketing(self, hourly_df, sample_dataframe):
+        # Given (CD-B-04)
+        head = hourly_df.head(48)
+        missing = pd.DataFrame({"日付": pd.to_datetime([None, None]), "売上": [1, 2]})
+
+        # When
+        raw = build_chart_data({"x": "日付", "y": "売上", "time_bucket": "none"}, head)
+        unknown = build_chart_data({"x": "日付", "y": "売上", "time_bucket": "hour"}, head)
+        empty = build_chart_data({"x": "日付", "y": "売上"}, missing)
+        category = build_chart_data({"x": "地域", "y": "売上"}, sample_dataframe)
+
+        # Then
+        assert len(raw["labels"]) == 48
+        assert "time_bucket" not in raw
+        assert unknown["time_bucket"] == "day"
+        assert empty["labels"] == []
+        assert "time_bucket" not in category
+
+
+class TestChartHtml:
+    """グラフ HTML のテスト"""
+
+    def test_one_dataset_per_series(self, customers_df):
+        # Given (CD-N-06)
+        handler = ChatHandler(model=Mock())
+        spec = {"type": "bar", "title": "地域別", "x": "地域", "y": ["売上", "利益"]}
+        data = handler.generate_chart_data(spec, customers_df)
+
+        # When
+        html = handler.generate_chart_html(spec, data)
+
+        # Then
+        assert '"label": "売上"' in html
+        assert '"label": "利益"' in html
+        assert html.count("borderWidth") == 2
@@ -0,0 +1,289 @@
+"""
+ChartFilters のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| CF-N-01    | 等値・リスト・min/max・start/end の filters | Equivalence       | eq / in / range / date_range の条件      |
+| CF-N-02    | 各条件のマスク                              | Equivalence       | pandas の比較と同じ行                    |
+| CF-N-03    | 同じデータ・条件で2回マスクを取る           | Equivalence       | 2回目はキャッシュから同じ配列            |
+| CF-N-04    | filters 付きのグラフ仕様                    | Equivalence       | 絞り込んだ行だけを集計                   |
+| CF-N-05    | mask_cache を渡した ChatHandler             | Equivalence       | 続くグラフでマスクを再利用               |
+| CF-B-01    | 時刻のない end・欠損を含むカラム            | Boundary          | その日の終わりまで含む・欠損は除く       |
+| CF-B-02    | データフレームの破棄・上限を超えるキャッシュ | Boundary          | 古いマスクを捨てる                       |
+| CF-B-03    | filters が空・None                          | Boundary          | 絞り込まない                             |
+| CF-A-01    | 不正な filters・比較できない範囲            | Abnormal          | ValueError / 空のグラフデータ            |
+"""
+
+import gc
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.chart_data import build_chart_data
+from src.services.chart_filters import (
+    FilterCondition,
+    MaskCache,
+    compute_mask,
+    filter_frame,
+    parse_filters,
+)
+from src.services.chat_handler import ChatHandler
+
+
+@pytest.fixture
+def orders_df():
+    return pd.DataFrame(
+        {
+            "日付": pd.to_datetime(
+                ["2024-01-05 10:00", "2024-01-31 18:00", "2024-02-01 09:00", "2024-03-10 12:00"]
+            ),
+            "地域": ["東京", "大阪", "東京", None],
+            "商品名": ["商品A", "商品B", "商品B", "商品A"],
+            "売上": [1000, 2500, 4000, 500],
+        }
+    )
+
+
+class TestParseFilters:
+    """filters の解釈のテスト"""
+
+    def test_condition_kinds(self):
+        # Given (CF-N-01)
+        filters = {
+            "地域": "東京",
+            "商品名": ["商品A", "商品B"],
+            "売上": {"min": 1000},
+            "日付": {"start": "2024-01-01", "end": "2024-01-31"},
+        }
+
+        # When
+        conditions = parse_filters(filters)
+
+        # Then
+        assert conditions == [
+            FilterCondition("地域", "eq", ("東京",)),
+            FilterCondition("商品名", "in", ("商品A", "商品B")),
+            FilterCondition("売上", "range", (1000, None)),
+            FilterCondition("日付", "date_range", ("2024-01-01", "2024-01-31")),
+        ]
+
+    @pytest.mark.parametrize("filters", [None, {}])
+    def test_no_filters(self, filters):
+        # Given / When / Then (CF-B-03)
+        assert parse_filters(filters) == []
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            ["地域", "東京"],
+            {"地域": []},
+            {"売上": {"min": 1, "start": "2024-01-01"}},
+            {"売上": {"above": 1}},
+            {"売上": {"min": None, "max": None}},
+        ],
+    )
+    def test_invalid_filters(self, filters):
+        # Given / When / Then (CF-A-01)
+        with pytest.raises(ValueError):
+            parse_filters(filters)
+
+
+class TestComputeMask:
+    """マスクの計算のテスト"""
+
+    @pytest.mark.parametrize(
+        ("filters", "expected"),
+        [
+            ({"地域": "東京"}, [True, False, True, False]),
+            ({"商品名": ["商品B"]}, [False, True, True, False]),
+            ({"売上": {"min": 1000, "max": 2500}}, [True, True, False, False]),
+            ({"日付": {"start": "2024-02-01"}}, [False, False, True, True]),
+        ],
+    )
+    def test_masks(self, orders_df, filters, expected):
+        # Given (CF-N-02)
+        [condition] = parse_filters(filters)
+
+        # When
+        mask = compute_mask(orders_df, condition)
+
+        # Then
+        assert mask.dtype == bool
+        assert mask.tolist() == expected
+
+    def test_date_only_end_includes_whole_day(self, orders_df):
+        # Given (CF-B-01)
+        text_dates = orders_df.assign(日付=orders_df["日付"].dt.strftime("%Y/%m/%d %H:%M"))
+        [whole_day] = parse_filters({"日付": {"end": "2024-01-31"}})
+        [until_noon] = parse_filters({"日付": {"end": "2024-01-31 12:00"}})
+
+        # When / Then
+        assert compute_mask(text_dates, whole_day).tolist() == [True, True, False, False]
+        assert compute_mask(orders_df, until_noon).tolist() == [True, False, False, False]
+
+    def test_timezone_aware_dates(self, orders_df):
+        # Given (CF-B-01)
+        aware = orders_df.assign(日付=orders_df["日付"].dt.tz_localize("Asia/Tokyo"))
+        [condition] = parse_filters({"日付": {"start": "2024-02-01", "end": "2024-02-01"}})
+
+        # When / Then
+        assert compute_mask(aware, condition).tolist() == [False, False, True, False]
+
+    @pytest.mark.parametrize(
+        "filters", [{"地域": {"min": 1}}, {"日付": {"start": "いつか"}}, {"日付": {"end": [1]}}]
+    )
+    def test_incomparable_range(self, orders_df, filters):
+        # Given (CF-A-01)
+        [condition] = parse_filters(filters)
+
+        # When / Then
+        with pytest.raises(ValueError):
+            compute_mask(orders_df, condition)
+
+
+class TestMaskCache:
+    """マスクのキャッシュのテスト"""
+
+    def test_reuses_mask(self, orders_df):
+        # Given (CF-N-03)
+        cache = MaskCache()
+        [condition] = parse_filters({"地域": "東京"})
+
+        # When
+        first = cache.mask(orders_df, condition)
+        second = cache.mask(orders_df, condition)
+
+        # Then
+        assert second is first
+        assert not first.flags.writeable
+        assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    def test_other_frame_not_reused(self, orders_df):
+        # Given (CF-N-03)
+        cache = MaskCache()
+        [condition] = parse_filters({"地域": "東京"})
+        cache.mask(orders_df, condition)
+
+        # When
+        other = orders_df.iloc[::-1].reset_index(drop=True)
+        mask = cache.mask(other, condition)
+
+        # Then
+        assert mask.tolist() == [False, True, False, True]
+        assert cache.misses == 2
+
+    def test_discarded_frame_evicted(self, orders_df):
+        # Given (CF-B-02)
+        cache = MaskCache()
+        [condition] = parse_filters({"地域": "東京"})
+        copy = orders_df.copy()
+        cache.mask(copy, condition)
+
+        # When
+        del copy
+        gc.collect()
+
+        # Then
+        assert len(cache) == 0
+
+    def test_lru_limits(self, orders_df):
+        # Given (CF-B-02)
+        cache = MaskCache(max_frames=1, max_masks=2)
+        frames = [orders_df, orders_df.copy()]
+        conditions = parse_filters({"地域": "東京", "商品名": "商品A", "売上": {"max": 1000}})
+
+        # When
+        for condition in conditions:
+            cache.mask(frames[0], condition)
+        cache.mask(frames[0], conditions[1])
+        cache.mask(frames[0], conditions[0])
+        after_masks = (cache.hits, cache.misses)
+        cache.mask(frames[1], conditions[0])
+        cache.clear()
+
+        # Then
+        assert after_masks == (1, 4)
+        assert cache.misses == 5
+        assert len(cache) == 0
+
+    def test_invalid_limits(self):
+        # Given / When / Then (CF-A-01)
+        with pytest.raises(ValueError):
+            MaskCache(max_frames=0)
+
+    def test_filter_frame(self, orders_df):
+        # Given (CF-N-02)
+        conditions = parse_filters({"地域": "東京", "商品名": "商品B"})
+
+        # When
+        filtered = filter_frame(orders_df, conditions, MaskCache(), columns=["商品名", "売上"])
+
+        # Then
+        assert filtered.columns.tolist() == ["商品名", "売上"]
+        assert filtered["売上"].tolist() == [4000]
+        assert filter_frame(orders_df, []) is orders_df
+
+
+class TestChartDataFilters:
+    """グラフデータへの組み込みのテスト"""
+
+    def test_filtered_chart(self, orders_df):
+        # Given (CF-N-04)
+        spec = {"x": "商品名", "y": "売上", "filters": {"地域": "東京"}}
+
+        # When
+        data = build_chart_data(spec, orders_df)
+
+        # Then
+        assert data["labels"] == ["商品A", "商品B"]
+        assert data["values"] == [1000, 4000]
+
+    def test_filtered_by_date_range(self, orders_df):
+        # Given (CF-N-04)
+        spec = {
+            "x": "地域",
+            "y": "売上",
+            "aggregation": "count",
+            "filters": {"日付": {"start": "2024-01-01", "end": "2024-01-31"}},
+        }
+
+        # When / Then
+        assert build_chart_data(spec, orders_df)["values"] == [1, 1]
+
+    @pytest.mark.parametrize(
+        "filters", [{"店舗": "本店"}, {"地域": []}, {"地域": {"min": 1}}, "東京"]
+    )
+    def test_unusable_filters(self, orders_df, filters):
+        # Given (CF-A-01)
+        spec = {"x": "商品名", "y": "売上", "filters": filters}
+
+        # When / Then
+        assert build_chart_data(spec, orders_df) == {"labels": [], "values": []}
+
+    def test_drill_down_reuses_masks(self):
+        # Given (CF-N-05)
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(
+            {
+                "地域": rng.choice(["東京", "大阪"], 1000),
+                "商品名": rng.choice(["商品A", "商品B", "商品C"], 1000),
+                "売上": rng.integers(0, 100, 1000),
+            }
+        )
+        handler = ChatHandler(model=Mock(), mask_cache=MaskCache())
+        tokyo = {"地域": "東京"}
+
+        # When
+        by_product = handler.generate_chart_data({"x": "商品名", "y": "売上", "filters": tokyo}, df)
+        drill_down = handler.generate_chart_data(
+            {"x": "地域", "y": "売上", "filters": {**tokyo, "商品名": "商品A"}}, df
+        )
+
+        # Then
+        tokyo_rows = df[df["地域"] == "東京"]
+        assert by_product["values"] == tokyo_rows.groupby("商品名")["売上"].sum().tolist()
+        assert drill_down["values"] == [tokyo_rows[tokyo_rows["商品名"] == "商品A"]["売上"].sum()]
+        assert (handler.mask_cache.hits, handler.mask_cache.misses) == (1, 2)
@@ -8,9 +8,13 @@ ChatHandler のテスト
 - コンテキスト管理
 """
 
+import json
 from unittest.mock import Mock
 
+import pytest
+
 from src.services.chat_handler import ChatHandler, ChatResponse, Intent
+from src.services.intent_classifier import IntentClassifier
 
 
 class TestChatHandlerIntentClassification:
@@ -261,6 +265,225 @@ class TestChatHandlerResponse:
         assert response.type == "text"
 
 
+class TestChatHandlerCombined:
+    """意図分類と応答生成を1回で行う統合モードのテスト"""
+
+    @pytest.mark.parametrize(
+        ("intent", "response_type"),
+        [
+            ("question", "text"),
+            ("analyze", "insight"),
+            ("summarize", "text"),
+            ("general", "text"),
+            ("unknown", "text"),
+        ],
+    )
+    def test_single_model_call(self, sample_dataframe, intent, response_type):
+        """意図ごとの type の応答を1回のモデル呼び出しで返す"""
+        mock_model = Mock()
+        payload = {"intent": intent, "content": "回答です。", "chart_spec": None}
+        mock_model.generate_content.return_value = Mock(text=json.dumps(payload))
+
+        handler = ChatHandler(model=mock_model, combined=True)
+        response = handler.handle_message("売上について", {"df": sample_dataframe})
+
+        assert response == ChatResponse(type=response_type, content="回答です。")
+        mock_model.generate_content.assert_called_once()
+        prompt = mock_model.generate_content.call_args.args[0]
+        assert "売上について" in prompt
+        assert "['日付', '商品名', '売上', '地域']" in prompt
+
+    def test_chart_spec_in_fenced_json(self, sample_dataframe):
+        """コードブロックで囲まれた JSON からグラフ仕様を取り出す"""
+        spec = {"type": "bar", "title": "地域別売上", "x": "地域", "y": "売上"}
+        payload = {"intent": "add_chart", "content": "グラフを作成しました。", "chart_spec": spec}
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(
+            text=f"```json\n{json.dumps(payload, ensure_ascii=False)}\n```"
+        )
+
+        handler = ChatHandler(model=mock_model, combined=True)
+        response = handler.handle_message("地域別のグラフ", {"df": sample_dataframe})
+
+        assert response.type == "chart"
+        assert response.chart_spec == spec
+        assert mock_model.generate_content.call_count == 1
+
+    def test_chart_spec_ignored_for_text_intent(self):
+        """chart_spec は add_chart 以外では無視する"""
+        text = '{"intent": "question", "content": "a", "chart_spec": {"type": "bar"}}'
+
+        assert ChatHandler(model=Mock())._parse_combined(text) == ChatResponse(
+            type="text", content="a"
+        )
+
+    @pytest.mark.parametrize(
+        "text", ["回答です。", '["question"]', '{"intent": "question", "content": null}']
+    )
+    def test_unparsable_response_falls_back(self, sample_dataframe, text):
+        """解釈できない応答の場合は意図分類と応答生成を個別に行う"""
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text=text),
+            Mock(text='{"intent": "analyze", "entities": []}'),
+            Mock(text="- 大阪が最も高い"),
+        ]
+
+        handler = ChatHandler(model=mock_model, combined=True)
+        response = handler.handle_message("売上について", {"df": sample_dataframe})
+
+        assert response == ChatResponse(type="insight", content="- 大阪が最も高い")
+        assert mock_model.generate_content.call_count == 3
+
+    def test_confident_local_intent_skips_combined_prompt(self, sample_dataframe):
+        """ローカルで分類できる場合は通常の応答プロンプトを使う"""
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(text="要点です。")
+
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier(), combined=True)
+        response = handler.handle_message("このデータをまとめて", {"df": sample_dataframe})
+
+        assert response == ChatResponse(type="text", content="要点です。")
+        prompt = mock_model.generate_content.call_args.args[0]
+        assert "以下のデータをまとめてください" in prompt
+
+    def test_combined_with_none_df(self):
+        """データがなくても統合プロンプトで応答する"""
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(
+            text='{"intent": "general", "content": "こんにちは！"}'
+        )
+
+        handler = ChatHandler(model=mock_model, combined=True)
+        response = handler.handle_message("やあ", {"df": None})
+
+        assert response.content == "こんにちは！"
+
+
+def _stream_model(*chunks):
+    """generate_content_stream で chunks を返すモデル"""
+    model = Mock()
+    model.generate_content_stream.return_value = iter([Mock(text=chunk) for chunk in chunks])
+    return model
+
+
+class TestChatHandlerStreaming:
+    """ストリーミング応答のテスト"""
+
+    def test_chunks_yielded_in_order(self, sample_dataframe):
+        """応答本文の断片を届いた順に返し、最後に ChatResponse が入る"""
+        mock_model = _stream_model("- 大阪が", "最も高い")
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier())
+
+        stream = handler.stream_message("性別で生存率を比較して", {"df": sample_dataframe})
+        assert stream.response is None
+        chunks = list(stream)
+
+        assert chunks == ["- 大阪が", "最も高い"]
+        assert stream.response == ChatResponse(type="insight", content="- 大阪が最も高い")
+        mock_model.generate_content.assert_not_called()
+
+    def test_chart_spec_extracted_after_stream(self, sample_dataframe):
+        """グラフ仕様はストリームの終了後に全文から取り出す"""
+        mock_model = _stream_model(
+            "作成しました。\n```chart_spec\n", '{"type": "bar", "x": "地域", "y": "売上"}\n```'
+        )
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier())
+
+        stream = handler.stream_message("地域別の売上グラフを追加して", {"df": sample_dataframe})
+        list(stream)
+
+        assert stream.response.type == "chart"
+        assert stream.response.chart_spec == {"type": "bar", "x": "地域", "y": "売上"}
+
+    def test_model_without_streaming(self, sample_dataframe):
+        """generate_content_stream がないモデルは一括の応答を1つの断片で返す"""
+        mock_model = Mock(spec=["generate_content"])
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "summarize"}'),
+            Mock(text="要点です。"),
+        ]
+        handler = ChatHandler(model=mock_model)
+
+        stream = handler.stream_message("どう？", {"df": sample_dataframe})
+
+        assert list(stream) == ["要点です。"]
+        assert stream.response.type == "text"
+
+    def test_combined_content_decoded_incrementally(self, sample_dataframe):
+        """統合モードでは生成途中の JSON から content の値だけを返す"""
+        mock_model = _stream_model(
+            '```json\n{"intent": "analyze", "con',
+            'tent": "- 大阪\\',
+            "nが高い \\u3042 \\ud83d",
+            '\\ude00 \\"A\\"',
+            '", "chart_spec": null}\n```',
+        )
+        handler = ChatHandler(model=mock_model, combined=True)
+
+        stream = handler.stream_message("どう？", {"df": sample_dataframe})
+        chunks = list(stream)
+
+        assert chunks == ["- 大阪", "\nが高い あ ", '\U0001f600 "A"']
+        assert stream.response == ChatResponse(type="insight", content="".join(chunks))
+        mock_model.generate_content.assert_not_called()
+
+    def test_combined_unparsable_falls_back(self, sample_dataframe):
+        """統合モードの応答を解釈できない場合は個別の呼び出しの応答を最後に返す"""
+        mock_model = _stream_model("わかりません")
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "general"}'),
+            Mock(text="こんにちは！"),
+        ]
+        handler = ChatHandler(model=mock_model, combined=True)
+
+        stream = handler.stream_message("やあ", {"df": sample_dataframe})
+
+        assert list(stream) == ["こんにちは！"]
+        assert stream.response.content == "こんにちは！"
+
+    def test_partial_content_then_fallback(self, sample_dataframe):
+        """途中まで返した content と最終的な応答が異なる場合は改行して続ける"""
+        mock_model = _stream_model('{"intent": "general", "content": "途中')
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "general"}'),
+            Mock(text="こんにちは！"),
+        ]
+        handler = ChatHandler(model=mock_model, combined=True)
+
+        assert list(handler.stream_message("やあ", {"df": sample_dataframe})) == [
+            "途中",
+            "\n\nこんにちは！",
+        ]
+
+    def test_local_answer_streamed_at_once(self, sample_dataframe):
+        """ローカル集計の回答はモデルを呼ばずに1つの断片で返す"""
+        mock_model = Mock()
+        handler = ChatHandler(model=mock_model, local_queries=True)
+
+        stream = handler.stream_message("売上トップ2を教えて", {"df": sample_dataframe})
+        chunks = list(stream)
+
+        assert len(chunks) == 1
+        assert chunks[0].startswith("商品名別の売上の合計（上位2件）")
+        mock_model.generate_content.assert_not_called()
+        mock_model.generate_content_stream.assert_not_called()
+
+    def test_model_query_answered_without_stream(self, sample_dataframe):
+        """モデルが作った集計クエリで答える場合は応答本文を生成しない"""
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "question"}'),
+            Mock(text='{"measure": null, "aggregation": "count"}'),
+        ]
+        handler = ChatHandler(model=mock_model, local_queries=True)
+
+        chunks = list(handler.stream_message("どのくらいある？", {"df": sample_dataframe}))
+
+        assert chunks[0].startswith("件数は 5 です。")
+        mock_model.generate_content_stream.assert_not_called()
+
+
 class TestChatHandlerContext:
     """コンテキスト管理のテスト"""
 
@@ -0,0 +1,152 @@
+"""
+ColumnIndex のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| CI-N-01    | 文字列・整数・カテゴリ型のカラム            | Equivalence       | 値ごとの行の位置（昇順）                 |
+| CI-N-02    | positions_in に複数の値                     | Equivalence       | 和集合の行の位置（昇順）                 |
+| CI-N-03    | index_columns=True の filter_frame          | Equivalence       | マスクで絞り込んだ結果と同じ行           |
+| CI-N-04    | index_columns=True のローカル集計           | Equivalence       | マスクで絞り込んだ結果と同じ回答         |
+| CI-N-05    | 同じカラムの条件を繰り返す                  | Equivalence       | インデックスは1回だけ作る                |
+| CI-B-01    | 欠損・存在しない値・ハッシュできない値      | Boundary          | 空の位置                                 |
+| CI-B-02    | 浮動小数点・日時のカラム、範囲の条件        | Boundary          | インデックスを使わずマスクで絞り込む     |
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.chart_data import build_chart_data
+from src.services.chart_filters import MaskCache, filter_frame, parse_filters
+from src.services.column_index import ColumnIndex, indexable
+from src.services.query_engine import QuerySpec, execute_query
+
+
+@pytest.fixture
+def shops_df():
+    rng = np.random.default_rng(1)
+    rows = 3_000
+    regions = rng.choice(["東京", "大阪", "福岡", None], rows, p=[0.4, 0.3, 0.2, 0.1])
+    return pd.DataFrame(
+        {
+            "地域": regions,
+            "店舗": pd.Categorical(rng.choice(["本店", "駅前", "郊外"], rows)),
+            "商品ID": rng.integers(0, 50, rows),
+            "単価": rng.normal(1000, 100, rows),
+            "日付": pd.date_range("2024-01-01", periods=rows, freq="h"),
+            "売上": rng.integers(100, 10_000, rows),
+        }
+    )
+
+
+class TestColumnIndex:
+    """転置インデックスのテスト"""
+
+    @pytest.mark.parametrize(
+        ("column", "value"), [("地域", "東京"), ("商品ID", 7), ("店舗", "駅前")]
+    )
+    def test_positions(self, shops_df, column, value):
+        # Given (CI-N-01)
+        index = ColumnIndex.from_series(shops_df[column])
+
+        # When
+        positions = index.positions(value)
+
+        # Then
+        expected = np.flatnonzero((shops_df[column] == value).to_numpy())
+        assert positions.tolist() == expected.tolist()
+        assert len(index) == len(shops_df)
+
+    def test_positions_in(self, shops_df):
+        # Given (CI-N-02)
+        index = ColumnIndex.from_series(shops_df["地域"])
+
+        # When
+        positions = index.positions_in(("福岡", "東京", "福岡", "札幌"))
+
+        # Then
+        expected = np.flatnonzero(shops_df["地域"].isin(["東京", "福岡"]).to_numpy())
+        assert positions.tolist() == expected.tolist()
+        assert index.positions_in(("札幌",)).tolist() == []
+
+    @pytest.mark.parametrize("value", [None, np.nan, "札幌", ["東京"]])
+    def test_no_rows(self, shops_df, value):
+        # Given (CI-B-01)
+        index = ColumnIndex.from_series(shops_df["地域"])
+
+        # When / Then
+        assert index.positions(value).tolist() == []
+
+    def test_indexable_columns(self, shops_df):
+        # Given / When / Then (CI-B-02)
+        assert [column for column in shops_df if indexable(shops_df[column])] == [
+            "地域",
+            "店舗",
+            "商品ID",
+            "売上",
+        ]
+
+
+class TestIndexedFilters:
+    """絞り込みへの組み込みのテスト"""
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {"地域": "東京"},
+            {"地域": "東京", "店舗": ["本店", "郊外"]},
+            {"商品ID": [1, 2, 3], "単価": {"min": 1000}},
+            {"地域": "大阪", "日付": {"start": "2024-02-01", "end": "2024-02-29"}},
+            {"地域": "札幌", "売上": {"max": 500}},
+        ],
+    )
+    def test_same_rows_as_masks(self, shops_df, filters):
+        # Given (CI-N-03)
+        conditions = parse_filters(filters)
+
+        # When
+        indexed = filter_frame(shops_df, conditions, MaskCache(index_columns=True), ["売上"])
+        masked = filter_frame(shops_df, conditions, MaskCache(), ["売上"])
+
+        # Then
+        pd.testing.assert_frame_equal(indexed, masked)
+
+    def test_index_built_once(self, shops_df):
+        # Given (CI-N-05)
+        cache = MaskCache(index_columns=True)
+
+        # When
+        for value in ["東京", "大阪", "東京"]:
+            build_chart_data(
+                {"x": "店舗", "y": "売上", "filters": {"地域": value}}, shops_df, cache
+            )
+
+        # Then
+        assert cache.index_builds == 1
+        assert len(cache) == 0
+
+    def test_non_indexable_uses_masks(self, shops_df):
+        # Given (CI-B-02)
+        cache = MaskCache(index_columns=True)
+        [condition] = parse_filters({"単価": 1000.0})
+
+        # When
+        rows = cache.rows(shops_df, condition)
+        filter_frame(shops_df, [condition], cache)
+
+        # Then
+        assert rows is None
+        assert cache.misses == 1
+
+    def test_query_engine(self, shops_df):
+        # Given (CI-N-04)
+        spec = QuerySpec("売上", group_by="店舗", filters={"地域": "福岡", "商品ID": 3})
+
+        # When
+        indexed = execute_query(spec, shops_df, MaskCache(index_columns=True))
+        masked = execute_query(spec, shops_df)
+
+        # Then
+        assert indexed.rows == masked.rows
+        assert indexed.row_count == masked.row_count > 0
@@ -0,0 +1,165 @@
+"""
+CompactEncoding のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| CE-N-01    | レコード形式の表（入れ子を含む）            | Equivalence       | 列形式になり、デコードで元に戻る         |
+| CE-N-02    | significant_digits=4                        | Equivalence       | 浮動小数点数だけ有効4桁に丸まる          |
+| CE-N-03    | 10,000 行の表                               | Equivalence       | JSON が半分以下になる                    |
+| CE-N-04    | encoding 付きの assemble_html               | Equivalence       | デコーダーがデータ宣言より前に入る       |
+| CE-N-05    | encoding + 圧縮                             | Equivalence       | デコーダーは遅延対象にならない           |
+| CE-B-01    | 1行の表・キーが異なる行・空 dict            | Boundary          | 列形式にしない                           |
+| CE-B-02    | 表がない集計結果                            | Boundary          | デコーダーを入れない                     |
+| CE-B-03    | データ宣言を含む <script> がない HTML       | Boundary          | <head> の先頭（なければ文書型宣言の後）  |
+| CE-A-01    | significant_digits=0                        | Abnormal          | ValueError                               |
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.ai_generator import AIGenerator
+from src.services.compact_encoding import (
+    COLUMNAR_KEY,
+    DECODER_FUNCTION,
+    PAYLOAD_DECODER_SCRIPT,
+    PayloadEncoding,
+    decode_payload,
+    encode_payload,
+    insert_decoder,
+)
+from src.services.payload_compression import DEFERRED_SCRIPT_TYPE
+
+TEMPLATE = "<html><body><script>const dashboardData = {{JSON_DATA}};</script></body></html>"
+
+
+class TestEncodePayload:
+    """エンコードのテスト"""
+
+    def test_records_round_trip(self):
+        # Given: Tables at top level and nested inside cells
+        data = {
+            "table": [
+                {"地域": "東京", "売上": 1.5, "内訳": [{"a": 1, "b": 2}, {"a": 3, "b": 4}]},
+                {"地域": "大阪", "売上": None, "内訳": []},
+            ],
+            "kpi": {"total": 3},
+        }
+
+        # When
+        encoded, tables = encode_payload(data, PayloadEncoding())
+
+        # Then (CE-N-01)
+        assert tables == 2
+        assert encoded["table"][COLUMNAR_KEY]["地域"] == ["東京", "大阪"]
+        assert encoded["table"][COLUMNAR_KEY]["内訳"][0] == {
+            COLUMNAR_KEY: {"a": [1, 3], "b": [2, 4]}
+        }
+        assert decode_payload(encoded) == data
+
+    def test_significant_digits(self):
+        # Given
+        data = {"values": [12345.678901234, 0.000123456789, 7, True], "avg": 2.718281828}
+
+        # When
+        encoded, _ = encode_payload(data, PayloadEncoding(significant_digits=4))
+
+        # Then (CE-N-02)
+        assert encoded == {"values": [12350.0, 0.0001235, 7, True], "avg": 2.718}
+
+    def test_payload_size_drops(self):
+        # Given (CE-N-03)
+        rows = [
+            {"地域": f"地域{i % 10}", "売上": i * 1.2345678901, "数量": i} for i in range(10000)
+        ]
+
+        # When
+        encoded, _ = encode_payload({"table": rows}, PayloadEncoding(significant_digits=6))
+
+        # Then
+        plain = json.dumps({"table": rows}, ensure_ascii=False)
+        compact = json.dumps(encoded, ensure_ascii=False)
+        assert len(compact) * 2 < len(plain)
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            [{"a": 1}],
+            [{"a": 1}, {"b": 2}],
+            [{}, {}],
+            [{"a": 1}, 2],
+        ],
+        ids=["single-row", "different-keys", "empty-dicts", "mixed"],
+    )
+    def test_non_tables_untouched(self, values):
+        # Given / When (CE-B-01)
+        encoded, tables = encode_payload({"x": values}, PayloadEncoding())
+
+        # Then
+        assert encoded == {"x": values}
+        assert tables == 0
+
+    def test_invalid_digits(self):
+        # Given / When / Then (CE-A-01)
+        with pytest.raises(ValueError):
+            PayloadEncoding(significant_digits=0)
+
+
+class TestAssembleHtmlEncoding:
+    """assemble_html への組み込みのテスト"""
+
+    def test_decoder_injected_before_declaration(self):
+        # Given (CE-N-04)
+        generator = AIGenerator(model=Mock(), encoding=PayloadEncoding())
+        data = {"table": [{"a": 1}, {"a": 2}]}
+
+        # When
+        html = generator.assemble_html(TEMPLATE, data)
+
+        # Then
+        declaration = f"const dashboardData = {DECODER_FUNCTION}("
+        assert declaration in html
+        assert html.index(f"function {DECODER_FUNCTION}") < html.index(declaration)
+
+    def test_no_tables_no_decoder(self):
+        # Given (CE-B-02)
+        generator = AIGenerator(model=Mock(), encoding=PayloadEncoding(significant_digits=3))
+
+        # When
+        html = generator.assemble_html(TEMPLATE, {"kpi": {"avg": 1.23456}})
+
+        # Then
+        assert 'const dashboardData = {"kpi": {"avg": 1.23}};' in html
+        assert DECODER_FUNCTION not in html
+
+    @pytest.mark.parametrize(
+        ("html", "prefix"),
+        [
+            (
+                '<!DOCTYPE html><html><head lang="ja"><title>t</title></head>'
+                f'<body onload="init({DECODER_FUNCTION}(d))"></body></html>',
+                '<!DOCTYPE html><html><head lang="ja">',
+            ),
+            (f'<!DOCTYPE html>\n<div data-x="{DECODER_FUNCTION}(d)"></div>', "<!DOCTYPE html>"),
+            ("<div></div>", ""),
+        ],
+    )
+    def test_decoder_without_declaration_script(self, html, prefix):
+        # Given / When (CE-B-03)
+        inserted = insert_decoder(html)
+
+        # Then
+        assert inserted == prefix + PAYLOAD_DECODER_SCRIPT + html[len(prefix) :]
+
+    def test_decoder_not_deferred_when_compressed(self):
+        # Given (CE-N-05)
+        generator = AIGenerator(model=Mock(), encoding=PayloadEncoding(), compress_threshold=0)
+
+        # When
+        html = generator.assemble_html(TEMPLATE, {"table": [{"a": 1}, {"a": 2}]})
+
+        # Then
+        assert PAYLOAD_DECODER_SCRIPT in html
+        assert html.index(PAYLOAD_DECODER_SCRIPT) < html.index(DEFERRED_SCRIPT_TYPE)
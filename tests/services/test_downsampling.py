@@ -0,0 +1,234 @@
+"""
+Downsampling のテスト
+
+観点表:
+| Case ID    | Input / Precondition                      | Perspective       | Expected Result                          |
+| ---------- | ----------------------------------------- | ----------------- | ---------------------------------------- |
+| DS-N-01    | 上限を超える系列に LTTB                   | Equivalence       | 上限点数・先頭末尾を保持・昇順           |
+| DS-N-02    | 単発のスパイクを含む系列                  | Equivalence       | LTTB / min-max ともにスパイクを残す      |
+| DS-N-03    | labels + datasets[].data                  | Equivalence       | 同じ点で揃えて間引かれる                 |
+| DS-N-04    | DatetimeIndex の Series                   | Equivalence       | インデックスごと間引かれる               |
+| DS-N-05    | 200k 点の系列を含む生成                   | Equivalence       | HTML は上限内、result.data は全件        |
+| DS-B-01    | 上限以下の系列・表のレコード・文字列      | Boundary          | 変更されない                             |
+| DS-B-04    | 系列と同じ長さの表のレコード・入れ子配列  | Boundary          | 系列とラベルだけ間引き、表は全件残す     |
+| DS-B-02    | max_points=None                           | Boundary          | 同じオブジェクトを返す                   |
+| DS-B-03    | NaN / None を含む系列                     | Boundary          | 例外にならず上限内に収まる               |
+| DS-A-01    | 未対応の方式・max_points < 3              | Abnormal          | ValueError                               |
+"""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.ai_generator import AIGenerator
+from src.services.downsampling import (
+    DownsampleConfig,
+    downsample_payload,
+    lttb_indices,
+    minmax_indices,
+)
+
+
+class TestIndexSelection:
+    """インデックス選択のテスト"""
+
+    def test_lttb_keeps_budget_and_endpoints(self):
+        # Given: A long noisy series
+        y = np.sin(np.linspace(0, 50, 100_000)) + np.random.RandomState(0).rand(100_000)
+
+        # When
+        indices = lttb_indices(y, 500)
+
+        # Then: Budget respected, endpoints kept, sorted (DS-N-01)
+        assert len(indices) == 500
+        assert indices[0] == 0
+        assert indices[-1] == 99_999
+        assert np.all(np.diff(indices) > 0)
+
+    @pytest.mark.parametrize("method", ["lttb", "minmax"])
+    def test_spike_survives(self, method):
+        # Given: A flat series with one spike
+        y = np.zeros(50_000)
+        y[31_337] = 100.0
+
+        # When
+        if method == "lttb":
+            indices = lttb_indices(y, 100)
+        else:
+            indices = minmax_indices(y, 100)
+
+        # Then (DS-N-02)
+        assert 31_337 in indices
+        assert len(indices) <= 100
+
+    def test_short_series_untouched(self):
+        # Given / When
+        indices = lttb_indices(np.arange(10.0), 100)
+
+        # Then
+        assert indices.tolist() == list(range(10))
+
+    def test_nan_values(self):
+        # Given: Series with NaN gaps (DS-B-03)
+        y = np.arange(10_000, dtype=float)
+        y[100:3000] = np.nan
+
+        # When
+        lttb = lttb_indices(y, 200)
+        minmax = minmax_indices(y, 200)
+
+        # Then
+        assert len(lttb) == 200
+        assert len(minmax) <= 200
+
+
+class TestDownsamplePayload:
+    """集計結果の間引きのテスト"""
+
+    def test_chartjs_structure_aligned(self):
+        # Given: Chart.js style dict with labels and two datasets
+        n = 10_000
+        data = {
+            "labels": [f"t{i}" for i in range(n)],
+            "datasets": [
+                {"label": "sales", "data": list(range(n))},
+                {"label": "profit", "data": [float(i % 7) for i in range(n)]},
+            ],
+        }
+
+        # When
+        result, report = downsample_payload(data, DownsampleConfig(max_points=400))
+
+        # Then: Labels and datasets share the same selected points (DS-N-03)
+        sales = result["datasets"][0]["data"]
+        assert len(result["labels"]) == len(sales) == len(result["datasets"][1]["data"])
+        assert len(sales) <= 400
+        assert [f"t{v}" for v in sales] == result["labels"]
+        assert result["datasets"][0]["label"] == "sales"
+        assert report[0].path == "$"
+        assert report[0].original_points == n
+
+    def test_original_not_mutated(self):
+        # Given
+        data = {"charts": {"daily": {"x": list(range(5000)), "y": list(range(5000))}}}
+
+        # When
+        result, report = downsample_payload(data, DownsampleConfig(max_points=100))
+
+        # Then
+        assert len(data["charts"]["daily"]["y"]) == 5000
+        assert len(result["charts"]["daily"]["y"]) <= 100
+        assert report[0].path == "charts.daily"
+
+    def test_datetime_series(self):
+        # Given: A Series indexed by timestamps (DS-N-04)
+        index = pd.date_range("2024-01-01", periods=20_000, freq="min")
+        series = pd.Series(np.random.RandomState(1).rand(20_000), index=index)
+
+        # When
+        result, _ = downsample_payload({"hourly": series}, DownsampleConfig(max_points=300))
+
+        # Then
+        assert isinstance(result["hourly"], pd.Series)
+        assert len(result["hourly"]) == 300
+        assert result["hourly"].index[0] == index[0]
+        assert result["hourly"].index.isin(index).all()
+
+    def test_non_series_values_untouched(self):
+        # Given: Short series, table records and string lists (DS-B-01)
+        records = [{"地域": "東京", "売上": i} for i in range(5000)]
+        names = [f"name{i}" for i in range(5000)]
+        data = {"kpi": {"total": 1}, "short": [1, 2, 3], "table": records, "names": names}
+
+        # When
+        result, report = downsample_payload(data, DownsampleConfig(max_points=100))
+
+        # Then
+        assert result == data
+        assert report == []
+
+    def test_same_length_records_kept(self):
+        # Given: A series next to a table and nested lists of the same length (DS-B-04)
+        n = 5000
+        data = {
+            "labels": [f"d{i}" for i in range(n)],
+            "values": list(range(n)),
+            "table": [{"地域": "東京", "売上": i} for i in range(n)],
+            "pairs": [[i, i] for i in range(n)],
+        }
+
+        # When
+        result, report = downsample_payload(data, DownsampleConfig(max_points=100))
+
+        # Then
+        assert len(result["values"]) <= 100
+        assert result["labels"] == [f"d{v}" for v in result["values"]]
+        assert result["table"] == data["table"]
+        assert result["pairs"] == data["pairs"]
+        assert [item.path for item in report] == ["$"]
+
+    def test_disabled_returns_same_object(self):
+        # Given (DS-B-02)
+        data = {"y": list(range(10_000))}
+
+        # When
+        result, report = downsample_payload(data, DownsampleConfig(max_points=None))
+
+        # Then
+        assert result is data
+        assert report == []
+
+    def test_none_values_in_list(self):
+        # Given (DS-B-03)
+        data = {"y": [None if i % 3 == 0 else i for i in range(9000)]}
+
+        # When
+        result, _ = downsample_payload(data, DownsampleConfig(max_points=100, method="minmax"))
+
+        # Then
+        assert len(result["y"]) <= 100
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"method": "average"}, {"max_points": 2}], ids=["method", "max_points"]
+    )
+    def test_invalid_config(self, kwargs):
+        # Given / When / Then (DS-A-01)
+        with pytest.raises(ValueError):
+            DownsampleConfig(**kwargs)
+
+
+class TestGenerateOneshotDownsampling:
+    """generate_oneshot への組み込みのテスト"""
+
+    def test_html_bounded_and_full_data_kept(self, sample_dataframe):
+        # Given: Aggregation code returning a 200k-point series (DS-N-05)
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text="Blueprint"),
+            Mock(
+                text="""
+```python
+def aggregate_all_data(df):
+    import numpy as np
+    return {"charts": {"hourly": {"labels": list(range(200000)),
+                                  "values": np.arange(200000.0)}}}
+```
+
+```html
+<!DOCTYPE html><html><script>const dashboardData = {{JSON_DATA}};</script></html>
+```
+"""
+            ),
+        ]
+        generator = AIGenerator(model=mock_model, downsample=DownsampleConfig(max_points=1000))
+
+        # When
+        result = generator.generate_oneshot(sample_dataframe)
+
+        # Then: Embedded payload is small, original data is complete
+        assert len(result.html) < 100_000
+        assert len(result.data["charts"]["hourly"]["values"]) == 200_000
+        assert result.downsampled[0].path == "charts.hourly"
+        assert result.downsampled[0].points <= 1000
@@ -0,0 +1,260 @@
+"""
+FakeGeminiServer のテスト
+
+責務:
+- 実際の genai.Client + GenAIModelAdapter からの接続
+- 定型応答の組み立て
+- レイテンシ・エラー・打ち切りの注入
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.services.ai_generator import AIGenerator
+from src.services.chat_handler import ChatHandler
+from src.services.fake_gemini_server import (
+    FAKE_TEXT,
+    CannedResponder,
+    FakeGeminiServer,
+    FakeServerConfig,
+    classify_prompt,
+    estimate_tokens,
+)
+from src.services.genai_adapter import GenAIModelAdapter
+
+genai_errors = pytest.importorskip("google.genai.errors")
+
+
+def _post(server, path, payload):
+    request = urllib.request.Request(
+        server.base_url + path,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    return urllib.request.urlopen(request, timeout=5)
+
+
+class TestCannedResponder:
+    """定型応答のテスト"""
+
+    @pytest.mark.parametrize(
+        ("prompt", "kind"),
+        [
+            ("The following Python code has a syntax error.", "repair"),
+            ("aggregate_all_data ... const dashboardData = {{JSON_DATA}};", "code"),
+            ("20個以上のグラフ構成案を提案してください。", "blueprint"),
+            ("ユーザーのメッセージを以下のカテゴリに分類してください。", "intent"),
+            ("カテゴリに分類したうえで、そのカテゴリに応じた回答を作成", "combined"),
+            ("以下のリクエストに基づいてグラフ仕様を生成してください。", "chart_spec"),
+            ("こんにちは", "text"),
+        ],
+    )
+    def test_classify_prompt(self, prompt, kind):
+        # Given/When/Then: Prompt kinds recognised from the app's templates
+        assert classify_prompt(prompt) == kind
+
+    def test_intent_response_is_json(self):
+        # Given: Intent classification prompt for a chart request
+        prompt = "カテゴリに分類\nユーザーメッセージ: 地域別のグラフを見せて\n"
+
+        # When: Responding
+        kind, text = CannedResponder()(prompt)
+
+        # Then: JSON payload with add_chart
+        assert kind == "intent"
+        assert json.loads(text)["intent"] == "add_chart"
+
+    def test_combined_response_is_json(self):
+        # Given: Combined prompt for a chart request
+        prompt = (
+            "カテゴリに応じた回答\n## 利用可能なカラム\n['地域', '売上']\n"
+            "## ユーザーメッセージ\n地域別のグラフを見せて\n"
+        )
+
+        # When: Responding
+        kind, text = CannedResponder()(prompt)
+
+        # Then: Intent and chart spec in one payload
+        payload = json.loads(text)
+        assert kind == "combined"
+        assert payload["intent"] == "add_chart"
+        assert payload["chart_spec"]["x"] == "地域"
+
+    def test_chart_spec_uses_available_columns(self):
+        # Given: Chart spec prompt listing columns
+        prompt = "グラフ仕様を生成\n## 利用可能なカラム\n['地域', '売上']\n"
+
+        # When: Responding
+        _, text = CannedResponder()(prompt)
+
+        # Then: Columns reused in the spec
+        assert '"x": "地域"' in text
+        assert '"y": "売上"' in text
+
+    def test_estimate_tokens_minimum(self):
+        # Given/When/Then: Empty text still counts as one token
+        assert estimate_tokens("") == 1
+
+
+class TestFakeServerConfig:
+    """設定バリデーションのテスト"""
+
+    def test_rejects_unknown_distribution(self):
+        # When & Then: ValueError for unsupported distribution
+        with pytest.raises(ValueError, match="未対応のレイテンシ分布"):
+            FakeServerConfig(latency_dist="pareto")
+
+    @pytest.mark.parametrize("rate", [-0.1, 1.1])
+    def test_rejects_out_of_range_rate(self, rate):
+        # When & Then: ValueError for rates outside [0, 1]
+        with pytest.raises(ValueError, match="error_rate"):
+            FakeServerConfig(error_rate=rate)
+
+    @pytest.mark.parametrize("dist", ["fixed", "uniform", "normal", "lognormal"])
+    def test_sample_latency_non_negative(self, dist):
+        # Given: Server with each distribution
+        config = FakeServerConfig(latency_ms=10, latency_dist=dist, latency_jitter_ms=50, seed=1)
+        server = FakeGeminiServer(config)
+        try:
+            # When: Sampling repeatedly
+            samples = [server.sample_latency() for _ in range(200)]
+        finally:
+            server._httpd.server_close()
+
+        # Then: Never negative, centred near the configured value
+        assert min(samples) >= 0.0
+        assert 0.0 < sorted(samples)[100] < 0.1
+
+
+class TestFakeServerWithGenAIClient:
+    """実際の genai.Client からの接続テスト"""
+
+    def test_generate_content_through_adapter(self):
+        # Given: Server and a real client/adapter pointed at it
+        with FakeGeminiServer() as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="gemini-2.5-flash")
+
+            # When: Requesting a blueprint
+            response = adapter.generate_content("20個以上のグラフ構成案を提案してください。")
+
+        # Then: Canned blueprint returned through the SDK
+        assert "Mock Blueprint" in response.text
+        assert server.stats.by_kind == {"blueprint": 1}
+
+    def test_oneshot_end_to_end(self, sample_dataframe):
+        # Given: AIGenerator using the real adapter against the fake server
+        with FakeGeminiServer() as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="gemini-2.5-flash")
+            generator = AIGenerator(model=adapter)
+
+            # When: Generating a full dashboard
+            result = generator.generate_oneshot(sample_dataframe)
+
+        # Then: Mock assets flow through parsing, exec and assembly
+        assert result.data["kpi"]["row_count"] == 5
+        assert "Titanic Executive Metadata" in result.html
+        assert "{{JSON_DATA}}" not in result.html
+
+    def test_streaming_chat_through_adapter(self, sample_dataframe):
+        # Given: Combined chat mode streaming small chunks from the server
+        config = FakeServerConfig(stream_chunk_tokens=4)
+        with FakeGeminiServer(config) as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="m")
+            handler = ChatHandler(model=adapter, combined=True)
+
+            # When: Streaming an answer to a question
+            stream = handler.stream_message("売上はどう？", {"df": sample_dataframe})
+            chunks = list(stream)
+
+        # Then: Only the decoded content is shown, from one streamed request
+        assert len(chunks) > 1
+        assert "".join(chunks) == FAKE_TEXT
+        assert stream.response.type == "text"
+        assert server.stats.by_kind == {"combined": 1}
+
+    def test_latency_and_token_rate(self):
+        # Given: 100ms latency plus a slow token rate
+        config = FakeServerConfig(latency_ms=100, tokens_per_second=1000)
+        with FakeGeminiServer(config) as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="m")
+
+            # When: Timing a request
+            start = time.perf_counter()
+            adapter.generate_content("こんにちは")
+            elapsed = time.perf_counter() - start
+
+        # Then: At least the configured latency elapsed
+        assert elapsed >= 0.1
+
+    def test_error_injection(self):
+        # Given: Every request fails with 503
+        config = FakeServerConfig(error_rate=1.0, error_statuses=(503,))
+        with FakeGeminiServer(config) as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="m")
+
+            # When & Then: SDK raises a server error
+            with pytest.raises(genai_errors.ServerError):
+                adapter.generate_content("こんにちは")
+        assert server.stats.errors == 1
+
+    def test_truncation_injection(self):
+        # Given: Every response is truncated to half
+        config = FakeServerConfig(truncation_rate=1.0, truncation_ratio=0.5)
+        with FakeGeminiServer(config) as server:
+            adapter = GenAIModelAdapter(server.create_client(), model_name="m")
+
+            # When: Requesting
+            response = adapter.generate_content("こんにちは")
+
+        # Then: Text shortened and finish reason is MAX_TOKENS
+        _, full = CannedResponder()("こんにちは")
+        assert response.text == full[: len(full) // 2]
+        assert response.raw.candidates[0].finish_reason.name == "MAX_TOKENS"
+        assert server.stats.truncated == 1
+
+    def test_streaming_endpoint(self):
+        # Given: Small stream chunks
+        config = FakeServerConfig(stream_chunk_tokens=4)
+        with FakeGeminiServer(config) as server:
+            client = server.create_client()
+
+            # When: Streaming through the SDK
+            chunks = [
+                chunk.text
+                for chunk in client.models.generate_content_stream(model="m", contents="hi")
+            ]
+
+        # Then: Multiple chunks that join to the canned text
+        _, full = CannedResponder()("hi")
+        assert len(chunks) > 1
+        assert "".join(chunks) == full
+
+
+class TestFakeServerHttpErrors:
+    """不正なリクエストのテスト"""
+
+    def test_unknown_path_returns_404(self):
+        # Given: Running server
+        # When & Then: Unknown method is rejected
+        with FakeGeminiServer() as server, pytest.raises(urllib.error.HTTPError) as excinfo:
+            _post(server, "/v1beta/models/m:countTokens", {})
+        assert excinfo.value.code == 404
+
+    def test_invalid_json_returns_400(self):
+        # Given: Running server
+        with FakeGeminiServer() as server:
+            request = urllib.request.Request(
+                server.base_url + "/v1beta/models/m:generateContent",
+                data=b"{not json",
+                method="POST",
+            )
+
+            # When & Then: Bad payload is rejected
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(request, timeout=5)
+        assert excinfo.value.code == 400
@@ -1,6 +1,7 @@
 from unittest.mock import Mock
 
 from src.services.genai_adapter import GenAIModelAdapter, GenAIResponse, _extract_text
+from src.services.model_cassette import ModelCassette
 
 
 class TestGenAIAdapter:
@@ -72,3 +73,29 @@ class TestGenAIAdapter:
 
         # Then: Returns empty string
         assert text == ""
+
+    def test_generate_content_stream_records_full_text(self, tmp_path):
+        # Given: Mock client streaming two chunks, recording cassette
+        # Perspective: GEN-N-02 (Equivalence - Streaming)
+        mock_client = Mock()
+        mock_client.models.generate_content_stream.return_value = iter(
+            [Mock(text="AI "), Mock(text="Result")]
+        )
+        cassette = ModelCassette(tmp_path / "c.jsonl", mode="record")
+        adapter = GenAIModelAdapter(client=mock_client, model_name="m", cassette=cassette)
+
+        # When: Streaming
+        chunks = [chunk.text for chunk in adapter.generate_content_stream("Hello")]
+
+        # Then: Chunks in order, and the joined text is recorded once
+        assert chunks == ["AI ", "Result"]
+        replay = ModelCassette(tmp_path / "c.jsonl", mode="replay")
+        assert replay.replay("m", "Hello").text == "AI Result"
+
+        # When: Replaying through the adapter without a client
+        replayed = list(
+            GenAIModelAdapter(None, "m", cassette=replay).generate_content_stream("Hello")
+        )
+
+        # Then: A single chunk with the full text
+        assert [chunk.text for chunk in replayed] == ["AI Result"]
@@ -0,0 +1,270 @@
+"""
+HtmlOptimizer のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| HO-N-01    | 同じ URL の script / link が2つ             | Equivalence       | 2つ目以降が除かれる                      |
+| HO-N-02    | 連続するインラインスクリプト                | Equivalence       | 1つの <script> にまとまる                |
+| HO-N-03    | コメント・文字列・正規表現を含む JS         | Equivalence       | コメントと空白だけが除かれる             |
+| HO-N-04    | コメント・文字列を含む CSS                  | Equivalence       | コメントと空白だけが除かれる             |
+| HO-N-05    | pre / JSON スクリプト / 条件付きコメント    | Equivalence       | そのまま残る                             |
+| HO-N-06    | optimize_output=True の assemble_html       | Equivalence       | lucide は1回・注入スクリプトは1ブロック  |
+| HO-N-07    | optimize_output=True + 圧縮                 | Equivalence       | 圧縮データとローダーが入る               |
+| HO-B-01    | 最初の読み込みが async                      | Boundary          | 後続のタグを残す                         |
+| HO-B-02    | return / ++ の前後・コメント内の改行        | Boundary          | 自動セミコロン挿入に関わる改行を残す     |
+| HO-B-03    | optimize_output 既定値                      | Boundary          | 出力は変わらない                         |
+| HO-B-04    | ASCII 以外の文字を含む識別子                | Boundary          | 識別子の間の空白を残す                   |
+| HO-B-05    | if / while / for の括弧の直後の正規表現     | Boundary          | 正規表現リテラルとしてそのまま残す       |
+| HO-B-06    | 閉じない正規表現・コメント、対応しない括弧  | Boundary          | 縮小せずにそのまま返す                   |
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.ai_generator import INJECTED_SCRIPTS, AIGenerator
+from src.services.html_optimizer import (
+    dedupe_resources,
+    loaded_resources,
+    merge_inline_scripts,
+    minify_css,
+    minify_html,
+    minify_js,
+    optimize_template,
+)
+from src.services.payload_compression import COMPRESSED_DATA_ELEMENT_ID
+
+LUCIDE = '<script src="https://unpkg.com/lucide@latest"></script>'
+
+TEMPLATE = f"""<!DOCTYPE html>
+<html>
+<head>
+    {LUCIDE}
+    <style>
+        /* カード */
+        .card {{ padding: 1rem; }}
+    </style>
+</head>
+<body>
+    <div class="card">  売上  </div>
+    <script>
+        // データ
+        const dashboardData = {{{{JSON_DATA}}}};
+        document.getElementById('memo').textContent = dashboardData.memo;
+    </script>
+</body>
+</html>"""
+
+
+class TestDedupeResources:
+    """外部リソースの重複除去のテスト"""
+
+    def test_duplicates_removed(self):
+        # Given
+        html = (
+            f"{LUCIDE}<link rel='stylesheet' href='a.css'>"
+            f"<p>x</p>{LUCIDE}<link href='a.css' rel='stylesheet'><link rel='icon' href='a.css'>"
+        )
+
+        # When
+        deduped, removed = dedupe_resources(html)
+
+        # Then (HO-N-01)
+        assert (
+            deduped
+            == f"{LUCIDE}<link rel='stylesheet' href='a.css'><p>x</p><link rel='icon' href='a.css'>"
+        )
+        assert removed == ["https://unpkg.com/lucide@latest", "a.css"]
+
+    def test_async_first_load_keeps_later_tag(self):
+        # Given (HO-B-01)
+        html = '<script async src="a.js"></script><script src="a.js"></script>'
+
+        # When
+        deduped, removed = dedupe_resources(html)
+
+        # Then
+        assert deduped == html
+        assert removed == []
+        assert loaded_resources(html) == {"a.js"}
+
+
+class TestMergeInlineScripts:
+    """インラインスクリプトの結合のテスト"""
+
+    def test_adjacent_scripts_merged(self):
+        # Given (HO-N-02)
+        html = (
+            "<script>a()</script>\n<script>b()</script>"
+            '<script src="x.js"></script><script>c()</script><p>d</p><script>e()</script>'
+        )
+
+        # When
+        merged = merge_inline_scripts(html)
+
+        # Then: External scripts and other content split the groups
+        assert merged == (
+            '<script>a();b()</script><script src="x.js"></script>'
+            "<script>c()</script><p>d</p><script>e()</script>"
+        )
+
+
+class TestMinify:
+    """縮小のテスト"""
+
+    def test_minify_js_keeps_literals(self):
+        # Given (HO-N-03)
+        js = """
+            // コメント
+            var url = "http://example.com/  a";  /* ブロック */
+            var re = /\\/\\/[/]/g, half = total / 2;
+            var text = `a  ${ value  +  1 }  b`;
+            if (x) { return 'y' ; }
+        """
+
+        # When
+        minified = minify_js(js)
+
+        # Then
+        assert minified == (
+            'var url="http://example.com/  a";var re=/\\/\\/[/]/g,half=total/2;'
+            "var text=`a  ${ value  +  1 }  b`;if(x){return'y';}"
+        )
+
+    @pytest.mark.parametrize(
+        ("js", "expected"),
+        [
+            ("return\nx", "return\nx"),
+            ("a\n++b", "a\n++b"),
+            ("a = b +\n+c", "a=b+\n+c"),
+            ("f(1,\n2)", "f(1,2)"),
+            ("var n = 1 .toString()", "var n=1 .toString()"),
+            ("a=1/*\n*/b=2", "a=1\nb=2"),
+            ("a=1/* x\u2028 */b=2", "a=1\nb=2"),
+            ("f(1, /*\n*/ 2)", "f(1,2)"),
+        ],
+    )
+    def test_minify_js_keeps_asi_newlines(self, js, expected):
+        # Given / When / Then (HO-B-02)
+        assert minify_js(js) == expected
+
+    @pytest.mark.parametrize(
+        ("js", "expected"),
+        [
+            ("const 売上 = 1", "const 売上=1"),
+            ("let total = 売上 + 件数", "let total=売上+件数"),
+            ("return 売上 in obj", "return 売上 in obj"),
+            ("x = 売上 / 2 / y", "x=売上/2/y"),
+        ],
+    )
+    def test_minify_js_non_ascii_identifiers(self, js, expected):
+        # Given / When / Then (HO-B-04)
+        assert minify_js(js) == expected
+
+    @pytest.mark.parametrize(
+        ("js", "expected"),
+        [
+            ("if (x) /\\/\\//.test(s) && f();", "if(x)/\\/\\//.test(s)&&f();"),
+            ("while (ok()) /a b/g.exec(t);", "while(ok())/a b/g.exec(t);"),
+            ("for (;;) /x/.test(s)", "for(;;)/x/.test(s)"),
+            ("a = (b) / c / d", "a=(b)/c/d"),
+            ("if (f(a) / 2) g()", "if(f(a)/2)g()"),
+        ],
+    )
+    def test_minify_js_regex_after_statement_header(self, js, expected):
+        # Given / When / Then (HO-B-05)
+        assert minify_js(js) == expected
+
+    @pytest.mark.parametrize(
+        "js",
+        ["var r = /abc\nvar s = 1;", "var a = 1; /* open", "f(1, 2;", "f(1)) ; g()"],
+    )
+    def test_minify_js_ambiguous_left_as_is(self, js):
+        # Given / When / Then (HO-B-06)
+        assert minify_js(js) == js
+
+    def test_minify_css(self):
+        # Given (HO-N-04)
+        css = """
+            /* 見出し */
+            h1 , h2 > span { font-family: 'Cormorant  Garamond', serif ; }
+            a :hover { color: red; }
+        """
+
+        # When / Then
+        assert minify_css(css) == (
+            "h1,h2>span{font-family:'Cormorant  Garamond',serif}a :hover{color:red}"
+        )
+
+    def test_minify_html_keeps_raw_content(self):
+        # Given (HO-N-05)
+        html = (
+            "<!--[if IE]><p>IE</p><![endif]-->\n<!-- 削除 -->\n<div>\n  <span>a</span>\n"
+            "  <span>b</span>\n</div>\n<pre>  整形  済み </pre>\n"
+            '<script type="application/json">{"a":  1}</script>'
+        )
+
+        # When
+        minified = minify_html(html)
+
+        # Then
+        assert minified == (
+            "<!--[if IE]><p>IE</p><![endif]--><div><span>a</span> <span>b</span></div>"
+            '<pre>  整形  済み </pre><script type="application/json">{"a":  1}</script>'
+        )
+
+
+class TestAssembleHtmlOptimization:
+    """assemble_html への組み込みのテスト"""
+
+    DATA = {"memo": "a  b // c <b>", "values": [1, 2]}
+
+    def test_optimized_output(self):
+        # Given (HO-N-06)
+        generator = AIGenerator(model=Mock(), optimize_output=True, prune_payload=False)
+        plain = AIGenerator(model=Mock(), prune_payload=False).assemble_html(TEMPLATE, self.DATA)
+
+        # When
+        html = generator.assemble_html(TEMPLATE, self.DATA)
+
+        # Then: Lucide is loaded once, injected scripts form one block, JSON is verbatim
+        assert html.count("lucide@latest") == 1
+        assert html.count("<script>") == 2
+        assert "Safety Net" in html and "Direct View" in html
+        assert f"const dashboardData={json.dumps(self.DATA, ensure_ascii=False)};" in html
+        assert "/* カード */" not in html
+        assert len(html) < len(plain)
+
+    def test_optimized_output_with_compression(self):
+        # Given (HO-N-07)
+        generator = AIGenerator(model=Mock(), optimize_output=True, compress_threshold=0)
+
+        # When
+        html = generator.assemble_html(TEMPLATE, self.DATA)
+
+        # Then
+        assert f'id="{COMPRESSED_DATA_ELEMENT_ID}"' in html
+        assert "a  b // c" not in html
+        assert html.count("lucide@latest") == 1
+
+    def test_disabled_by_default(self):
+        # Given (HO-B-03)
+        generator = AIGenerator(model=Mock(), prune_payload=False)
+
+        # When
+        html = generator.assemble_html(TEMPLATE, self.DATA)
+
+        # Then
+        assert INJECTED_SCRIPTS in html
+        assert html.count("lucide@latest") == 2
+
+    def test_optimize_template_drops_loaded_lucide(self):
+        # Given / When
+        template, scripts = optimize_template(TEMPLATE, INJECTED_SCRIPTS)
+
+        # Then
+        assert LUCIDE in template
+        assert "lucide@latest" not in scripts
+        assert scripts.count("<script>") == 1
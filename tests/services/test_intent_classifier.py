@@ -0,0 +1,169 @@
+"""
+IntentClassifier のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| IC-N-01    | 学習用例文にない典型的なメッセージ          | Equivalence       | 確信度しきい値以上で正しい意図           |
+| IC-N-02    | 全角英数・空白を含むメッセージ              | Equivalence       | 正規化して同じ結果                       |
+| IC-N-03    | 確信度の高いメッセージで ChatHandler        | Equivalence       | 意図分類でモデルを呼ばない               |
+| IC-N-04    | handle_message                              | Equivalence       | モデル呼び出しは応答生成の1回だけ        |
+| IC-B-01    | 複数の意図が混在・曖昧なメッセージ          | Boundary          | classify は None（LLM に委ねる）         |
+| IC-B-02    | 確信度が足りないメッセージで ChatHandler    | Boundary          | モデルで分類する                         |
+| IC-B-03    | threshold=0 / 1                             | Boundary          | 常にローカル / 常に LLM                  |
+| IC-B-04    | キーワード直後に否定語（グラフは要らない）  | Boundary          | その意図に分類しない（他の意図か LLM）   |
+| IC-A-01    | threshold が範囲外                          | Abnormal          | ValueError                               |
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.chat_handler import ChatHandler, Intent
+from src.services.intent_classifier import (
+    INTENT_LABELS,
+    IntentClassifier,
+    NgramModel,
+    char_ngrams,
+    normalize,
+)
+
+HELD_OUT = [
+    ("question", "売上が最も多い月はいつですか？"),
+    ("question", "総売上はいくら"),
+    ("question", "大阪と東京どっちが多い？"),
+    ("add_chart", "年代別の棒グラフを作って"),
+    ("add_chart", "クラス別の生存率を可視化して"),
+    ("analyze", "性別で生存率を比較して"),
+    ("analyze", "曜日ごとの傾向を調べて"),
+    ("summarize", "重要なポイントをまとめて"),
+    ("summarize", "レポートを作って"),
+    ("general", "ありがとうございます"),
+    ("general", "こんにちは！"),
+]
+
+
+class TestIntentClassifier:
+    """ローカル分類のテスト"""
+
+    @pytest.mark.parametrize(("label", "message"), HELD_OUT)
+    def test_held_out_messages(self, label, message):
+        # Given
+        classifier = IntentClassifier()
+
+        # When
+        prediction = classifier.predict(message)
+
+        # Then (IC-N-01)
+        assert prediction.intent == label
+        assert classifier.classify(message) == label
+        assert prediction.probabilities.keys() == set(INTENT_LABELS)
+        assert sum(prediction.probabilities.values()) == pytest.approx(1.0)
+
+    def test_normalization(self):
+        # Given (IC-N-02)
+        classifier = IntentClassifier()
+
+        # When / Then
+        assert normalize("Ｆａｒｅ の 平均 は？") == "fareの平均は?"
+        assert classifier.predict("Ｆａｒｅ の 平均 は？") == classifier.predict("fareの平均は?")
+        assert classifier.predict("ＯＫ") == classifier.predict("OK") == classifier.predict("ok")
+
+    @pytest.mark.parametrize(
+        "message", ["グラフの傾向を分析して", "まとめてグラフにして", "うーん", "show me sales"]
+    )
+    def test_ambiguous_messages_deferred(self, message):
+        # Given / When / Then (IC-B-01)
+        assert IntentClassifier().classify(message) is None
+
+    @pytest.mark.parametrize(
+        ("message", "negated"),
+        [
+            ("グラフは要らない、要約して", "add_chart"),
+            ("グラフなしで要約して", "add_chart"),
+            ("チャートは不要、まとめて", "add_chart"),
+            ("グラフはいりません。まとめだけください", "add_chart"),
+            ("グラフを追加して、要約は要らない", "summarize"),
+        ],
+    )
+    def test_negated_keywords(self, message, negated):
+        # Given
+        classifier = IntentClassifier()
+
+        # When
+        prediction = classifier.predict(message)
+
+        # Then (IC-B-04)
+        assert prediction.intent != negated
+        assert classifier.classify(message) != negated
+
+    def test_threshold_bounds(self):
+        # Given (IC-B-03)
+        always_local = IntentClassifier(threshold=0.0)
+        never_local = IntentClassifier(threshold=1.0)
+
+        # When / Then
+        assert always_local.classify("うーん") is not None
+        assert never_local.classify("うーん") is None
+
+    @pytest.mark.parametrize("threshold", [-0.1, 1.5])
+    def test_invalid_threshold(self, threshold):
+        # Given / When / Then (IC-A-01)
+        with pytest.raises(ValueError):
+            IntentClassifier(threshold=threshold)
+
+    def test_custom_model(self):
+        # Given: A model trained on a custom corpus
+        model = NgramModel({"question": ("いくら？",), "general": ("やあ",)})
+
+        # When
+        scores = model.log_scores(normalize("やあやあ"))
+
+        # Then
+        assert scores["general"] > scores["question"]
+        assert char_ngrams("ab") == {
+            "^": 1, "a": 1, "b": 1, "$": 1, "^a": 1, "ab": 1, "b$": 1, "^ab": 1, "ab$": 1,
+        }  # fmt: skip
+
+
+class TestChatHandlerLocalIntent:
+    """ChatHandler への組み込みのテスト"""
+
+    def test_confident_message_skips_model(self):
+        # Given (IC-N-03)
+        mock_model = Mock()
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier())
+
+        # When
+        intent = handler.classify_intent("地域別の売上グラフを追加して")
+
+        # Then
+        assert intent == Intent.ADD_CHART
+        mock_model.generate_content.assert_not_called()
+
+    def test_uncertain_message_uses_model(self):
+        # Given (IC-B-02)
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(text='{"intent": "analyze"}')
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier())
+
+        # When
+        intent = handler.classify_intent("グラフの傾向を分析して")
+
+        # Then
+        assert intent == Intent.ANALYZE
+        mock_model.generate_content.assert_called_once()
+
+    def test_handle_message_single_model_call(self, sample_dataframe):
+        # Given (IC-N-04)
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(text="大阪が最も高く20000円です。")
+        handler = ChatHandler(model=mock_model, intent_classifier=IntentClassifier())
+
+        # When
+        response = handler.handle_message("売上が一番高いのはどこ？", {"df": sample_dataframe})
+
+        # Then
+        assert response.type == "text"
+        assert response.content == "大阪が最も高く20000円です。"
+        assert mock_model.generate_content.call_count == 1
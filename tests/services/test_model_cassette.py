@@ -0,0 +1,165 @@
+"""
+ModelCassette のテスト
+
+観点表:
+| Case ID    | Input / Precondition                 | Perspective       | Expected Result                       |
+| ---------- | ------------------------------------ | ----------------- | ------------------------------------- |
+| CAS-N-01   | 記録 → 再生                          | Equivalence       | client を呼ばずに同じ応答が返る       |
+| CAS-N-02   | 同じプロンプトを複数回記録           | Equivalence       | 記録順に返り、使い切ると最後を返す    |
+| CAS-N-03   | replay_latency=True                  | Equivalence       | 記録レイテンシ×倍率だけ待機する       |
+| CAS-A-01   | 未記録のプロンプト                   | Abnormal          | CassetteMissError                     |
+| CAS-A-02   | 存在しないカセットで再生             | Abnormal          | FileNotFoundError                     |
+| CAS-A-03   | 未対応モード                         | Abnormal          | ValueError                            |
+| CAS-B-01   | 最終行が途切れたカセット             | Boundary          | 途切れた行は無視される                |
+"""
+
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.genai_adapter import GenAIModelAdapter
+from src.services.model_cassette import CassetteMissError, ModelCassette, prompt_key
+
+
+def _client_returning(*texts):
+    client = Mock()
+    client.models.generate_content.side_effect = [Mock(text=text) for text in texts]
+    return client
+
+
+class TestRecordAndReplay:
+    """記録・再生のテスト"""
+
+    def test_record_then_replay_without_client(self, tmp_path):
+        # Given: A recorded session
+        path = tmp_path / "session.jsonl"
+        recorder = GenAIModelAdapter(
+            _client_returning("blueprint", "code"),
+            model_name="gemini-2.5-flash",
+            cassette=ModelCassette(path, mode="record"),
+        )
+        recorder.generate_content("phase1")
+        recorder.generate_content("phase2")
+
+        # When: Replaying with no client at all
+        player = GenAIModelAdapter(
+            None, model_name="gemini-2.5-flash", cassette=ModelCassette(path)
+        )
+
+        # Then: Same responses served back (CAS-N-01)
+        assert player.generate_content("phase2").text == "code"
+        assert player.generate_content("phase1").text == "blueprint"
+        assert player.generate_content("phase1").raw is None
+
+    def test_compact_line_format(self, tmp_path):
+        # Given: A long prompt recorded once
+        path = tmp_path / "c.jsonl"
+        cassette = ModelCassette(path, mode="record")
+
+        # When: Recording
+        cassette.record("m", "x" * 1000, "応答", 12.345)
+
+        # Then: Prompt stored as hash + head only, text kept verbatim
+        line = json.loads(path.read_text(encoding="utf-8"))
+        assert line["key"] == prompt_key("m", "x" * 1000)
+        assert len(line["prompt_head"]) == 120
+        assert line["text"] == "応答"
+        assert line["latency_ms"] == 12.3
+
+    def test_repeated_prompt_served_in_order(self, tmp_path):
+        # Given: Same prompt recorded twice with different answers (chat retries)
+        path = tmp_path / "c.jsonl"
+        recorder = ModelCassette(path, mode="record")
+        recorder.record("m", "same", "first", 1.0)
+        recorder.record("m", "same", "second", 1.0)
+        player = ModelCassette(path)
+
+        # When: Replaying three times
+        texts = [player.replay("m", "same").text for _ in range(3)]
+
+        # Then: Recorded order, last one repeated when exhausted (CAS-N-02)
+        assert texts == ["first", "second", "second"]
+        assert len(player) == 2
+
+    def test_model_name_is_part_of_key(self, tmp_path):
+        # Given: Recording made with another model
+        path = tmp_path / "c.jsonl"
+        ModelCassette(path, mode="record").record("gemini-2.5-pro", "p", "t", 1.0)
+
+        # When & Then: Miss for a different model (CAS-A-01)
+        with pytest.raises(CassetteMissError, match="gemini-2.5-flash"):
+            ModelCassette(path).replay("gemini-2.5-flash", "p")
+
+    def test_replay_latency_scaled(self, tmp_path):
+        # Given: Entry recorded with 200ms latency, replayed at 0.5x
+        path = tmp_path / "c.jsonl"
+        ModelCassette(path, mode="record").record("m", "p", "t", 200.0)
+        player = ModelCassette(path, replay_latency=True, latency_scale=0.5)
+
+        # When: Replaying
+        start = time.perf_counter()
+        player.replay("m", "p")
+        elapsed = time.perf_counter() - start
+
+        # Then: Waited about 100ms (CAS-N-03)
+        assert 0.09 <= elapsed < 0.5
+
+    def test_client_errors_are_not_recorded(self, tmp_path):
+        # Given: Client that fails
+        path = tmp_path / "c.jsonl"
+        client = Mock()
+        client.models.generate_content.side_effect = RuntimeError("quota")
+        adapter = GenAIModelAdapter(client, "m", cassette=ModelCassette(path, mode="record"))
+
+        # When & Then: Error propagates and nothing is written
+        with pytest.raises(RuntimeError):
+            adapter.generate_content("p")
+        assert not path.exists()
+
+
+class TestCassetteValidation:
+    """設定・読み込みのテスト"""
+
+    def test_missing_file_in_replay(self, tmp_path):
+        # When & Then: FileNotFoundError (CAS-A-02)
+        with pytest.raises(FileNotFoundError, match="カセットファイル"):
+            ModelCassette(tmp_path / "none.jsonl")
+
+    def test_unknown_mode(self, tmp_path):
+        # When & Then: ValueError (CAS-A-03)
+        with pytest.raises(ValueError, match="未対応のカセットモード"):
+            ModelCassette(tmp_path / "c.jsonl", mode="rewind")
+
+    def test_truncated_last_line_ignored(self, tmp_path):
+        # Given: Cassette whose recording was interrupted (CAS-B-01)
+        path = tmp_path / "c.jsonl"
+        ModelCassette(path, mode="record").record("m", "p", "ok", 1.0)
+        with path.open("a", encoding="utf-8") as fh:
+            fh.write('{"model": "m", "key": "ab')
+
+        # When & Then: Complete entries still load
+        assert ModelCassette(path).replay("m", "p").text == "ok"
+
+    def test_from_env(self, tmp_path, monkeypatch):
+        # Given: Environment configured for replay with latency
+        path = tmp_path / "c.jsonl"
+        ModelCassette(path, mode="record").record("m", "p", "t", 1.0)
+        monkeypatch.setenv("GEMINI_CASSETTE", str(path))
+        monkeypatch.setenv("GEMINI_CASSETTE_LATENCY", "0.25")
+
+        # When: Building from env
+        cassette = ModelCassette.from_env()
+
+        # Then: Replay mode with scaled latency
+        assert cassette.replaying
+        assert cassette.replay_latency
+        assert cassette.latency_scale == 0.25
+
+    def test_from_env_unset(self, monkeypatch):
+        # Given: No cassette configured
+        monkeypatch.delenv("GEMINI_CASSETTE", raising=False)
+
+        # When & Then: None
+        assert ModelCassette.from_env() is None
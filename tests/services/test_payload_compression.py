@@ -0,0 +1,139 @@
+"""
+PayloadCompression のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| PC-N-01    | JSON 文字列                                 | Equivalence       | gzip + base64 で往復でき、出力は決定的   |
+| PC-N-02    | データ宣言を含むスクリプト以降              | Equivalence       | 遅延 type に書き換わり、前のものは不変   |
+| PC-N-03    | 閾値を超える集計結果で assemble_html        | Equivalence       | 圧縮要素と展開スクリプトが入り 5 倍以上縮む |
+| PC-B-01    | JSON データブロック / type="module"         | Boundary          | データブロックは不変、module は型を保持  |
+| PC-B-02    | 式がスクリプトの外にある                    | Boundary          | 圧縮せず JSON をそのまま埋め込む         |
+| PC-B-03    | 閾値以下 / compress_threshold=None          | Boundary          | 圧縮しない                               |
+"""
+
+import base64
+import gzip
+import json
+import re
+from unittest.mock import Mock
+
+from src.services.ai_generator import AIGenerator
+from src.services.payload_compression import (
+    COMPRESSED_DATA_ELEMENT_ID,
+    COMPRESSED_DATA_EXPRESSION,
+    COMPRESSED_DATA_LOADER_SCRIPT,
+    DEFERRED_SCRIPT_TYPE,
+    compress_json,
+    embed_compressed,
+)
+
+TEMPLATE = (
+    "<html><head>"
+    '<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>'
+    "<script>const dashboardData = {{JSON_DATA}};</script>"
+    '<script type="application/json" id="config">{"a": 1}</script>'
+    '<script type="module">import x from "./x.js";</script>'
+    "</head><body><script>render(dashboardData.charts);</script></body></html>"
+)
+
+
+def _decode(html: str) -> dict:
+    match = re.search(rf'id="{COMPRESSED_DATA_ELEMENT_ID}">([^<]*)</script>', html)
+    return json.loads(gzip.decompress(base64.b64decode(match.group(1))))
+
+
+class TestCompressJson:
+    """圧縮のテスト"""
+
+    def test_round_trip_and_deterministic(self):
+        # Given
+        json_data = json.dumps({"売上": [1.5, 2.0] * 1000}, ensure_ascii=False)
+
+        # When
+        encoded = compress_json(json_data)
+
+        # Then (PC-N-01)
+        assert gzip.decompress(base64.b64decode(encoded)).decode("utf-8") == json_data
+        assert compress_json(json_data) == encoded
+
+
+class TestEmbedCompressed:
+    """埋め込みのテスト"""
+
+    def test_loader_uses_same_names(self):
+        # Given / When / Then: Loader script matches the Python-side constants
+        assert f"'{DEFERRED_SCRIPT_TYPE}'" in COMPRESSED_DATA_LOADER_SCRIPT
+        assert f"'{COMPRESSED_DATA_ELEMENT_ID}'" in COMPRESSED_DATA_LOADER_SCRIPT
+        assert f"{COMPRESSED_DATA_EXPRESSION} = await" in COMPRESSED_DATA_LOADER_SCRIPT
+
+    def test_scripts_from_declaration_are_deferred(self):
+        # Given
+        html = TEMPLATE.replace("{{JSON_DATA}}", COMPRESSED_DATA_EXPRESSION)
+
+        # When
+        result = embed_compressed(html, '{"charts": [1, 2]}')
+
+        # Then (PC-N-02)
+        tags = re.findall(r"<script\b[^>]*>", result)
+        assert tags[0] == '<script src="https://cdn.jsdelivr.net/npm/chart.js">'
+        assert f'id="{COMPRESSED_DATA_ELEMENT_ID}"' in tags[1]
+        assert tags[3] == f'<script type="{DEFERRED_SCRIPT_TYPE}">'
+        assert tags[-1] == f'<script type="{DEFERRED_SCRIPT_TYPE}">'
+        assert result.index(COMPRESSED_DATA_ELEMENT_ID) < result.index(COMPRESSED_DATA_EXPRESSION)
+        assert _decode(result) == {"charts": [1, 2]}
+
+    def test_data_blocks_untouched_and_module_type_kept(self):
+        # Given (PC-B-01)
+        html = TEMPLATE.replace("{{JSON_DATA}}", COMPRESSED_DATA_EXPRESSION)
+
+        # When
+        result = embed_compressed(html, "{}")
+
+        # Then
+        assert '<script type="application/json" id="config">' in result
+        assert f'type="{DEFERRED_SCRIPT_TYPE}" data-deferred-type="module"' in result
+
+    def test_expression_outside_script_falls_back(self):
+        # Given (PC-B-02)
+        html = f"<div data-x='{COMPRESSED_DATA_EXPRESSION}'></div><script>go()</script>"
+
+        # When
+        result = embed_compressed(html, '{"a": 1}')
+
+        # Then
+        assert result == "<div data-x='{\"a\": 1}'></div><script>go()</script>"
+
+
+class TestAssembleHtmlCompression:
+    """assemble_html への組み込みのテスト"""
+
+    def test_large_payload_is_compressed(self):
+        # Given (PC-N-03)
+        data = {"charts": [{"地域": f"地域{i % 10}", "売上": i * 1.25} for i in range(20000)]}
+        generator = AIGenerator(model=Mock(), compress_threshold=64 * 1024)
+        plain = AIGenerator(model=Mock(), compress_threshold=None).assemble_html(TEMPLATE, data)
+
+        # When
+        result = generator.assemble_html(TEMPLATE, data)
+
+        # Then
+        assert f"const dashboardData = {COMPRESSED_DATA_EXPRESSION};" in result
+        assert "DecompressionStream" in result
+        assert _decode(result) == data
+        assert len(result.encode()) * 5 < len(plain.encode())
+
+    def test_small_payload_is_not_compressed(self):
+        # Given (PC-B-03)
+        data = {"charts": [1, 2, 3]}
+
+        # When
+        default = AIGenerator(model=Mock()).assemble_html(TEMPLATE, data)
+        disabled = AIGenerator(model=Mock(), compress_threshold=None).assemble_html(
+            TEMPLATE, {"charts": list(range(100000))}
+        )
+
+        # Then
+        assert 'const dashboardData = {"charts": [1, 2, 3]};' in default
+        assert COMPRESSED_DATA_ELEMENT_ID not in default
+        assert COMPRESSED_DATA_ELEMENT_ID not in disabled
@@ -0,0 +1,209 @@
+"""
+PayloadPruning のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| PP-N-01    | dashboardData.a.b / ["キー"] / ?. 参照      | Equivalence       | 参照パスとして抽出される                 |
+| PP-N-02    | 参照されないキーを含む集計結果              | Equivalence       | 除外され、除外パスが返る                 |
+| PP-N-03    | プレースホルダーを別名の変数で受け取る      | Equivalence       | その変数名で解析される                   |
+| PP-N-04    | assemble_html                               | Equivalence       | 除外後のデータが埋め込まれ INFO ログが出る|
+| PP-B-01    | if / ! / && / 三項演算子での存在チェック    | Boundary          | 値を読む参照とみなす                     |
+| PP-B-07    | typeof 変数 === 'undefined' / 'キー' in     | Boundary          | 変数全体・in の対象全体を残す理由にしない|
+| PP-B-02    | 動的キー・代入・関数への受け渡し            | Boundary          | そのサブツリーを丸ごと残す               |
+| PP-B-03    | 参照なし・変数名不明・dict 以外             | Boundary          | 何も除外しない                           |
+| PP-B-04    | toString 等のオブジェクトメンバー参照       | Boundary          | そのサブツリーを丸ごと残す               |
+| PP-B-05    | 数値キー（groupby の結果）                  | Boundary          | 文字列のキー参照と一致する               |
+| PP-B-06    | prune_payload=False                         | Boundary          | 除外しない                               |
+"""
+
+import logging
+from unittest.mock import Mock
+
+from src.services.ai_generator import AIGenerator
+from src.services.payload_pruning import (
+    data_variable_name,
+    find_data_references,
+    prune_unreferenced,
+)
+
+
+def _template(script: str, declaration: str = "const dashboardData = {{JSON_DATA}};") -> str:
+    return f"<html><body><script>{declaration}\n{script}</script></body></html>"
+
+
+DATA = {
+    "kpi": {"total": 100, "avg": 2.5},
+    "charts": {"daily": [1, 2, 3], "monthly": [4, 5]},
+    "table": [{"a": 1}] * 10,
+}
+
+
+class TestFindReferences:
+    """参照パス抽出のテスト"""
+
+    def test_dot_bracket_and_optional_chaining(self):
+        # Given
+        html = _template(
+            "el.textContent = dashboardData.kpi.total;\n"
+            "render(dashboardData['charts'][\"日次\"]);\n"
+            "show(dashboardData?.micro_insights?.売上);"
+        )
+
+        # When
+        paths = find_data_references(html, "dashboardData")
+
+        # Then (PP-N-01)
+        assert paths == {("kpi", "total"), ("charts", "日次"), ("micro_insights", "売上")}
+
+    def test_guards_are_reads(self):
+        # Given: Truthiness checks read the value (PP-B-01)
+        html = _template(
+            "if (typeof dashboardData !== 'undefined' && dashboardData.charts) {\n"
+            "  if (!dashboardData.kpi) return;\n"
+            "  const v = dashboardData.table ? 1 : 0;\n"
+            "  while (dashboardData.extra) break;\n"
+            "  draw(dashboardData.charts.daily);\n"
+            "}"
+        )
+
+        # When
+        paths = find_data_references(html, "dashboardData")
+
+        # Then
+        assert paths == {("charts",), ("kpi",), ("table",), ("extra",), ("charts", "daily")}
+
+    def test_non_read_checks(self):
+        # Given (PP-B-07)
+        html = _template(
+            "if (typeof dashboardData === 'undefined') return;\n"
+            "if ('daily' in dashboardData.charts) draw(dashboardData.kpi.total);"
+        )
+        indexed = _template("if ('x' in dashboardData.charts[0]) draw(dashboardData.kpi);")
+
+        # When
+        pruned, dropped = prune_unreferenced(html, DATA)
+
+        # Then
+        assert find_data_references(html, "dashboardData") == {
+            ("charts", "daily"),
+            ("kpi", "total"),
+        }
+        assert pruned == {"kpi": {"total": 100}, "charts": {"daily": [1, 2, 3]}}
+        assert set(dropped) == {"kpi.avg", "charts.monthly", "table"}
+        assert find_data_references(indexed, "dashboardData") == {("charts",), ("kpi",)}
+
+    def test_only_guards_is_undecidable(self):
+        # Given (PP-B-03)
+        html = _template("if (typeof dashboardData === 'undefined') { console.log('ng'); }")
+
+        # When / Then
+        assert find_data_references(html, "dashboardData") is None
+
+    def test_variable_name_from_placeholder(self):
+        # Given (PP-N-03)
+        html = _template("draw(data.charts.daily);", declaration="var data = {{ JSON_DATA }};")
+
+        # When / Then
+        assert data_variable_name(html) == "data"
+        assert data_variable_name("<script>init({{JSON_DATA}});</script>") is None
+        assert data_variable_name("<script>draw(dashboardData.kpi)</script>") == "dashboardData"
+
+
+class TestPruneUnreferenced:
+    """除外のテスト"""
+
+    def test_drops_unreferenced_subtrees(self):
+        # Given
+        html = _template("a(dashboardData.kpi.total); b(dashboardData.charts.daily);")
+
+        # When
+        pruned, dropped = prune_unreferenced(html, DATA)
+
+        # Then (PP-N-02)
+        assert pruned == {"kpi": {"total": 100}, "charts": {"daily": [1, 2, 3]}}
+        assert set(dropped) == {"kpi.avg", "charts.monthly", "table"}
+        assert DATA["kpi"] == {"total": 100, "avg": 2.5}
+
+    def test_dynamic_access_keeps_subtree(self):
+        # Given: Dynamic key, alias and whole-object pass (PP-B-02)
+        html = _template(
+            "Object.keys(dashboardData.charts).forEach(k => draw(dashboardData.charts[k]));\n"
+            "const kpi = dashboardData.kpi;"
+        )
+
+        # When
+        pruned, dropped = prune_unreferenced(html, DATA)
+
+        # Then
+        assert pruned == {"kpi": DATA["kpi"], "charts": DATA["charts"]}
+        assert list(dropped) == ["table"]
+
+    def test_whole_object_use_keeps_everything(self):
+        # Given
+        html = _template("render(dashboardData);")
+
+        # When
+        pruned, dropped = prune_unreferenced(html, DATA)
+
+        # Then
+        assert pruned is DATA
+        assert dropped == {}
+
+    def test_object_member_keeps_subtree(self):
+        # Given (PP-B-04)
+        html = _template("log(dashboardData.kpi.toString()); draw(dashboardData.charts.daily);")
+
+        # When
+        pruned, _ = prune_unreferenced(html, DATA)
+
+        # Then
+        assert pruned["kpi"] == DATA["kpi"]
+
+    def test_numeric_keys_match_string_access(self):
+        # Given (PP-B-05)
+        data = {"by_year": {2023: 1, 2024: 2}}
+        html = _template("draw(dashboardData.by_year['2024']);")
+
+        # When
+        pruned, _ = prune_unreferenced(html, data)
+
+        # Then
+        assert pruned == {"by_year": {2024: 2}}
+
+    def test_non_dict_payload_untouched(self):
+        # Given (PP-B-03)
+        html = _template("draw(dashboardData.kpi);")
+
+        # When / Then
+        assert prune_unreferenced(html, [1, 2]) == ([1, 2], {})
+
+
+class TestAssembleHtmlPruning:
+    """assemble_html への組み込みのテスト"""
+
+    def test_assemble_html_embeds_pruned_data(self, caplog):
+        # Given (PP-N-04)
+        html = _template("draw(dashboardData.charts.daily);")
+        generator = AIGenerator(model=Mock())
+
+        # When
+        with caplog.at_level(logging.INFO, logger="src.services.ai_generator"):
+            result = generator.assemble_html(html, DATA)
+
+        # Then
+        assert '{"charts": {"daily": [1, 2, 3]}}' in result
+        assert "table" not in result
+        assert "bytes 削減" in caplog.text
+        assert "charts.monthly" in caplog.text
+
+    def test_pruning_can_be_disabled(self):
+        # Given (PP-B-06)
+        html = _template("draw(dashboardData.charts.daily);")
+        generator = AIGenerator(model=Mock(), prune_payload=False)
+
+        # When
+        result = generator.assemble_html(html, DATA)
+
+        # Then
+        assert '"table"' in result
@@ -0,0 +1,273 @@
+"""
+QueryEngine のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| QE-N-01    | 「売上トップ5を教えて」など定量的な質問     | Equivalence       | 集計クエリを組み立てる                   |
+| QE-N-02    | グループ・上位 N 件のクエリ                 | Equivalence       | pandas で直接計算した値と一致            |
+| QE-N-03    | 月別・件数・絞り込みのクエリ                | Equivalence       | 期間順・件数・絞り込み後の値             |
+| QE-N-04    | local_queries=True の ChatHandler           | Equivalence       | モデルを呼ばずに計算時間付きで回答       |
+| QE-N-05    | 質問文から組み立てられない質問              | Equivalence       | モデルはクエリ仕様だけを返しローカル集計 |
+| QE-N-06    | 統合モードで query を返す応答               | Equivalence       | 1回の呼び出しでローカル集計の回答        |
+| QE-B-01    | グラフ・分析の依頼、集計対象のない質問      | Boundary          | None（従来のモデル応答）                 |
+| QE-B-02    | 絞り込みで行がなくなる                      | Boundary          | 該当なしの回答                           |
+| QE-B-03    | モデルが null・不正な仕様を返す             | Boundary          | 従来の質問プロンプトで回答               |
+| QE-B-04    | 否定・しきい値・年・割合を含む質問          | Boundary          | None（一部だけ読み取って集計しない）     |
+| QE-A-01    | 存在しないカラム・未対応の集計方法・型違い  | Abnormal          | ValueError                               |
+"""
+
+import json
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from src.services.chat_handler import ChatHandler
+from src.services.query_engine import (
+    QuerySpec,
+    detect_date_column,
+    execute_query,
+    parse_query,
+)
+
+
+@pytest.fixture
+def sales_df():
+    return pd.DataFrame(
+        {
+            "日付": ["2024-01-05", "2024-01-20", "2024-02-03", "2024-03-04", "2024-03-15"] * 4,
+            "商品名": ["商品A", "商品B", "商品A", "商品C", "商品B"] * 4,
+            "売上": [10000, 15000, 12000, 8000, 20000] * 4,
+            "地域": ["東京", "大阪", "東京", "福岡", "大阪"] * 4,
+        }
+    )
+
+
+class TestParseQuery:
+    """質問文からのクエリ組み立てのテスト"""
+
+    @pytest.mark.parametrize(
+        ("message", "expected"),
+        [
+            ("売上トップ5を教えて", QuerySpec("売上", group_by="商品名", top_k=5)),
+            ("売上が一番高い地域は？", QuerySpec("売上", group_by="地域", top_k=1)),
+            (
+                "売上が最も少ない商品名はどれ",
+                QuerySpec("売上", group_by="商品名", top_k=1, ascending=True),
+            ),
+            ("東京の売上の合計は？", QuerySpec("売上", filters={"地域": "東京"})),
+            ("売上の平均はいくら", QuerySpec("売上", aggregation="mean")),
+            ("月別の売上", QuerySpec("売上", group_by="日付", time_bucket="month")),
+            ("データは何件？", QuerySpec(None, aggregation="count")),
+            ("地域ごとの件数", QuerySpec(None, aggregation="count", group_by="地域")),
+            (
+                "ワースト2の商品名の売上",
+                QuerySpec("売上", group_by="商品名", top_k=2, ascending=True),
+            ),
+        ],
+    )
+    def test_quantitative_questions(self, sales_df, message, expected):
+        # Given / When / Then (QE-N-01)
+        assert parse_query(message, sales_df) == expected
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "トレンドを分析して",
+            "データの特徴を教えて",
+            "地域別の売上グラフを追加して",
+            "売上",
+            "こんにちは",
+        ],
+    )
+    def test_non_queries(self, sales_df, message):
+        # Given / When / Then (QE-B-01)
+        assert parse_query(message, sales_df) is None
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "大阪以外の売上合計は?",
+            "数量が10以上の件数は？",
+            "売上が500以上の件数は？",
+            "2023年の売上合計は？",
+            "総売上に占める東京の割合は?",
+            "売上の件数は？",
+            "3月の売上合計は？",
+            "売上が15000の件数",
+        ],
+    )
+    def test_partly_understood_questions(self, sales_df, message):
+        # Given / When / Then (QE-B-04)
+        assert parse_query(message, sales_df) is None
+
+    def test_detect_date_column(self, sales_df):
+        # Given
+        typed = sales_df.assign(日付=pd.to_datetime(sales_df["日付"]))
+
+        # When / Then
+        assert detect_date_column(sales_df) == "日付"
+        assert detect_date_column(typed) == "日付"
+        assert detect_date_column(sales_df.drop(columns="日付")) is None
+
+
+class TestExecuteQuery:
+    """クエリ実行のテスト"""
+
+    def test_top_k_matches_pandas(self, sales_df):
+        # Given (QE-N-02)
+        spec = QuerySpec("売上", group_by="商品名", top_k=2)
+
+        # When
+        result = execute_query(spec, sales_df)
+
+        # Then
+        expected = sales_df.groupby("商品名")["売上"].sum().nlargest(2)
+        assert result.rows == [(label, float(value)) for label, value in expected.items()]
+        assert result.group_count == 3
+        assert result.row_count == 20
+        assert result.elapsed_ms >= 0
+        assert "1. 商品B: 140,000" in result.to_text()
+        assert "計算時間" in result.to_text()
+
+    def test_time_bucket_count_and_filter(self, sales_df):
+        # Given (QE-N-03)
+        monthly = QuerySpec("売上", group_by="日付", time_bucket="month")
+        count = QuerySpec(None, aggregation="count", filters={"地域": "大阪"})
+
+        # When
+        monthly_result = execute_query(monthly, sales_df)
+        count_result = execute_query(count, sales_df)
+
+        # Then
+        assert monthly_result.rows == [
+            ("2024-01", 100000.0), ("2024-02", 48000.0), ("2024-03", 112000.0),
+        ]  # fmt: skip
+        assert count_result.value == 8.0
+        assert count_result.to_text().startswith("大阪の件数は 8 です。")
+
+    def test_all_groups_sorted_and_truncated_in_text(self):
+        # Given
+        df = pd.DataFrame({"店舗": [f"S{i:02d}" for i in range(12)], "売上": range(12)})
+
+        # When
+        result = execute_query(QuerySpec("売上", group_by="店舗"), df)
+
+        # Then
+        assert result.rows[0] == ("S11", 11.0)
+        assert "ほか 2 件" in result.to_text()
+
+    def test_empty_after_filter(self, sales_df):
+        # Given (QE-B-02)
+        scalar = QuerySpec("売上", aggregation="mean", filters={"地域": "札幌"})
+        grouped = QuerySpec("売上", group_by="商品名", filters={"地域": "札幌"})
+
+        # When / Then
+        assert "計算できる行がありません" in execute_query(scalar, sales_df).to_text()
+        assert "該当する行がありません" in execute_query(grouped, sales_df).to_text()
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"measure": "利益"},
+            {"measure": "売上", "aggregation": "mode"},
+            {"measure": None, "aggregation": "sum"},
+            {"measure": "売上", "time_bucket": "month"},
+            {"measure": "売上", "group_by": "地域", "top_k": 0},
+            {"measure": "売上", "having": 1},
+            {"measure": "売上", "filters": ["地域"]},
+            {"measure": "売上", "filters": {"地域": ["東京", "大阪"]}},
+            {"measure": "商品名", "aggregation": "sum"},
+            {"measure": "地域", "aggregation": "mean", "group_by": "商品名"},
+            {"measure": "売上", "group_by": "地域", "top_k": True},
+            {"measure": "売上", "group_by": "地域", "top_k": 1, "ascending": "false"},
+        ],
+    )
+    def test_invalid_spec(self, sales_df, data):
+        # Given / When / Then (QE-A-01)
+        with pytest.raises(ValueError):
+            QuerySpec.from_dict(data, sales_df)
+
+
+class TestChatHandlerLocalQueries:
+    """ChatHandler への組み込みのテスト"""
+
+    def test_answered_without_model(self, sales_df):
+        # Given (QE-N-04)
+        mock_model = Mock()
+        handler = ChatHandler(model=mock_model, local_queries=True)
+
+        # When
+        response = handler.handle_message("売上トップ5を教えて", {"df": sales_df})
+
+        # Then
+        assert response.type == "text"
+        assert response.content.startswith("商品名別の売上の合計（上位3件）:\n1. 商品B: 140,000")
+        assert response.data["query"]["top_k"] == 5
+        assert response.data["elapsed_ms"] >= 0
+        mock_model.generate_content.assert_not_called()
+
+    def test_model_returns_query_spec(self, sales_df):
+        # Given (QE-N-05)
+        spec = {"measure": "売上", "aggregation": "max", "group_by": "地域", "top_k": 1}
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "question"}'),
+            Mock(text=f"```json\n{json.dumps(spec, ensure_ascii=False)}\n```"),
+        ]
+        handler = ChatHandler(model=mock_model, local_queries=True)
+
+        # When
+        response = handler.handle_message("どこが稼いでる？", {"df": sales_df})
+
+        # Then
+        assert response.data["rows"] == [["大阪", 20000.0]]
+        prompt = mock_model.generate_content.call_args.args[0]
+        assert "集計クエリに変換" in prompt
+        assert '"売上": "int64"' in prompt
+
+    @pytest.mark.parametrize(
+        "spec_text",
+        [
+            "null",
+            '{"measure": "利益"}',
+            "わかりません",
+            '{"measure": "売上", "filters": ["地域"]}',
+            '{"measure": "売上", "filters": {"地域": ["東京", "大阪"]}}',
+            '{"measure": "商品名", "aggregation": "mean"}',
+            '{"measure": "売上", "group_by": "地域", "top_k": true}',
+            '{"measure": "売上", "group_by": "地域", "top_k": 1, "ascending": "false"}',
+        ],
+    )
+    def test_model_spec_unusable(self, sales_df, spec_text):
+        # Given (QE-B-03)
+        mock_model = Mock()
+        mock_model.generate_content.side_effect = [
+            Mock(text='{"intent": "question"}'),
+            Mock(text=spec_text),
+            Mock(text="大阪が好調です。"),
+        ]
+        handler = ChatHandler(model=mock_model, local_queries=True)
+
+        # When
+        response = handler.handle_message("どこが稼いでる？", {"df": sales_df})
+
+        # Then
+        assert response.content == "大阪が好調です。"
+        assert mock_model.generate_content.call_count == 3
+
+    def test_combined_query(self, sales_df):
+        # Given (QE-N-06)
+        payload = {"intent": "question", "query": {"measure": None, "aggregation": "count"}}
+        mock_model = Mock()
+        mock_model.generate_content.return_value = Mock(text=json.dumps(payload))
+        handler = ChatHandler(model=mock_model, combined=True, local_queries=True)
+
+        # When
+        response = handler.handle_message("どれくらいの規模のデータ？", {"df": sales_df})
+
+        # Then
+        assert response.content.startswith("件数は 20 です。")
+        mock_model.generate_content.assert_called_once()
+        assert "query の形式" in mock_model.generate_content.call_args.args[0]
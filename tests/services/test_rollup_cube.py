@@ -0,0 +1,284 @@
+"""
+RollupCube のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| RC-N-01    | 次元・メジャー・日付カラムを含むデータ      | Equivalence       | 低カーディナリティの次元・数値のメジャー |
+| RC-N-02    | 次元・日付の粒度・等値/いずれかの条件       | Equivalence       | 生データの groupby と同じ集計値          |
+| RC-N-03    | cube を渡した build_chart_data              | Equivalence       | 生データで集計したグラフと同じ結果       |
+| RC-N-04    | cube を渡した execute_query                 | Equivalence       | 生データで集計した回答と同じ結果         |
+| RC-N-05    | 絞り込み付きの date_span                    | Equivalence       | 絞り込んだ行の日付の最小値・最大値       |
+| RC-N-06    | CubeBuild / rollup_cube を渡した ChatHandler | Equivalence       | バックグラウンドで構築したキューブを使う |
+| RC-B-01    | 中央値・出現順・範囲の条件・別のデータ      | Boundary          | None を返し生データで集計する            |
+| RC-B-02    | 次元の値が欠損の行                          | Boundary          | グループに含めないが行数・全体には含める |
+| RC-B-03    | 日付カラム・次元がないデータ                | Boundary          | 日付の集計表のないキューブ               |
+| RC-B-04    | 値を変えたコピー・同じ形の別のデータ        | Boundary          | キューブを使わず生データで集計する       |
+| RC-A-01    | 構築に失敗するデータ                        | Abnormal          | cube は None・error に例外               |
+"""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.chart_data import build_chart_data
+from src.services.chart_filters import parse_filters
+from src.services.chat_handler import ChatHandler
+from src.services.query_engine import QuerySpec, execute_query
+from src.services.rollup_cube import CubeBuild, RollupCube
+
+
+@pytest.fixture
+def sales_df():
+    rng = np.random.default_rng(7)
+    rows = 5_000
+    return pd.DataFrame(
+        {
+            "日付": pd.Timestamp("2023-01-01")
+            + pd.to_timedelta(rng.integers(0, 500 * 24, rows), unit="h"),
+            "地域": rng.choice(["東京", "大阪", "福岡", None], rows, p=[0.4, 0.3, 0.2, 0.1]),
+            "店舗": pd.Categorical(rng.choice(["本店", "駅前", "郊外"], rows)),
+            "顧客ID": [f"C{i:05d}" for i in rng.integers(0, 2_000, rows)],
+            "売上": rng.integers(100, 10_000, rows),
+            "単価": np.where(rng.random(rows) < 0.05, np.nan, rng.normal(1000, 100, rows)),
+        }
+    )
+
+
+@pytest.fixture
+def cube(sales_df):
+    return RollupCube.build(sales_df)
+
+
+class TestBuild:
+    """キューブの構築のテスト"""
+
+    def test_dimensions_and_measures(self, cube, sales_df):
+        # Given / When (RC-N-01)
+        dimension_groups = [group for group in cube.cuboids if len(group) == 1]
+
+        # Then
+        assert cube.dimensions == ["地域", "店舗"]
+        assert cube.measures == ["売上", "単価"]
+        assert cube.date_column == "日付"
+        assert cube.date_range == (sales_df["日付"].min(), sales_df["日付"].max())
+        assert len(dimension_groups) == 2 + 5  # 次元ごと + 日付の粒度ごと
+        assert frozenset({("地域", None), ("日付", "month")}) in cube.cuboids
+        assert cube.group_count > 0 and cube.nbytes > 0
+        assert cube.matches(sales_df)
+        assert not cube.matches(sales_df.head(10))
+
+    def test_no_date_or_dimensions(self):
+        # Given (RC-B-03)
+        df = pd.DataFrame({"地域": ["東京", "大阪", "東京"], "売上": [1, 2, 3]})
+
+        # When
+        cube = RollupCube.build(df)
+        numbers = RollupCube.build(df[["売上"]])
+
+        # Then
+        assert cube.date_column is None and cube.date_span() is None
+        assert cube.aggregate("地域", None, [("売上", "sum")]).values[0].tolist() == [2, 4]
+        assert numbers.cuboids == {}
+        assert numbers.aggregate(None, None, [("売上", "sum")]) is None
+
+
+class TestAggregate:
+    """キューブからの集計のテスト"""
+
+    @pytest.mark.parametrize("aggregation", ["sum", "count", "min", "max", "mean"])
+    @pytest.mark.parametrize(
+        ("by", "grain", "filters"),
+        [
+            ("地域", None, None),
+            ("店舗", None, {"地域": "東京"}),
+            ("日付", "week", {"店舗": ["本店", "郊外"]}),
+            ("日付", "quarter", None),
+            (None, None, {"地域": "大阪", "店舗": "駅前"}),
+        ],
+    )
+    def test_same_as_groupby(self, cube, sales_df, by, grain, filters, aggregation):
+        # Given (RC-N-02)
+        conditions = parse_filters(filters)
+        rows = sales_df
+        for condition in conditions:
+            rows = rows[rows[condition.column].isin(condition.values)]
+
+        # When
+        answer = cube.aggregate(by, grain, [("単価", aggregation)], conditions)
+
+        # Then
+        assert answer.row_count == len(rows)
+        if by is None:
+            assert answer.values[0] == pytest.approx(rows["単価"].agg(aggregation))
+            return
+        keys = rows[by].dt.to_period(grain[0].upper()) if grain else rows[by]
+        expected = rows["単価"].groupby(keys, observed=True).agg(aggregation)
+        pd.testing.assert_series_equal(
+            answer.values[0], expected, check_names=False, check_dtype=False, check_index_type=False
+        )
+
+    def test_row_count_measure(self, cube, sales_df):
+        # Given / When (RC-B-02)
+        by_region = cube.aggregate("地域", None, [(None, "count")])
+        total = cube.aggregate(None, None, [(None, "count"), ("売上", "sum")])
+
+        # Then
+        assert by_region.values[0].to_dict() == sales_df["地域"].value_counts().to_dict()
+        assert by_region.row_count == len(sales_df)
+        assert total.values == [len(sales_df), sales_df["売上"].sum()]
+
+    @pytest.mark.parametrize(
+        ("by", "grain", "measures", "filters"),
+        [
+            ("地域", None, [("売上", "median")], None),
+            ("地域", None, [(None, "sum")], None),
+            ("顧客ID", None, [("売上", "sum")], None),
+            ("日付", None, [("売上", "sum")], None),
+            ("地域", None, [("売上", "sum")], {"売上": {"min": 100}}),
+            ("地域", None, [("売上", "sum")], {"顧客ID": "C00001"}),
+        ],
+    )
+    def test_unanswerable(self, cube, by, grain, measures, filters):
+        # Given / When / Then (RC-B-01)
+        assert cube.aggregate(by, grain, measures, parse_filters(filters)) is None
+
+    def test_date_span(self, cube, sales_df):
+        # Given (RC-N-05)
+        conditions = parse_filters({"店舗": ["本店", "郊外"]})
+        rows = sales_df[sales_df["店舗"].isin(["本店", "郊外"])]
+
+        # When / Then
+        assert cube.date_span(conditions) == (rows["日付"].min(), rows["日付"].max())
+        assert cube.date_span() == cube.date_range
+        assert cube.date_span(parse_filters({"売上": {"max": 1}})) is None
+        # 日付と2つの次元の組は事前集計しない
+        assert cube.date_span(parse_filters({"地域": "福岡", "店舗": "郊外"})) is None
+        assert all(pd.isna(value) for value in cube.date_span(parse_filters({"地域": "札幌"})))
+
+
+class TestIntegration:
+    """グラフ・ローカル集計への組み込みのテスト"""
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            {"x": "地域", "y": "売上"},
+            {"x": "日付", "y": ["売上", "単価"], "aggregation": ["sum", "mean"]},
+            {"x": "日付", "y": "売上", "time_bucket": "week", "filters": {"地域": "東京"}},
+            {"x": "店舗", "y": "単価", "aggregation": "mean", "top_n": 2},
+            {"x": "地域", "y": "売上", "aggregation": "max", "sort": "asc", "top_n": 1},
+            {"x": "日付", "y": "売上", "max_points": 8, "filters": {"店舗": ["駅前"]}},
+        ],
+    )
+    def test_chart_data(self, cube, sales_df, spec):
+        # Given (RC-N-03)
+        expected = build_chart_data(spec, sales_df)
+
+        # When
+        data = build_chart_data(spec, sales_df, cube=cube)
+
+        # Then
+        assert data["labels"] == expected["labels"]
+        assert data.get("time_bucket") == expected.get("time_bucket")
+        assert data["group_count"] == expected["group_count"]
+        for series, expected_series in zip(data["series"], expected["series"], strict=True):
+            assert series["values"] == pytest.approx(expected_series["values"])
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            {"x": "地域", "y": "売上", "aggregation": "median"},
+            {"x": "地域", "y": "売上", "sort": "none"},
+            {"x": "日付", "y": "売上", "time_bucket": "none"},
+            {"x": "地域", "y": "売上", "filters": {"日付": {"start": "2023-06-01"}}},
+            {"x": "地域", "y": "売上", "filters": {"地域": "札幌"}},
+        ],
+    )
+    def test_chart_data_fallback(self, cube, sales_df, spec):
+        # Given / When / Then (RC-B-01)
+        assert build_chart_data(spec, sales_df, cube=cube) == build_chart_data(spec, sales_df)
+
+    def test_other_frame_uses_raw_data(self, cube, sales_df):
+        # Given (RC-B-01)
+        head = sales_df.head(100)
+        spec = {"x": "地域", "y": "売上"}
+
+        # When / Then
+        assert build_chart_data(spec, head, cube=cube) == build_chart_data(spec, head)
+
+    def test_same_shape_other_frames(self, cube, sales_df):
+        # Given (RC-B-04)
+        frames = [
+            sales_df.assign(売上=sales_df["売上"] * 100),
+            sales_df.copy(),
+            sales_df.sort_values("売上"),
+        ]
+        spec = {"x": "地域", "y": "売上"}
+        query = QuerySpec("売上", group_by="地域")
+
+        # When / Then
+        for df in frames:
+            assert not cube.matches(df)
+            assert build_chart_data(spec, df, cube=cube) == build_chart_data(spec, df)
+            assert execute_query(query, df, cube=cube).rows == execute_query(query, df).rows
+        scaled = build_chart_data(spec, frames[0], cube=cube)["values"]
+        assert scaled == [value * 100 for value in build_chart_data(spec, sales_df)["values"]]
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            QuerySpec("売上", group_by="地域"),
+            QuerySpec("単価", "mean", group_by="日付", time_bucket="month"),
+            QuerySpec("売上", "max", group_by="店舗", filters={"地域": "東京"}, top_k=2),
+            QuerySpec("単価", "min", filters={"店舗": "本店"}),
+            QuerySpec(None, "count", filters={"地域": "大阪"}),
+            QuerySpec("売上", "median", group_by="地域"),
+            QuerySpec("単価", "mean", filters={"地域": "札幌"}),
+        ],
+    )
+    def test_query_engine(self, cube, sales_df, spec):
+        # Given (RC-N-04)
+        expected = execute_query(spec, sales_df)
+
+        # When
+        result = execute_query(spec, sales_df, cube=cube)
+
+        # Then
+        assert result.row_count == expected.row_count
+        assert result.group_count == expected.group_count
+        assert result.value == pytest.approx(expected.value, nan_ok=True)
+        assert [label for label, _ in result.rows] == [label for label, _ in expected.rows]
+        assert [value for _, value in result.rows] == pytest.approx(
+            [value for _, value in expected.rows]
+        )
+
+    def test_background_build(self, sales_df):
+        # Given (RC-N-06)
+        build = CubeBuild(sales_df)
+
+        # When
+        cube = build.wait(timeout=30)
+        handler = ChatHandler(model=Mock(), rollup_cube=cube)
+        data = handler.generate_chart_data({"x": "店舗", "y": "売上"}, sales_df)
+
+        # Then
+        assert build.done and build.error is None
+        assert cube is not None and cube.build_ms > 0
+        assert data == build_chart_data({"x": "店舗", "y": "売上"}, sales_df)
+
+    def test_failed_build(self):
+        # Given (RC-A-01)
+        broken = Mock(spec=pd.DataFrame)
+        broken.columns = ["売上"]
+        broken.__getitem__ = Mock(side_effect=KeyError("売上"))
+
+        # When
+        build = CubeBuild(broken)
+
+        # Then
+        assert build.wait(timeout=30) is None
+        assert build.done
+        assert isinstance(build.error, Exception)
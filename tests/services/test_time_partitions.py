@@ -0,0 +1,277 @@
+"""
+TimePartitions のテスト
+
+観点表:
+| Case ID    | Input / Precondition                        | Perspective       | Expected Result                          |
+| ---------- | ------------------------------------------- | ----------------- | ---------------------------------------- |
+| TP-N-01    | 日付順・順不同のデータ                      | Equivalence       | 日付順に並べたキーと境界の最小値・最大値 |
+| TP-N-02    | さまざまな日付の範囲                        | Equivalence       | 日付の範囲のマスクと同じ行の位置         |
+| TP-N-03    | partitions を渡した filter_frame            | Equivalence       | マスクで絞り込んだ結果と同じ行           |
+| TP-N-04    | time_partitions を渡した ChatHandler        | Equivalence       | 生データで集計したグラフと同じ結果       |
+| TP-N-05    | 集計コードの filter_date_range              | Equivalence       | 範囲で絞り込んだ行を集計する             |
+| TP-B-01    | 解釈できない日付・タイムゾーン付きの日付    | Boundary          | どの範囲にも含めない・UTC で比較する     |
+| TP-B-02    | 別のカラム・別のデータ・表せない範囲        | Boundary          | None を返しマスクで絞り込む              |
+| TP-B-03    | タイムゾーンの混在・表せない日時のカラム    | Boundary          | パーティションを作らない                 |
+| TP-B-04    | 並べ替え・日付をずらした同じ形のデータ      | Boundary          | パーティションを使わずマスクと同じ行     |
+| TP-A-01    | 解釈できない範囲・partition_rows が0        | Abnormal          | ValueError                               |
+"""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.ai_generator import AIGenerator
+from src.services.chart_data import build_chart_data
+from src.services.chart_filters import (
+    FilterCondition,
+    MaskCache,
+    compute_mask,
+    filter_frame,
+    parse_filters,
+)
+from src.services.chat_handler import ChatHandler
+from src.services.time_partitions import TimePartitions
+
+
+@pytest.fixture
+def hourly_df():
+    rng = np.random.default_rng(3)
+    rows = 2_000
+    dates = pd.date_range("2023-12-25", periods=rows, freq="h").strftime("%Y-%m-%d %H:%M")
+    return pd.DataFrame(
+        {
+            "日付": np.where(rng.random(rows) < 0.02, "不明", dates),
+            "地域": rng.choice(["東京", "大阪", "福岡"], rows),
+            "売上": rng.integers(100, 10_000, rows),
+        }
+    )
+
+
+@pytest.fixture
+def shuffled_df(hourly_df):
+    return hourly_df.sample(frac=1, random_state=5).reset_index(drop=True)
+
+
+RANGES = [
+    ("2024-01-01", "2024-01-31"),
+    ("2024-01-10 05:00", "2024-01-10 05:00"),
+    ("2024-02-01 12:30", None),
+    (None, "2023-12-31"),
+    ("2025-01-01", None),
+    (None, "2023-01-01"),
+    ("2024-03-01", "2024-02-01"),
+]
+
+
+class TestTimePartitions:
+    """パーティションの構築と行の取り出しのテスト"""
+
+    def test_layout(self, hourly_df, shuffled_df):
+        # Given (TP-N-01)
+        sorted_parts = TimePartitions.build(hourly_df, "日付", partition_rows=300)
+        shuffled_parts = TimePartitions.build(shuffled_df, "日付", partition_rows=300)
+
+        # When / Then
+        missing = int((hourly_df["日付"] == "不明").sum())
+        assert shuffled_parts.missing == missing
+        assert np.all(shuffled_parts.keys[1:] >= shuffled_parts.keys[:-1])
+        assert shuffled_parts.partition_count == -(-(len(hourly_df) - missing) // 300)
+        assert shuffled_parts.offsets[0] == missing
+        assert np.all(shuffled_parts.mins <= shuffled_parts.maxs)
+        assert np.all(shuffled_parts.maxs[:-1] <= shuffled_parts.mins[1:])
+        assert shuffled_parts.order is not None
+        # 解釈できない値が途中にあるため、日付順のデータでも並べ替える
+        assert sorted_parts.order is not None
+        assert TimePartitions.build(hourly_df.iloc[:10], "日付").order is None
+
+    @pytest.mark.parametrize(("start", "end"), RANGES)
+    @pytest.mark.parametrize("frame", ["hourly_df", "shuffled_df"])
+    def test_same_rows_as_mask(self, request, frame, start, end):
+        # Given (TP-N-02)
+        df = request.getfixturevalue(frame)
+        partitions = TimePartitions.build(df, "日付", partition_rows=97)
+        condition = FilterCondition("日付", "date_range", (start, end))
+
+        # When
+        rows = partitions.rows(df, "日付", start, end)
+
+        # Then
+        assert rows.tolist() == np.flatnonzero(compute_mask(df, condition)).tolist()
+
+    def test_timezone_aware_dates(self):
+        # Given (TP-B-01)
+        df = pd.DataFrame(
+            {"日付": pd.date_range("2024-01-01", periods=72, freq="h", tz="Asia/Tokyo")}
+        )
+        partitions = TimePartitions.build(df, "日付", partition_rows=10)
+        condition = FilterCondition("日付", "date_range", ("2024-01-02", "2024-01-02"))
+
+        # When
+        rows = partitions.rows(df, "日付", "2024-01-02", "2024-01-02")
+
+        # Then
+        assert rows.tolist() == np.flatnonzero(compute_mask(df, condition)).tolist()
+        assert rows.tolist() == list(range(24, 48))
+
+    def test_sorted_frame_rows_are_contiguous(self):
+        # Given (TP-N-02)
+        df = pd.DataFrame({"日付": pd.date_range("2024-01-01", periods=1_000, freq="D")})
+        partitions = TimePartitions.build(df, "日付", partition_rows=64)
+
+        # When
+        rows = partitions.rows(df, "日付", "2024-03-01", "2024-03-31")
+
+        # Then
+        assert partitions.order is None
+        assert rows.tolist() == list(range(60, 91))
+
+    @pytest.mark.parametrize(
+        ("column", "start", "end", "frame"),
+        [
+            ("地域", "2024-01-01", None, None),
+            ("日付", "2024-01-01", None, "head"),
+            ("日付", "2024-01-01 00:00+09:00", None, None),
+            ("日付", None, "2300-01-01", None),
+        ],
+    )
+    def test_not_answerable(self, hourly_df, column, start, end, frame):
+        # Given (TP-B-02)
+        partitions = TimePartitions.build(hourly_df, "日付")
+        df = hourly_df.head(10) if frame == "head" else hourly_df
+
+        # When / Then
+        assert partitions.rows(df, column, start, end) is None
+
+    def test_same_shape_other_frames(self, hourly_df):
+        # Given (TP-B-04)
+        partitions = TimePartitions.build(hourly_df, "日付", partition_rows=128)
+        shifted_dates = pd.to_datetime(hourly_df["日付"], errors="coerce") + pd.Timedelta(days=7)
+        frames = [
+            hourly_df.sort_values("売上", ascending=False),
+            hourly_df.assign(日付=shifted_dates.dt.strftime("%Y-%m-%d %H:%M")),
+            hourly_df.copy(),
+        ]
+        conditions = parse_filters({"日付": {"start": "2024-01-05", "end": "2024-01-20"}})
+
+        # When / Then
+        assert partitions.matches(hourly_df)
+        for df in frames:
+            assert not partitions.matches(df)
+            assert partitions.rows(df, "日付", "2024-01-05", "2024-01-20") is None
+            pd.testing.assert_frame_equal(
+                filter_frame(df, conditions, partitions=partitions),
+                filter_frame(df, conditions),
+            )
+
+    def test_chart_data_for_reordered_frame(self, hourly_df):
+        # Given (TP-B-04)
+        partitions = TimePartitions.build(hourly_df, "日付")
+        reordered = hourly_df.sort_values("売上", ascending=False)
+        spec = {
+            "x": "地域",
+            "y": "売上",
+            "filters": {"日付": {"start": "2024-01-10", "end": "2024-01-12"}},
+        }
+
+        # When
+        data = build_chart_data(spec, reordered, partitions=partitions)
+
+        # Then
+        assert data == build_chart_data(spec, reordered)
+
+    @pytest.mark.parametrize(
+        "dates",
+        [
+            pd.Series(["2024-01-01 00:00+09:00", "2024-01-01 00:00+00:00"]),
+            pd.Series(np.array(["3000-01-01", "2024-01-01"], dtype="datetime64[s]")),
+        ],
+    )
+    def test_not_partitionable(self, dates):
+        # Given / When / Then (TP-B-03)
+        assert TimePartitions.build(pd.DataFrame({"日付": dates}), "日付") is None
+
+    def test_invalid(self, hourly_df):
+        # Given (TP-A-01)
+        partitions = TimePartitions.build(hourly_df, "日付")
+
+        # When / Then
+        with pytest.raises(ValueError):
+            partitions.rows(hourly_df, "日付", "いつか", None)
+        with pytest.raises(ValueError):
+            TimePartitions.build(hourly_df, "日付", partition_rows=0)
+
+
+class TestPartitionedFilters:
+    """絞り込みへの組み込みのテスト"""
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {"日付": {"start": "2024-01-15", "end": "2024-02-15"}},
+            {"日付": {"start": "2024-01-15"}, "地域": "東京"},
+            {"地域": ["大阪", "福岡"], "日付": {"end": "2024-01-20"}, "売上": {"min": 5000}},
+        ],
+    )
+    @pytest.mark.parametrize("index_columns", [False, True])
+    def test_same_rows_as_masks(self, shuffled_df, filters, index_columns):
+        # Given (TP-N-03)
+        conditions = parse_filters(filters)
+        partitions = TimePartitions.build(shuffled_df, "日付", partition_rows=128)
+        cache = MaskCache(index_columns=index_columns)
+
+        # When
+        partitioned = filter_frame(shuffled_df, conditions, cache, ["売上"], partitions)
+        masked = filter_frame(shuffled_df, conditions, MaskCache(), ["売上"])
+
+        # Then
+        pd.testing.assert_frame_equal(partitioned, masked)
+
+    def test_chat_handler(self, shuffled_df):
+        # Given (TP-N-04)
+        partitions = TimePartitions.build(shuffled_df, "日付")
+        handler = ChatHandler(model=Mock(), time_partitions=partitions)
+        spec = {
+            "x": "日付",
+            "y": "売上",
+            "time_bucket": "day",
+            "filters": {"日付": {"start": "2024-01-10", "end": "2024-01-12"}},
+        }
+
+        # When
+        data = handler.generate_chart_data(spec, shuffled_df)
+
+        # Then
+        assert data == build_chart_data(spec, shuffled_df)
+        assert data["labels"] == ["2024-01-10", "2024-01-11", "2024-01-12"]
+
+    def test_unparsable_range(self, hourly_df):
+        # Given (TP-A-01)
+        partitions = TimePartitions.build(hourly_df, "日付")
+        spec = {"x": "地域", "y": "売上", "filters": {"日付": {"start": "いつか"}}}
+
+        # When / Then
+        assert build_chart_data(spec, hourly_df, partitions=partitions) == {
+            "labels": [],
+            "values": [],
+        }
+
+    @pytest.mark.parametrize("partitioned", [False, True])
+    def test_generated_code_helper(self, hourly_df, partitioned):
+        # Given (TP-N-05)
+        partitions = TimePartitions.build(hourly_df, "日付") if partitioned else None
+        generator = AIGenerator(model=Mock(), time_partitions=partitions)
+        code = (
+            "def aggregate_all_data(df):\n"
+            "    january = filter_date_range(df, '日付', '2024-01-01', '2024-01-31')\n"
+            "    return {'rows': len(january), 'sales': int(january['売上'].sum())}\n"
+        )
+
+        # When
+        result = generator.execute_aggregation(code, hourly_df)
+
+        # Then
+        dates = pd.to_datetime(hourly_df["日付"], errors="coerce")
+        january = hourly_df[(dates >= "2024-01-01") & (dates < "2024-02-01")]
+        assert result == {"rows": len(january), "sales": int(january["売上"].sum())}
@@ -2,211 +2,169 @@
 大規模データ性能テスト
 
 目的:
-- 大規模データでの処理時間を計測
-- メモリ使用量の確認
-- ボトルネックの特定
+- ベンチマークスイートの各ケースが大規模データで正しく動くことの確認
+- 保存済みベースラインとの比較による性能回帰の検出
+- メモリ使用量の確認（段階別の計測は python -m benchmarks.memory）
+
+壁時計の固定しきい値は CI のノイズで不安定なため使わない。
+性能回帰の判定は RUN_BENCHMARKS=1 のときだけ行う（python -m benchmarks と同じ計測）。
 """
 
-import time
-from io import StringIO
+import os
 from unittest.mock import Mock
 
-import numpy as np
-import pandas as pd
 import pytest
 
-from src.services.ai_generator import AIGenerator
+from benchmarks.__main__ import BASELINE_PATH
+from benchmarks.datasets import generate_large_csv_bytes, generate_large_dataframe
+from benchmarks.injection import INJECTION_PATHS, run_injection
+from benchmarks.memory import PIPELINE_STAGES, pipeline_generator, profile_pipeline
+from benchmarks.scaling import analyse, run_sweep
+from benchmarks.suite import (
+    AGGREGATION_CODE,
+    ASSEMBLY_CODE,
+    CHART_SPEC,
+    DEFAULT_SIZES,
+    build_cases,
+)
+from src.services.ai_generator import AIGenerator, serialize_json
 from src.services.chat_handler import ChatHandler
 from src.services.data_processor import DataProcessor
+from src.services.mock_generator import MOCK_DASHBOARD_HTML
+from src.utils.benchmark import (
+    compare,
+    format_report,
+    load_baselines,
+    log_spaced_sizes,
+    run_case,
+)
 
-
-def generate_large_dataframe(rows: int) -> pd.DataFrame:
-    """大規模テストデータを生成"""
-    np.random.seed(42)
-
-    regions = ["東京", "大阪", "名古屋", "福岡", "札幌", "仙台", "広島", "神戸"]
-    products = [f"商品{i}" for i in range(1, 51)]  # 50商品
-    categories = ["食品", "衣料", "電化製品", "日用品", "書籍"]
-
-    return pd.DataFrame(
-        {
-            "日付": pd.date_range("2020-01-01", periods=rows, freq="h"),
-            "地域": np.random.choice(regions, rows),
-            "商品名": np.random.choice(products, rows),
-            "カテゴリ": np.random.choice(categories, rows),
-            "売上": np.random.randint(100, 100000, rows),
-            "数量": np.random.randint(1, 100, rows),
-            "利益": np.random.randint(-10000, 50000, rows),
-            "顧客ID": np.random.randint(1, 10000, rows),
-        }
-    )
-
-
-def generate_large_csv_bytes(rows: int) -> bytes:
-    """大規模CSVデータをバイト列で生成"""
-    df = generate_large_dataframe(rows)
-    buffer = StringIO()
-    df.to_csv(buffer, index=False)
-    return buffer.getvalue().encode("utf-8")
+SMOKE_ROWS = 100000
 
 
 class TestDataProcessorPerformance:
-    """DataProcessor の性能テスト"""
-
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_load_csv_performance(self, rows):
-        """CSV読み込みの性能テスト"""
-        csv_bytes = generate_large_csv_bytes(rows)
-        processor = DataProcessor()
-
-        start = time.perf_counter()
-        df = processor.load_csv(csv_bytes)
-        elapsed = time.perf_counter() - start
+    """DataProcessor の大規模データテスト"""
 
-        assert len(df) == rows
-        print(f"\n  load_csv ({rows:,} rows): {elapsed:.3f}s")
-
-        # 性能基準: 10万行で5秒以内
-        if rows == 100000:
-            assert elapsed < 5.0, f"Too slow: {elapsed:.3f}s"
-
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_generate_summary_performance(self, rows):
-        """サマリー生成の性能テスト"""
-        df = generate_large_dataframe(rows)
-        processor = DataProcessor()
-
-        start = time.perf_counter()
-        summary = processor.generate_summary(df)
-        elapsed = time.perf_counter() - start
-
-        assert summary["row_count"] == rows
-        print(f"\n  generate_summary ({rows:,} rows): {elapsed:.3f}s")
+    def test_load_csv_large(self):
+        """CSV読み込み"""
+        df = DataProcessor().load_csv(generate_large_csv_bytes(SMOKE_ROWS))
+        assert len(df) == SMOKE_ROWS
 
-        # 性能基準: 10万行で1秒以内
-        if rows == 100000:
-            assert elapsed < 1.0, f"Too slow: {elapsed:.3f}s"
-
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_calculate_statistics_performance(self, rows):
-        """統計計算の性能テスト"""
-        df = generate_large_dataframe(rows)
-        processor = DataProcessor()
-
-        start = time.perf_counter()
-        stats = processor.calculate_statistics(df)
-        elapsed = time.perf_counter() - start
+    def test_generate_summary_large(self):
+        """サマリー生成"""
+        summary = DataProcessor().generate_summary(generate_large_dataframe(SMOKE_ROWS))
+        assert summary["row_count"] == SMOKE_ROWS
 
+    def test_calculate_statistics_large(self):
+        """統計計算"""
+        stats = DataProcessor().calculate_statistics(generate_large_dataframe(SMOKE_ROWS))
         assert "売上" in stats
-        print(f"\n  calculate_statistics ({rows:,} rows): {elapsed:.3f}s")
-
-        # 性能基準: 10万行で2秒以内
-        if rows == 100000:
-            assert elapsed < 2.0, f"Too slow: {elapsed:.3f}s"
 
 
 class TestAIGeneratorPerformance:
-    """AIGenerator の性能テスト"""
-
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_execute_aggregation_performance(self, rows):
-        """集計実行の性能テスト"""
-        df = generate_large_dataframe(rows)
-
-        py_code = """
-def aggregate_all_data(df):
-    import pandas as pd
-
-    # KPI計算
-    kpi = {
-        "total_sales": int(df['売上'].sum()),
-        "total_profit": int(df['利益'].sum()),
-        "avg_sales": float(df['売上'].mean()),
-        "transaction_count": len(df)
-    }
-
-    # グラフデータ
-    charts = {
-        "region_sales": df.groupby('地域')['売上'].sum().to_dict(),
-        "category_sales": df.groupby('カテゴリ')['売上'].sum().to_dict(),
-        "daily_sales": df.groupby(df['日付'].dt.date)['売上'].sum().head(30).to_dict()
-    }
-
-    return {"kpi": kpi, "charts": charts}
-"""
+    """AIGenerator の大規模データテスト"""
 
+    def test_execute_aggregation_large(self):
+        """集計実行"""
         generator = AIGenerator(model=Mock())
+        result = generator.execute_aggregation(
+            AGGREGATION_CODE, generate_large_dataframe(SMOKE_ROWS)
+        )
+        assert result["kpi"]["transaction_count"] == SMOKE_ROWS
 
-        start = time.perf_counter()
-        result = generator.execute_aggregation(py_code, df)
-        elapsed = time.perf_counter() - start
 
-        assert "kpi" in result
-        assert result["kpi"]["transaction_count"] == rows
-        print(f"\n  execute_aggregation ({rows:,} rows): {elapsed:.3f}s")
+class TestChatHandlerPerformance:
+    """ChatHandler の大規模データテスト"""
 
-        # 性能基準: 10万行で3秒以内
-        if rows == 100000:
-            assert elapsed < 3.0, f"Too slow: {elapsed:.3f}s"
+    def test_generate_chart_data_large(self):
+        """グラフデータ生成"""
+        handler = ChatHandler(model=Mock())
+        data = handler.generate_chart_data(CHART_SPEC, generate_large_dataframe(SMOKE_ROWS))
+        assert len(data["labels"]) > 0
 
+    def test_build_context_large(self):
+        """コンテキスト構築"""
+        handler = ChatHandler(model=Mock())
+        history = [{"role": "user", "content": f"Message {i}"} for i in range(100)]
+        context = handler.build_context(generate_large_dataframe(SMOKE_ROWS), history)
+        assert "data_summary" in context
+        assert len(context["chat_history"]) == 10  # 直近10件に制限
 
-class TestChatHandlerPerformance:
-    """ChatHandler の性能テスト"""
+    def test_get_data_info_large(self):
+        """データ情報取得"""
+        info = ChatHandler(model=Mock())._get_data_info(generate_large_dataframe(SMOKE_ROWS))
+        assert "行数:" in info
 
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_generate_chart_data_performance(self, rows):
-        """グラフデータ生成の性能テスト"""
-        df = generate_large_dataframe(rows)
-        handler = ChatHandler(model=Mock())
 
-        spec = {"type": "bar", "x": "地域", "y": "売上", "aggregation": "sum"}
+class TestBenchmarkSuite:
+    """ベンチマークスイートのテスト"""
 
-        start = time.perf_counter()
-        data = handler.generate_chart_data(spec, df)
-        elapsed = time.perf_counter() - start
+    def test_cases_cover_baselines(self):
+        """全ケースにベースラインが保存されている"""
+        names = {case.name for case in build_cases(DEFAULT_SIZES)}
+        assert names <= set(load_baselines(BASELINE_PATH))
 
-        assert len(data["labels"]) > 0
-        print(f"\n  generate_chart_data ({rows:,} rows): {elapsed:.3f}s")
+    @pytest.mark.parametrize("case", build_cases([1000]), ids=lambda case: case.name)
+    def test_case_runs(self, case):
+        """各ケースが1ラウンドで計測できる"""
+        result = run_case(case, rounds=1, warmup=0, calibration_rounds=1)
+        assert result.median > 0
+        assert result.calibration > 0
 
-        # 性能基準: 10万行で1秒以内
-        if rows == 100000:
-            assert elapsed < 1.0, f"Too slow: {elapsed:.3f}s"
+    @pytest.mark.skipif(
+        os.getenv("RUN_BENCHMARKS") != "1", reason="RUN_BENCHMARKS=1 のときだけ回帰判定する"
+    )
+    def test_no_regression_against_baselines(self):
+        """ベースラインより threshold 以上遅くなったケースがない"""
+        threshold = float(os.getenv("BENCHMARK_THRESHOLD", "25"))
+        results = [run_case(case) for case in build_cases(DEFAULT_SIZES)]
+        comparisons = compare(results, load_baselines(BASELINE_PATH), threshold)
+        print("\n" + format_report(results, comparisons))
+
+        regressions = [c.name for c in comparisons if c.status == "regression"]
+        assert not regressions, f"性能回帰: {regressions}"
+
+
+class TestScalability:
+    """スケーラビリティ（計算量）のテスト"""
+
+    def test_analyse_flags_quadratic(self):
+        """二乗オーダーのメソッドだけが超線形として検出される"""
+        sizes = [1_000, 10_000, 100_000, 1_000_000]
+        measurements = {
+            "generate_chart_data": [(n, 1e-3 + 1e-7 * n) for n in sizes],
+            "calculate_statistics": [(n, 1e-12 * n * n) for n in sizes],
+        }
 
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_build_context_performance(self, rows):
-        """コンテキスト構築の性能テスト"""
-        df = generate_large_dataframe(rows)
-        handler = ChatHandler(model=Mock())
-        history = [{"role": "user", "content": f"Message {i}"} for i in range(100)]
+        checks = {check.fit.name: check for check in analyse(measurements)}
 
-        start = time.perf_counter()
-        context = handler.build_context(df, history)
-        elapsed = time.perf_counter() - start
+        assert checks["generate_chart_data"].passed
+        assert not checks["calculate_statistics"].passed
+        assert checks["calculate_statistics"].fit.exponent == pytest.approx(2.0)
 
-        assert "data_summary" in context
-        assert len(context["chat_history"]) == 10  # 直近10件に制限
-        print(f"\n  build_context ({rows:,} rows): {elapsed:.3f}s")
+    def test_sweep_collects_points_per_method(self):
+        """スイープがメソッドごとにサイズ順の計測点を返す"""
+        measurements = run_sweep([1_000, 2_000], rounds=1, name_filter="generate_chart_data")
 
-        # 性能基準: 10万行で0.1秒以内
-        if rows == 100000:
-            assert elapsed < 0.1, f"Too slow: {elapsed:.3f}s"
+        assert [rows for rows, _ in measurements["generate_chart_data"]] == [1_000, 2_000]
 
-    @pytest.mark.parametrize("rows", [1000, 10000, 100000])
-    def test_get_data_info_performance(self, rows):
-        """データ情報取得の性能テスト"""
-        df = generate_large_dataframe(rows)
-        handler = ChatHandler(model=Mock())
+    def test_injection_collects_points_per_path(self):
+        """注入ベンチマークがパスごと・コピー下限の計測点を返す"""
+        measurements = run_injection([0.1, 0.2], rounds=1)
 
-        start = time.perf_counter()
-        info = handler._get_data_info(df)
-        elapsed = time.perf_counter() - start
+        assert set(measurements) == {*INJECTION_PATHS, "copy"}
+        assert all(len(points) == 2 for points in measurements.values())
 
-        assert "行数:" in info
-        print(f"\n  _get_data_info ({rows:,} rows): {elapsed:.3f}s")
+    @pytest.mark.skipif(
+        os.getenv("RUN_BENCHMARKS") != "1", reason="RUN_BENCHMARKS=1 のときだけ計測する"
+    )
+    def test_linear_methods_do_not_trend_superlinear(self):
+        """1k〜SCALING_MAX_ROWS 行でどのメソッドも超線形にならない"""
+        max_rows = int(os.getenv("SCALING_MAX_ROWS", "10000000"))
+        checks = analyse(run_sweep(log_spaced_sizes(1_000, max_rows)))
 
-        # 性能基準: 10万行で1秒以内
-        if rows == 100000:
-            assert elapsed < 1.0, f"Too slow: {elapsed:.3f}s"
+        failed = [(c.fit.name, round(c.fit.exponent, 2)) for c in checks if not c.passed]
+        assert not failed, f"超線形: {failed}"
 
 
 class TestMemoryUsage:
@@ -225,45 +183,39 @@ class TestMemoryUsage:
         # 100万行で100MB以下を期待（8カラム）
         assert memory_mb < 100, f"Memory too high: {memory_mb:.2f} MB"
 
+    def test_pipeline_stage_memory(self):
+        """generate_oneshot 相当の各段階のメモリを計測し、ピーク段階を特定できる"""
+        report = profile_pipeline(10000)
+        print("\n" + report.format_table())
 
-class TestEndToEndPerformance:
-    """エンドツーエンド性能テスト"""
-
-    def test_full_pipeline_performance(self):
-        """完全なパイプラインの性能テスト"""
-        rows = 50000
-        csv_bytes = generate_large_csv_bytes(rows)
+        assert tuple(stage.stage for stage in report.stages) == PIPELINE_STAGES
+        assert report.peak_stage is not None
+        assert all(stage.heap_peak >= 0 for stage in report.stages)
 
-        # 1. CSV読み込み
-        processor = DataProcessor()
-        start = time.perf_counter()
-        df = processor.load_csv(csv_bytes)
-        load_time = time.perf_counter() - start
+    def test_pipeline_assembles_full_payload(self):
+        """html_assembly は集計結果を除外・圧縮せずに全件埋め込む"""
+        df = generate_large_dataframe(2000)
+        generator = pipeline_generator()
+        data = generator.execute_aggregation(ASSEMBLY_CODE, df)
 
-        # 2. サマリー生成
-        start = time.perf_counter()
-        summary = processor.generate_summary(df)
-        summary_time = time.perf_counter() - start
+        html = generator.assemble_html(MOCK_DASHBOARD_HTML, data)
 
-        # 3. 統計計算
-        start = time.perf_counter()
-        stats = processor.calculate_statistics(df)
-        stats_time = time.perf_counter() - start
+        assert set(data) >= {"kpi", "charts", "table"}
+        assert serialize_json(data) in html
 
-        # 4. コンテキスト構築
-        handler = ChatHandler(model=Mock())
-        start = time.perf_counter()
-        context = handler.build_context(df, [])
-        context_time = time.perf_counter() - start
 
-        total_time = load_time + summary_time + stats_time + context_time
+class TestEndToEndPerformance:
+    """エンドツーエンドテスト"""
 
-        print(f"\n  === Full Pipeline ({rows:,} rows) ===")
-        print(f"  CSV Load:    {load_time:.3f}s")
-        print(f"  Summary:     {summary_time:.3f}s")
-        print(f"  Statistics:  {stats_time:.3f}s")
-        print(f"  Context:     {context_time:.3f}s")
-        print(f"  TOTAL:       {total_time:.3f}s")
+    def test_full_pipeline_large(self):
+        """CSV読み込みからコンテキスト構築までの完全なパイプライン"""
+        rows = 50000
+        processor = DataProcessor()
+        df = processor.load_csv(generate_large_csv_bytes(rows))
+        summary = processor.generate_summary(df)
+        stats = processor.calculate_statistics(df)
+        context = ChatHandler(model=Mock()).build_context(df, [])
 
-        # 全体で10秒以内
-        assert total_time < 10.0, f"Pipeline too slow: {total_time:.3f}s"
+        assert summary["row_count"] == rows
+        assert "売上" in stats
+        assert "data_summary" in context
@@ -0,0 +1 @@
+# tests/utils package
@@ -0,0 +1,246 @@
+"""
+Benchmark ハーネスのテスト
+
+観点表:
+| Case ID    | Input / Precondition                 | Perspective       | Expected Result                     |
+| ---------- | ------------------------------------ | ----------------- | ----------------------------------- |
+| BEN-N-01   | 既知のサンプル                       | Equivalence       | 中央値・四分位・IQR                 |
+| BEN-N-02   | ベースライン比 +50% / -50% / +5%      | Equivalence       | regression / improved / ok          |
+| BEN-N-03   | 保存 → 読み込み                       | Equivalence       | 正規化値が往復する・未計測分は残る  |
+| BEN-A-01   | rounds=0                             | Abnormal          | ValueError                          |
+| BEN-A-02   | 未対応のスキーマ                     | Abnormal          | ValueError                          |
+| BEN-B-01   | ベースラインなし                     | Boundary          | status="new"                        |
+| BEN-B-02   | サンプル1件                          | Boundary          | IQR=0                               |
+| BEN-N-04   | t = c·n^k の合成データ               | Equivalence       | 指数 k・係数 c・r2=1 を復元         |
+| BEN-A-03   | サイズ1種類のみ / 0 以下の値         | Abnormal          | ValueError                          |
+"""
+
+import json
+import time
+
+import pytest
+
+from src.utils.benchmark import (
+    BenchmarkCase,
+    BenchmarkResult,
+    calibrate,
+    compare,
+    fit_scaling_exponent,
+    format_report,
+    load_baselines,
+    log_spaced_sizes,
+    measure,
+    run_case,
+    save_baselines,
+)
+
+
+class TestBenchmarkResult:
+    """統計値のテスト"""
+
+    def test_median_and_iqr(self):
+        # Given: Known samples (BEN-N-01)
+        result = BenchmarkResult("x", samples=[5.0, 1.0, 3.0, 2.0, 4.0])
+
+        # When & Then: Linear-interpolated quartiles
+        assert result.median == 3.0
+        assert result.q1 == 2.0
+        assert result.q3 == 4.0
+        assert result.iqr == 2.0
+
+    def test_single_sample(self):
+        # Given: One sample (BEN-B-02)
+        result = BenchmarkResult("x", samples=[0.5])
+
+        # When & Then: No spread
+        assert result.iqr == 0.0
+        assert result.normalized == 0.5
+
+    def test_normalized_by_calibration(self):
+        # Given: Result calibrated against a 0.2s workload
+        result = BenchmarkResult("x", samples=[0.1], calibration=0.2)
+
+        # When & Then: Relative value
+        assert result.normalized == pytest.approx(0.5)
+        assert result.to_dict()["normalized"] == pytest.approx(0.5)
+
+
+class TestMeasure:
+    """計測のテスト"""
+
+    def test_short_functions_are_batched(self):
+        # Given: A very fast function
+        calls = []
+
+        # When: Measuring with a 5ms minimum round
+        result = measure(lambda: calls.append(1), rounds=3, warmup=0, min_round_seconds=0.005)
+
+        # Then: Executed many times per round, per-call time reported
+        assert result.number > 1
+        assert len(result.samples) == 3
+        assert result.median < 0.005
+
+    def test_slow_function_runs_once_per_round(self):
+        # Given: A function slower than the minimum round
+        result = measure(lambda: time.sleep(0.02), rounds=2, warmup=0)
+
+        # When & Then: One call per round
+        assert result.number == 1
+        assert result.median >= 0.02
+
+    def test_invalid_rounds(self):
+        # When & Then: ValueError (BEN-A-01)
+        with pytest.raises(ValueError, match="rounds"):
+            measure(lambda: None, rounds=0)
+
+    def test_run_case_setup_once(self):
+        # Given: Case whose setup counts calls
+        setups = []
+
+        def setup():
+            setups.append(1)
+            return 21
+
+        seen = []
+        case = BenchmarkCase("double", lambda value: seen.append(value * 2), setup=setup)
+
+        # When: Running with calibration
+        result = run_case(case, rounds=2, warmup=1, calibration_rounds=1)
+
+        # Then: Setup once, state passed, calibration recorded
+        assert setups == [1]
+        assert set(seen) == {42}
+        assert result.name == "double"
+        assert result.calibration > 0
+
+    def test_calibrate_positive(self):
+        # When & Then: Calibration takes measurable time
+        assert calibrate(rounds=1) > 0
+
+
+class TestBaselines:
+    """ベースライン比較・保存のテスト"""
+
+    def test_compare_statuses(self):
+        # Given: Results normalised to 1.5, 0.5, 1.05 and an unknown case
+        results = [
+            BenchmarkResult("slow", [1.5]),
+            BenchmarkResult("fast", [0.5]),
+            BenchmarkResult("same", [1.05]),
+            BenchmarkResult("added", [1.0]),
+        ]
+        baselines = {"slow": 1.0, "fast": 1.0, "same": 1.0}
+
+        # When: Comparing at 25% (BEN-N-02, BEN-B-01)
+        comparisons = compare(results, baselines, threshold_pct=25.0)
+
+        # Then: Status and change per case
+        assert [c.status for c in comparisons] == ["regression", "improved", "ok", "new"]
+        assert comparisons[0].change_pct == pytest.approx(50.0)
+        assert comparisons[3].change_pct is None
+        report = format_report(results, comparisons)
+        assert "+50.0%" in report
+        assert "regression" in report
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        # Given: Existing baseline for another case
+        path = tmp_path / "baselines.json"
+        save_baselines(path, [BenchmarkResult("old", [2.0])])
+
+        # When: Saving a new calibrated result (BEN-N-03)
+        save_baselines(path, [BenchmarkResult("new", [0.3], calibration=0.1)])
+
+        # Then: Both stored, normalised
+        assert load_baselines(path) == {"new": pytest.approx(3.0), "old": 2.0}
+
+    def test_save_without_merge(self, tmp_path):
+        # Given: Existing baseline
+        path = tmp_path / "baselines.json"
+        save_baselines(path, [BenchmarkResult("old", [2.0])])
+
+        # When: Overwriting
+        save_baselines(path, [BenchmarkResult("new", [1.0])], merge=False)
+
+        # Then: Old case removed
+        assert load_baselines(path) == {"new": 1.0}
+
+    def test_missing_file_is_empty(self, tmp_path):
+        # When & Then: Empty dict
+        assert load_baselines(tmp_path / "none.json") == {}
+
+    def test_unknown_schema(self, tmp_path):
+        # Given: File from a future version (BEN-A-02)
+        path = tmp_path / "baselines.json"
+        path.write_text(json.dumps({"version": 99, "benchmarks": {}}), encoding="utf-8")
+
+        # When & Then: ValueError
+        with pytest.raises(ValueError, match="ベースライン形式"):
+            load_baselines(path)
+
+    def test_format_seconds_units(self):
+        # Given: Results spanning units
+        results = [BenchmarkResult("s", [1.5]), BenchmarkResult("us", [2e-6])]
+
+        # When: Formatting
+        report = format_report(results, compare(results, {}))
+
+        # Then: Human readable units
+        assert "1.500s" in report
+        assert "2.0us" in report
+
+
+class TestScaling:
+    """スケーリング指数推定のテスト"""
+
+    @pytest.mark.parametrize("exponent", [0.5, 1.0, 2.0])
+    def test_recovers_power_law(self, exponent):
+        # Given: Exact power-law timings (BEN-N-04)
+        sizes = [1_000, 10_000, 100_000, 1_000_000]
+        seconds = [2e-6 * n**exponent for n in sizes]
+
+        # When: Fitting
+        fit = fit_scaling_exponent(sizes, seconds, name="f")
+
+        # Then: Parameters recovered
+        assert fit.exponent == pytest.approx(exponent)
+        assert fit.coefficient == pytest.approx(2e-6)
+        assert fit.r_squared == pytest.approx(1.0)
+        assert fit.sizes == sizes
+
+    def test_constant_time(self):
+        # Given: Flat timings
+        fit = fit_scaling_exponent([10, 100, 1000], [0.5, 0.5, 0.5])
+
+        # When & Then: Zero exponent, perfect fit
+        assert fit.exponent == pytest.approx(0.0, abs=1e-9)
+        assert fit.r_squared == 1.0
+
+    @pytest.mark.parametrize(
+        ("sizes", "seconds", "message"),
+        [
+            ([100, 100], [1.0, 2.0], "2点以上"),
+            ([100, 1000], [0.0, 1.0], "正の値"),
+            ([100, 1000], [1.0], "長さ"),
+        ],
+    )
+    def test_invalid_input(self, sizes, seconds, message):
+        # When & Then: ValueError (BEN-A-03)
+        with pytest.raises(ValueError, match=message):
+            fit_scaling_exponent(sizes, seconds)
+
+    def test_log_spaced_sizes(self):
+        # Given/When: Two points per decade from 1k to 10M
+        sizes = log_spaced_sizes(1_000, 10_000_000, points_per_decade=2)
+
+        # Then: Both ends included, geometric spacing
+        assert sizes == [1000, 3162, 10000, 31623, 100000, 316228, 1000000, 3162278, 10000000]
+
+    def test_log_spaced_sizes_narrow_range(self):
+        # Given/When & Then: Equal ends collapse to one size
+        assert log_spaced_sizes(500, 500) == [500]
+
+    @pytest.mark.parametrize(("low", "high", "per_decade"), [(0, 10, 1), (10, 5, 1), (1, 10, 0)])
+    def test_log_spaced_sizes_invalid(self, low, high, per_decade):
+        # When & Then: ValueError
+        with pytest.raises(ValueError):
+            log_spaced_sizes(low, high, per_decade)
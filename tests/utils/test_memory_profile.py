@@ -0,0 +1,150 @@
+"""
+MemoryProfile のテスト
+
+観点表:
+| Case ID    | Input / Precondition                 | Perspective       | Expected Result                       |
+| ---------- | ------------------------------------ | ----------------- | ------------------------------------- |
+| MEM-N-01   | 大きな確保をする段階を含む           | Equivalence       | その段階がピーク段階になる            |
+| MEM-N-02   | 確保して解放する段階                 | Equivalence       | ピークは大きく、保持量は小さい        |
+| MEM-N-03   | 既に tracemalloc が有効              | Equivalence       | 終了後も有効なまま                    |
+| MEM-A-01   | with ブロック外で stage()            | Abnormal          | RuntimeError                          |
+| MEM-A-02   | 段階内で例外                         | Abnormal          | 例外は伝播し、段階は記録される        |
+| MEM-B-01   | /proc が使えない                     | Boundary          | RSS 列は None / "-"                   |
+| MEM-B-02   | 段階なし                             | Boundary          | peak_stage は None                    |
+"""
+
+import tracemalloc
+
+import pytest
+
+from src.utils import memory_profile
+from src.utils.memory_profile import MemoryProfiler, MemoryReport, StageMemory, current_rss
+
+MB = 1024 * 1024
+
+
+class TestMemoryProfiler:
+    """段階別計測のテスト"""
+
+    def test_peak_stage_is_largest_allocation(self):
+        # Given: Small and large allocating stages (MEM-N-01)
+        with MemoryProfiler("test") as profiler:
+            with profiler.stage("small"):
+                small = bytearray(1 * MB)
+            with profiler.stage("large"):
+                large = bytearray(20 * MB)
+
+        # When: Reading the report
+        report = profiler.report
+
+        # Then: Large stage flagged, heap sizes roughly match
+        assert [s.stage for s in report.stages] == ["small", "large"]
+        assert report.peak_stage.stage == "large"
+        assert report.stages[1].heap_peak >= 20 * MB
+        assert "<-- peak" in report.format_table().splitlines()[-1]
+        assert report.to_dict()["peak_stage"] == "large"
+        del small, large
+
+    def test_transient_allocation_peak_vs_retained(self):
+        # Given: Stage that allocates and frees (MEM-N-02)
+        with MemoryProfiler() as profiler, profiler.stage("transient"):
+            buffer = bytearray(10 * MB)
+            del buffer
+
+        # When & Then: Peak counted, nothing retained
+        stage = profiler.report.stages[0]
+        assert stage.heap_peak >= 10 * MB
+        assert stage.heap_retained < 1 * MB
+
+    def test_rss_sampled_when_available(self):
+        # Given: Linux-style /proc available
+        if current_rss() is None:
+            pytest.skip("/proc/self/statm が使えない環境")
+
+        # When: Touching memory in a stage (larger than glibc's mmap threshold, so not reused)
+        with MemoryProfiler() as profiler, profiler.stage("touch"):
+            data = b"x" * (100 * MB)
+
+        # Then: RSS growth observed
+        assert profiler.report.stages[0].rss_peak >= 64 * MB
+        del data
+
+    def test_keeps_existing_tracing(self):
+        # Given: tracemalloc started by the caller (MEM-N-03)
+        tracemalloc.start()
+        try:
+            with MemoryProfiler() as profiler, profiler.stage("noop"):
+                pass
+
+            # When & Then: Still tracing afterwards
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_stage_outside_profiler(self):
+        # Given: Profiler not entered (MEM-A-01)
+        profiler = MemoryProfiler()
+
+        # When & Then: RuntimeError
+        with pytest.raises(RuntimeError, match="with ブロック"), profiler.stage("x"):
+            pass
+
+    def test_exception_in_stage_recorded(self):
+        # Given: Stage that fails (MEM-A-02)
+        with MemoryProfiler() as profiler, pytest.raises(KeyError), profiler.stage("boom"):
+            raise KeyError("x")
+
+        # When & Then: Stage still recorded, tracing stopped
+        assert profiler.report.stages[0].stage == "boom"
+        assert not tracemalloc.is_tracing()
+
+    def test_without_proc(self, monkeypatch):
+        # Given: /proc unavailable (MEM-B-01)
+        monkeypatch.setattr(memory_profile, "_STATM_PATH", "/nonexistent/statm")
+
+        # When: Profiling
+        with MemoryProfiler() as profiler, profiler.stage("heap-only"):
+            data = bytearray(MB)
+
+        # Then: Heap only, RSS reported as "-"
+        stage = profiler.report.stages[0]
+        assert stage.rss_peak is None
+        assert stage.peak == stage.heap_peak
+        assert " -" in profiler.report.format_table()
+        del data
+
+
+class TestMemoryReport:
+    """レポートのテスト"""
+
+    def test_empty_report(self):
+        # When & Then: No peak stage (MEM-B-02)
+        assert MemoryReport().peak_stage is None
+
+    def test_peak_uses_rss_when_larger(self):
+        # Given: Native allocation visible only in RSS
+        report = MemoryReport(
+            stages=[
+                StageMemory("heap", heap_peak=5 * MB, heap_retained=0, rss_peak=5 * MB),
+                StageMemory("native", heap_peak=1 * MB, heap_retained=0, rss_peak=50 * MB),
+            ]
+        )
+
+        # When & Then: RSS-heavy stage flagged
+        assert report.peak_stage.stage == "native"
+
+    def test_format_units(self):
+        # Given: Sizes across units
+        report = MemoryReport(
+            label="units",
+            stages=[StageMemory("s", heap_peak=3 * 1024**3, heap_retained=-512, rss_peak=2048)],
+        )
+
+        # When: Formatting
+        table = report.format_table()
+
+        # Then: Human readable units including negatives
+        assert "== units ==" in table
+        assert "3.00GB" in table
+        assert "-512B" in table
+        assert "2.0KB" in table